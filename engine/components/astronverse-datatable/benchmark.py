@@ -0,0 +1,111 @@
+"""
+数据表过滤、查找、排序吞吐测试
+
+生成一张 50 万行的数据表(编号、名称、金额、日期、分类五列), 统计各原子整列批量处理的耗时,
+并和逐个单元格调用 value_check 的过滤方式对比:
+
+    python benchmark.py [行数]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from astronverse.datatable import ConditionType, FilterType, FindType, SortOrder, datatable
+from astronverse.datatable.datatable import DataTable
+from astronverse.datatable.openpyxl import OpenpyxlWrapper
+from astronverse.datatable.utils import value_check
+
+CATEGORIES = ["Alpha", "beta", "Gamma", "delta", "epsilon"]
+
+
+def make_table(path: str, rows: int):
+    """数据只写入内存中的表, 不在计时范围内保存"""
+    wrapper = OpenpyxlWrapper(file_path=path, sheet_name=None)
+    columns = [
+        list(range(1, rows + 1)),
+        ["name{}".format(i) for i in range(rows)],
+        [round(i * 0.37 % 1000, 2) for i in range(rows)],
+        ["2023-{:02d}-{:02d}".format(i % 12 + 1, i % 28 + 1) for i in range(rows)],
+        [CATEGORIES[i % len(CATEGORIES)] for i in range(rows)],
+    ]
+    for col_index, data in enumerate(columns, 1):
+        wrapper.write_column(col_index=col_index, data=data)
+    return wrapper
+
+
+def timed(name: str, cells: int, func):
+    start = time.perf_counter()
+    result = func()
+    cost = time.perf_counter() - start
+    print("{:<28}{:>8.2f}s{:>14,.0f} cells/s".format(name, cost, cells / cost))
+    return result
+
+
+def filter_column(col: str, condition_type: ConditionType, **kwargs) -> list:
+    return DataTable.filter_data_table(
+        filter_type=FilterType.COLUMN, col=col, condition_type=condition_type, is_case_sensitive=False, **kwargs
+    )
+
+
+def value_check_loop(values: list, condition_type: ConditionType, **kwargs) -> list:
+    """逐个单元格判断, 批量过滤之前的做法"""
+    conditions = {"condition_value": "", "date_value": "", "date_range": "", "is_case_sensitive": False}
+    conditions.update(kwargs)
+    return [value for value in values if value_check(value, condition_type, **conditions)]
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    cells = rows * 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data_table.xlsx")
+        datatable._xlsx_file_path = path
+        datatable.PyxlWrapper = make_table(path, rows)
+        # 计时范围内不按写回策略保存文件
+        datatable._save_interval = 3600
+        datatable._save_budget = sys.maxsize
+        print("{:,} rows x 5 cols = {:,} cells".format(rows, cells))
+
+        names = datatable.PyxlWrapper.read_column(col_index=2)
+        dates = datatable.PyxlWrapper.read_column(col_index=4)
+        contains = {"condition_value": "NAME1"}
+        between = {"date_range": "2023-03-01,2023-09-30"}
+        expected = timed(
+            "contains (value_check)", rows, lambda: value_check_loop(names, ConditionType.CONTAINS, **contains)
+        )
+        assert timed("contains", rows, lambda: filter_column("B", ConditionType.CONTAINS, **contains)) == expected
+        expected = timed(
+            "date_between (value_check)", rows, lambda: value_check_loop(dates, ConditionType.DATE_BETWEEN, **between)
+        )
+        assert (
+            timed("date_between", rows, lambda: filter_column("D", ConditionType.DATE_BETWEEN, **between)) == expected
+        )
+        timed("greater_than", rows, lambda: filter_column("C", ConditionType.GREATER_THAN, condition_value="500"))
+        timed(
+            "filter table (equals)",
+            cells,
+            lambda: DataTable.filter_data_table(
+                filter_type=FilterType.TABLE, condition_type=ConditionType.EQUALS, condition_value="Gamma"
+            ),
+        )
+
+        found = timed(
+            "find table",
+            cells,
+            lambda: DataTable.find_and_replace(find_type=FindType.TABLE, find_value="name12", is_replace=False),
+        )
+        timed(
+            "find + replace column",
+            rows,
+            lambda: DataTable.find_and_replace(
+                find_type=FindType.COLUMN, col="E", find_value="beta", is_case_sensitive=False, replace_value="BETA"
+            ),
+        )
+        timed("sort column (numbers)", rows, lambda: DataTable.sort_table(col="C", sort_type=SortOrder.DESCENDING))
+        timed("sort column (text)", rows, lambda: DataTable.sort_table(col="B", sort_type=SortOrder.ASCENDING))
+        print("find table matches: {:,}".format(len(found)))
+        # 临时文件不保存, 退出时也不再写回
+        datatable.PyxlWrapper.store.clean()
@@ -1,7 +1,10 @@
 import ast
+import atexit
 import json
 import os
 import sys
+import threading
+import time
 from functools import wraps
 
 from astronverse.actionlib import DynamicsItem
@@ -36,7 +39,15 @@ from astronverse.datatable.error import (
     PARAMS_ERROR,
 )
 from astronverse.datatable.openpyxl import OpenpyxlWrapper
-from astronverse.datatable.utils import col_to_index, filter_data, index_to_col, validate, validate_formula
+from astronverse.datatable.utils import (
+    col_to_index,
+    filter_columns,
+    filter_data,
+    find_matches,
+    index_to_col,
+    validate,
+    validate_formula,
+)
 
 _clipboard = None
 _xlsx_file_path = os.path.abspath(os.path.join(sys.exec_prefix, "../astron/data_table.xlsx"))
@@ -50,13 +61,74 @@ PyxlWrapper = OpenpyxlWrapper(file_path=_xlsx_file_path, sheet_name=None)
 PyxlHeadWrapper = OpenpyxlWrapper(file_path=_head_file_path, sheet_name=None)
 
 
+# 写回策略: 修改只写内存, 未保存的单元格数超过预算或距第一次未保存的修改超过间隔时写回文件
+_save_interval = 3  # 秒
+_save_budget = 10000  # 单元格数
+# 有未保存的修改时启动定时器, 流程之后不再写入数据表时也按间隔写回; 写入和定时写回通过锁互斥
+_save_timer = None
+_save_lock = threading.RLock()
+
+
+def flush_data_table(force: bool = False):
+    """按写回策略把内存中的修改保存到文件, force 为 True 时只要有修改就保存"""
+    with _save_lock:
+        store = PyxlWrapper.store
+        if not store.is_dirty:
+            return
+        if force or store.changes >= _save_budget or time.monotonic() - store.dirty_since >= _save_interval:
+            PyxlWrapper.save(path=_xlsx_file_path)
+        _arm_save_timer()
+
+
+def _arm_save_timer():
+    """还有未保存的修改且没有等待中的定时器时, 在间隔到期时写回"""
+    global _save_timer
+    store = PyxlWrapper.store
+    if not store.is_dirty:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        return
+    if _save_timer is not None:
+        return
+    delay = max(_save_interval - (time.monotonic() - store.dirty_since), 0)
+    _save_timer = threading.Timer(delay, _save_on_timer)
+    _save_timer.daemon = True
+    _save_timer.start()
+
+
+def _save_on_timer():
+    """定时器到期, 按写回策略保存; 失败时等下一次写入再重试"""
+    global _save_timer
+    with _save_lock:
+        _save_timer = None
+        try:
+            flush_data_table()
+        except Exception as e:
+            logger.error(f"DataTable timed save failed: {e}")
+
+
+def _save_at_exit():
+    """流程结束时保存剩余的修改"""
+    try:
+        flush_data_table(force=True)
+    except Exception as e:
+        logger.error(f"DataTable save at exit failed: {e}")
+
+
+# 执行器结束流程时强制结束进程, 不会执行 atexit, 通过 atomicMg 在结束前写回
+atexit.register(_save_at_exit)
+atomicMg.register_exit_flush(_save_at_exit)
+
+
 def auto_save(func):
-    """自动保存装饰器"""
+    """自动保存装饰器, 按写回策略延后保存"""
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        result = func(*args, **kwargs)  # type: ignore , 先执行写入操作
-        PyxlWrapper.save(path=_xlsx_file_path)
+        with _save_lock:
+            result = func(*args, **kwargs)  # type: ignore , 先执行写入操作
+            flush_data_table()
         return result
 
     return wrapper
@@ -487,6 +559,18 @@ class DataTable:
         """
         return PyxlWrapper.get_max_column()
 
+    @staticmethod
+    @atomicMg.atomic(
+        "DataTable",
+        inputList=[],
+        outputList=[],
+    )
+    def save_data_table():
+        """
+        保存数据表格, 立即把内存中的修改写入文件
+        """
+        flush_data_table(force=True)
+
     @staticmethod
     @validate_cell
     @atomicMg.atomic(
@@ -937,25 +1021,26 @@ class DataTable:
         """
         遍历数据表格内容
         """
-        list_data = DataTable.read_data(
-            read_type=ReadType(loop_type.value),
-            row=row,
-            col=col,
-            start_row=start_row,
-            start_col=start_col,
-            end_row=end_row,
-            end_col=end_col,
-        )
-
-        if not list_data:
-            list_data = []
+        if loop_type != LoopType.AREA:
+            # 单行/单列已经在内存中, 直接遍历
+            list_data = DataTable.read_data(read_type=ReadType(loop_type.value), row=row, col=col) or []
+            return enumerate(list_data)
 
-        def table_generator():
-            list_length = len(list_data)
-            for i in range(list_length):
-                yield (i, list_data[i])
+        if start_row and start_col:
+            validate(col=start_col, row=start_row)
+        else:
+            raise DATAFRAME_EXPECTION(PARAMS_ERROR.format("区域读/写需要指定起始行列"), "区域读/写需要指定起始行列")
+        if end_col:
+            validate(col=end_col)
+        else:
+            end_col = index_to_col(PyxlWrapper.get_max_column() - 1)
+        if end_row:
+            validate(row=end_row)
+        else:
+            end_row = PyxlWrapper.get_max_row()
 
-        return table_generator()
+        # 按窗口逐步构造行数据, 循环中 break 时不会读取剩余的行
+        return enumerate(PyxlWrapper.iter_range(range_str=f"{start_col}{start_row}:{end_col}{end_row}"))
 
     @staticmethod
     @validate_cell
@@ -1133,39 +1218,27 @@ class DataTable:
                 raise DATAFRAME_EXPECTION(PARAMS_ERROR.format("列不能为空"), "列不能为空")
             col_index = col_to_index(col)
             column_data = PyxlWrapper.read_column(col_index=col_index)
-            for r, cell_value in enumerate(column_data, start=1):
-                if cell_value is not None:
-                    cell_str = str(cell_value)
-                    if is_case_sensitive:
-                        if find_value in cell_str:
-                            find_data_positions.append((r, col))
-                            if is_replace:
-                                new_value = cell_str.replace(find_value, replace_value)
-                                PyxlWrapper.write_cell(row=r, col=col_index, value=new_value)
-                    else:
-                        if find_value.lower() in cell_str.lower():
-                            find_data_positions.append((r, col))
-                            if is_replace:
-                                new_value = cell_str.replace(find_value, replace_value)
-                                PyxlWrapper.write_cell(row=r, col=col_index, value=new_value)
+            matches = find_matches(column_data, find_value, is_case_sensitive)
+            find_data_positions = [(r + 1, col) for r in matches]
+            if is_replace and matches:
+                for r in matches:
+                    column_data[r] = str(column_data[r]).replace(find_value, replace_value)
+                PyxlWrapper.write_column(
+                    col_index=col_index, data=column_data[matches[0] : matches[-1] + 1], start_row=matches[0] + 1
+                )
         else:
-            max_row = PyxlWrapper.get_max_row()
-            max_col = PyxlWrapper.get_max_column()
-            for r in range(1, max_row + 1):
-                for c in range(1, max_col + 1):
-                    cell_value = PyxlWrapper.read_cell(row=r, col=c)
-                    if cell_value is not None and str(find_value) in str(cell_value):
-                        if is_case_sensitive:
-                            find_data_positions.append((r, index_to_col(c - 1)))
-                            if is_replace:
-                                new_value = str(cell_value).replace(find_value, replace_value)
-                                PyxlWrapper.write_cell(row=r, col=c, value=new_value)
-                        else:
-                            if str(find_value).lower() in str(cell_value).lower():
-                                find_data_positions.append((r, index_to_col(c)))
-                                if is_replace:
-                                    new_value = str(cell_value).replace(find_value, replace_value)
-                                    PyxlWrapper.write_cell(row=r, col=c, value=new_value)
+            # 按列批量查找, 结果按行优先排序; 每列的替换结果整段写回
+            for c in range(1, PyxlWrapper.get_max_column() + 1):
+                column_data = PyxlWrapper.read_column(col_index=c)
+                matches = find_matches(column_data, find_value, is_case_sensitive)
+                find_data_positions.extend((r + 1, c) for r in matches)
+                if is_replace and matches:
+                    for r in matches:
+                        column_data[r] = str(column_data[r]).replace(find_value, replace_value)
+                    PyxlWrapper.write_column(
+                        col_index=c, data=column_data[matches[0] : matches[-1] + 1], start_row=matches[0] + 1
+                    )
+            find_data_positions = [(r, index_to_col(c - 1)) for r, c in sorted(find_data_positions)]
         return find_data_positions
 
     @staticmethod
@@ -1258,23 +1331,22 @@ class DataTable:
                     "日期范围格式错误，正确格式如：2023-01-01,2023-12-31",
                 )
         col_index = col_to_index(col)
-        data = []
-        if filter_type == FilterType.COLUMN:
-            data = PyxlWrapper.read_column(col_index=col_index)
-        elif filter_type == FilterType.ROW:
-            data = PyxlWrapper.read_row(row_index=row)
-        else:
-            data = PyxlWrapper.read_effective_area()
-
-        data_filtered = filter_data(
-            data=data,
-            filter_type=filter_type,
+        conditions = dict(
             condition_type=condition_type,
             condition_value=condition_value,
             date_value=date_value,
             date_range=date_range,
             is_case_sensitive=is_case_sensitive,
         )
+        if filter_type == FilterType.COLUMN:
+            data_filtered = filter_data(
+                data=PyxlWrapper.read_column(col_index=col_index), filter_type=filter_type, **conditions
+            )
+        elif filter_type == FilterType.ROW:
+            data_filtered = filter_data(data=PyxlWrapper.read_row(row_index=row), filter_type=filter_type, **conditions)
+        else:
+            # 整表按列批量过滤, 不需要先转成行
+            data_filtered = filter_columns(PyxlWrapper.read_columns(), **conditions)
 
         if is_save_filtered:
             if filter_type == FilterType.COLUMN:
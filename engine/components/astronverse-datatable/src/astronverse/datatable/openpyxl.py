@@ -8,12 +8,21 @@ from astronverse.datatable.error import (
     WRITE_DATA_ERROR_FORMAT,
     WRITE_PERMISSION_DENIED_ERROR_FORMAT,
 )
+from astronverse.datatable.store import TableStore
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.utils.cell import coordinate_from_string
 from openpyxl.worksheet.worksheet import Worksheet
 
 
 class OpenpyxlWrapper:
+    """
+    Excel wrapper working on an in-memory columnar copy of the active sheet.
+
+    Reads and writes go to ``self.store``; the worksheet object is only updated by
+    ``sync`` and the file is only written by ``save``.
+    """
+
     def __init__(self, file_path: str, sheet_name=None):
         """
         Initializes the Excel wrapper.
@@ -37,6 +46,18 @@ class OpenpyxlWrapper:
                 self.sheet = self.workbook.create_sheet(title=sheet_name)
         else:
             self.sheet = self.workbook.active
+        self.store = TableStore.from_sheet(self.sheet)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Whether there are changes not yet saved to the file."""
+        return self.store.is_dirty
+
+    def sync(self):
+        """
+        Writes the pending in-memory changes into the worksheet object, without saving the file.
+        """
+        self.store.write_to(self.sheet)
 
     def save(self, path: str = None):
         """
@@ -46,12 +67,15 @@ class OpenpyxlWrapper:
             path (str, optional): The path to save the file. If None, overwrites the original file.
         """
         save_path = path or self.file_path
+        self.sync()
         try:
             self.workbook.save(save_path)
         except PermissionError:
             raise DATAFRAME_EXPECTION(WRITE_PERMISSION_DENIED_ERROR_FORMAT.format(save_path), "写入Excel文件失败")
         except Exception as e:
             raise DATAFRAME_EXPECTION(WRITE_DATA_ERROR_FORMAT.format(save_path, str(e)), "写入Excel文件失败")
+        if os.path.abspath(save_path) == os.path.abspath(self.file_path):
+            self.store.clean()
 
     def close(self):
         """
@@ -73,10 +97,15 @@ class OpenpyxlWrapper:
         Args:
             sheet_name (str): The name of the sheet to activate. If it does not exist, it will be created.
         """
+        self.sync()
+        dirty_since, changes = self.store.dirty_since, self.store.changes
         if sheet_name in self.workbook.sheetnames:
             self.sheet = self.workbook[sheet_name]
         else:
             self.sheet = self.workbook.create_sheet(title=sheet_name)
+        self.store = TableStore.from_sheet(self.sheet)
+        # 切换前未保存的修改已经在 worksheet 里, 仍需写回文件
+        self.store.dirty_since, self.store.changes = dirty_since, changes
 
     def add_sheet(self, title: str = None, index: int = None) -> Worksheet:
         """
@@ -99,6 +128,7 @@ class OpenpyxlWrapper:
         Args:
             sheet_name (str): The name of the sheet to delete.
         """
+        self.sync()
         if sheet_name in self.workbook.sheetnames:
             sheet_to_delete = self.workbook[sheet_name]
             self.workbook.remove(sheet_to_delete)
@@ -114,6 +144,7 @@ class OpenpyxlWrapper:
         Returns:
             Worksheet: The newly created sheet.
         """
+        self.sync()
         source_sheet = self.workbook[source_sheet_name]
         new_sheet = self.workbook.copy_worksheet(source_sheet)
         new_sheet.title = new_sheet_name
@@ -151,7 +182,7 @@ class OpenpyxlWrapper:
         Returns:
             The value of the cell.
         """
-        return self.sheet.cell(row=row, column=col).value
+        return self.store.get(row, col)
 
     def read_row(self, row_index: int) -> list:
         """
@@ -163,7 +194,7 @@ class OpenpyxlWrapper:
         Returns:
             list: A list of cell values in the row.
         """
-        return [cell.value for cell in self.sheet[row_index]]
+        return self.store.row(row_index)
 
     def read_column(self, col_name: str = None, col_index: int = None) -> list:
         """
@@ -180,9 +211,9 @@ class OpenpyxlWrapper:
             ValueError: If neither col_name nor col_index is provided.
         """
         if col_name:
-            return [cell.value for cell in self.sheet[col_name]]
+            return self.store.column(column_index_from_string(col_name))
         elif col_index:
-            return [cell.value for cell in self.sheet[get_column_letter(col_index)]]
+            return self.store.column(col_index)
         else:
             raise ValueError("Either column name or column index must be provided.")
 
@@ -196,7 +227,22 @@ class OpenpyxlWrapper:
         Returns:
             list: A 2D list of cell values in the range.
         """
-        return [[cell.value for cell in row] for row in self.sheet[range_str]]
+        min_col, min_row, max_col, max_row = range_boundaries(range_str)
+        return self.store.range(min_row, min_col, max_row, max_col)
+
+    def iter_range(self, range_str: str, window: int = 1000):
+        """
+        Iterates over the rows of a range without building them all up front.
+
+        Args:
+            range_str (str): The range string (e.g., 'A1:B2').
+            window (int): The number of rows built per step.
+
+        Returns:
+            Iterator[list]: The cell value lists of each row in the range.
+        """
+        min_col, min_row, max_col, max_row = range_boundaries(range_str)
+        return self.store.iter_range(min_row, min_col, max_row, max_col, window)
 
     def read_effective_area(self) -> list:
         """
@@ -205,9 +251,16 @@ class OpenpyxlWrapper:
         Returns:
             list: A 2D list of cell values in the effective area.
         """
-        max_row = self.sheet.max_row
-        max_col = self.sheet.max_column
-        return [[self.sheet.cell(row=r, column=c).value for c in range(1, max_col + 1)] for r in range(1, max_row + 1)]
+        return self.store.rows()
+
+    def read_columns(self) -> list:
+        """
+        Reads the effective area of the sheet column by column.
+
+        Returns:
+            list: A list of columns, each a list of ``max_row`` cell values.
+        """
+        return [self.store.column(c) for c in range(1, self.store.max_column + 1)]
 
     def get_max_row(self) -> int:
         """
@@ -216,7 +269,7 @@ class OpenpyxlWrapper:
         Returns:
             int: The maximum row index.
         """
-        return self.sheet.max_row
+        return self.store.max_row
 
     def get_max_column(self) -> int:
         """
@@ -225,7 +278,7 @@ class OpenpyxlWrapper:
         Returns:
             int: The maximum column index.
         """
-        return self.sheet.max_column
+        return self.store.max_column
 
     def write_cell(self, row: int, col: int, value):
         """
@@ -236,7 +289,7 @@ class OpenpyxlWrapper:
             col (int): The column index (1-based).
             value: The value to write.
         """
-        self.sheet.cell(row=row, column=col, value=value)
+        self.store.set(row, col, value)
 
     def write_row(self, row_index: int, data: list, start_col: int = 1):
         """
@@ -247,9 +300,7 @@ class OpenpyxlWrapper:
             data (list): The list of data to write.
             start_col (int): The starting column index (1-based).
         """
-        print(f"Writing data to row {row_index} starting at column {start_col}: {data}")
-        for i, value in enumerate(data):
-            self.sheet.cell(row=row_index, column=start_col + i, value=value)
+        self.store.set_range(row_index, start_col, [list(data)])
 
     def append_row(self, data: list):
         """
@@ -258,7 +309,7 @@ class OpenpyxlWrapper:
         Args:
             data (list): The list of data to append.
         """
-        self.sheet.append(data)
+        self.store.append_row(data)
 
     def write_column(self, col_name: str = None, col_index: int = None, data: list = None, start_row: int = 1):
         """
@@ -276,10 +327,8 @@ class OpenpyxlWrapper:
         if not col_name and not col_index:
             raise ValueError("Either column name or column index must be provided.")
 
-        col = col_index or openpyxl.utils.column_index_from_string(col_name)
-
-        for i, value in enumerate(data):
-            self.sheet.cell(row=start_row + i, column=col, value=value)
+        col = col_index or column_index_from_string(col_name)
+        self.store.set_column(col, list(data), start_row=start_row)
 
     def write_range(self, range_str: str, data: list):
         """
@@ -289,19 +338,14 @@ class OpenpyxlWrapper:
             range_str (str): The range string (e.g., 'A1:B2').
             data (list): A 2D list of data to write.
         """
-        from openpyxl.utils import range_boundaries
-
         min_col, min_row, max_col, max_row = range_boundaries(range_str)
-
-        for r_idx, row_data in enumerate(data):
-            for c_idx, cell_value in enumerate(row_data):
-                self.sheet.cell(row=min_row + r_idx, column=min_col + c_idx, value=cell_value)
+        self.store.set_range(min_row, min_col, [list(row_data) for row_data in data])
 
     def fill_data_table_by_import_file(
         self, import_file_path: str, delimiter: str = ",", include_header: bool = True, sheet_name=None
     ):
         ext = os.path.splitext(import_file_path)[1].lower()
-        self.sheet.delete_rows(1, self.sheet.max_row)
+        self.store.delete_rows(1, self.store.n_rows)
         if ext == ".csv":
             try:
                 with open(import_file_path, newline="", encoding="utf-8") as csvfile:
@@ -337,8 +381,8 @@ class OpenpyxlWrapper:
             col (int): The column index (1-based) where to insert cells.
             amount (int): The number of cells to insert.
         """
-        self.sheet.insert_cols(idx=col, amount=amount)
-        self.sheet.insert_rows(idx=row, amount=amount)
+        self.store.insert_cols(col, amount)
+        self.store.insert_rows(row, amount)
 
     def insert_rows(self, idx: int, amount: int = 1):
         """
@@ -348,7 +392,7 @@ class OpenpyxlWrapper:
             idx (int): The row index (1-based) where to insert rows.
             amount (int): The number of rows to insert.
         """
-        self.sheet.insert_rows(idx=idx, amount=amount)
+        self.store.insert_rows(idx, amount)
 
     def insert_cols(self, idx: int, amount: int = 1):
         """
@@ -358,7 +402,7 @@ class OpenpyxlWrapper:
             idx (int): The column index (1-based) where to insert columns.
             amount (int): The number of columns to insert.
         """
-        self.sheet.insert_cols(idx=idx, amount=amount)
+        self.store.insert_cols(idx, amount)
 
     def copy_paste_range(self, source_range_str: str, dest_start_cell_str: str):
         """
@@ -368,15 +412,9 @@ class OpenpyxlWrapper:
             source_range_str (str): The source range (e.g., 'A1:B2').
             dest_start_cell_str (str): The top-left cell of the destination (e.g., 'C1').
         """
-        source_range = self.sheet[source_range_str]
-        dest_start_cell = self.sheet[dest_start_cell_str]
-
-        dest_start_row = dest_start_cell.row
-        dest_start_col = dest_start_cell.column
-
-        for i, row in enumerate(source_range):
-            for j, cell in enumerate(row):
-                self.sheet.cell(row=dest_start_row + i, column=dest_start_col + j, value=cell.value)
+        data = self.read_range(source_range_str)
+        dest_col, dest_row = coordinate_from_string(dest_start_cell_str)
+        self.store.set_range(dest_row, column_index_from_string(dest_col), data)
 
     def delete_cell(self, row: int, col: int, move_direction: str = "up"):
         """
@@ -387,14 +425,21 @@ class OpenpyxlWrapper:
             col (int): The column index (1-based) of the cell to delete.
             move_direction (str): The direction to shift cells ('up' or 'left').
         """
+        store = self.store
         if move_direction == "up":
-            for r in range(row, self.sheet.max_row):
-                self.sheet.cell(row=r, column=col).value = self.sheet.cell(row=r + 1, column=col).value
-            self.sheet.cell(row=self.sheet.max_row, column=col).value = None
+            max_row = store.max_row
+            if row <= max_row:
+                below = [store.get(r, col) for r in range(row + 1, max_row + 1)]
+                store.set_column(col, below + [None], start_row=row)
+            else:
+                store.set(max_row, col, None)
         elif move_direction == "left":
-            for c in range(col, self.sheet.max_column):
-                self.sheet.cell(row=row, column=c).value = self.sheet.cell(row=row, column=c + 1).value
-            self.sheet.cell(row=row, column=self.sheet.max_column).value = None
+            max_col = store.max_column
+            if col <= max_col:
+                right = [store.get(row, c) for c in range(col + 1, max_col + 1)]
+                store.set_range(row, col, [right + [None]])
+            else:
+                store.set(row, max_col, None)
 
     def delete_rows(self, idx: int, amount: int = 1):
         """
@@ -404,7 +449,7 @@ class OpenpyxlWrapper:
             idx (int): The row index (1-based) from where to delete.
             amount (int): The number of rows to delete.
         """
-        self.sheet.delete_rows(idx=idx, amount=amount)
+        self.store.delete_rows(idx, amount)
 
     def delete_cols(self, idx: int, amount: int = 1):
         """
@@ -414,7 +459,7 @@ class OpenpyxlWrapper:
             idx (int): The column index (1-based) from where to delete.
             amount (int): The number of columns to delete.
         """
-        self.sheet.delete_cols(idx=idx, amount=amount)
+        self.store.delete_cols(idx, amount)
 
     def empty_row(self, row_index: int):
         """
@@ -423,8 +468,7 @@ class OpenpyxlWrapper:
         Args:
             row_index (int): The row index (1-based) to empty.
         """
-        for cell in self.sheet[row_index]:
-            cell.value = None
+        self.store.clear(row_index, 1, row_index, self.store.max_column)
 
     def empty_column(self, col_name: str = None, col_index: int = None):
         """
@@ -440,11 +484,8 @@ class OpenpyxlWrapper:
         if not col_name and not col_index:
             raise ValueError("Either column name or column index must be provided.")
 
-        col = col_index or openpyxl.utils.column_index_from_string(col_name)
-
-        for row in self.sheet.iter_rows(min_col=col, max_col=col):
-            for cell in row:
-                cell.value = None
+        col = col_index or column_index_from_string(col_name)
+        self.store.clear(1, col, self.store.max_row, col)
 
     def clear_range(self, range_str: str):
         """
@@ -453,9 +494,8 @@ class OpenpyxlWrapper:
         Args:
             range_str (str): The range to clear (e.g., 'A1:B10').
         """
-        for row in self.sheet[range_str]:
-            for cell in row:
-                cell.value = None
+        min_col, min_row, max_col, max_row = range_boundaries(range_str)
+        self.store.clear(min_row, min_col, max_row, max_col)
 
     def sort_range(self, range_str: str, sort_column_index: int, reverse: bool = False):
         """
@@ -469,17 +509,13 @@ class OpenpyxlWrapper:
         data = self.read_range(range_str)
 
         # Extract the top-left cell coordinates to write back the sorted data
-        from openpyxl.utils import range_boundaries
-
         min_col, min_row, max_col, max_row = range_boundaries(range_str)
 
         # Sort the data
         sorted_data = sorted(data, key=lambda x: x[sort_column_index], reverse=reverse)
 
         # Write the sorted data back to the sheet
-        for r_idx, row_data in enumerate(sorted_data):
-            for c_idx, cell_value in enumerate(row_data):
-                self.sheet.cell(row=min_row + r_idx, column=min_col + c_idx, value=cell_value)
+        self.store.set_range(min_row, min_col, sorted_data)
 
     def sort_column(self, col_index: int, order: str = "ascending"):
         """
@@ -489,35 +525,15 @@ class OpenpyxlWrapper:
             col_index (int): The column index (1-based) to sort.
             order (str): The sort order ('ascending' or 'descending').
         """
-        max_row = self.sheet.max_row
+        max_row = self.store.max_row
         if max_row == 0:
             return  # Nothing to sort
 
-        # Read the data from the specified column
-        col_data = [self.sheet.cell(row=r, column=col_index).value for r in range(1, max_row + 1)]
-
         # Determine sort order
         reverse = order.lower() == "descending"
 
-        # Define a sort key to handle mixed types (numbers, strings, None) to avoid TypeErrors
-        def sort_key(x):
-            if x is None:
-                return (2, None)  # Nones last
-            if isinstance(x, (int, float)):
-                return (0, x)  # Numbers first
-            return (1, str(x))  # Other types (converted to string) second
-
-        # Sort the column data
-        try:
-            sorted_data = sorted(col_data, key=sort_key, reverse=reverse)
-        except TypeError:
-            # Fallback for un-sortable types, though the key should handle most cases.
-            # In this case, we do nothing.
-            return
-
-        # Write the sorted data back to the column, leaving other columns unaffected
-        for i, value in enumerate(sorted_data):
-            self.sheet.cell(row=i + 1, column=col_index, value=value)
+        # Numbers first, then other values as strings, None last; other columns are unaffected
+        self.store.sort_column(col_index, reverse=reverse)
 
     def find_and_replace(self, find_value, replace_value, range_str: str = None):
         """
@@ -530,14 +546,14 @@ class OpenpyxlWrapper:
                                       If None, searches the entire sheet.
         """
         if range_str:
-            target_range = self.sheet[range_str]
+            min_col, min_row, max_col, max_row = range_boundaries(range_str)
         else:
-            target_range = self.sheet.iter_rows()
+            min_col, min_row, max_col, max_row = 1, 1, self.store.max_column, self.store.max_row
 
-        for row in target_range:
-            for cell in row:
-                if cell.value == find_value:
-                    cell.value = replace_value
+        for r_idx, row in enumerate(self.store.range(min_row, min_col, max_row, max_col)):
+            for c_idx, value in enumerate(row):
+                if value == find_value:
+                    self.store.set(min_row + r_idx, min_col + c_idx, replace_value)
 
     def import_from_csv(self, csv_file_path: str, delimiter=","):
         """
@@ -550,7 +566,7 @@ class OpenpyxlWrapper:
         with open(csv_file_path, newline="", encoding="utf-8") as csvfile:
             reader = csv.reader(csvfile, delimiter=delimiter)
             for row_data in reader:
-                self.sheet.append(row_data)
+                self.store.append_row(row_data)
 
     def export_to_csv(self, csv_file_path: str, include_header: bool = True, delimiter=","):
         """
@@ -565,11 +581,9 @@ class OpenpyxlWrapper:
             writer = csv.writer(csvfile, delimiter=delimiter)
 
             if include_header:
-                header = [cell.value for cell in self.sheet[1]]
-                writer.writerow(header)
+                writer.writerow(self.store.row(1))
 
-            for row in self.sheet.iter_rows(min_row=2 if include_header else 1):
-                writer.writerow([cell.value for cell in row])
+            writer.writerows(self.store.rows(min_row=2 if include_header else 1))
 
     def import_from_json(self, json_file_path: str, include_header: bool = True):
         """
@@ -605,13 +619,11 @@ class OpenpyxlWrapper:
         """
         data = []
         if use_header:
-            header = [cell.value for cell in self.sheet[1]]
-            for row in self.sheet.iter_rows(min_row=2):
-                row_data = {header[i]: cell.value for i, cell in enumerate(row)}
-                data.append(row_data)
+            header = self.store.row(1)
+            for row in self.store.rows(min_row=2):
+                data.append(dict(zip(header, row)))
         else:
-            for row in self.sheet.iter_rows():
-                data.append([cell.value for cell in row])
+            data = self.store.rows()
 
         with open(json_file_path, "w", encoding="utf-8") as jsonfile:
             json.dump(data, jsonfile, indent=4)
@@ -632,7 +644,7 @@ class OpenpyxlWrapper:
         Returns:
             int: The maximum row count.
         """
-        return self.sheet.max_row
+        return self.store.max_row
 
     def get_column_count(self) -> int:
         """
@@ -641,7 +653,7 @@ class OpenpyxlWrapper:
         Returns:
             int: The maximum column count.
         """
-        return self.sheet.max_column
+        return self.store.max_column
 
     def get_column_name(self, col_index: int) -> str:
         """
@@ -663,7 +675,7 @@ class OpenpyxlWrapper:
             col_index (int): The column index (1-based).
             name (str): The name to set.
         """
-        self.sheet.cell(row=1, column=col_index, value=name)
+        self.store.set(1, col_index, name)
 
     def insert_formula(self, row: int, col: int, formula: str):
         """
@@ -674,7 +686,7 @@ class OpenpyxlWrapper:
             col (int): The column index (1-based).
             formula (str): The formula to insert (e.g., '=SUM(A1:A5)').
         """
-        self.sheet.cell(row=row, column=col, value=formula)
+        self.store.set(row, col, formula)
 
     def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
         """
@@ -690,6 +702,7 @@ class OpenpyxlWrapper:
         Returns:
             generator: A generator for rows.
         """
+        self.sync()
         return self.sheet.iter_rows(
             min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=values_only
         )
@@ -708,6 +721,7 @@ class OpenpyxlWrapper:
         Returns:
             generator: A generator for columns.
         """
+        self.sync()
         return self.sheet.iter_cols(
             min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=values_only
         )
@@ -724,6 +738,7 @@ class OpenpyxlWrapper:
             list: A list of rows that meet the condition.
         """
         filtered_rows = []
+        self.sync()
 
         if range_str:
             rows = self.sheet[range_str]
@@ -0,0 +1,389 @@
+import time
+import weakref
+
+from openpyxl.worksheet.worksheet import Worksheet
+
+
+class RangeReader:
+    """
+    Iterator over the rows of a range, building ``window`` rows at a time from the columns.
+
+    The range is not copied up front: before the store is changed it calls ``detach`` on the
+    readers still in use, which copy only the values they have not returned yet.
+    """
+
+    def __init__(self, columns: list, start: int, end: int, window: int):
+        """
+        Args:
+            columns (list): The column lists of the range, None for columns past the last one.
+            start (int): The first row as a 0-based index into the columns.
+            end (int): The index after the last row.
+            window (int): The number of rows built per step.
+        """
+        self.columns = columns
+        self.start = start
+        self.end = end
+        self.window = max(window, 1)
+        self.rows = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> list:
+        row = next(self.rows, None)
+        if row is not None:
+            return row
+        if self.start >= self.end:
+            raise StopIteration
+        stop = min(self.start + self.window, self.end)
+        height = stop - self.start
+        if self.columns:
+            # 按窗口转置, 提前 break 时剩下的行不会被构造; 超出范围的部分补 None
+            parts = [[] if column is None else column[self.start : stop] for column in self.columns]
+            parts = [part + [None] * (height - len(part)) if len(part) < height else part for part in parts]
+            self.rows = map(list, zip(*parts))
+        else:
+            self.rows = iter([[] for _ in range(height)])
+        self.start = stop
+        return next(self.rows)
+
+    def detach(self):
+        """Copies the values not returned yet, so later changes to the store do not affect them."""
+        self.columns = [None if column is None else column[self.start : self.end] for column in self.columns]
+        self.end -= self.start
+        self.start = 0
+
+
+class TableStore:
+    """
+    In-memory columnar copy of a worksheet's cell values.
+
+    Every column is a list of values of the same length (``n_rows``). Rows and columns are
+    1-based as in openpyxl. Changes are tracked as a dirty bounding box; structural changes
+    (inserting or deleting rows/columns) mark the whole table for rewrite.
+    """
+
+    def __init__(self, rows: list = None):
+        """
+        Initializes the store.
+
+        Args:
+            rows (list, optional): A 2D list of row values to start with.
+        """
+        self.columns: list[list] = []
+        self.n_rows = 0
+        # 正在遍历的 iter_range 迭代器, 修改前让它们复制剩余的值
+        self.readers = weakref.WeakSet()
+        if rows:
+            width = max(len(row) for row in rows)
+            self.n_rows = len(rows)
+            self.columns = [[row[c] if c < len(row) else None for row in rows] for c in range(width)]
+        self.clean()
+
+    @classmethod
+    def from_sheet(cls, sheet: Worksheet) -> "TableStore":
+        """
+        Loads the values of a worksheet.
+
+        Args:
+            sheet (Worksheet): The worksheet to copy.
+
+        Returns:
+            TableStore: The store holding the sheet values.
+        """
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        # 空表 openpyxl 也会返回一个 A1 空单元格
+        if len(rows) == 1 and all(v is None for v in rows[0]):
+            rows = []
+        return cls(rows)
+
+    # ==================== 脏区域 ====================
+
+    def clean(self):
+        """Marks all changes as persisted."""
+        self.dirty = None  # (min_row, min_col, max_row, max_col)
+        self.structural = False
+        self.changes = 0
+        self.dirty_since = None
+
+    @property
+    def is_dirty(self) -> bool:
+        """Whether there are changes not yet saved to the file."""
+        return self.dirty_since is not None
+
+    def __mark__(self, min_row: int, min_col: int, max_row: int, max_col: int):
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+        self.changes += (max_row - min_row + 1) * (max_col - min_col + 1)
+        if self.dirty is None:
+            self.dirty = (min_row, min_col, max_row, max_col)
+        else:
+            r1, c1, r2, c2 = self.dirty
+            self.dirty = (min(r1, min_row), min(c1, min_col), max(r2, max_row), max(c2, max_col))
+
+    def __detach__(self):
+        # 修改之前调用, 遍历中的修改不影响迭代器后面的行
+        if self.readers:
+            for reader in list(self.readers):
+                reader.detach()
+            self.readers.clear()
+
+    def __mark_structural__(self, cells: int):
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+        self.changes += cells
+        self.structural = True
+
+    # ==================== 尺寸 ====================
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.columns)
+
+    @property
+    def max_row(self) -> int:
+        """Same as ``Worksheet.max_row``: 1 for an empty sheet."""
+        return max(self.n_rows, 1)
+
+    @property
+    def max_column(self) -> int:
+        """Same as ``Worksheet.max_column``: 1 for an empty sheet."""
+        return max(self.n_cols, 1)
+
+    @staticmethod
+    def __check__(row: int, col: int):
+        # 与 openpyxl 一致, 行列从 1 开始
+        if row < 1 or col < 1:
+            raise ValueError("Row or column values must be at least 1")
+
+    def __grow__(self, rows: int, cols: int):
+        if cols > self.n_cols:
+            self.columns.extend([None] * self.n_rows for _ in range(cols - self.n_cols))
+        if rows > self.n_rows:
+            pad = [None] * (rows - self.n_rows)
+            for column in self.columns:
+                column.extend(pad)
+            self.n_rows = rows
+
+    # ==================== 读 ====================
+
+    def get(self, row: int, col: int):
+        self.__check__(row, col)
+        if row > self.n_rows or col > self.n_cols:
+            return None
+        return self.columns[col - 1][row - 1]
+
+    def row(self, row: int) -> list:
+        """Values of a row from column 1 to ``max_column``."""
+        self.__check__(row, 1)
+        if row > self.n_rows:
+            return [None] * self.max_column
+        values = [column[row - 1] for column in self.columns]
+        return values or [None]
+
+    def column(self, col: int) -> list:
+        """Values of a column from row 1 to ``max_row``."""
+        self.__check__(1, col)
+        if col > self.n_cols:
+            return [None] * self.max_row
+        values = list(self.columns[col - 1])
+        return values or [None]
+
+    def __slice__(self, min_row: int, min_col: int, max_row: int, max_col: int) -> list:
+        # 区域内每列的值, 超出范围的部分补 None
+        self.__check__(min_row, min_col)
+        columns = [
+            self.columns[c - 1][min_row - 1 : max_row] if c <= self.n_cols else [] for c in range(min_col, max_col + 1)
+        ]
+        height = max_row - min_row + 1
+        return [column + [None] * (height - len(column)) for column in columns]
+
+    def range(self, min_row: int, min_col: int, max_row: int, max_col: int) -> list:
+        """2D list of the values in a range (inclusive bounds)."""
+        columns = self.__slice__(min_row, min_col, max_row, max_col)
+        height = max_row - min_row + 1
+        return [list(row) for row in zip(*columns)] if columns else [[] for _ in range(height)]
+
+    def iter_range(self, min_row: int, min_col: int, max_row: int, max_col: int, window: int = 1000):
+        """
+        Iterates over the rows of a range, building ``window`` rows at a time.
+
+        The values are taken when this is called, so edits made while looping do not change
+        the rows still to come, the same as reading the whole range up front. The range is
+        only copied if the store is changed while the iterator is in use (see ``RangeReader``).
+
+        Args:
+            min_row (int): The first row (1-based).
+            min_col (int): The first column (1-based).
+            max_row (int): The last row (inclusive).
+            max_col (int): The last column (inclusive).
+            window (int): The number of rows built per step.
+
+        Returns:
+            Iterator[list]: The row value lists.
+        """
+        self.__check__(min_row, min_col)
+        columns = [self.columns[c - 1] if c <= self.n_cols else None for c in range(min_col, max_col + 1)]
+        reader = RangeReader(columns, min_row - 1, max_row, window)
+        self.readers.add(reader)
+        return reader
+
+    def rows(self, min_row: int = 1) -> list:
+        """All rows from ``min_row`` to ``max_row``, each ``max_column`` wide."""
+        return self.range(min_row, 1, self.max_row, self.max_column) if min_row <= self.max_row else []
+
+    # ==================== 写 ====================
+
+    def set(self, row: int, col: int, value):
+        self.__check__(row, col)
+        self.__detach__()
+        self.__grow__(row, col)
+        self.columns[col - 1][row - 1] = value
+        self.__mark__(row, col, row, col)
+
+    def set_range(self, row: int, col: int, data: list):
+        """
+        Writes a 2D list with its top-left corner at (row, col).
+
+        Args:
+            row (int): The starting row (1-based).
+            col (int): The starting column (1-based).
+            data (list): A 2D list of values; rows may have different lengths.
+        """
+        self.__check__(row, col)
+        if not data:
+            return
+        width = max(len(r) for r in data)
+        if width == 0:
+            return
+        self.__detach__()
+        self.__grow__(row + len(data) - 1, col + width - 1)
+        for i, values in enumerate(data):
+            for j, value in enumerate(values):
+                self.columns[col - 1 + j][row - 1 + i] = value
+        self.__mark__(row, col, row + len(data) - 1, col + width - 1)
+
+    def set_column(self, col: int, data: list, start_row: int = 1):
+        """Writes values down a column starting at ``start_row``."""
+        self.__check__(start_row, col)
+        if not data:
+            return
+        end_row = start_row + len(data) - 1
+        self.__detach__()
+        self.__grow__(end_row, col)
+        self.columns[col - 1][start_row - 1 : end_row] = data
+        self.__mark__(start_row, col, end_row, col)
+
+    def append_row(self, data: list):
+        """Writes a row after the last row, like ``Worksheet.append``."""
+        self.set_range(self.n_rows + 1, 1, [list(data)])
+        if not data:
+            self.__grow__(self.n_rows + 1, 0)
+
+    def clear(self, min_row: int, min_col: int, max_row: int, max_col: int):
+        """Sets all cells in a range to None."""
+        self.__check__(min_row, min_col)
+        self.__detach__()
+        self.__grow__(max_row, max_col)
+        for c in range(min_col, max_col + 1):
+            self.columns[c - 1][min_row - 1 : max_row] = [None] * (max_row - min_row + 1)
+        self.__mark__(min_row, min_col, max_row, max_col)
+
+    def sort_column(self, col: int, reverse: bool = False):
+        """
+        Sorts one column in place (other columns are not moved): numbers first, then other
+        values by their string form, then None. The sort is stable.
+
+        Args:
+            col (int): The column index (1-based).
+            reverse (bool): If True, sorts in descending order.
+        """
+        self.__check__(1, col)
+        if col > self.n_cols:
+            return
+        self.__detach__()
+        numbers, others, empty = [], [], []
+        for value in self.columns[col - 1]:
+            if value is None:
+                empty.append(value)
+            elif isinstance(value, (int, float)):
+                numbers.append(value)
+            else:
+                others.append(value)
+        # 分组后各自排序, 数字组不需要 key 函数
+        numbers.sort(reverse=reverse)
+        others.sort(key=str, reverse=reverse)
+        values = empty + others + numbers if reverse else numbers + others + empty
+        self.columns[col - 1][:] = values
+        self.__mark__(1, col, self.n_rows, col)
+
+    # ==================== 结构变更 ====================
+
+    def insert_rows(self, idx: int, amount: int = 1):
+        """Inserts blank rows before ``idx``; like openpyxl, nothing happens below the last row."""
+        if amount <= 0 or idx > self.n_rows:
+            return
+        self.__detach__()
+        pad = [None] * amount
+        for column in self.columns:
+            column[idx - 1 : idx - 1] = pad
+        self.n_rows += amount
+        self.__mark_structural__(amount * self.n_cols)
+
+    def insert_cols(self, idx: int, amount: int = 1):
+        """Inserts blank columns before ``idx``; nothing happens right of the last column."""
+        if amount <= 0 or idx > self.n_cols:
+            return
+        self.columns[idx - 1 : idx - 1] = [[None] * self.n_rows for _ in range(amount)]
+        self.__mark_structural__(amount * self.n_rows)
+
+    def delete_rows(self, idx: int, amount: int = 1):
+        """Deletes rows and shifts the rows below up."""
+        if amount <= 0 or idx > self.n_rows:
+            return
+        self.__detach__()
+        end = min(idx - 1 + amount, self.n_rows)
+        for column in self.columns:
+            del column[idx - 1 : end]
+        self.n_rows -= end - idx + 1
+        if self.n_rows == 0:
+            self.columns = []
+        self.__mark_structural__((end - idx + 1) * self.n_cols)
+
+    def delete_cols(self, idx: int, amount: int = 1):
+        """Deletes columns and shifts the columns to the right left."""
+        if amount <= 0 or idx > self.n_cols:
+            return
+        end = min(idx - 1 + amount, self.n_cols)
+        del self.columns[idx - 1 : end]
+        if not self.columns:
+            self.n_rows = 0
+        self.__mark_structural__((end - idx + 1) * self.n_rows)
+
+    # ==================== 写回 ====================
+
+    def write_to(self, sheet: Worksheet):
+        """
+        Writes the pending changes into a worksheet object (the file is not saved).
+
+        Args:
+            sheet (Worksheet): The worksheet this store was loaded from.
+        """
+        if self.structural:
+            # 行列结构变了, 去掉超出范围的单元格后整表重写
+            if sheet.max_row > self.n_rows:
+                sheet.delete_rows(self.n_rows + 1, sheet.max_row - self.n_rows)
+            if sheet.max_column > self.n_cols:
+                sheet.delete_cols(self.n_cols + 1, sheet.max_column - self.n_cols)
+            bounds = (1, 1, self.n_rows, self.n_cols)
+        elif self.dirty is not None:
+            bounds = self.dirty
+        else:
+            return
+        min_row, min_col, max_row, max_col = bounds
+        for c in range(min_col, min(max_col, self.n_cols) + 1):
+            column = self.columns[c - 1]
+            for r in range(min_row, min(max_row, self.n_rows) + 1):
+                sheet.cell(row=r, column=c).value = column[r - 1]
+        self.dirty = None
+        self.structural = False
@@ -1,5 +1,9 @@
+import operator
 from datetime import datetime
+from itertools import compress, repeat
 
+import numpy as np
+import pandas as pd
 from astronverse.datatable import ConditionType, FilterType
 from astronverse.datatable.error import COL_FORMAT_ERROR, DATAFRAME_EXPECTION, FORMULA_FORMAT_ERROR, ROW_FORMAT_ERROR
 
@@ -75,38 +79,192 @@ def filter_data(
     date_range: str,
     is_case_sensitive: bool,
 ) -> list:
-    filtered_data = []
     if not data:
         return []
+    kwargs = dict(
+        condition_type=condition_type,
+        condition_value=condition_value,
+        date_value=date_value,
+        date_range=date_range,
+        is_case_sensitive=is_case_sensitive,
+    )
     if filter_type == FilterType.TABLE:  # 过滤表格数据
+        if len({len(row) for row in data}) == 1:
+            # 等宽的表格按列批量过滤
+            return filter_columns([list(column) for column in zip(*data)], **kwargs)
+        filtered_data = []
         for row in data:
-            filtered_row = []
-            for item in row:
-                if value_check(
-                    value=item,
-                    condition_type=condition_type,
-                    condition_value=condition_value,
-                    date_value=date_value,
-                    date_range=date_range,
-                    is_case_sensitive=is_case_sensitive,
-                ):
-                    filtered_row.append(item)
+            filtered_row = list(compress(row, condition_mask(row, **kwargs)))
             if filtered_row:
                 filtered_data.append(filtered_row)
+        return filtered_data
+
+    mask = condition_mask(data, **kwargs)
+    return [
+        item.strftime("%Y-%m-%d %H:%M:%S") if isinstance(item, datetime) else item
+        for item, keep in zip(data, mask)
+        if keep
+    ]
+
+
+def filter_columns(
+    columns: list,
+    condition_type: ConditionType,
+    condition_value: str,
+    date_value: str,
+    date_range: str,
+    is_case_sensitive: bool,
+) -> list:
+    """
+    按列过滤整个表格, 结果与 filter_data 的表格过滤相同: 每行只保留满足条件的单元格, 去掉没有命中的行
+    逐列批量判断, 只为有命中的行构造结果, 不需要先把整表转成行
+    :param columns: 等长的列数据列表
+    """
+    masks = [
+        condition_mask(
+            column,
+            condition_type=condition_type,
+            condition_value=condition_value,
+            date_value=date_value,
+            date_range=date_range,
+            is_case_sensitive=is_case_sensitive,
+        )
+        for column in columns
+    ]
+    if not masks:
+        return []
+    hit_rows = np.flatnonzero(np.logical_or.reduce(masks)).tolist()
+    masks = [mask.tolist() for mask in masks]
+    pairs = list(zip(columns, masks))
+    return [[column[r] for column, mask in pairs if mask[r]] for r in hit_rows]
+
+
+# 文本条件: (比较函数, 是否取反), 比较函数参数为 (str(值), 条件值)
+_TEXT_CONDITIONS = {
+    ConditionType.EQUALS: (operator.eq, False),
+    ConditionType.NOT_EQUALS: (operator.ne, False),
+    ConditionType.CONTAINS: (operator.contains, False),
+    ConditionType.NOT_CONTAINS: (operator.contains, True),
+    ConditionType.STARTS_WITH: (str.startswith, False),
+    ConditionType.ENDS_WITH: (str.endswith, False),
+}
+
+_NUMBER_CONDITIONS = {
+    ConditionType.GREATER_THAN: np.greater,
+    ConditionType.LESS_THAN: np.less,
+    ConditionType.GREATER_THAN_OR_EQUAL: np.greater_equal,
+    ConditionType.LESS_THAN_OR_EQUAL: np.less_equal,
+}
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _to_dates(values: list) -> np.ndarray:
+    """转成 datetime64 数组, 无法识别的值为 NaT, 同样的字符串只解析一次"""
+    parsed = {}
+    dates = []
+    append = dates.append
+    for value in values:
+        if isinstance(value, str):
+            date = parsed.get(value, False)
+            if date is False:
+                try:
+                    date = datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    date = None
+                parsed[value] = date
+            append(date)
+        elif isinstance(value, datetime) and value.tzinfo is None:
+            append(value)
+        else:
+            # 带时区的时间和无时区的条件不可比较, 与 value_check 一样视为不满足
+            append(None)
+    try:
+        return pd.DatetimeIndex(dates).to_numpy()
+    except (ValueError, OverflowError):
+        # 超出 pandas 纳秒精度范围的日期
+        return np.array(dates, dtype="datetime64[us]")
+
+
+def condition_mask(
+    values: list,
+    condition_type: ConditionType,
+    condition_value: str,
+    date_value: str,
+    date_range: str,
+    is_case_sensitive: bool,
+) -> np.ndarray:
+    """
+    批量判断一列值是否满足条件, 结果与逐个调用 value_check 相同
+    条件值只解析一次, 比较在 C 层的 map 或 numpy 中整列完成
+    :return: 与 values 等长的 bool 数组
+    """
+    n = len(values)
+    if condition_type in _TEXT_CONDITIONS:
+        op, negate = _TEXT_CONDITIONS[condition_type]
+        cond = str(condition_value)
+        # 与 value_check 一致: 只有字符串值和字符串条件在不区分大小写时转小写
+        lower = not is_case_sensitive and isinstance(condition_value, str)
+        if lower:
+            texts = [v.lower() if isinstance(v, str) else str(v) for v in values]
+            cond_lower = cond.lower()
+            conds = (
+                [cond_lower if isinstance(v, str) else cond for v in values] if cond_lower != cond else repeat(cond, n)
+            )
+        else:
+            texts = [v if isinstance(v, str) else str(v) for v in values]
+            conds = repeat(cond, n)
+        mask = np.fromiter(map(op, texts, conds), dtype=bool, count=n)
+        return ~mask if negate else mask
+
+    if condition_type in (ConditionType.IS_EMPTY, ConditionType.IS_NOT_EMPTY):
+        mask = np.fromiter((v is None or v == "" for v in values), dtype=bool, count=n)
+        return mask if condition_type == ConditionType.IS_EMPTY else ~mask
+
+    if condition_type in _NUMBER_CONDITIONS:
+        cond = _to_float(condition_value)
+        if np.isnan(cond):
+            return np.zeros(n, dtype=bool)
+        numbers = np.fromiter(map(_to_float, values), dtype=float, count=n)
+        return _NUMBER_CONDITIONS[condition_type](numbers, cond)
+
+    if condition_type in (ConditionType.DATE_AFTER, ConditionType.DATE_BEFORE, ConditionType.DATE_BETWEEN):
+        try:
+            if condition_type == ConditionType.DATE_BETWEEN:
+                start_date_str, end_date_str = date_range.split(",")
+                start_date = np.datetime64(datetime.strptime(start_date_str.strip(), "%Y-%m-%d"), "us")
+                end_date = np.datetime64(datetime.strptime(end_date_str.strip(), "%Y-%m-%d"), "us")
+            else:
+                cond_date = np.datetime64(datetime.strptime(date_value, "%Y-%m-%d"), "us")
+        except (ValueError, TypeError, AttributeError):
+            return np.zeros(n, dtype=bool)
+        dates = _to_dates(values)
+        if condition_type == ConditionType.DATE_AFTER:
+            return dates > cond_date
+        if condition_type == ConditionType.DATE_BEFORE:
+            return dates < cond_date
+        return (start_date <= dates) & (dates <= end_date)
+
+    return np.zeros(n, dtype=bool)
+
+
+def find_matches(values: list, find_value: str, is_case_sensitive: bool) -> list:
+    """
+    批量查找一列中包含 find_value 的非空单元格
+    :return: 匹配的下标列表(从 0 开始)
+    """
+    find_value = str(find_value)
+    if is_case_sensitive:
+        texts = [None if v is None else str(v) for v in values]
     else:
-        for item in data:
-            if value_check(
-                value=item,
-                condition_type=condition_type,
-                condition_value=condition_value,
-                date_value=date_value,
-                date_range=date_range,
-                is_case_sensitive=is_case_sensitive,
-            ):
-                if isinstance(item, datetime):
-                    item = item.strftime("%Y-%m-%d %H:%M:%S")
-                filtered_data.append(item)
-    return filtered_data
+        find_value = find_value.lower()
+        texts = [None if v is None else str(v).lower() for v in values]
+    return [i for i, text in enumerate(texts) if text is not None and find_value in text]
 
 
 def value_check(
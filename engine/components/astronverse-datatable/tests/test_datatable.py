@@ -1,4 +1,7 @@
-from unittest import TestCase
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
 
 from astronverse.datatable import (
     AppendShift,
@@ -20,7 +23,9 @@ from astronverse.datatable import (
     WriteMode,
     WriteType,
 )
+from astronverse.datatable import datatable
 from astronverse.datatable.datatable import DataTable
+from astronverse.datatable.openpyxl import OpenpyxlWrapper
 
 
 class TestDataTable(TestCase):
@@ -331,4 +336,23 @@ class TestDataTable(TestCase):
             export_file_name="exported_file",
             export_file_type=ExportFileType.CSV
         )
-        
\ No newline at end of file
+        
+
+class TestTimedSave(TestCase):
+
+    def test_saved_after_interval_without_more_writes(self):
+        # 最后一次写入之后流程不再操作数据表, 定时器到期后也会写回文件
+        path = os.path.join(tempfile.mkdtemp(), "data_table.xlsx")
+        with (
+            mock.patch.object(datatable, "_xlsx_file_path", path),
+            mock.patch.object(datatable, "PyxlWrapper", OpenpyxlWrapper(file_path=path, sheet_name=None)),
+            mock.patch.object(datatable, "_save_interval", 0.2),
+        ):
+            DataTable.write_data(row=1, col="A", data="first")
+            self.assertFalse(os.path.exists(path))
+            for _ in range(50):
+                if not datatable.PyxlWrapper.is_dirty:
+                    break
+                time.sleep(0.1)
+            self.assertFalse(datatable.PyxlWrapper.is_dirty)
+        self.assertEqual(OpenpyxlWrapper(file_path=path).read_cell(row=1, col=1), "first")
@@ -1,77 +1,157 @@
 import os
+import tempfile
 from unittest import TestCase
 
 import openpyxl
+import pytest
 from astronverse.datatable.openpyxl import OpenpyxlWrapper
 
-test_excel_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../test.xlsx"))
-
-
-print(f"Test Excel Path: {test_excel_path}")
-
 
 class TestOpenpyxl(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def excel_file(self, tmp_path):
+        # 每个用例在临时目录中生成自己的表格, 不读写仓库中的文件
+        self.test_excel_path = str(tmp_path / "test.xlsx")
+        pyxl = openpyxl.Workbook()
+        sheet = pyxl.active
+        for row in range(1, 12):
+            sheet.append([row, f"name{row}", row * 2])
+        pyxl.save(self.test_excel_path)
     
     def test_openpyxl_read_cell(self):
-        pyxl = openpyxl.load_workbook(test_excel_path)
+        pyxl = openpyxl.load_workbook(self.test_excel_path)
         sheet = pyxl.active
         value = sheet.cell(row=11, column=1).value
         print(value)
     
     def test_openpyxl_write_cell(self):
-        pyxl = openpyxl.load_workbook(test_excel_path)
+        pyxl = openpyxl.load_workbook(self.test_excel_path)
         sheet = pyxl.active
         sheet.cell(row=1, column=1, value="Test Value")
-        pyxl.save(test_excel_path)
+        pyxl.save(self.test_excel_path)
         
     def test_read_cell(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         value = wrapper.read_cell(row=1, col=1)
         print(value)
         
     def test_read_row(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         values = wrapper.read_row(row_index=1)
         print(values)
         
     def test_read_column(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         values = wrapper.read_column(col_index=1)
         print(values)
         
     def test_read_area(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         values = wrapper.read_range("A1:C3")
         print(values)
     
     def test_read_all(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         values = wrapper.read_effective_area()
         print(values)
         
     def test_get_max_row(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         max_row = wrapper.get_max_row()
         print(max_row)
     
     def test_get_max_column(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         max_col = wrapper.get_max_column()
         print(max_col)
     
     def test_write_cell(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         wrapper.write_cell(row=1, col=1, value="11")
         
     def test_insert_cell(self):
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         # wrapper.insert_cell(row=2, col=2, value="22", shift="right")
         
     def test_write_cell_formula(self):
         # 测试写入单元格公式
-        wrapper = OpenpyxlWrapper(file_path=test_excel_path)
+        wrapper = OpenpyxlWrapper(file_path=self.test_excel_path)
         wrapper.write_cell(row=12, col=1, value="=SUM(A10:A11)")
         wrapper.save()
         value = wrapper.read_cell(row=12, col=1)
         print(value)
 
+    def test_write_deferred_save(self):
+        # 写入只修改内存, save 时才写文件
+        path = os.path.join(tempfile.mkdtemp(), "deferred.xlsx")
+        wrapper = OpenpyxlWrapper(file_path=path)
+        for i in range(1, 1001):
+            wrapper.write_row(row_index=i, data=[i, f"name{i}", i * 2])
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(wrapper.is_dirty)
+        wrapper.save()
+        self.assertFalse(wrapper.is_dirty)
+
+        reloaded = OpenpyxlWrapper(file_path=path)
+        self.assertEqual(reloaded.get_max_row(), 1000)
+        self.assertEqual(reloaded.get_max_column(), 3)
+        self.assertEqual(reloaded.read_row(row_index=10), [10, "name10", 20])
+
+    def test_structural_edits_match_openpyxl(self):
+        # 内存表的行列增删和 openpyxl 工作表保持一致
+        rows = [[r * 10 + c for c in range(1, 5)] for r in range(1, 9)]
+        path = os.path.join(tempfile.mkdtemp(), "edits.xlsx")
+        wrapper = OpenpyxlWrapper(file_path=path)
+        sheet = openpyxl.Workbook().active
+        for row in rows:
+            wrapper.append_row(row)
+            sheet.append(row)
+
+        for target in (wrapper, sheet):
+            target.insert_rows(idx=3, amount=2)
+            target.delete_cols(idx=2, amount=1)
+            target.insert_cols(idx=1, amount=1)
+            target.delete_rows(idx=7, amount=3)
+        wrapper.write_cell(row=2, col=5, value="x")
+        sheet.cell(row=2, column=5, value="x")
+
+        expected = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(wrapper.read_effective_area(), expected)
+        wrapper.save()
+        self.assertEqual(OpenpyxlWrapper(file_path=path).read_effective_area(), expected)
+
+    def test_iter_range(self):
+        # 分窗口遍历和一次读取的结果一致, 循环中的修改不影响后面的行
+        path = os.path.join(tempfile.mkdtemp(), "iter.xlsx")
+        wrapper = OpenpyxlWrapper(file_path=path)
+        for i in range(1, 26):
+            wrapper.append_row([i, f"name{i}", None if i % 3 else i])
+        for range_str in ("A1:C25", "B3:E20", "C25:C25", "A20:C30"):
+            self.assertEqual(list(wrapper.iter_range(range_str, window=4)), wrapper.read_range(range_str))
+
+        expected = wrapper.read_range("A1:C25")
+        rows = []
+        for row in wrapper.iter_range("A1:C25", window=4):
+            rows.append(row)
+            wrapper.delete_rows(idx=1, amount=1)
+        self.assertEqual(rows, expected)
+
+    def test_iter_range_copy_on_write(self):
+        # 不修改时不复制区域; 循环中写入或排序时迭代器先复制剩余的值, 后面的行保持不变
+        path = os.path.join(tempfile.mkdtemp(), "iter.xlsx")
+        wrapper = OpenpyxlWrapper(file_path=path)
+        for i in range(1, 11):
+            wrapper.append_row([i, f"name{i}"])
+        expected = wrapper.read_range("A2:C9")
+
+        reader = wrapper.iter_range("A2:C9", window=3)
+        self.assertIs(reader.columns[0], wrapper.store.columns[0])
+        rows = [next(reader), next(reader)]
+        wrapper.write_cell(row=5, col=2, value="changed")
+        self.assertIsNot(reader.columns[0], wrapper.store.columns[0])
+        wrapper.sort_column(col_index=1, order="descending")
+        wrapper.insert_rows(idx=1, amount=2)
+        rows.extend(reader)
+        self.assertEqual(rows, expected)
+        self.assertEqual(len(wrapper.store.readers), 0)
@@ -0,0 +1,99 @@
+from datetime import datetime
+from unittest import TestCase
+
+from astronverse.datatable import ConditionType, FilterType
+from astronverse.datatable.store import TableStore
+from astronverse.datatable.utils import condition_mask, filter_columns, filter_data, find_matches, value_check
+
+values = [
+    None,
+    "",
+    "Apple",
+    "apple pie",
+    "APPLE",
+    "None",
+    3,
+    "3",
+    " 12 ",
+    2.5,
+    True,
+    "abc",
+    "2023-05-01",
+    "2023-5-2",
+    "2023-05-01 10:00",
+    datetime(2023, 6, 1, 8, 30),
+    datetime(2022, 12, 31),
+]
+
+
+class TestUtils(TestCase):
+    def test_condition_mask_matches_value_check(self):
+        # 批量判断和逐个判断的结果一致
+        cases = [
+            ("apple", "", ""),
+            ("APPLE", "", ""),
+            ("None", "", ""),
+            ("3", "", ""),
+            ("2.5", "", ""),
+            ("abc", "", ""),
+            ("", "2023-05-01", "2023-01-01,2023-06-30"),
+            ("x", "bad", "2023-01-01"),
+        ]
+        for condition_type in ConditionType:
+            for condition_value, date_value, date_range in cases:
+                for is_case_sensitive in (True, False):
+                    kwargs = dict(
+                        condition_type=condition_type,
+                        condition_value=condition_value,
+                        date_value=date_value,
+                        date_range=date_range,
+                        is_case_sensitive=is_case_sensitive,
+                    )
+                    expected = [value_check(value=v, **kwargs) for v in values]
+                    self.assertEqual(condition_mask(values, **kwargs).tolist(), expected, kwargs)
+
+    def test_filter_table(self):
+        data = [["apple", 1, None], [None, None], ["Apple", "pear"]]
+        filtered = filter_data(
+            data=data,
+            filter_type=FilterType.TABLE,
+            condition_type=ConditionType.CONTAINS,
+            condition_value="apple",
+            date_value="",
+            date_range="",
+            is_case_sensitive=False,
+        )
+        self.assertEqual(filtered, [["apple"], ["Apple"]])
+
+        # 等宽表格按列过滤, 结果与逐行过滤一致
+        rows = [values[i : i + 3] for i in range(0, 15, 3)]
+        kwargs = dict(
+            condition_type=ConditionType.NOT_EQUALS,
+            condition_value="3",
+            date_value="",
+            date_range="",
+            is_case_sensitive=True,
+        )
+        expected = [[v for v in row if value_check(value=v, **kwargs)] for row in rows]
+        self.assertEqual(filter_columns([list(c) for c in zip(*rows)], **kwargs), [r for r in expected if r])
+        self.assertEqual(filter_data(data=rows, filter_type=FilterType.TABLE, **kwargs), [r for r in expected if r])
+
+    def test_find_matches(self):
+        self.assertEqual(find_matches(values, "apple", True), [3])
+        self.assertEqual(find_matches(values, "apple", False), [2, 3, 4])
+        self.assertEqual(find_matches(values, "12", True), [8, 16])
+
+    def test_sort_column(self):
+        # 与原来的 (数字, 字符串, None) 排序键结果一致, 且排序稳定
+        def sort_key(x):
+            if x is None:
+                return (2, None)
+            if isinstance(x, (int, float)):
+                return (0, x)
+            return (1, str(x))
+
+        for reverse in (False, True):
+            store = TableStore([[v] for v in values] + [[1], [1.0], [True]])
+            expected = sorted(store.column(1), key=sort_key, reverse=reverse)
+            store.sort_column(1, reverse=reverse)
+            self.assertEqual([repr(v) for v in store.column(1)], [repr(v) for v in expected])
@@ -0,0 +1,65 @@
+"""
+无界面 Excel 读取吞吐测试
+
+生成一个 100 万单元格的工作簿, 统计打开、整表读取(值/显示文本)和循环读取的耗时:
+
+    python benchmark.py [行数] [列数]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+from astronverse.excel import ApplicationType, ReadRangeType, SaveType
+from astronverse.excel.excel import Excel
+
+
+def make_workbook(path: str, rows: int, cols: int):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    for r in range(rows):
+        ws.append([r * cols + c if c % 2 else "text{}".format(r * cols + c) for c in range(cols)])
+    wb.save(path)
+
+
+def timed(name: str, cells: int, func):
+    start = time.perf_counter()
+    result = func()
+    cost = time.perf_counter() - start
+    print("{:<24}{:>8.2f}s{:>14,.0f} cells/s".format(name, cost, cells / cost))
+    return result
+
+
+def loop_all(excel) -> int:
+    count = 0
+    for _, row in Excel.loop_excel_content(excel=excel):
+        count += len(row)
+    return count
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    cells = rows * cols
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark.xlsx")
+        make_workbook(path, rows, cols)
+        print("{} x {} = {:,} cells".format(rows, cols, cells))
+
+        excel = timed(
+            "open",
+            cells,
+            lambda: Excel.open_excel(file_path=path, default_application=ApplicationType.FILE),
+        )
+        # 打开时只读取工作簿信息, 第一次读取才解析整张工作表
+        for name, read_display in (("parse + read all", False), ("read all", False), ("read all (text)", True)):
+            timed(
+                name,
+                cells,
+                lambda: Excel.read_excel(excel=excel, read_range=ReadRangeType.ALL, read_display=read_display),
+            )
+        assert timed("loop all", cells, lambda: loop_all(excel)) == cells
+        Excel.close_excel(excel=excel, save_type_one=SaveType.ABORT)
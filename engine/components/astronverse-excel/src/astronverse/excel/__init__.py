@@ -7,6 +7,7 @@ class ApplicationType(Enum):
     EXCEL = "Excel"  # Excel
     WPS = "WPS"  # WPS
     DEFAULT = "Default"  # 系统自动选择
+    FILE = "File"  # 无界面(直接读写文件)
 
 
 class FileExistenceType(Enum):
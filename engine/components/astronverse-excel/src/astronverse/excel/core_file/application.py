@@ -0,0 +1,42 @@
+from astronverse.excel.core_file.workbook import FileWorkbook
+from astronverse.excel.excel_obj import ExcelObj
+
+
+class Application:
+    """无界面模式的工作簿操作, 和 core_win 的 Application 对应"""
+
+    @staticmethod
+    def create_workbook(file_path: str = "", password: str = "") -> ExcelObj:
+        """创建新工作簿"""
+        if password:
+            raise ValueError("无界面模式不支持设置文件密码")
+        workbook = FileWorkbook.create(file_path)
+        if file_path:
+            workbook.Save()
+        return ExcelObj(obj=workbook, path=file_path or "")
+
+    @staticmethod
+    def open_workbook(file_path: str, password: str = "") -> ExcelObj:
+        """打开工作簿"""
+        if password:
+            raise ValueError("无界面模式不支持打开带密码的文件")
+        return ExcelObj(obj=FileWorkbook.open(file_path), path=file_path or "")
+
+    @staticmethod
+    def save_workbook(excel_obj: ExcelObj, file_path: str = "", password: str = ""):
+        workbook = excel_obj.obj
+        if file_path:
+            workbook.SaveAs(Filename=file_path, Password=password)
+        else:
+            workbook.Save()
+
+    @staticmethod
+    def close_workbook(excel_obj: ExcelObj, save_changes: bool = True):
+        workbook = excel_obj.obj
+        workbook.Close(SaveChanges=save_changes)
+
+    @staticmethod
+    def close_all(save_changes: bool = True):
+        """关闭所有无界面模式打开的工作簿, 只在内存中新建(没有路径)的工作簿不保存"""
+        for workbook in list(FileWorkbook.opened):
+            workbook.Close(SaveChanges=save_changes and bool(workbook.path))
@@ -0,0 +1,725 @@
+"""
+无界面的 Excel 后端
+
+直接读写 xlsx 文件, 对外提供和 Excel COM 相同的对象模型 (Workbook / Worksheet / Range 的常用部分),
+core_win 中的 Worksheet、Range 工具函数可以直接作用在这些对象上。
+
+- 读取: 打开文件时不加载整个工作簿, 第一次读某个工作表时用 python-calamine 一次性取出它的全部值,
+  之后的读取都在内存中按区域整块完成。
+- 写入: 第一次修改时才用 openpyxl 加载完整工作簿 (保留样式), 之后读写都基于它。
+- 没有计算引擎: 公式单元格读到的是文件中缓存的计算结果, 被改写后读到的是公式文本;
+  Evaluate 只支持文本转数值用到的 VALUE(区域)。
+"""
+
+import math
+import os
+import re
+import shutil
+import zipfile
+from bisect import bisect_right
+from datetime import date, datetime, time
+from types import SimpleNamespace
+from typing import Any, Optional
+from xml.etree import ElementTree
+
+import openpyxl
+from openpyxl.utils.cell import get_column_letter, range_boundaries
+from openpyxl.utils.datetime import to_excel
+from python_calamine import CalamineWorkbook, SheetTypeEnum
+
+MAX_ROW = 1048576
+MAX_COLUMN = 16384
+SUPPORTED_SUFFIXES = (".xlsx", ".xlsm", ".xltx", ".xltm")
+
+# COM 常量: Find 的 LookAt, Delete 的 Shift, 单元格错误值 #VALUE!
+XL_WHOLE = 1
+XL_PART = 2
+XL_TO_LEFT = -4159
+XL_UP = -4162
+XL_ERR_VALUE = -2146826273
+# 中文版 Excel 中常规格式的名称
+GENERAL_FORMATS = ("General", "G/通用格式")
+
+
+def cell_value(value):
+    """把读取到的原始值转换成和 openpyxl 一致的类型"""
+    if value == "":
+        return None
+    if value.__class__ is float:
+        return int(value) if value.is_integer() else value
+    if value.__class__ is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def cell_text(value) -> str:
+    """单元格按常规格式显示的文本"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else "{:.15g}".format(value)
+    if isinstance(value, datetime):
+        text = "{}/{}/{}".format(value.year, value.month, value.day)
+        if value.time() != time():
+            text += " {}:{:02d}".format(value.hour, value.minute)
+        return text
+    if isinstance(value, time):
+        return "{}:{:02d}:{:02d}".format(value.hour, value.minute, value.second)
+    return str(value)
+
+
+def value_of(value):
+    """和 Excel 的 VALUE 函数一样把单元格的值转换成数值, 转换失败返回 #VALUE! 错误值"""
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return XL_ERR_VALUE
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (datetime, time)):
+        return float(to_excel(value))
+    text = str(value).strip().replace(",", "")
+    percent = text.endswith("%")
+    if percent:
+        text = text[:-1].rstrip()
+    if "_" in text:
+        return XL_ERR_VALUE
+    try:
+        number = float(text)
+    except ValueError:
+        return XL_ERR_VALUE
+    if not math.isfinite(number):
+        return XL_ERR_VALUE
+    return number / 100 if percent else number
+
+
+def read_active_tab(file_path: str) -> int:
+    """读取工作簿保存时激活的工作表序号 (从 0 开始)"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        for element in root.iter():
+            if element.tag.endswith("}workbookView"):
+                return int(element.get("activeTab", 0))
+    except (KeyError, ValueError, zipfile.BadZipFile, ElementTree.ParseError):
+        pass
+    return 0
+
+
+class ComObject:
+    """不支持的 COM 成员给出明确的错误"""
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        raise AttributeError("无界面模式不支持 {}.{}".format(type(self).__name__, name))
+
+
+class FileWorkbook(ComObject):
+    """文件工作簿, 对应 COM 的 Workbook"""
+
+    # 打开中的工作簿, 对应 COM 的 Application.Workbooks, 关闭所有文档时使用
+    opened: list["FileWorkbook"] = []
+
+    def __init__(self, path: str, book: Optional[openpyxl.Workbook] = None):
+        self.path = path
+        self.changed = False
+        self._book = book
+        self._calamine = None
+        self._sheets: list[FileWorksheet] = []
+        self._active: Optional[FileWorksheet] = None
+        self.Sheets = self.Worksheets = FileSheets(self)
+
+    @classmethod
+    def open(cls, path: str) -> "FileWorkbook":
+        """
+        打开已有的工作簿, 只读取工作表列表
+
+        Args:
+            path: 文件路径
+        """
+        if not path.lower().endswith(SUPPORTED_SUFFIXES):
+            raise ValueError("无界面模式只支持 {} 文件".format("/".join(SUPPORTED_SUFFIXES)))
+        workbook = cls(path)
+        workbook._calamine = CalamineWorkbook.from_path(path)
+        names = [meta.name for meta in workbook._calamine.sheets_metadata]
+        worksheet_names = [
+            meta.name for meta in workbook._calamine.sheets_metadata if meta.typ == SheetTypeEnum.WorkSheet
+        ]
+        workbook._sheets = [FileWorksheet(workbook, name) for name in worksheet_names]
+        if not workbook._sheets:
+            raise ValueError("工作簿中没有工作表")
+
+        active_tab = read_active_tab(path)
+        active_name = names[active_tab] if active_tab < len(names) else None
+        workbook._active = next((s for s in workbook._sheets if s.Name == active_name), workbook._sheets[0])
+        cls.opened.append(workbook)
+        return workbook
+
+    @classmethod
+    def create(cls, path: str) -> "FileWorkbook":
+        """
+        新建工作簿
+
+        Args:
+            path: 保存路径, 为空时只在内存中创建
+        """
+        book = openpyxl.Workbook()
+        workbook = cls(path, book)
+        workbook._sheets = [FileWorksheet(workbook, ws.title, ws) for ws in book.worksheets]
+        workbook._active = workbook._sheets[0]
+        workbook.changed = True
+        cls.opened.append(workbook)
+        return workbook
+
+    def load(self) -> openpyxl.Workbook:
+        """完整的 openpyxl 工作簿, 第一次修改时加载"""
+        if self._book is None:
+            # 先取出还没读过的工作表的值, 改写前的公式单元格仍读到缓存的计算结果
+            for worksheet in self._sheets:
+                worksheet.cells()
+            self._book = openpyxl.load_workbook(self.path, keep_vba=self.path.lower().endswith((".xlsm", ".xltm")))
+            for worksheet in self._sheets:
+                worksheet.sheet = self._book[worksheet.Name]
+            self.__close_reader__()
+        return self._book
+
+    def __close_reader__(self):
+        if self._calamine is not None:
+            self._calamine.close()
+            self._calamine = None
+
+    def read_sheet(self, name: str) -> list:
+        """从文件中读取一个工作表的全部值"""
+        rows = self._calamine.get_sheet_by_name(name).to_python(skip_empty_area=False)
+        return [[cell_value(value) for value in row] for row in rows]
+
+    # ==================== COM 成员 ====================
+
+    @property
+    def Name(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def FullName(self) -> str:
+        return self.path
+
+    @property
+    def ActiveSheet(self) -> "FileWorksheet":
+        return self._active
+
+    def Save(self):
+        if not self.path:
+            raise ValueError("工作簿还没有保存路径")
+        if self._book is None:
+            # 没有加载过完整工作簿就没有修改, 文件保持原样
+            return
+        self._book.active = self._sheets.index(self._active)
+        self._book.save(self.path)
+        self.changed = False
+
+    def SaveAs(self, Filename: str, Password: str = "", **kwargs):
+        if Password:
+            raise ValueError("无界面模式不支持设置文件密码")
+        if not Filename.lower().endswith(SUPPORTED_SUFFIXES):
+            raise ValueError("无界面模式只支持 {} 文件".format("/".join(SUPPORTED_SUFFIXES)))
+        if self._book is None:
+            shutil.copyfile(self.path, Filename)
+            self.path = Filename
+            return
+        self.path = Filename
+        self.Save()
+
+    def Close(self, SaveChanges: bool = True):
+        if SaveChanges and self.changed:
+            self.Save()
+        self.__close_reader__()
+        self._book = None
+        self._sheets = []
+        self._active = None
+        if self in FileWorkbook.opened:
+            FileWorkbook.opened.remove(self)
+
+
+class FileSheets(ComObject):
+    """工作表集合, 对应 COM 的 Sheets / Worksheets"""
+
+    def __init__(self, workbook: FileWorkbook):
+        self.workbook = workbook
+
+    def __call__(self, key) -> "FileWorksheet":
+        sheets = self.workbook._sheets
+        if isinstance(key, int):
+            if 1 <= key <= len(sheets):
+                return sheets[key - 1]
+        else:
+            for worksheet in sheets:
+                if worksheet.Name == key:
+                    return worksheet
+        raise KeyError("工作表'{}'不存在".format(key))
+
+    def __iter__(self):
+        return iter(list(self.workbook._sheets))
+
+    def __len__(self):
+        return len(self.workbook._sheets)
+
+    @property
+    def Count(self) -> int:
+        return len(self.workbook._sheets)
+
+    def Add(self, Before: "FileWorksheet" = None, After: "FileWorksheet" = None) -> "FileWorksheet":
+        workbook = self.workbook
+        names = {worksheet.Name for worksheet in workbook._sheets}
+        n = len(workbook._sheets) + 1
+        while "Sheet{}".format(n) in names:
+            n += 1
+        worksheet = FileWorksheet(workbook, "Sheet{}".format(n), workbook.load().create_sheet("Sheet{}".format(n)))
+        workbook._sheets.append(worksheet)
+        worksheet.__place__(Before, After)
+        workbook._active = worksheet
+        workbook.changed = True
+        return worksheet
+
+
+class FileWorksheet(ComObject):
+    """文件工作表, 对应 COM 的 Worksheet"""
+
+    def __init__(self, workbook: FileWorkbook, name: str, sheet=None):
+        self.Parent = workbook
+        self.sheet = sheet
+        self._name = name
+        self._cells: Optional[list] = None
+        self._bounds: Optional[tuple] = None
+
+    def cells(self) -> Optional[list]:
+        """文件中的值 (行列表), 工作簿加载前读取一次; 新建的工作表返回 None"""
+        if self._cells is None and self.sheet is None:
+            self._cells = self.Parent.read_sheet(self._name)
+            self._bounds = None
+        return self._cells
+
+    def __place__(self, before=None, after=None):
+        # 把工作表移动到 before 之前或 after 之后, 都为空时放在当前激活的工作表之前
+        workbook = self.Parent
+        if before is None and after is None:
+            before = workbook._active
+        for target in (before, after):
+            if target is not None and target.Parent is not workbook:
+                raise ValueError("无界面模式不支持跨工作簿移动或复制工作表")
+        sheets = workbook._sheets
+        sheets.remove(self)
+        index = sheets.index(before) if before is not None else sheets.index(after) + 1
+        sheets.insert(index, self)
+
+        book = workbook.load()
+        names = book.sheetnames
+        target_name = sheets[index + 1].Name if index + 1 < len(sheets) else None
+        target_index = names.index(target_name) if target_name else len(names)
+        current_index = names.index(self.Name)
+        book.move_sheet(self.sheet, target_index - current_index - (1 if target_index > current_index else 0))
+
+    # ==================== 尺寸 ====================
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """已使用区域 (起始行, 起始列, 结束行, 结束列), 空表为 A1"""
+        if self.sheet is not None:
+            return self.sheet.min_row, self.sheet.min_column, self.sheet.max_row, self.sheet.max_column
+        if self._bounds is None:
+            min_row = max_row = 0
+            min_col, max_col = MAX_COLUMN, 0
+            for i, row in enumerate(self.cells(), 1):
+                used = [j for j, value in enumerate(row, 1) if value is not None]
+                if used:
+                    min_row = min_row or i
+                    max_row = i
+                    min_col = min(min_col, used[0])
+                    max_col = max(max_col, used[-1])
+            self._bounds = (min_row, min_col, max_row, max_col) if max_row else (1, 1, 1, 1)
+        return self._bounds
+
+    # ==================== 读写 ====================
+
+    def get_values(
+        self, start_row: int, start_col: int, end_row: int, end_col: int, use_text: bool = False
+    ) -> list[list]:
+        """
+        整块读取一个区域
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            end_row: 结束行 (包含)
+            end_col: 结束列 (包含)
+            use_text: 是否返回显示文本
+
+        Returns:
+            二维列表, 超出已使用区域的单元格为 None
+        """
+        width = end_col - start_col + 1
+        if end_row < start_row or width <= 0:
+            return []
+        height = end_row - start_row + 1
+        cached = self.cells() if self.sheet is None else self._cells
+        if self.sheet is None:
+            rows = [row[start_col - 1 : end_col] for row in cached[start_row - 1 : end_row]]
+        else:
+            # 只读取已有单元格的范围, 避免 openpyxl 为空白区域创建单元格
+            last_row = min(end_row, self.sheet.max_row)
+            last_col = min(end_col, self.sheet.max_column)
+            rows = []
+            if start_row <= last_row and start_col <= last_col:
+                rows = [
+                    list(row)
+                    for row in self.sheet.iter_rows(
+                        min_row=start_row, max_row=last_row, min_col=start_col, max_col=last_col, values_only=True
+                    )
+                ]
+            if cached is not None:
+                self.__restore_formulas__(rows, start_row, start_col, cached)
+        rows = [row + [None] * (width - len(row)) if len(row) < width else row for row in rows]
+        rows.extend([None] * width for _ in range(height - len(rows)))
+        if use_text:
+            return [[cell_text(value) for value in row] for row in rows]
+        return rows
+
+    @staticmethod
+    def __restore_formulas__(rows: list, start_row: int, start_col: int, cached: list):
+        # 没有被改写过的公式单元格换成文件中缓存的计算结果
+        for i, row in enumerate(rows):
+            r = start_row - 1 + i
+            if r >= len(cached):
+                break
+            cached_row = cached[r]
+            for j, value in enumerate(row):
+                if value.__class__ is str and value.startswith("="):
+                    c = start_col - 1 + j
+                    if c < len(cached_row) and cached_row[c] is not None:
+                        row[j] = cached_row[c]
+
+    def set_values(self, start_row: int, start_col: int, rows: list):
+        """
+        从 (start_row, start_col) 开始写入二维列表
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            rows: 二维列表, 每行长度可以不同
+        """
+        self.Parent.load()
+        cell = self.sheet.cell
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                cell(row=start_row + i, column=start_col + j).value = value
+        self.__forget__(start_row, start_col, start_row + len(rows) - 1, start_col + max(map(len, rows), default=0) - 1)
+        self.Parent.changed = True
+
+    def clear(self, start_row: int, start_col: int, end_row: int, end_col: int, contents=True, formats=False):
+        """清除区域的内容和/或格式, 只处理已有的单元格"""
+        self.Parent.load()
+        last_row = min(end_row, self.sheet.max_row)
+        last_col = min(end_col, self.sheet.max_column)
+        for row in self.sheet.iter_rows(min_row=start_row, max_row=last_row, min_col=start_col, max_col=last_col):
+            for c in row:
+                if contents:
+                    c.value = None
+                if formats:
+                    c.style = "Normal"
+        self.__forget__(start_row, start_col, end_row, end_col)
+        self.Parent.changed = True
+
+    def __forget__(self, start_row: int, start_col: int, end_row: int, end_col: int):
+        # 改写过的单元格不再使用文件中缓存的值
+        if not self._cells:
+            return
+        for row in self._cells[start_row - 1 : end_row]:
+            row[start_col - 1 : end_col] = [None] * len(row[start_col - 1 : end_col])
+
+    def delete(self, start_row: int, start_col: int, end_row: int, end_col: int, shift_up: bool):
+        """
+        删除区域, 下方的单元格上移或者右侧的单元格左移
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            end_row: 结束行 (包含)
+            end_col: 结束列 (包含)
+            shift_up: True 时下方单元格上移, False 时右侧单元格左移
+        """
+        self.Parent.load()
+        sheet = self.sheet
+        height, width = end_row - start_row + 1, end_col - start_col + 1
+        if shift_up and width == MAX_COLUMN:
+            sheet.delete_rows(start_row, height)
+        elif not shift_up and height == MAX_ROW:
+            sheet.delete_cols(start_col, width)
+        else:
+            self.clear(start_row, start_col, end_row, end_col, formats=True)
+            # 上移时只移动区域所在的列, 左移时只移动区域所在的行
+            last_row = sheet.max_row if shift_up else min(end_row, sheet.max_row)
+            last_col = min(end_col, sheet.max_column) if shift_up else sheet.max_column
+            if shift_up and end_row < sheet.max_row and start_col <= last_col:
+                moved = "{}{}:{}{}".format(
+                    get_column_letter(start_col), end_row + 1, get_column_letter(last_col), sheet.max_row
+                )
+                sheet.move_range(moved, rows=-height)
+            elif not shift_up and end_col < sheet.max_column and start_row <= last_row:
+                moved = "{}{}:{}{}".format(
+                    get_column_letter(end_col + 1), start_row, get_column_letter(sheet.max_column), last_row
+                )
+                sheet.move_range(moved, cols=-width)
+        self.__shift_cache__(start_row, start_col, end_row, end_col, shift_up)
+        self.Parent.changed = True
+
+    def __shift_cache__(self, start_row: int, start_col: int, end_row: int, end_col: int, shift_up: bool):
+        # 文件中缓存的值和单元格一起移动
+        cells = self._cells
+        if not cells:
+            return
+        if shift_up:
+            height = end_row - start_row + 1
+            for r in range(start_row - 1, len(cells)):
+                row = cells[r]
+                below = cells[r + height] if r + height < len(cells) else []
+                for c in range(start_col - 1, min(end_col, len(row))):
+                    row[c] = below[c] if c < len(below) else None
+        else:
+            for row in cells[start_row - 1 : end_row]:
+                del row[start_col - 1 : end_col]
+
+    def find(
+        self, what: str, start_row: int, start_col: int, end_row: int, end_col: int, whole: bool, match_case: bool
+    ):
+        """
+        按行查找显示文本包含 (或等于) what 的单元格
+
+        Returns:
+            按行排列的 (行, 列) 列表
+        """
+        min_row, min_col, max_row, max_col = self.bounds()
+        end_row, end_col = min(end_row, max_row), min(end_col, max_col)
+        if not match_case:
+            what = what.lower()
+        found = []
+        for i, row in enumerate(self.get_values(start_row, start_col, end_row, end_col, use_text=True)):
+            for j, text in enumerate(row):
+                if not match_case:
+                    text = text.lower()
+                if text == what if whole else what in text:
+                    found.append((start_row + i, start_col + j))
+        return found
+
+    def set_number_format(self, start_row: int, start_col: int, end_row: int, end_col: int, number_format: str):
+        """设置区域的数字格式, 只处理已使用区域内的单元格"""
+        self.Parent.load()
+        if number_format in GENERAL_FORMATS:
+            number_format = "General"
+        last_row = min(end_row, self.sheet.max_row)
+        last_col = min(end_col, self.sheet.max_column)
+        for row in self.sheet.iter_rows(min_row=start_row, max_row=last_row, min_col=start_col, max_col=last_col):
+            for c in row:
+                c.number_format = number_format
+        self.Parent.changed = True
+
+    # ==================== COM 成员 ====================
+
+    @property
+    def Name(self) -> str:
+        return self._name
+
+    @Name.setter
+    def Name(self, name: str):
+        if name == self._name:
+            return
+        if any(worksheet.Name == name for worksheet in self.Parent._sheets):
+            raise ValueError("工作表'{}'已存在".format(name))
+        self.Parent.load()
+        self.sheet.title = name
+        self._name = name
+        self.Parent.changed = True
+
+    @property
+    def UsedRange(self) -> "FileRange":
+        return FileRange(self, *self.bounds())
+
+    def Range(self, cell1, cell2=None) -> "FileRange":
+        if cell2 is not None:
+            first = cell1 if isinstance(cell1, FileRange) else self.Range(cell1)
+            last = cell2 if isinstance(cell2, FileRange) else self.Range(cell2)
+            return FileRange(
+                self,
+                min(first.Row, last.Row),
+                min(first.Column, last.Column),
+                max(first.end_row, last.end_row),
+                max(first.end_col, last.end_col),
+            )
+        min_col, min_row, max_col, max_row = range_boundaries(str(cell1).replace("$", "").upper())
+        # 整行/整列区域
+        return FileRange(self, min_row or 1, min_col or 1, max_row or MAX_ROW, max_col or MAX_COLUMN)
+
+    def Cells(self, row: int, column: int) -> "FileRange":
+        return FileRange(self, row, column, row, column)
+
+    def Evaluate(self, name: str) -> Any:
+        """只支持 VALUE(区域), 单个单元格返回数值, 多个单元格返回二维元组"""
+        match = re.fullmatch(r"\s*VALUE\((.+)\)\s*", str(name), re.IGNORECASE)
+        if not match:
+            raise AttributeError("无界面模式不支持计算 {}".format(name))
+        range_obj = self.Range(match.group(1).strip())
+        rows = self.get_values(range_obj.Row, range_obj.Column, range_obj.end_row, range_obj.end_col)
+        numbers = tuple(tuple(value_of(value) for value in row) for row in rows)
+        return numbers[0][0] if range_obj.Count == 1 else numbers
+
+    def Activate(self):
+        self.Parent._active = self
+
+    def Delete(self):
+        workbook = self.Parent
+        if len(workbook._sheets) == 1:
+            raise ValueError("工作簿中至少要保留一个工作表")
+        workbook.load().remove(self.sheet)
+        index = workbook._sheets.index(self)
+        workbook._sheets.remove(self)
+        if workbook._active is self:
+            workbook._active = workbook._sheets[min(index, len(workbook._sheets) - 1)]
+        workbook.changed = True
+
+    def Move(self, Before: "FileWorksheet" = None, After: "FileWorksheet" = None):
+        if Before is None and After is None:
+            raise ValueError("无界面模式不支持把工作表移动到新工作簿")
+        self.__place__(Before, After)
+        self.Parent.changed = True
+
+    def Copy(self, Before: "FileWorksheet" = None, After: "FileWorksheet" = None):
+        if Before is None and After is None:
+            raise ValueError("无界面模式不支持把工作表复制到新工作簿")
+        workbook = self.Parent
+        sheet = workbook.load().copy_worksheet(self.sheet)
+        names = {worksheet.Name for worksheet in workbook._sheets}
+        n = 2
+        while "{} ({})".format(self.Name, n) in names:
+            n += 1
+        sheet.title = "{} ({})".format(self.Name, n)
+        worksheet = FileWorksheet(workbook, sheet.title, sheet)
+        if self._cells is not None:
+            worksheet._cells = [list(row) for row in self._cells]
+        workbook._sheets.append(worksheet)
+        worksheet.__place__(Before, After)
+        workbook._active = worksheet
+        workbook.changed = True
+
+
+class FileRange(ComObject):
+    """单元格区域, 对应 COM 的 Range"""
+
+    def __init__(self, worksheet: FileWorksheet, start_row: int, start_col: int, end_row: int, end_col: int):
+        if start_row < 1 or start_col < 1 or end_row > MAX_ROW or end_col > MAX_COLUMN:
+            raise ValueError("区域超出工作表范围")
+        self.Worksheet = self.Parent = worksheet
+        self.Row = start_row
+        self.Column = start_col
+        self.end_row = end_row
+        self.end_col = end_col
+        self.Rows = SimpleNamespace(Count=end_row - start_row + 1)
+        self.Columns = SimpleNamespace(Count=end_col - start_col + 1)
+        self._found: Optional[list] = None
+
+    @property
+    def Count(self) -> int:
+        return self.Rows.Count * self.Columns.Count
+
+    @property
+    def Address(self) -> str:
+        first = "${}${}".format(get_column_letter(self.Column), self.Row)
+        if self.Count == 1:
+            return first
+        return "{}:${}${}".format(first, get_column_letter(self.end_col), self.end_row)
+
+    def __values__(self, use_text: bool) -> Any:
+        rows = self.Worksheet.get_values(self.Row, self.Column, self.end_row, self.end_col, use_text)
+        if self.Count == 1:
+            return rows[0][0]
+        return tuple(tuple(row) for row in rows)
+
+    @property
+    def Value(self) -> Any:
+        """单个单元格返回值, 多个单元格返回二维元组"""
+        return self.__values__(False)
+
+    @Value.setter
+    def Value(self, value: Any):
+        height, width = self.Rows.Count, self.Columns.Count
+        if isinstance(value, (list, tuple)):
+            # 和 COM 一样, 一维数组按一行处理, 超出区域的部分不写
+            rows = value if value and all(isinstance(row, (list, tuple)) for row in value) else [value]
+            rows = [list(row[:width]) for row in rows[:height]]
+        else:
+            rows = [[value] * width for _ in range(height)]
+        self.Worksheet.set_values(self.Row, self.Column, rows)
+
+    @property
+    def Text(self) -> Optional[str]:
+        """显示文本, 多个单元格的文本不同时为 None"""
+        texts = self.__values__(True)
+        if self.Count == 1:
+            return texts
+        distinct = {text for row in texts for text in row}
+        return distinct.pop() if len(distinct) == 1 else None
+
+    def ClearContents(self):
+        self.Worksheet.clear(self.Row, self.Column, self.end_row, self.end_col)
+
+    def ClearFormats(self):
+        self.Worksheet.clear(self.Row, self.Column, self.end_row, self.end_col, contents=False, formats=True)
+
+    def Clear(self):
+        self.Worksheet.clear(self.Row, self.Column, self.end_row, self.end_col, formats=True)
+
+    @property
+    def NumberFormat(self) -> str:
+        worksheet = self.Worksheet
+        worksheet.Parent.load()
+        return worksheet.sheet.cell(row=self.Row, column=self.Column).number_format
+
+    @NumberFormat.setter
+    def NumberFormat(self, number_format: str):
+        self.Worksheet.set_number_format(self.Row, self.Column, self.end_row, self.end_col, number_format)
+
+    def Delete(self, Shift: int = None):
+        # 和 COM 一样, 不指定方向时整行上移、整列左移, 其余按区域形状决定
+        if Shift is None:
+            if self.Columns.Count == MAX_COLUMN:
+                Shift = XL_UP
+            elif self.Rows.Count == MAX_ROW:
+                Shift = XL_TO_LEFT
+            else:
+                Shift = XL_UP if self.Rows.Count <= self.Columns.Count else XL_TO_LEFT
+        if Shift not in (XL_UP, XL_TO_LEFT):
+            raise ValueError("无界面模式不支持删除方向 {}".format(Shift))
+        self.Worksheet.delete(self.Row, self.Column, self.end_row, self.end_col, Shift == XL_UP)
+
+    def Find(
+        self, What, After: "FileRange" = None, LookAt: int = XL_PART, MatchCase=False, **kwargs
+    ) -> Optional["FileRange"]:
+        """
+        查找显示文本, 和 COM 一样按行从 After (默认为区域的第一个单元格) 之后开始, 找不到返回 None
+
+        本次查找的结果会被记住, 之后用 FindNext 依次取出
+        """
+        self._found = self.Worksheet.find(
+            str(What), self.Row, self.Column, self.end_row, self.end_col, LookAt == XL_WHOLE, bool(MatchCase)
+        )
+        return self.FindNext(After or self.Worksheet.Cells(self.Row, self.Column))
+
+    def FindNext(self, After: "FileRange" = None) -> Optional["FileRange"]:
+        if self._found is None:
+            raise ValueError("需要先调用 Find")
+        if not self._found:
+            return None
+        index = 0
+        if After is not None:
+            index = bisect_right(self._found, (After.Row, After.Column)) % len(self._found)
+        row, col = self._found[index]
+        return self.Worksheet.Cells(row, col)
@@ -10,6 +10,7 @@ from astronverse.excel import (
     SetType,
     VerticalAlign,
 )
+from astronverse.excel.core_win.transfer import RangeTransfer
 
 
 class Range:
@@ -380,34 +381,37 @@ class Range:
             range_obj.AutoFit()
 
     @staticmethod
-    def convert_text_to_number(range_obj, temp_range):
+    def convert_text_to_number(range_obj):
         """
         将范围内的文本格式转换为数值格式
 
         Args:
             range_obj: Range 对象（要转换的范围）
-            temp_range: 临时单元格 Range 对象（用于存储 VALUE 函数结果）
         """
-        # 遍历范围内的每个单元格
-        for cell in range_obj.Cells:
-            cell_address = cell.Address.replace("$", "")
-            cell_value = cell.Value
-
-            # 跳过空单元格
-            if cell_value in ["", None]:
-                continue
-
-            # 设置数字格式为通用格式
-            cell.NumberFormat = "G/通用格式"
-
-            # 使用 VALUE 函数转换
-            temp_range.Value = "=VALUE({})".format(cell_address)
-            temp_value = temp_range.Value
-
-            # 如果转换成功（不是错误值），更新单元格值
-            # Excel 错误值通常是 -2146826273.0 (xlErrValue)
-            if temp_value != -2146826273.0:
-                cell.Value = temp_value
+        worksheet = range_obj.Worksheet
+        transfer = RangeTransfer(worksheet)
+        start_row, start_col, end_row, end_col = RangeTransfer.bounds(range_obj)
+        width = end_col - start_col + 1
+
+        for first, last in transfer.chunks(start_row, end_row, width):
+            values = transfer.get_values(first, start_col, last, end_col)
+            # 用 VALUE 函数一次算出整块的转换结果, 转换失败的单元格是错误值
+            address = transfer.range(first, start_col, last, end_col).Address
+            numbers = worksheet.Evaluate("VALUE({})".format(address))
+            if not isinstance(numbers, tuple):
+                numbers = tuple((numbers,) * width for _ in values)
+
+            # 跳过空单元格, 非空单元格设置为通用格式
+            filled = [[value not in ["", None] for value in row] for row in values]
+            for r1, c1, r2, c2 in RangeTransfer.blocks(filled):
+                transfer.range(first + r1, start_col + c1, first + r2, start_col + c2).NumberFormat = "G/通用格式"
+
+            # 只写回转换成功的单元格
+            converted = [
+                [is_filled and not RangeTransfer.is_error(number) for is_filled, number in zip(filled_row, number_row)]
+                for filled_row, number_row in zip(filled, numbers)
+            ]
+            transfer.set_cells(first, start_col, [list(row) for row in numbers], converted)
 
     @staticmethod
     def convert_number_to_text(range_obj):
@@ -417,16 +421,18 @@ class Range:
         Args:
             range_obj: Range 对象（要转换的范围）
         """
-        # 遍历范围内的每个单元格
-        for cell in range_obj.Cells:
-            cell_value = cell.Value
+        transfer = RangeTransfer(range_obj.Worksheet)
+        start_row, start_col, end_row, end_col = RangeTransfer.bounds(range_obj)
 
-            # 如果值不是字符串类型，转换为文本格式
-            if not isinstance(cell_value, str):
-                # 设置数字格式为文本格式（"@" 表示文本）
-                cell.NumberFormat = "@"
-                # 使用 Text 属性获取显示值并设置为文本
-                cell.Value = cell.Text
+        for first, last in transfer.chunks(start_row, end_row, end_col - start_col + 1):
+            values = transfer.get_values(first, start_col, last, end_col)
+            # 改格式之前读取显示文本
+            texts = transfer.texts(first, start_col, values)
+            # 值不是字符串的单元格设置为文本格式（"@" 表示文本）, 再写入显示文本
+            mask = [[not isinstance(value, str) for value in row] for row in values]
+            for r1, c1, r2, c2 in RangeTransfer.blocks(mask):
+                transfer.range(first + r1, start_col + c1, first + r2, start_col + c2).NumberFormat = "@"
+            transfer.set_cells(first, start_col, texts, mask)
 
     @staticmethod
     def add_comment(range_obj, comment_text: str):
@@ -500,11 +506,6 @@ class Range:
             first_address = found_cell.Address
             positions.add(first_address)
 
-            # 如果需要替换
-            if replace_str:
-                cell_value = str(found_cell.Value) if found_cell.Value is not None else ""
-                found_cell.Value = cell_value.replace(find_str, replace_str)
-
             # 如果需要查找所有匹配项
             if match_all:
                 while True:
@@ -513,11 +514,6 @@ class Range:
                         break
                     positions.add(found_cell.Address)
 
-                    # 如果需要替换
-                    if replace_str:
-                        cell_value = str(found_cell.Value) if found_cell.Value is not None else ""
-                        found_cell.Value = cell_value.replace(find_str, replace_str)
-
         # 格式化结果
         res = []
         import re
@@ -537,6 +533,21 @@ class Range:
         # 按照行号优先，列号次之的顺序排序
         res.sort(key=lambda x: (x["row"], x["col_num"]))
 
+        # 查找完成后再整块替换, 不逐个单元格读写
+        if replace_str and res:
+            first_row, last_row = res[0]["row"], res[-1]["row"]
+            first_col = min(item["col_num"] for item in res)
+            last_col = max(item["col_num"] for item in res)
+            transfer = RangeTransfer(range_obj.Worksheet)
+            values = transfer.get_values(first_row, first_col, last_row, last_col)
+            mask = [[False] * (last_col - first_col + 1) for _ in values]
+            for item in res:
+                i, j = item["row"] - first_row, item["col_num"] - first_col
+                cell_value = str(values[i][j]) if values[i][j] is not None else ""
+                values[i][j] = cell_value.replace(find_str, replace_str)
+                mask[i][j] = True
+            transfer.set_cells(first_row, first_col, values, mask)
+
         # 将行号转换回字符串
         for item in res:
             item["row"] = str(item["row"])
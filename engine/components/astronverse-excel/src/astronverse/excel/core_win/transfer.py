@@ -0,0 +1,184 @@
+from collections.abc import Iterator
+from typing import Any
+
+# 单次 Range.Value 传输的单元格数上限, 更大的区域按整行分块
+CHUNK_CELLS = 100000
+
+# 单元格错误值: xlErrDiv0, xlErrNA, xlErrName, xlErrNull, xlErrNum, xlErrRef, xlErrValue
+XL_ERRORS = {-2146826281, -2146826246, -2146826259, -2146826288, -2146826252, -2146826265, -2146826273}
+
+
+class RangeTransfer:
+    """
+    区域整块读写
+
+    通过一次 Range.Value 读写一个二维数组, 代替逐个单元格的 COM 调用, 大区域按 chunk_cells 分块传输。
+    只用到 Worksheet.Range / Worksheet.Cells 和 Range.Value / Range.Text, 实现了这部分对象模型的对象
+    (如 core_file 中的 FileWorksheet) 都可以作为 worksheet 使用。
+    """
+
+    def __init__(self, worksheet, chunk_cells: int = CHUNK_CELLS):
+        self.worksheet = worksheet
+        self.chunk_cells = chunk_cells
+
+    @staticmethod
+    def of(worksheet):
+        """
+        获取工作表的整块读写对象
+
+        工作表自身提供 get_values / set_values 时 (无界面模式) 直接使用, 否则通过 COM 区域传输。
+        """
+        if hasattr(type(worksheet), "get_values"):
+            return worksheet
+        return RangeTransfer(worksheet)
+
+    @staticmethod
+    def bounds(range_obj) -> tuple[int, int, int, int]:
+        """区域的 (起始行, 起始列, 结束行, 结束列)"""
+        start_row, start_col = range_obj.Row, range_obj.Column
+        return start_row, start_col, start_row + range_obj.Rows.Count - 1, start_col + range_obj.Columns.Count - 1
+
+    def range(self, start_row: int, start_col: int, end_row: int, end_col: int) -> object:
+        """按行列号获取区域 Range 对象"""
+        return self.worksheet.Range(self.worksheet.Cells(start_row, start_col), self.worksheet.Cells(end_row, end_col))
+
+    def chunks(self, start_row: int, end_row: int, width: int) -> Iterator[tuple[int, int]]:
+        """把行范围拆成每块不超过 chunk_cells 个单元格的 (起始行, 结束行)"""
+        step = max(1, self.chunk_cells // max(width, 1))
+        for first in range(start_row, end_row + 1, step):
+            yield first, min(first + step - 1, end_row)
+
+    def get_values(
+        self, start_row: int, start_col: int, end_row: int, end_col: int, use_text: bool = False
+    ) -> list[list]:
+        """
+        整块读取一个区域
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            end_row: 结束行 (包含)
+            end_col: 结束列 (包含)
+            use_text: 是否返回显示文本
+
+        Returns:
+            二维列表
+        """
+        width = end_col - start_col + 1
+        if end_row < start_row or width <= 0:
+            return []
+        rows = []
+        for first, last in self.chunks(start_row, end_row, width):
+            values = self.range(first, start_col, last, end_col).Value
+            # 单个单元格返回的是值本身
+            if not isinstance(values, tuple):
+                values = ((values,),)
+            rows.extend(list(row) for row in values)
+        if use_text:
+            return self.texts(start_row, start_col, rows)
+        return rows
+
+    def texts(self, start_row: int, start_col: int, values: list) -> list[list]:
+        """
+        把整块读取的值转换成显示文本
+
+        多个单元格的 Range.Text 只在文本都相同时有值, 不能按块读取; 空单元格和字符串的显示文本就是值本身,
+        只有数字、日期等需要按格式显示的单元格才单独读取 Text。
+
+        限制: 每个数字、日期单元格仍是一次 Cells(r, c).Text 的 COM 调用, 读取以数字为主的大区域的显示文本时,
+        耗时和这类单元格的数量成正比, 不受 chunk_cells 分块的影响; 不需要显示格式时应读取值 (use_text=False)。
+
+        Args:
+            start_row: values 第一行的行号
+            start_col: values 第一列的列号
+            values: get_values 读取的二维列表
+
+        Returns:
+            二维列表
+        """
+        texts = []
+        for i, row in enumerate(values):
+            row_texts = []
+            for j, value in enumerate(row):
+                if value is None:
+                    row_texts.append("")
+                elif isinstance(value, str):
+                    row_texts.append(value)
+                else:
+                    row_texts.append(self.worksheet.Cells(start_row + i, start_col + j).Text)
+            texts.append(row_texts)
+        return texts
+
+    def set_values(self, start_row: int, start_col: int, rows: list):
+        """
+        从 (start_row, start_col) 开始写入二维列表, 连续等长的行合并成一块写入
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            rows: 二维列表, 每行长度可以不同
+        """
+        i = 0
+        while i < len(rows):
+            width = len(rows[i])
+            j = i + 1
+            while j < len(rows) and len(rows[j]) == width:
+                j += 1
+            if width:
+                for first, last in self.chunks(start_row + i, start_row + j - 1, width):
+                    block = tuple(tuple(row) for row in rows[first - start_row : last - start_row + 1])
+                    self.range(first, start_col, last, start_col + width - 1).Value = block
+            i = j
+
+    def set_cells(self, start_row: int, start_col: int, rows: list, mask: list):
+        """
+        只写入 mask 中为 True 的单元格, 相邻的单元格合并成矩形区域写入
+
+        Args:
+            start_row: 起始行 (从 1 开始)
+            start_col: 起始列 (从 1 开始)
+            rows: 二维列表
+            mask: 与 rows 形状相同的二维布尔列表
+        """
+        for r1, c1, r2, c2 in self.blocks(mask):
+            self.set_values(start_row + r1, start_col + c1, [row[c1 : c2 + 1] for row in rows[r1 : r2 + 1]])
+
+    @staticmethod
+    def blocks(mask: list) -> list[tuple[int, int, int, int]]:
+        """
+        把二维布尔列表中为 True 的单元格合并成矩形区域
+
+        先找出每行中连续的列段, 上下相邻且列段相同的行合并成一个矩形。
+
+        Args:
+            mask: 二维布尔列表
+
+        Returns:
+            矩形列表 (起始行, 起始列, 结束行, 结束列), 从 0 开始且包含结束位置
+        """
+        blocks = []
+        opened: dict[tuple[int, int], int] = {}
+        for i, row in enumerate(mask):
+            runs = []
+            j = 0
+            while j < len(row):
+                if row[j]:
+                    k = j
+                    while k + 1 < len(row) and row[k + 1]:
+                        k += 1
+                    runs.append((j, k))
+                    j = k + 1
+                else:
+                    j += 1
+            for run in list(opened):
+                if run not in runs:
+                    blocks.append((opened.pop(run), run[0], i - 1, run[1]))
+            for run in runs:
+                opened.setdefault(run, i)
+        blocks.extend((first, run[0], len(mask) - 1, run[1]) for run, first in opened.items())
+        return blocks
+
+    @staticmethod
+    def is_error(value: Any) -> bool:
+        """COM 返回的单元格错误值 (#VALUE! 等) 是 int 类型的错误码, 数字是 float"""
+        return isinstance(value, int) and not isinstance(value, bool) and value in XL_ERRORS
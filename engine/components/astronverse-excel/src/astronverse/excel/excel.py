@@ -1,18 +1,25 @@
 import ast
+import sys
 import time
 from itertools import zip_longest
 
-import win32clipboard as cv
 from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.actionlib.types import PATH
 from astronverse.excel import *
-from astronverse.excel.core_win.application import Application
 from astronverse.excel.core_win.range import Range
+from astronverse.excel.core_win.transfer import RangeTransfer
 from astronverse.excel.core_win.worksheet import Worksheet
 from astronverse.excel.excel_obj import ExcelObj
 from astronverse.excel.utils import *
 
+if sys.platform == "win32":
+    import win32clipboard as cv
+    from astronverse.excel.core_win.application import Application
+
+# 遍历 Excel 内容时每次从 Excel 读取的单元格数
+LOOP_WINDOW_CELLS = 10000
+
 
 class Excel:
     @staticmethod
@@ -43,6 +50,11 @@ class Excel:
             raise Exception("填写的文件路径有误，请输入正确的路径！")
         else:
             file_path = os.path.abspath(file_path)
+        if default_application == ApplicationType.FILE or sys.platform != "win32":
+            # 无界面模式, 不启动 Excel/WPS 直接读写文件
+            from astronverse.excel.core_file.application import Application as FileApplication
+
+            return FileApplication.open_workbook(file_path=file_path, password=password)
         application = Application.init_app(
             default_application=default_application,
             visible_flag=visible_flag,
@@ -130,6 +142,11 @@ class Excel:
         new_file_path = os.path.join(file_path, file_name)
         new_file_path = resolve_file_path(new_file_path, exist_handle_type)
 
+        if default_application == ApplicationType.FILE or sys.platform != "win32":
+            from astronverse.excel.core_file.application import Application as FileApplication
+
+            excel = FileApplication.create_workbook(file_path=new_file_path, password=password)
+            return excel, new_file_path
         application = Application.init_app(
             default_application=default_application,
             visible_flag=visible_flag,
@@ -187,20 +204,24 @@ class Excel:
         exist_handle_type: FileExistenceType = FileExistenceType.RENAME,
         close_flag: bool = False,
     ):
+        if excel.headless:
+            from astronverse.excel.core_file.application import Application as application
+        else:
+            application = Application
         if save_type == SaveType.SAVE_AS and file_path:
             file_suffix = "." + excel.get_name().split(".")[-1]
             if not file_name:
                 file_name = excel.get_name().split(".")[0]
             dst_file = os.path.join(file_path, file_name + file_suffix)
             new_file_path = resolve_file_path(dst_file, exist_handle_type)
-            Application.save_workbook(excel_obj=excel, file_path=new_file_path)
+            application.save_workbook(excel_obj=excel, file_path=new_file_path)
         elif save_type == SaveType.SAVE:
-            Application.save_workbook(excel_obj=excel)
+            application.save_workbook(excel_obj=excel)
         else:
             # 不做任何处理 SaveType.SAVE_AS 没有 file_path 或者是 SaveType.ABORT
             pass
         if close_flag:
-            Application.close_workbook(excel_obj=excel, save_changes=False)
+            application.close_workbook(excel_obj=excel, save_changes=False)
 
     @staticmethod
     @atomicMg.atomic(
@@ -292,6 +313,12 @@ class Excel:
             if save_type_all == SaveType_ALL.SAVE:
                 save_changes = True
 
+            # 无界面模式打开的工作簿不在 Excel/WPS 进程中, 单独关闭
+            if "astronverse.excel.core_file.workbook" in sys.modules:
+                from astronverse.excel.core_file.application import Application as FileApplication
+
+                FileApplication.close_all(save_changes=save_changes)
+
             excel_flag, excel_pid, wps_flag, wps_pid = get_excel_processes()
             if wps_flag:
                 Application.quit_app(default_application=ApplicationType.WPS, save_changes=save_changes)
@@ -362,16 +389,12 @@ class Excel:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
             first_col = end_col + 1 if edit_type == EditType.APPEND else start_col_num
-            for offset, val in enumerate(value):
-                r_obj = Worksheet.get_cell(worksheet, start_row_num, first_col + offset)
-                Range.set_range_data(r_obj, val)
+            RangeTransfer.of(worksheet).set_values(start_row_num, first_col, [value])
         elif edit_range == EditRangeType.COLUMN:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
             first_row = end_row + 1 if edit_type == EditType.APPEND else start_row_num
-            for offset, val in enumerate(value):
-                r_obj = Worksheet.get_cell(worksheet, first_row + offset, start_col_num)
-                Range.set_range_data(r_obj, val)
+            RangeTransfer.of(worksheet).set_values(first_row, start_col_num, [[val] for val in value])
         elif edit_range == EditRangeType.AREA:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
@@ -379,11 +402,7 @@ class Excel:
                 raise Exception("填写内容的列表格式有误")
             first_col = end_col + 1 if edit_type == EditType.APPEND else start_col_num
             first_row = end_row + 1 if edit_type == EditType.APPEND else start_row_num
-            for row in value:
-                for offset, val in enumerate(row):
-                    r_obj = Worksheet.get_cell(worksheet, first_row, first_col + offset)
-                    Range.set_range_data(r_obj, val)
-                first_row += 1  # 写完一行，整体下移
+            RangeTransfer.of(worksheet).set_values(first_row, first_col, value)
         elif edit_range == EditRangeType.CELL:
             r_obj = Worksheet.get_cell(worksheet, start_row_num, start_col_num)
             Range.set_range_data(r_obj, value)
@@ -483,44 +502,31 @@ class Excel:
         if read_range == ReadRangeType.CELL:
             r_obj = Worksheet.get_range(worksheet, cell)
             content = Range.get_range_data(r_obj, use_text=True if read_display else False)
-        elif read_range == ReadRangeType.ROW:
-            start_row_num = handle_row_input(row, r_end_row)
-            content = []
-            for col in range(1, r_end_col + 1):
-                r_obj = Worksheet.get_cell(worksheet, start_row_num, col)
-                cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                content.append(cell_text)
-        elif read_range == ReadRangeType.COLUMN:
-            start_col_num = handle_column_input(column, r_end_col)
-            content = []
-            for row in range(1, r_end_row + 1):
-                r_obj = Worksheet.get_cell(worksheet, row, start_col_num)
-                cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                content.append(cell_text)
-        elif read_range == ReadRangeType.AREA:
-            start_col_num = handle_column_input(start_col, r_end_col)
-            end_col_num = handle_column_input(end_col, r_end_col)
-            start_row_num = handle_row_input(start_row, r_end_row)
-            end_row_num = handle_row_input(end_row, r_end_row)
-            content = []
-            for row in range(start_row_num, end_row_num + 1):
-                row_data = []
-                for col in range(start_col_num, end_col_num + 1):
-                    r_obj = Worksheet.get_cell(worksheet, row, col)
-                    cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                    row_data.append(cell_text)
-                content.append(row_data)
-        elif read_range == ReadRangeType.ALL:
-            content = []
-            for row in range(1, r_end_row + 1):
-                row_data = []
-                for col in range(1, r_end_col + 1):
-                    r_obj = Worksheet.get_cell(worksheet, row, col)
-                    cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                    row_data.append(cell_text)
-                content.append(row_data)
         else:
-            raise NotImplementedError()
+            if read_range == ReadRangeType.ROW:
+                start_row_num = end_row_num = handle_row_input(row, r_end_row)
+                start_col_num, end_col_num = 1, r_end_col
+            elif read_range == ReadRangeType.COLUMN:
+                start_row_num, end_row_num = 1, r_end_row
+                start_col_num = end_col_num = handle_column_input(column, r_end_col)
+            elif read_range == ReadRangeType.AREA:
+                start_col_num = handle_column_input(start_col, r_end_col)
+                end_col_num = handle_column_input(end_col, r_end_col)
+                start_row_num = handle_row_input(start_row, r_end_row)
+                end_row_num = handle_row_input(end_row, r_end_row)
+            elif read_range == ReadRangeType.ALL:
+                start_row_num, start_col_num, end_row_num, end_col_num = 1, 1, r_end_row, r_end_col
+            else:
+                raise NotImplementedError()
+
+            content = RangeTransfer.of(worksheet).get_values(
+                start_row_num, start_col_num, end_row_num, end_col_num, use_text=True if read_display else False
+            )
+
+            if read_range == ReadRangeType.ROW:
+                content = content[0] if content else []
+            elif read_range == ReadRangeType.COLUMN:
+                content = [row_data[0] for row_data in content]
 
         if trim_spaces:
             content = util_trim(content)
@@ -1030,63 +1036,38 @@ class Excel:
 
         if insert_type in [EnhancedInsertType.ROW, EnhancedInsertType.ADD_ROWS]:
             start_row_num = handle_row_input(row, r_end_row)
-            if row_direction == RowDirectionType.UPPER:  # 向上
-                for _ in range(insert_num):
-                    r_obj = Worksheet.get_range(
-                        worksheet, "A{}:{}{}".format(start_row_num, r_end_col_letter, start_row_num)
-                    )
-                    Range.insert_range(r_obj, "row")
-            elif row_direction == RowDirectionType.LOWER:  # 向下
-                for _ in range(insert_num):
-                    r_obj = Worksheet.get_range(
-                        worksheet, "A{}:{}{}".format(start_row_num + 1, r_end_col_letter, start_row_num + 1)
-                    )
-                    Range.insert_range(r_obj, "row")
+            if row_direction == RowDirectionType.LOWER:  # 向下
                 start_row_num = start_row_num + 1
+            if insert_num > 0:
+                # 一次插入多行
+                r_obj = Worksheet.get_range(
+                    worksheet, "A{}:{}{}".format(start_row_num, r_end_col_letter, start_row_num + insert_num - 1)
+                )
+                Range.insert_range(r_obj, "row")
 
             if not blank_rows:
                 # 插入内容
-                first_col = 1
-                first_row = start_row_num
-                for row in value:
-                    for offset, val in enumerate(row):
-                        r_obj = Worksheet.get_cell(worksheet, first_row, first_col + offset)
-                        Range.set_range_data(r_obj, val)
-                    first_row += 1  # 写完一行，整体下移
+                RangeTransfer.of(worksheet).set_values(start_row_num, 1, value)
         elif insert_type in [EnhancedInsertType.COLUMN, EnhancedInsertType.ADD_COLUMNS]:
             start_col_num = handle_column_input(str(col), r_end_col)
-            if col_direction == ColumnDirectionType.LEFT:  # 向上
-                for _ in range(insert_num):
-                    r_obj = Worksheet.get_range(
-                        worksheet,
-                        "{}1:{}{}".format(
-                            column_number_to_letter(start_col_num), column_number_to_letter(start_col_num), r_end_row
-                        ),
-                    )
-                    Range.insert_range(r_obj, "column")
-            elif col_direction == ColumnDirectionType.RIGHT:  # 向下
-                for _ in range(insert_num):
-                    r_obj = Worksheet.get_range(
-                        worksheet,
-                        "{}1:{}{}".format(
-                            column_number_to_letter(start_col_num + 1),
-                            column_number_to_letter(start_col_num + 1),
-                            r_end_row,
-                        ),
-                    )
-                    Range.insert_range(r_obj, "column")
+            if col_direction == ColumnDirectionType.RIGHT:  # 向下
                 start_col_num = start_col_num + 1
+            if insert_num > 0:
+                # 一次插入多列
+                r_obj = Worksheet.get_range(
+                    worksheet,
+                    "{}1:{}{}".format(
+                        column_number_to_letter(start_col_num),
+                        column_number_to_letter(start_col_num + insert_num - 1),
+                        r_end_row,
+                    ),
+                )
+                Range.insert_range(r_obj, "column")
             if not blank_rows:
                 filled_T = list(zip_longest(*value, fillvalue=""))
                 value = [list(t_row) for t_row in filled_T]
                 # 插入内容
-                first_col = start_col_num
-                first_row = 1
-                for row in value:
-                    for offset, val in enumerate(row):
-                        r_obj = Worksheet.get_cell(worksheet, first_row, first_col + offset)
-                        Range.set_range_data(r_obj, val)
-                    first_row += 1  # 写完一行，整体下移
+                RangeTransfer.of(worksheet).set_values(1, start_col_num, value)
 
     @staticmethod
     @atomicMg.atomic(
@@ -1118,9 +1099,9 @@ class Excel:
             return r_end_row
         elif get_col_type == ColumnType.ONE_COLUMN:
             start_col_num = handle_column_input(col, r_end_col)
+            values = RangeTransfer.of(worksheet).get_values(1, start_col_num, r_end_row, start_col_num)
             for row in range(r_end_row, 0, -1):  # 倒序
-                val = Range.get_range_data(Worksheet.get_cell(worksheet, row, start_col_num), False)
-                if val not in [None, ""]:
+                if values[row - 1][0] not in [None, ""]:
                     return row  # Excel 行号 = row
             return 0  # 全空
 
@@ -1159,9 +1140,9 @@ class Excel:
         elif get_row_type == RowType.ONE_ROW:
             start_row_num = handle_row_input(row, r_end_row)
 
+            values = RangeTransfer.of(worksheet).get_values(start_row_num, 1, start_row_num, r_end_col)[0]
             for col in range(r_end_col, 0, -1):  # 从最后一列向前查
-                val = Range.get_range_data(Worksheet.get_cell(worksheet, start_row_num, col), False)
-                if val not in [None, ""]:
+                if values[col - 1] not in [None, ""]:
                     return column_number_to_letter(col) if output_type == ColumnOutputType.LETTER else col
             return "" if output_type == ColumnOutputType.LETTER else 0
 
@@ -1190,13 +1171,14 @@ class Excel:
         used_range = Worksheet.get_worksheet_used_range(worksheet)
         r_start_row, r_start_col, r_end_row, r_end_col, r_address = used_range
 
-        for row in range(r_start_row, r_end_row + 1):
-            for col in range(r_start_col, r_end_col + 1):
-                val = Range.get_range_data(Worksheet.get_cell(worksheet, row, col), False)
-                if val not in (None, ""):
-                    break
-            else:
-                return row
+        # 每次整块读取若干整行, 找到空行后不再读取
+        transfer = RangeTransfer.of(worksheet)
+        step = max(1, LOOP_WINDOW_CELLS // (r_end_col - r_start_col + 1))
+        for first in range(r_start_row, r_end_row + 1, step):
+            last = min(first + step - 1, r_end_row)
+            for offset, values in enumerate(transfer.get_values(first, r_start_col, last, r_end_col)):
+                if all(val in (None, "") for val in values):
+                    return first + offset
         return r_end_row + 1
 
     @staticmethod
@@ -1227,13 +1209,15 @@ class Excel:
         used_range = Worksheet.get_worksheet_used_range(worksheet)
         r_start_row, r_start_col, r_end_row, r_end_col, r_address = used_range
 
-        for col in range(r_start_col, r_end_col + 1):
-            for row in range(r_start_row, r_end_row + 1):
-                val = Range.get_range_data(Worksheet.get_cell(worksheet, row, col), False)
-                if val not in (None, ""):
-                    break
-            else:
-                return column_number_to_letter(col) if output_type == ColumnOutputType.LETTER else col
+        # 每次整块读取若干整列, 找到空列后不再读取
+        transfer = RangeTransfer.of(worksheet)
+        step = max(1, LOOP_WINDOW_CELLS // (r_end_row - r_start_row + 1))
+        for first in range(r_start_col, r_end_col + 1, step):
+            last = min(first + step - 1, r_end_col)
+            for offset, values in enumerate(zip(*transfer.get_values(r_start_row, first, r_end_row, last))):
+                if all(val in (None, "") for val in values):
+                    col = first + offset
+                    return column_number_to_letter(col) if output_type == ColumnOutputType.LETTER else col
         return column_number_to_letter(r_end_col + 1) if output_type == ColumnOutputType.LETTER else r_end_col + 1
 
     @staticmethod
@@ -1302,50 +1286,78 @@ class Excel:
         real_text: bool = False,
         cell_strip: bool = False,
     ):
+        """
+        循环 Excel 内容, 返回 (位置, 值) 的迭代器
+
+        区域在调用时确定, 第一个窗口 (约 LOOP_WINDOW_CELLS 个单元格) 在原子内读取; 之后的窗口在循环到时才从
+        Excel 读取, 循环体中对还没读到的单元格的修改会反映在后面的循环项中。循环中关闭工作簿或删除工作表时,
+        读取剩余窗口会抛出异常并指明出错的位置。
+        """
         worksheet = Worksheet.get_worksheet(excel, sheet_name, default=1)
         used_range = Worksheet.get_worksheet_used_range(worksheet)
         _, _, r_end_row, r_end_col, r_address = used_range
 
-        r_end_col_letter = column_number_to_letter(r_end_col)
-
         start_col_num = handle_column_input(start_col, r_end_col)
         end_col_num = handle_column_input(end_col, r_end_col)
         start_row_num = handle_row_input(start_row, r_end_row)
         end_row_num = handle_row_input(end_row, r_end_row)
 
         if select_type == SearchRangeType.ROW:
-            data_region = "{}{}:{}{}".format("A", start_row_num, r_end_col_letter, end_row_num)
+            row_range, col_range = (start_row_num, end_row_num), (1, r_end_col)
         elif select_type == SearchRangeType.COLUMN:
-            data_region = "{}{}:{}{}".format(
-                column_number_to_letter(start_col_num), "1", column_number_to_letter(end_col_num), end_row_num
-            )
+            row_range, col_range = (1, end_row_num), (start_col_num, end_col_num)
         elif select_type == SearchRangeType.AREA:
-            data_region = "{}{}:{}{}".format(
-                column_number_to_letter(start_col_num), start_row_num, column_number_to_letter(end_col_num), end_row_num
-            )
+            row_range, col_range = (start_row_num, end_row_num), (start_col_num, end_col_num)
         elif select_type == SearchRangeType.ALL:
-            data_region = "{}{}:{}{}".format("A", "1", r_end_col_letter, r_end_row)
+            row_range, col_range = (1, r_end_row), (1, r_end_col)
         else:
             raise ValueError("不支持的操作类型：{}".format(select_type))
-
-        content = Range.get_range_data(Worksheet.get_range(worksheet, data_region), True if real_text else False)
-        if content is None:
-            return {}
-
-        if cell_strip:
-            content = util_trim(content)
-
-        if content:
-            if not isinstance(content, (list, tuple)):
-                content = ((content,),)
-            if select_type == SearchRangeType.COLUMN:
-                keys = (column_number_to_letter(n) for n in range(start_col_num, end_col_num + 1))
-                vals = (list(col) for col in zip(*content))
-            else:
-                keys = range(start_row_num, start_row_num + len(content))
-                vals = (list(row) for row in content)
-            content = dict(zip(keys, vals))
-        return content
+        # 与 Excel 的区域一致, 起止顺序颠倒时按实际区域处理
+        start_row_num, end_row_num = sorted(row_range)
+        start_col_num, end_col_num = sorted(col_range)
+
+        # 按列遍历时每个窗口是若干整列, 否则是若干整行, 每个窗口约 LOOP_WINDOW_CELLS 个单元格
+        by_column = select_type == SearchRangeType.COLUMN
+        if by_column:
+            first, last = start_col_num, end_col_num
+            step = max(1, LOOP_WINDOW_CELLS // (end_row_num - start_row_num + 1))
+        else:
+            first, last = start_row_num, end_row_num
+            step = max(1, LOOP_WINDOW_CELLS // (end_col_num - start_col_num + 1))
+
+        transfer = RangeTransfer.of(worksheet)
+
+        def read_window(start: int) -> list:
+            end = min(start + step - 1, last)
+            if by_column:
+                content = transfer.get_values(start_row_num, start, end_row_num, end, True if real_text else False)
+                return [list(values) for values in zip(*content)]
+            return transfer.get_values(start, start_col_num, end, end_col_num, True if real_text else False)
+
+        # 第一个窗口立即读取, 区域错误在原子能力内抛出
+        window = read_window(first)
+        if start_row_num == end_row_num and start_col_num == end_col_num and window[0][0] is None:
+            return iter(())
+
+        def content_generator(window: list):
+            start = first
+            while True:
+                for offset, values in enumerate(window):
+                    key = column_number_to_letter(start + offset) if by_column else start + offset
+                    yield key, util_trim(values) if cell_strip else values
+                start += step
+                if start > last:
+                    return
+                # 循环体中 break 时不再读取剩余窗口
+                try:
+                    window = read_window(start)
+                except Exception as e:
+                    key = column_number_to_letter(start) if by_column else start
+                    raise Exception(
+                        "循环读取Excel内容失败, 工作簿可能已在循环中关闭: 位置 {}, {}".format(key, e)
+                    ) from e
+
+        return content_generator(window)
 
     @staticmethod
     @atomicMg.atomic(
@@ -2128,15 +2140,15 @@ class Excel:
                 used_range = Worksheet.get_worksheet_used_range(worksheet)
                 _, _, r_end_row, r_end_col, _ = used_range
 
-                # 遍历所有单元格查找匹配的内容
+                # 整块读取显示文本, 遍历所有单元格查找匹配的内容
+                texts = RangeTransfer.of(worksheet).get_values(1, 1, r_end_row, r_end_col, use_text=True)
                 for row in range(1, r_end_row + 1):
                     for col in range(1, r_end_col + 1):
-                        cell = Worksheet.get_cell(worksheet, row, col)
-                        cell_value = Range.get_range_data(cell, use_text=True)
+                        cell_value = texts[row - 1][col - 1]
 
                         # 检查是否匹配查找内容
                         if cell_value and find_str in str(cell_value):
-                            Range.add_comment(cell, comment)
+                            Range.add_comment(Worksheet.get_cell(worksheet, row, col), comment)
                             count += 1
 
                             # 如果只批注第一个匹配项，则退出所有循环
@@ -2274,17 +2286,10 @@ class Excel:
             r_address=r_address,
         )
 
-        # 使用一个临时单元格来存储转换结果
-        temp_cell = "{}{}".format(column_number_to_letter(r_end_col), r_end_row + 1)
-        temp_range = Worksheet.get_range(worksheet, temp_cell)
-
         # 遍历所有单元格位置
         for cell_pos in cell_positions:
             range_obj = Worksheet.get_range(worksheet, cell_pos)
-            Range.convert_text_to_number(range_obj, temp_range)
-
-        # 清理临时单元格
-        temp_range.Value = None
+            Range.convert_text_to_number(range_obj)
 
     @staticmethod
     @atomicMg.atomic(
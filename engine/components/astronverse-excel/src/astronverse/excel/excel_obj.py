@@ -19,8 +19,15 @@ class ExcelObj:
             return value
         raise BaseException(PARAM_VERIFY_ERROR_FORMAT.format(name, value), "{}参数验证失败{}".format(name, value))
 
+    @property
+    def headless(self) -> bool:
+        """是否为无界面模式 (直接读写文件) 打开的工作簿"""
+        # core_file 依赖 python-calamine, 只在使用无界面模式时导入; 没有导入过就不会有无界面的工作簿
+        workbook = sys.modules.get("astronverse.excel.core_file.workbook")
+        return workbook is not None and isinstance(self.obj, workbook.FileWorkbook)
+
     def get_name(self):
-        if sys.platform == "win32":
+        if sys.platform == "win32" or self.headless:
             return self.obj.Name
         else:
             return ""
@@ -0,0 +1,215 @@
+import unittest
+
+from astronverse.excel.core_win.range import Range
+from astronverse.excel.core_win.transfer import RangeTransfer
+from astronverse.excel.utils import column_number_to_letter
+
+
+class FakeCount:
+    def __init__(self, count: int):
+        self.Count = count
+
+
+class FakeRange:
+    """COM Range 的替身, 行为和 Excel 一致: 单个单元格的 Value 是值本身, 多个单元格是二维元组"""
+
+    def __init__(self, sheet: "FakeWorksheet", start_row: int, start_col: int, end_row: int, end_col: int):
+        self.Worksheet = sheet
+        self.Row, self.Column = start_row, start_col
+        self.end_row, self.end_col = end_row, end_col
+        self.Rows = FakeCount(end_row - start_row + 1)
+        self.Columns = FakeCount(end_col - start_col + 1)
+
+    @property
+    def Address(self) -> str:
+        first = "${}${}".format(column_number_to_letter(self.Column), self.Row)
+        if self.Rows.Count == 1 and self.Columns.Count == 1:
+            return first
+        return "{}:${}${}".format(first, column_number_to_letter(self.end_col), self.end_row)
+
+    def positions(self) -> list[tuple[int, int]]:
+        return [(r, c) for r in range(self.Row, self.end_row + 1) for c in range(self.Column, self.end_col + 1)]
+
+    @property
+    def Value(self):
+        self.Worksheet.reads.append(self.Address)
+        rows = tuple(
+            tuple(self.Worksheet.cells.get((r, c)) for c in range(self.Column, self.end_col + 1))
+            for r in range(self.Row, self.end_row + 1)
+        )
+        return rows[0][0] if len(self.positions()) == 1 else rows
+
+    @Value.setter
+    def Value(self, value):
+        self.Worksheet.writes.append(self.Address)
+        if len(self.positions()) == 1:
+            value = ((value,),) if not isinstance(value, tuple) else value
+        assert len(value) == self.Rows.Count and all(len(row) == self.Columns.Count for row in value), value
+        for i, row in enumerate(value):
+            for j, cell in enumerate(row):
+                self.Worksheet.cells[(self.Row + i, self.Column + j)] = cell
+
+    @property
+    def Text(self):
+        self.Worksheet.text_reads += 1
+        texts = {self.Worksheet.text(r, c) for r, c in self.positions()}
+        return texts.pop() if len(texts) == 1 else None
+
+    def Find(self, what: str, LookAt: int = 2, LookIn: int = -4163, MatchCase: int = 0):
+        # 和 Excel 一样从左上角单元格之后开始查找, 左上角最后才找到
+        return self.next_match(what, LookAt == 1, 0)
+
+    def FindNext(self, after: "FakeRange"):
+        return self.next_match(*self.Worksheet.last_find, self.positions().index((after.Row, after.Column)))
+
+    def next_match(self, what: str, whole: bool, after: int):
+        """从 after 的下一个单元格开始按行查找, 到末尾后回到开头"""
+        self.Worksheet.last_find = (what, whole)
+        positions = self.positions()
+        for k in range(1, len(positions) + 1):
+            r, c = positions[(after + k) % len(positions)]
+            value = self.Worksheet.cells.get((r, c))
+            text = "" if value is None else str(value)
+            if (text == what) if whole else (what in text):
+                return FakeRange(self.Worksheet, r, c, r, c)
+        return None
+
+
+class FakeWorksheet:
+    """COM Worksheet 的替身, 记录每次 Value 读写的区域地址"""
+
+    def __init__(self, cells: dict = None):
+        self.cells = dict(cells or {})
+        self.reads, self.writes = [], []
+        self.text_reads = 0
+        self.last_find = None
+
+    def Cells(self, row: int, col: int) -> FakeRange:
+        return FakeRange(self, row, col, row, col)
+
+    def Range(self, first: FakeRange, last: FakeRange) -> FakeRange:
+        return FakeRange(self, first.Row, first.Column, last.Row, last.Column)
+
+    def text(self, row: int, col: int) -> str:
+        value = self.cells.get((row, col))
+        if value is None:
+            return ""
+        return "{:.2f}".format(value) if isinstance(value, float) else str(value)
+
+    def grid(self, end_row: int, end_col: int) -> list[list]:
+        return [[self.cells.get((r, c)) for c in range(1, end_col + 1)] for r in range(1, end_row + 1)]
+
+
+class TestRangeTransfer(unittest.TestCase):
+    def test_get_values_in_chunks(self):
+        # 大区域按整行分块读取, 每块不超过 chunk_cells 个单元格, 结果和整块读取一致
+        sheet = FakeWorksheet({(r, c): r * 10 + c for r in range(1, 11) for c in range(1, 4)})
+        transfer = RangeTransfer(sheet, chunk_cells=7)
+        values = transfer.get_values(1, 1, 10, 3)
+        self.assertEqual(values, sheet.grid(10, 3))
+        self.assertEqual(sheet.reads, ["$A$1:$C$2", "$A$3:$C$4", "$A$5:$C$6", "$A$7:$C$8", "$A$9:$C$10"])
+
+    def test_chunk_wider_than_budget(self):
+        # 一行的单元格数超过 chunk_cells 时每块一行
+        transfer = RangeTransfer(FakeWorksheet(), chunk_cells=2)
+        self.assertEqual(list(transfer.chunks(3, 5, 10)), [(3, 3), (4, 4), (5, 5)])
+
+    def test_get_values_shapes(self):
+        # 单个单元格的值包成 1x1, 单行单列也都是二维列表
+        sheet = FakeWorksheet({(1, 1): "a", (1, 2): "b", (2, 1): "c"})
+        transfer = RangeTransfer(sheet)
+        self.assertEqual(transfer.get_values(1, 1, 1, 1), [["a"]])
+        self.assertEqual(transfer.get_values(1, 1, 1, 2), [["a", "b"]])
+        self.assertEqual(transfer.get_values(1, 1, 2, 1), [["a"], ["c"]])
+        self.assertEqual(transfer.get_values(2, 1, 1, 1), [])
+
+    def test_single_row_chunks_of_one_cell(self):
+        # 分块后只剩一个单元格时 Value 返回值本身, 仍按 1x1 拼接
+        sheet = FakeWorksheet({(r, 1): r for r in range(1, 4)})
+        transfer = RangeTransfer(sheet, chunk_cells=1)
+        self.assertEqual(transfer.get_values(1, 1, 3, 1), [[1], [2], [3]])
+        self.assertEqual(sheet.reads, ["$A$1", "$A$2", "$A$3"])
+
+    def test_texts_only_for_formatted_cells(self):
+        # 空单元格和字符串不读取 Text, 其他单元格逐个读取
+        sheet = FakeWorksheet({(1, 1): "a", (1, 2): 1.5, (2, 2): 2.0})
+        transfer = RangeTransfer(sheet)
+        self.assertEqual(transfer.get_values(1, 1, 2, 2, use_text=True), [["a", "1.50"], ["", "2.00"]])
+        self.assertEqual(sheet.text_reads, 2)
+
+    def test_set_values_in_chunks(self):
+        # 连续等长的行合并写入, 长度变化时另起一块, 大块再按 chunk_cells 拆分
+        sheet = FakeWorksheet()
+        transfer = RangeTransfer(sheet, chunk_cells=4)
+        rows = [[1, 2], [3, 4], [5, 6], ["x"], [], [7, 8, 9]]
+        transfer.set_values(2, 2, rows)
+        self.assertEqual(sheet.writes, ["$B$2:$C$3", "$B$4:$C$4", "$B$5", "$B$7:$D$7"])
+        self.assertEqual(
+            sheet.grid(7, 4),
+            [[None] * 4, [None, 1, 2, None], [None, 3, 4, None], [None, 5, 6, None], [None, "x", None, None],
+             [None] * 4, [None, 7, 8, 9]],
+        )  # fmt: skip
+
+    def test_blocks(self):
+        # 每行连续的列段合并, 上下列段相同的行合成一个矩形
+        mask = [
+            [True, True, False, True],
+            [True, True, False, False],
+            [False, True, True, False],
+        ]
+        self.assertEqual(sorted(RangeTransfer.blocks(mask)), [(0, 0, 1, 1), (0, 3, 0, 3), (2, 1, 2, 2)])
+        self.assertEqual(RangeTransfer.blocks([[False, False]]), [])
+
+    def test_set_cells_only_masked(self):
+        # 只写入 mask 为 True 的单元格, 其他单元格保持原值
+        sheet = FakeWorksheet({(r, c): "old" for r in range(1, 3) for c in range(1, 4)})
+        transfer = RangeTransfer(sheet)
+        transfer.set_cells(1, 1, [[1, 2, 3], [4, 5, 6]], [[True, False, True], [True, False, False]])
+        self.assertEqual(sheet.grid(2, 3), [[1, "old", 3], [4, "old", "old"]])
+        self.assertEqual(sorted(sheet.writes), ["$A$1:$A$2", "$C$1"])
+
+
+class TestSearchAndReplace(unittest.TestCase):
+    def make_sheet(self) -> FakeWorksheet:
+        return FakeWorksheet(
+            {
+                (1, 1): "apple",
+                (1, 2): "pear",
+                (2, 3): "apple pie",
+                (3, 1): "kiwi",
+                (3, 2): 1.5,
+                (4, 2): "apple",
+            }
+        )
+
+    def test_find_all_wraps_once(self):
+        # FindNext 回到第一个结果时停止, 结果按行列排序
+        sheet = self.make_sheet()
+        res = Range.search_and_replace(sheet.Range(sheet.Cells(1, 1), sheet.Cells(4, 3)), "apple")
+        self.assertEqual(res, [{"row": "1", "col": "A"}, {"row": "2", "col": "C"}, {"row": "4", "col": "B"}])
+        self.assertEqual(sheet.writes, [])
+
+    def test_replace_writes_only_matches(self):
+        # 在匹配单元格的外接矩形内整块读取, 只写回匹配的单元格, 矩形内其他单元格不被改写
+        sheet = self.make_sheet()
+        res = Range.search_and_replace(sheet.Range(sheet.Cells(1, 1), sheet.Cells(4, 3)), "apple", "plum")
+        self.assertEqual(len(res), 3)
+        self.assertEqual(
+            sheet.grid(4, 3),
+            [["plum", "pear", None], [None, None, "plum pie"], ["kiwi", 1.5, None], [None, "plum", None]],
+        )
+        self.assertEqual(sheet.reads, ["$A$1:$C$4"])
+        self.assertEqual(sorted(sheet.writes), ["$A$1", "$B$4", "$C$2"])
+
+    def test_first_match_only(self):
+        sheet = self.make_sheet()
+        res = Range.search_and_replace(
+            sheet.Range(sheet.Cells(1, 1), sheet.Cells(4, 3)), "apple", "plum", exact_match=True, match_all=False
+        )
+        self.assertEqual(res, [{"row": "4", "col": "B"}])
+        self.assertEqual(sheet.cells[(1, 1)], "apple")
+        self.assertEqual(sheet.cells[(4, 2)], "plum")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import openpyxl
+from astronverse.excel import CloseRangeType, SaveType_ALL, SearchRangeType
+from astronverse.excel import excel as excel_module
+from astronverse.excel.core_file.application import Application
+from astronverse.excel.core_file.workbook import XL_TO_LEFT, XL_UP, FileWorkbook
+from astronverse.excel.core_win.range import Range
+from astronverse.excel.excel import Excel
+from astronverse.excel.excel_obj import ExcelObj
+
+
+def make_workbook(path: str, rows: list, cached: dict = None):
+    """
+    生成测试用的工作簿
+
+    openpyxl 保存的公式没有计算结果, cached 中 {公式: 值} 写入文件作为缓存的计算结果, 和 Excel 保存的文件一致
+    """
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = "Sheet1"
+    for row in rows:
+        sheet.append(row)
+    book.save(path)
+    if not cached:
+        return
+    with zipfile.ZipFile(path) as src:
+        files = {name: src.read(name) for name in src.namelist()}
+    xml = files["xl/worksheets/sheet1.xml"].decode("utf-8")
+    for formula, value in cached.items():
+        xml = xml.replace("<f>{}</f><v />".format(formula), "<f>{}</f><v>{}</v>".format(formula, value))
+    files["xl/worksheets/sheet1.xml"] = xml.encode("utf-8")
+    with zipfile.ZipFile(path, "w") as dst:
+        for name, data in files.items():
+            dst.writestr(name, data)
+
+
+class FileWorkbookTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "test.xlsx")
+
+    def tearDown(self):
+        for workbook in list(FileWorkbook.opened):
+            workbook.Close(SaveChanges=False)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def open(self, rows: list, cached: dict = None) -> FileWorkbook:
+        make_workbook(self.path, rows, cached)
+        return FileWorkbook.open(self.path)
+
+
+class TestFind(FileWorkbookTestCase):
+    def test_find_next_wraps_around(self):
+        # 和 COM 一样从第一个单元格之后开始按行查找, 到末尾后回到开头
+        sheet = self.open([["apple", "pear"], [None, "Apple pie"], ["kiwi", "apple"]]).ActiveSheet
+        area = sheet.Range("A1:B3")
+        found = area.Find("apple")
+        addresses = [found.Address]
+        for _ in range(3):
+            found = area.FindNext(found)
+            addresses.append(found.Address)
+        self.assertEqual(addresses, ["$B$2", "$B$3", "$A$1", "$B$2"])
+        self.assertIsNone(area.Find("plum"))
+        self.assertEqual(area.Find("apple", MatchCase=True).Address, "$B$3")
+
+    def test_search_and_replace(self):
+        # core_win 的查找替换直接作用在无界面工作表上, 只改写匹配的单元格
+        workbook = self.open([["apple", "pear"], [None, "Apple pie"], ["kiwi", "apple"]])
+        sheet = workbook.ActiveSheet
+        res = Range.search_and_replace(sheet.Range("A1:B3"), "apple", "plum", exact_match=True)
+        self.assertEqual(res, [{"row": "1", "col": "A"}, {"row": "3", "col": "B"}])
+        self.assertEqual(sheet.get_values(1, 1, 3, 2), [["plum", "pear"], [None, "Apple pie"], ["kiwi", "plum"]])
+
+
+class TestDelete(FileWorkbookTestCase):
+    rows = [[11, 12, 13], [21, 22, 23], [31, 32, 33], [41, 42, 43]]
+
+    def test_delete_shift_up(self):
+        # 只有区域所在的列上移, 最下面空出
+        sheet = self.open(self.rows).ActiveSheet
+        sheet.Range("B2:B3").Delete(Shift=XL_UP)
+        self.assertEqual(sheet.get_values(1, 1, 4, 3), [[11, 12, 13], [21, 42, 23], [31, None, 33], [41, None, 43]])
+
+    def test_delete_shift_left(self):
+        # 只有区域所在的行左移, 最右面空出
+        sheet = self.open(self.rows).ActiveSheet
+        sheet.Range("A2:B3").Delete(Shift=XL_TO_LEFT)
+        self.assertEqual(sheet.get_values(1, 1, 4, 3), [[11, 12, 13], [23, None, None], [33, None, None], [41, 42, 43]])
+
+    def test_delete_entire_row(self):
+        # 不指定方向时整行删除
+        sheet = self.open(self.rows).ActiveSheet
+        sheet.Range("2:3").Delete()
+        self.assertEqual(sheet.get_values(1, 1, 3, 3), [[11, 12, 13], [41, 42, 43], [None, None, None]])
+
+
+class TestEvaluate(FileWorkbookTestCase):
+    def test_convert_text_to_number(self):
+        # VALUE(区域) 整块转换, 转换失败和空白的单元格保持原样
+        sheet = self.open([["1,234", "12%"], ["abc", None], [" 7 ", True]]).ActiveSheet
+        self.assertEqual(sheet.Evaluate("VALUE(A1)"), 1234.0)
+        Range.convert_text_to_number(sheet.Range("A1:B3"))
+        self.assertEqual(sheet.get_values(1, 1, 3, 2), [[1234, 0.12], ["abc", None], [7, True]])
+        self.assertEqual(sheet.Range("A1").NumberFormat, "General")
+        with self.assertRaises(AttributeError):
+            sheet.Evaluate("SUM(A1:A3)")
+
+    def test_convert_number_to_text(self):
+        # 数字按常规格式的显示文本写回, 并设置为文本格式
+        sheet = self.open([[1, 2.5], ["x", None]]).ActiveSheet
+        Range.convert_number_to_text(sheet.Range("A1:B2"))
+        self.assertEqual(sheet.get_values(1, 1, 2, 2), [["1", "2.5"], ["x", ""]])
+        self.assertEqual(sheet.Range("A1").NumberFormat, "@")
+        self.assertEqual(sheet.Range("B2").NumberFormat, "@")
+
+
+class TestCachedFormulas(FileWorkbookTestCase):
+    def test_cached_values_kept_across_save(self):
+        # openpyxl 保存后文件中不再有计算结果, 同一个工作簿之后仍读到打开时缓存的值; 改写过的公式读到公式文本
+        workbook = self.open([[1, 2, "=A1+B1"], [3, 4, "=A2+B2"]], {"A1+B1": 3, "A2+B2": 7})
+        sheet = workbook.ActiveSheet
+        self.assertEqual(sheet.get_values(1, 3, 2, 3), [[3], [7]])
+
+        sheet.Range("A2").Value = 30
+        sheet.Range("C2").Value = "=A2*2"
+        workbook.Save()
+        self.assertEqual(sheet.get_values(1, 1, 2, 3), [[1, 2, 3], [30, 4, "=A2*2"]])
+        self.assertEqual(sheet.Range("C1").Text, "3")
+
+        # 上移后缓存的值跟着单元格移动
+        sheet.Range("A1:C1").Delete(Shift=XL_UP)
+        self.assertEqual(sheet.get_values(1, 1, 1, 3), [[30, 4, "=A2*2"]])
+        workbook.Close(SaveChanges=False)
+        self.assertEqual(openpyxl.load_workbook(self.path).active["C1"].value, "=A1+B1")
+
+
+class TestCloseAll(FileWorkbookTestCase):
+    def test_close_all_includes_headless(self):
+        # 关闭所有文档时无界面模式打开的工作簿也被保存并关闭
+        make_workbook(self.path, [[1]])
+        other = os.path.join(self.dir, "other.xlsx")
+        make_workbook(other, [[2]])
+        first = Application.open_workbook(self.path)
+        second = Application.open_workbook(other)
+        first.obj.ActiveSheet.Range("A1").Value = 10
+        second.obj.ActiveSheet.Range("A1").Value = 20
+        self.assertEqual(FileWorkbook.opened, [first.obj, second.obj])
+
+        Excel.close_excel(close_range_flag=CloseRangeType.ALL, save_type_all=SaveType_ALL.SAVE)
+        self.assertEqual(FileWorkbook.opened, [])
+        self.assertEqual(openpyxl.load_workbook(self.path).active["A1"].value, 10)
+        self.assertEqual(openpyxl.load_workbook(other).active["A1"].value, 20)
+
+    def test_close_all_without_saving(self):
+        make_workbook(self.path, [[1]])
+        excel = Application.open_workbook(self.path)
+        excel.obj.ActiveSheet.Range("A1").Value = 10
+        Excel.close_excel(close_range_flag=CloseRangeType.ALL, save_type_all=SaveType_ALL.ABORT)
+        self.assertEqual(FileWorkbook.opened, [])
+        self.assertEqual(openpyxl.load_workbook(self.path).active["A1"].value, 1)
+
+
+class TestLoopContent(FileWorkbookTestCase):
+    @mock.patch.object(excel_module, "LOOP_WINDOW_CELLS", 4)
+    def test_later_windows_read_live(self):
+        # 第一个窗口在原子内读取, 之后的窗口循环到时才读取, 循环中的修改反映在还没读到的行中
+        workbook = self.open([[r, r * 10] for r in range(1, 6)])
+        sheet = workbook.ActiveSheet
+        content = Excel.loop_excel_content(excel=ExcelObj(workbook, self.path), select_type=SearchRangeType.ALL)
+        sheet.Range("A1").Value = "changed"
+        sheet.Range("A4").Value = "changed"
+        self.assertEqual(list(content), [(1, [1, 10]), (2, [2, 20]), (3, [3, 30]), (4, ["changed", 40]), (5, [5, 50])])
+
+    @mock.patch.object(excel_module, "LOOP_WINDOW_CELLS", 4)
+    def test_window_read_error(self):
+        # 读取之后的窗口失败时指明出错的位置
+        workbook = self.open([[r, r * 10] for r in range(1, 6)])
+        content = Excel.loop_excel_content(excel=ExcelObj(workbook, self.path), select_type=SearchRangeType.ALL)
+        workbook.ActiveSheet.get_values = mock.Mock(side_effect=RuntimeError("closed"))
+        self.assertEqual(next(content), (1, [1, 10]))
+        self.assertEqual(next(content), (2, [2, 20]))
+        with self.assertRaisesRegex(Exception, "位置 3, closed"):
+            next(content)
+
+
+if __name__ == "__main__":
+    unittest.main()
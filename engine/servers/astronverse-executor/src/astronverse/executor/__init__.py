@@ -25,6 +25,7 @@ class ProjectInfo:
     requirement: dict = None
     gateway_port: int = 0
     global_var: dict = None
+    elements: set = None
 
     def __json__(self):
         return {
@@ -34,6 +35,7 @@ class ProjectInfo:
             "version": self.version,
             "requirement": self.requirement,
             "gateway_port": self.gateway_port,
+            "elements": sorted(self.elements or []),
         }
 
     @classmethod
@@ -45,6 +47,7 @@ class ProjectInfo:
             version=data.get("version", ""),
             requirement=data.get("requirement", {}),
             gateway_port=int(data.get("gateway_port", 0)),
+            elements=set(data.get("elements", [])),
         )
 
 
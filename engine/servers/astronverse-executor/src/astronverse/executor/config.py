@@ -31,6 +31,9 @@ class Config:
     # 组件生成目录
     gen_component_path: str = "{}/astron_extension/".format(platform_python_venv_run_dir(sys.executable))
 
+    # 工程数据并发获取线程数
+    storage_fetch_workers: int = 8
+
     # 主入口脚本文件名
     main_file_name: str = "main.py"
 
@@ -40,6 +43,15 @@ class Config:
     # package cache
     package_cache_dir: str = "./pip_cache/"
 
+    # 机器级依赖索引/锁文件(位于package_cache_dir下), 依赖并发下载线程数, 索引保留的环境指纹数
+    package_index_file: str = "requirements_index.json"
+    package_lock_file: str = "requirements.lock"
+    package_download_workers: int = 4
+    package_index_max_envs: int = 200
+
+    # 原子能力定义缓存目录
+    atom_cache_dir: str = "./atom_cache/"
+
     # resource dir
     resource_dir: str = "./"
 
@@ -52,5 +64,16 @@ class Config:
     # 是否开启并等待右下角ws连接
     wait_tip_ws: bool = False
 
+    # 运行日志批量写入: 条数阈值/时间间隔(秒)/最大积压条数
+    report_flush_size: int = 200
+    report_flush_interval: float = 0.2
+    report_buffer_size: int = 100000
+
+    # ws日志队列满时的策略 block/drop_oldest/drop_new
+    report_queue_policy: str = "block"
+
+    # ws日志每次唤醒最多合并发送的条数
+    report_ws_batch_size: int = 100
+
     # 是否是 debug 模式
     debug_mode: bool = False
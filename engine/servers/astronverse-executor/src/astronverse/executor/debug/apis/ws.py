@@ -1,6 +1,7 @@
 import asyncio
 import json
 import queue
+import time
 import traceback
 from dataclasses import dataclass
 from typing import Any
@@ -73,6 +74,12 @@ class Ws:
 
         self.BASE_MSG = BaseMsg(channel="flow", key="report", uuid="$root$")
         self.report_once = AsyncOnce()
+        self.report_event = None
+
+        # 日志端到端延迟统计
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
 
     def check_ws_link(self):
         if self.is_open_web_link and not self.is_web_link:
@@ -85,21 +92,55 @@ class Ws:
     async def send_text(conn: Conn, msg: str):
         await conn.send_text(msg)
 
+    def wake_report(self):
+        """唤醒日志发送协程, 只能在事件循环线程中调用"""
+        if self.report_event:
+            self.report_event.set()
+
+    def __drain__(self, q: queue.Queue, limit: int) -> list:
+        """非阻塞地取出一批消息"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def __latency__(self, batch: list):
+        """统计日志从提交到发送的端到端延迟"""
+        now = time.time()
+        for event_time, _ in batch:
+            latency = now - event_time
+            self.latency_count += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+        if self.latency_count >= 1000:
+            logger.debug(
+                "report latency avg: {:.2f}ms max: {:.2f}ms count: {}".format(
+                    self.latency_sum / self.latency_count * 1000, self.latency_max * 1000, self.latency_count
+                )
+            )
+            self.latency_count = 0
+            self.latency_sum = 0.0
+            self.latency_max = 0.0
+
     async def send_report(self, q: queue.Queue):
         async def inner_send_report():
-            i = 1
+            loop = asyncio.get_running_loop()
+            self.report_event = asyncio.Event()
+            # 写线程推送消息后通过call_soon_threadsafe唤醒, 不再轮询
+            self.svc.report.set_queue_notify(lambda: loop.call_soon_threadsafe(self.report_event.set))
+
+            batch_size = self.svc.conf.report_ws_batch_size
             drop_max_size = int(q.maxsize / 10 * 8)
             drop_min_size = int(q.maxsize / 10 * 2)
             drop_num = 0
 
             while True:
-                if not self.check_ws_link():
-                    await asyncio.sleep(0.3)
-                    continue
-                try:
-                    msg = q.get_nowait()
-                except queue.Empty:
-                    await asyncio.sleep(0.3)
+                self.report_event.clear()
+                if not self.check_ws_link() or q.empty():
+                    await self.report_event.wait()
                     continue
 
                 try:
@@ -107,51 +148,45 @@ class Ws:
                     if not self.is_open_web_link:
                         # 消息太多直接抛弃, 快速抛弃
                         if q.qsize() > drop_max_size:
-                            for i in range(drop_max_size - drop_min_size):
-                                msg = q.get()
-                                pass
-
-                    # 都需要发送
-                    data = json.loads(msg)
-                    tag = data.get("tag", None)
-                    if tag == "tip":
-                        # 只需要发送给tip
-                        is_send_web = False
-                        is_send_tip = True
-                    else:
-                        # 都需要发送
-                        is_send_web = True
-                        is_send_tip = True
-
-                    tasks_1 = []
-                    tasks_2 = []
-                    if is_send_web and wsmg.conns.get("$executor$"):
-                        self.BASE_MSG.send_uuid = "$executor$"
-                        self.BASE_MSG.init().data = data
-                        tasks_1 = [
-                            asyncio.create_task(self.send_text(v1, self.BASE_MSG.tojson()))
-                            for v1 in wsmg.conns[self.BASE_MSG.send_uuid]
-                        ]
-                    if is_send_tip and wsmg.conns.get("$executor_tip$"):
-                        # tip达到抛弃的下沿就直接抛弃，并计算抛弃数量30个就吐出1个
-                        if q.qsize() > drop_min_size and drop_num < 30:
-                            tasks_2 = []
-                            drop_num += 1
+                            self.__drain__(q, drop_max_size - drop_min_size)
+
+                    # 一次唤醒合并发送一批消息
+                    batch = self.__drain__(q, batch_size)
+                    self.__latency__(batch)
+
+                    tasks = []
+                    for _, msg in batch:
+                        data = json.loads(msg)
+                        tag = data.get("tag", None)
+                        if tag == "tip":
+                            # 只需要发送给tip
+                            is_send_web = False
+                            is_send_tip = True
                         else:
-                            drop_num = 0
-                            self.BASE_MSG.send_uuid = "$executor_tip$"
+                            # 都需要发送
+                            is_send_web = True
+                            is_send_tip = True
+
+                        if is_send_web and wsmg.conns.get("$executor$"):
+                            self.BASE_MSG.send_uuid = "$executor$"
                             self.BASE_MSG.init().data = data
-                            tasks_2 = [
-                                asyncio.create_task(self.send_text(v2, self.BASE_MSG.tojson()))
-                                for v2 in wsmg.conns[self.BASE_MSG.send_uuid]
-                            ]
-                    tasks = tasks_1 + tasks_2
+                            text = self.BASE_MSG.tojson()
+                            tasks.extend(self.send_text(v1, text) for v1 in wsmg.conns[self.BASE_MSG.send_uuid])
+                        if is_send_tip and wsmg.conns.get("$executor_tip$"):
+                            # tip达到抛弃的下沿就直接抛弃，并计算抛弃数量30个就吐出1个
+                            if q.qsize() > drop_min_size and drop_num < 30:
+                                drop_num += 1
+                            else:
+                                drop_num = 0
+                                self.BASE_MSG.send_uuid = "$executor_tip$"
+                                self.BASE_MSG.init().data = data
+                                text = self.BASE_MSG.tojson()
+                                tasks.extend(self.send_text(v2, text) for v2 in wsmg.conns[self.BASE_MSG.send_uuid])
                     if tasks:
-                        i += 1
-                        if i % 30 == 0:
-                            i = 1
-                            await asyncio.sleep(0.3)  # 每次发送30条消息就休眠0.3秒
                         await asyncio.gather(*tasks)
+                    else:
+                        # 让出事件循环
+                        await asyncio.sleep(0)
                 except Exception as e:
                     pass
 
@@ -171,6 +206,8 @@ class Ws:
             else:
                 # 其他条件不管
                 pass
+            # 新连接可能满足发送条件, 唤醒日志发送
+            self.wake_report()
 
             await asyncio.gather(
                 wsmg.listen(uuid, Conn(ws=WsSocket(ws)), self.svc),
@@ -2,11 +2,12 @@ import bdb
 import importlib
 import os
 import sys
-import glob
 import threading
 from collections import defaultdict
 from typing import List, Callable
 
+from astronverse.executor.flow.line_map import load_line_map
+
 
 class CustomBdb(bdb.Bdb):
     def __init__(self, project_dir: str, ext_dir: str, notify: Callable, err_handler: Callable):
@@ -20,7 +21,7 @@ class CustomBdb(bdb.Bdb):
         self.ext_dir = os.path.abspath(ext_dir)
         self.main_file = os.path.join(self.project_dir, "main.py")
 
-        # 多文件行号映射
+        # 多文件行号映射, 按需加载
         self.file_line_maps = {}
         self.file_rev_maps = {}
 
@@ -28,8 +29,9 @@ class CustomBdb(bdb.Bdb):
         self.paused = False
         self.current_frame = None
 
-        # 加载所有文件的映射
-        self._load_all_maps()
+        # 快速模式: 没有断点时不挂调试器, 运行中添加断点再挂上
+        self._run_thread_id = None
+        self._tracing = False
 
         # 同步事件
         self._go_event = threading.Event()
@@ -39,47 +41,43 @@ class CustomBdb(bdb.Bdb):
         # 强制中断标志
         self._force_stop = False
 
-    def _load_all_maps(self):
-        """加载project目录下所有.py文件的.map文件"""
-        py_files = glob.glob(os.path.join(self.project_dir, "*.py"))
-
-        for py_file in py_files:
-            filename = os.path.basename(py_file)
-            map_file = py_file.replace(".py", ".map")
-
-            if not os.path.exists(map_file):
-                continue
-
-            # 加载单个.map文件
-            with open(map_file, encoding="utf-8") as f:
-                content = f.read().strip()
-                if not content:
-                    continue
-
-                line_map = {}
-                for pair in content.split(","):
-                    if ":" in pair:
-                        py_line, flow_line = pair.strip().split(":")
-                        line_map[int(py_line)] = int(flow_line)
-
-                if line_map:
-                    self.file_line_maps[filename] = line_map
-
-                    # 根据行号映射生成反向映射
-                    rev = defaultdict(list)
-                    for py_line, flow_line in line_map.items():
-                        rev[flow_line].append(py_line)
-                    for lst in rev.values():
-                        lst.sort()
-                    self.file_rev_maps[filename] = dict(rev)
+    def _line_map(self, filename: str) -> dict:
+        """获取单个文件的行号映射, 第一次使用时从.map文件加载"""
+        if filename in self.file_line_maps:
+            return self.file_line_maps[filename]
+
+        line_map = {}
+        map_file = os.path.join(self.project_dir, filename.replace(".py", ".map"))
+        if os.path.exists(map_file):
+            with open(map_file, "rb") as f:
+                line_map = load_line_map(f.read())
+        self.file_line_maps[filename] = line_map
+        return line_map
+
+    def _rev_map(self, filename: str) -> dict:
+        """获取单个文件的反向映射(流程行号 -> Python行号列表)"""
+        if filename in self.file_rev_maps:
+            return self.file_rev_maps[filename]
+
+        rev = defaultdict(list)
+        for py_line, flow_line in self._line_map(filename).items():
+            rev[flow_line].append(py_line)
+        for lst in rev.values():
+            lst.sort()
+        self.file_rev_maps[filename] = dict(rev)
+        return self.file_rev_maps[filename]
 
     def _to_flow_line(self, filename: str, py_line: int) -> int:
         """把Python行号转成流程行号"""
-        return self.file_line_maps.get(filename, {}).get(py_line, py_line)
+        return self._line_map(filename).get(py_line, py_line)
 
     def _to_py_lines(self, filename: str, flow_line: int) -> List[int]:
         """把流程行号转成Python行号列表"""
-        return self.file_rev_maps.get(filename, {}).get(flow_line, [flow_line])
+        return self._rev_map(filename).get(flow_line, [flow_line])
+
+    def _is_project_frame(self, frame) -> bool:
+        """是否是生成的工程文件"""
+        return frame.f_code.co_filename.startswith(self.project_dir)
 
     def _to_project_path(self, path):
         """把绝对路径转成 project 相对路径，方便用户输入/显示"""
@@ -101,6 +99,7 @@ class CustomBdb(bdb.Bdb):
         for py_line in py_lines:
             self.set_break(abs_path, py_line, cond=cond)
             break
+        self._attach()
 
     def clear_breakpoint(self, filename: str, flow_line: int):
         """清除断点 - 支持多文件"""
@@ -150,13 +149,75 @@ class CustomBdb(bdb.Bdb):
             )
             code = compile(source, self.main_file, "exec")
 
-            # 运行代码
-            self.err_handler(self.run)(code, g_v_exec, l_v_exec)
+            # 运行代码, 没有断点时直接执行, 不承担逐行跟踪的开销
+            if self.breaks:
+                self.err_handler(self.run)(code, g_v_exec, l_v_exec)
+            else:
+                self.err_handler(self.run_fast)(code, g_v_exec, l_v_exec)
         except Exception as e:
             self._handle_exception(e)
         finally:
             os.chdir(original_cwd)
 
+    def run(self, cmd, globals=None, locals=None):
+        self._run_thread_id = threading.get_ident()
+        self._tracing = True
+        try:
+            super().run(cmd, globals, locals)
+        finally:
+            self._run_thread_id = None
+            self._detach()
+
+    def run_fast(self, cmd, globals=None, locals=None):
+        """不挂调试器直接执行, 运行中添加断点时再通过 _attach 挂上"""
+        self.reset()
+        self.botframe = sys._getframe()
+        self._set_stopinfo(self.botframe, None, -1)
+        self._first_stop = False
+        self._run_thread_id = threading.get_ident()
+        try:
+            exec(cmd, globals, locals)
+        except bdb.BdbQuit:
+            pass
+        finally:
+            self.quitting = True
+            self._run_thread_id = None
+            if self._tracing:
+                self._detach()
+
+    def _attach(self):
+        """执行中从其他线程挂上调试器, 只有 python3.12+ 支持给其他线程设置 trace"""
+        settrace_all_threads = getattr(threading, "settrace_all_threads", None)
+        if self._tracing or self._run_thread_id is None or settrace_all_threads is None:
+            return
+        self._tracing = True
+
+        # 正在执行的工程文件栈帧需要单独设置, 否则要等到下一次函数调用才生效
+        frame = sys._current_frames().get(self._run_thread_id)
+        while frame is not None and frame is not self.botframe:
+            if self._is_project_frame(frame):
+                frame.f_trace = self.trace_dispatch
+            frame = frame.f_back
+        settrace_all_threads(self.trace_dispatch)
+
+    def _detach(self, frame=None):
+        """在执行线程中卸下调试器, 恢复到无跟踪执行, frame 为当前正在跟踪的栈帧"""
+        settrace_all_threads = getattr(threading, "settrace_all_threads", None)
+        if settrace_all_threads is not None:
+            settrace_all_threads(None)
+        else:
+            sys.settrace(None)
+        while frame is not None and frame is not self.botframe:
+            frame.f_trace = None
+            frame = frame.f_back
+        self._tracing = False
+
+    def dispatch_call(self, frame, arg):
+        # 只跟踪生成的工程文件, 原子能力和第三方库的代码不逐行跟踪
+        if self.botframe is not None and not self._is_project_frame(frame):
+            return None
+        return super().dispatch_call(frame, arg)
+
     def cmd_continue(self):
         """继续执行"""
         self.set_continue()
@@ -197,10 +258,9 @@ class CustomBdb(bdb.Bdb):
 
         # 检查是否是可视化文件，但当前行号不在映射表中
         basename = os.path.basename(filename)
-        if basename in self.file_line_maps:
-            line_map = self.file_line_maps[basename]
-            if py_line not in line_map:
-                return
+        line_map = self._line_map(basename)
+        if line_map and py_line not in line_map:
+            return
 
         self.current_frame = frame
         self.paused = True
@@ -229,6 +289,10 @@ class CustomBdb(bdb.Bdb):
         self._go_event.clear()
         self._go_event.wait()
 
+        # 断点已全部清除并继续执行, 卸下调试器
+        if not self.breaks and not self._force_stop and self.stopframe is self.botframe and self.stoplineno == -1:
+            self._detach(frame)
+
     def _handle_exception(self, exc: Exception):
         """处理异常 - 支持多文件"""
         tb = exc.__traceback__
@@ -240,6 +304,8 @@ class CustomBdb(bdb.Bdb):
         py_line = tb.tb_lineno
 
         project_filename = self._to_project_path(filename)
-        flow_line = self._to_flow_line(filename, py_line)
+        flow_line = py_line
+        if filename.startswith(self.project_dir):
+            flow_line = self._to_flow_line(os.path.basename(filename), py_line)
 
         self.notify("exception", file=project_filename, line=flow_line, py_line=py_line, exc=exc)
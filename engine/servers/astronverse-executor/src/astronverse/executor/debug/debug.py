@@ -75,21 +75,27 @@ class Debug:
         """执行代码"""
 
         # 环境准备, 下载依赖环境
+        requirements = []
         if self.svc.ast_globals.project_info.requirement:
             for k, v in self.svc.ast_globals.project_info.requirement.items():
-                self.svc.package.download(
-                    library=v.get("package_name"),
-                    version=v.get("package_version", ""),
-                    mirror=v.get("package_mirror", ""),
+                requirements.append(
+                    {
+                        "library": v.get("package_name"),
+                        "version": v.get("package_version", ""),
+                        "mirror": v.get("package_mirror", ""),
+                    }
                 )
         if self.svc.ast_globals.component_info:
             for c_id, c in self.svc.ast_globals.component_info.items():
                 for k, v in c.requirement.items():
-                    self.svc.package.download(
-                        library=v.get("package_name"),
-                        version=v.get("package_version", ""),
-                        mirror=v.get("package_mirror", ""),
+                    requirements.append(
+                        {
+                            "library": v.get("package_name"),
+                            "version": v.get("package_version", ""),
+                            "mirror": v.get("package_mirror", ""),
+                        }
                     )
+        self.svc.package.ensure(requirements)
 
         # 断点设置
         if self.svc.debug_model:
@@ -4,6 +4,7 @@ import threading
 import time
 from typing import Optional
 from astronverse.actionlib import ReportFlow, ReportType, ReportFlowStatus, ReportTip
+from astronverse.actionlib.atomic import atomicMg
 from astronverse.actionlib.report import report
 from astronverse.executor import ExecuteStatus, AstGlobals
 from astronverse.executor.config import Config
@@ -64,6 +65,24 @@ class DebugSvc:
             return None
         return self.ast_globals.process_info[process_id]
 
+    def write_status(self, status: ExecuteStatus, data=None, reason=""):
+        """把最终执行状态写到日志目录, 调度器在进程退出后直接读取"""
+        if status == ExecuteStatus.SUCCESS:
+            reason = ""
+        elif status == ExecuteStatus.CANCEL:
+            reason = MSG_TASK_USER_CANCELLED
+        try:
+            status_dir = os.path.join(self.conf.log_path, "report", self.conf.project_id)
+            os.makedirs(status_dir, exist_ok=True)
+            status_file = os.path.join(status_dir, "{}.status.json".format(self.conf.exec_id))
+            with open(status_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(
+                    {"result": status.value, "msg_str": reason, "data": data or {}}, f, ensure_ascii=False, default=str
+                )
+            os.replace(status_file + ".tmp", status_file)
+        except Exception as e:
+            logger.exception("write status error: {}".format(e))
+
     def end(self, status: ExecuteStatus, data=None, reason=""):
         logger.info("end: {}.{}.{}".format(status, data, reason))
         with self.sys_exit_lock:
@@ -105,6 +124,12 @@ class DebugSvc:
                 else:
                     raise NotImplementedError()
 
+                # 保存组件未写回的数据(如数据表), 之后进程会被强制结束, atexit 不会执行
+                atomicMg.run_exit_flush()
+
+                # 推送最终状态给调度器
+                self.write_status(status, data, reason)
+
                 # 关闭日志
                 if self.report:
                     self.report.close()
@@ -1,5 +1,10 @@
+import hashlib
+import json
 import os
 import sys
+import sysconfig
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from astronverse.actionlib import ReportTip
 from importlib_metadata import version as check_version
@@ -41,11 +46,152 @@ def find_version(lib, ver, ver_strict) -> bool:
     return False
 
 
+class FileLock:
+    """跨进程文件锁, 同一台机器上的多个执行器共用"""
+
+    def __init__(self, path: str, timeout: float = 600):
+        self.path = path
+        self.timeout = timeout
+        self.fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        start = time.time()
+        while True:
+            try:
+                if sys.platform == "win32":
+                    import msvcrt
+
+                    msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+                else:
+                    import fcntl
+
+                    fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.time() - start > self.timeout:
+                    os.close(self.fd)
+                    self.fd = None
+                    raise TimeoutError("lock timeout: {}".format(self.path)) from None
+                time.sleep(0.1)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+
+def env_fingerprint(requirements: list) -> str:
+    """
+    环境指纹: 解释器 + site-packages目录修改时间 + 依赖列表
+    安装/卸载包都会改变site-packages的修改时间, 指纹随之失效
+    """
+    purelib = sysconfig.get_paths()["purelib"]
+    try:
+        mtime = os.stat(purelib).st_mtime_ns
+    except OSError:
+        mtime = 0
+    reqs = sorted((r.get("library"), r.get("version", ""), r.get("version_strict", False)) for r in requirements)
+    data = json.dumps([sys.executable, purelib, mtime, reqs], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
 class Package:
     def __init__(self, svc):
         self.svc = svc
         self.library_cache = {}
 
+    def __index_path__(self) -> str:
+        return os.path.join(self.svc.conf.package_cache_dir, self.svc.conf.package_index_file)
+
+    def __load_index__(self) -> dict:
+        try:
+            with open(self.__index_path__(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if isinstance(index, dict):
+                index.setdefault("envs", {})
+                index.setdefault("resolved", {})
+                return index
+        except Exception:
+            pass
+        return {"envs": {}, "resolved": {}}
+
+    def __save_index__(self, index: dict):
+        # 只保留最近的指纹, 防止索引无限增长
+        envs = sorted(index["envs"].items(), key=lambda x: x[1], reverse=True)
+        index["envs"] = dict(envs[: self.svc.conf.package_index_max_envs])
+
+        path = self.__index_path__()
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("save package index error: {}".format(e))
+
+    def ensure(self, requirements: list):
+        """
+        批量准备依赖环境
+        1. 环境指纹命中机器级索引, 直接跳过
+        2. 加锁后检查缺失的包, 并发下载, 串行安装(同一个环境并发pip install不安全)
+        3. 更新索引
+        """
+
+        reqs = {}
+        for r in requirements:
+            library = r.get("library")
+            if library and library not in self.library_cache and library not in reqs:
+                reqs[library] = r
+        if not reqs:
+            return
+        reqs = list(reqs.values())
+
+        if env_fingerprint(reqs) in self.__load_index__()["envs"]:
+            for r in reqs:
+                self.library_cache[r.get("library")] = True
+            return
+
+        pip_cache_dir = self.svc.conf.package_cache_dir
+        if not os.path.exists(pip_cache_dir):
+            os.makedirs(pip_cache_dir)
+
+        with FileLock(os.path.join(pip_cache_dir, self.svc.conf.package_lock_file)):
+            # 拿到锁之后再检查一遍, 可能其他执行器已经准备好了
+            index = self.__load_index__()
+            if env_fingerprint(reqs) not in index["envs"]:
+                missing = [
+                    r
+                    for r in reqs
+                    if not find_version(r.get("library"), r.get("version", ""), r.get("version_strict", False))
+                ]
+                if missing:
+                    with ThreadPoolExecutor(max_workers=self.svc.conf.package_download_workers) as pool:
+                        list(pool.map(lambda r: self.__pip_download__(**r), missing))
+                    for r in missing:
+                        self.__pip_install__(**r)
+
+                for r in reqs:
+                    try:
+                        index["resolved"][r.get("library")] = check_version(r.get("library"))
+                    except Exception:
+                        pass
+                index["envs"][env_fingerprint(reqs)] = time.time()
+                self.__save_index__(index)
+
+        for r in reqs:
+            self.library_cache[r.get("library")] = True
+
     def download(self, library: str, version: str, mirror: str = "", version_strict: bool = False, error_try=True):
         # 1. 快速结束
         if not library:
@@ -60,43 +206,66 @@ class Package:
         if find_version(library, version, version_strict):
             return
 
-        # 4. 初始化
-        self.svc.report.info(ReportTip(msg_str=MSG_DOWNLOAD_FORMAT.format(library)))
-
         pip_cache_dir = os.path.join(self.svc.conf.package_cache_dir)
         if not os.path.exists(pip_cache_dir):
             os.makedirs(pip_cache_dir)
 
-        # 6. 下载
+        self.__pip_download__(library, version, mirror, version_strict)
+        self.__pip_install__(library, version, mirror, version_strict, error_try)
 
-        # 6.1 下载的名称
+    @staticmethod
+    def __cmd_name__(library: str, version: str, version_strict: bool) -> str:
         if version:
             if version_strict:
-                cmd_name = "{}=={}".format(library, version)
-            else:
-                v1 = [[int(x) for x in version.split(".")][0]]
-                v2 = [v1[0] + 1]
-                cmd_name = "{}>={},<{}".format(library, ".".join(str(x) for x in v1), ".".join(str(x) for x in v2))
-        else:
-            cmd_name = library
+                return "{}=={}".format(library, version)
+            v1 = [[int(x) for x in version.split(".")][0]]
+            v2 = [v1[0] + 1]
+            return "{}>={},<{}".format(library, ".".join(str(x) for x in v1), ".".join(str(x) for x in v2))
+        return library
 
-        # 6.2 下载的mirror
+    @staticmethod
+    def __mirror__(mirror: str) -> list:
         if mirror:
-            mirror = ["--index-url", mirror, "--trusted-host", urlparse(mirror).hostname]
+            return ["--index-url", mirror, "--trusted-host", urlparse(mirror).hostname]
+        return []
+
+    def __pip_download__(
+        self, library: str, version: str = "", mirror: str = "", version_strict: bool = False, **kwargs
+    ):
+        """下载到本地缓存目录, 可以并发执行"""
+
+        self.svc.report.info(ReportTip(msg_str=MSG_DOWNLOAD_FORMAT.format(library)))
 
-        # 6.3 下载的命令
         pip_download = [
             sys.executable,
             "-m",
             "pip",
             "download",
-            cmd_name,
+            self.__cmd_name__(library, version, version_strict),
             "-d",
-            pip_cache_dir,
-            *mirror,
+            self.svc.conf.package_cache_dir,
+            *self.__mirror__(mirror),
             "--disable-pip-version-check",
             "--no-cache",
         ]
+        try:
+            exec_run(pip_download, False, 600)
+        except Exception as e:
+            logger.warning("pip_download error: {}".format(e))
+
+    def __pip_install__(
+        self,
+        library: str,
+        version: str = "",
+        mirror: str = "",
+        version_strict: bool = False,
+        error_try: bool = True,
+        **kwargs,
+    ):
+        """优先从本地缓存目录安装, 失败再走镜像源"""
+
+        pip_cache_dir = self.svc.conf.package_cache_dir
+        cmd_name = self.__cmd_name__(library, version, version_strict)
         pip_install_1 = [
             sys.executable,
             "-m",
@@ -115,17 +284,11 @@ class Package:
             "install",
             cmd_name,
             "--find-links={}".format(pip_cache_dir),
-            *mirror,
+            *self.__mirror__(mirror),
             "--no-warn-script-location",
             "--disable-pip-version-check",
         ]
 
-        try:
-            exec_run(pip_download, False, 600)
-        except Exception as e:
-            logger.warning("pip_download error: {}".format(e))
-            pass
-
         def __install_pip(cmd):
             try:
                 exec_run(cmd, False, 600)
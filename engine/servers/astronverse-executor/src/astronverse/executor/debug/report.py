@@ -1,9 +1,11 @@
 import json
 import os
+import threading
 import time
-from dataclasses import asdict
+from collections import deque
+from dataclasses import fields
 from enum import Enum
-from queue import Queue
+from queue import Empty, Full, Queue
 
 from astronverse.actionlib import (
     ReportCode,
@@ -15,6 +17,22 @@ from astronverse.actionlib import (
     ReportUser,
 )
 from astronverse.actionlib.report import IReport
+from astronverse.executor.logger import logger
+
+
+# 消息类型 -> 字段名
+_fields_cache = {}
+
+
+class QueuePolicy(Enum):
+    """ws发送队列满时的处理策略"""
+
+    # 阻塞等待(只阻塞后台写线程)
+    BLOCK = "block"
+    # 丢弃最旧的消息
+    DROP_OLDEST = "drop_oldest"
+    # 丢弃最新的消息
+    DROP_NEW = "drop_new"
 
 
 class Report(IReport):
@@ -44,9 +62,53 @@ class Report(IReport):
         self.last_meta = []
         self.last_line = 0
 
+        # 后台批量写: 调用方序列化后入队, 写文件/推送ws在后台线程完成
+        self.queue_policy = QueuePolicy(self.svc.conf.report_queue_policy)
+        self.drop_num = 0
+        # 已经通知前端的丢弃条数
+        self.drop_reported = 0
+        # ws队列有新消息时的通知回调(由ws的事件循环注册)
+        self.queue_notify = None
+        self.pending = deque()
+        self.pending_cond = threading.Condition()
+        self.put_seq = 0
+        self.done_seq = 0
+        self.flush_request = False
+        self.closing = False
+        self.writer = threading.Thread(target=self.__write_loop__, daemon=True)
+        self.writer.start()
+
+    def flush(self, timeout=None):
+        """等待已提交的日志全部写入文件并推送到ws队列"""
+        if threading.current_thread() is self.writer:
+            return
+        with self.pending_cond:
+            target = self.put_seq
+            self.flush_request = True
+            self.pending_cond.notify_all()
+            self.pending_cond.wait_for(lambda: self.done_seq >= target or not self.writer.is_alive(), timeout)
+
     def close(self):
+        with self.pending_cond:
+            self.closing = True
+            self.pending_cond.notify_all()
+        if threading.current_thread() is not self.writer:
+            self.writer.join(timeout=10)
         self.log_local_file.close()
 
+    @staticmethod
+    def __filtered_dict__(message) -> dict:
+        """取出消息字段并去掉None, 嵌套的对象在序列化时由__json__处理"""
+        names = _fields_cache.get(type(message))
+        if names is None:
+            names = _fields_cache[type(message)] = tuple(f.name for f in fields(message))
+        res = {}
+        for name in names:
+            v = getattr(message, name)
+            if v is not None:
+                res[name] = v
+        return res
+
     @staticmethod
     def __json__(obj):
         if isinstance(obj, Enum):
@@ -55,23 +117,122 @@ class Report(IReport):
             return obj.__dict__
 
     def __send__(self, filtered_dict):
-        if self.queue and self.svc.conf.open_log_ws:
+        to_ws = bool(self.queue is not None and self.svc.conf.open_log_ws)
+        # Tip数据不写入到日志里面, tag等于Tag也不写入到日志
+        to_file = filtered_dict["log_type"] != ReportType.Tip and filtered_dict.get("tag", None) != "tip"
+        if not to_ws and not to_file:
+            return
+
+        # 在调用方线程序列化, 原子能力之后修改嵌套对象不会影响已提交的日志
+        try:
             ms = json.dumps(filtered_dict, ensure_ascii=False, default=self.__json__)
-            self.queue.put(ms, block=True, timeout=None)
+        except Exception as e:
+            logger.exception("report dumps error: {}".format(e))
+            return
 
-        if (
-            self.log_local_file
-            and (not self.log_local_file.closed)
-            and filtered_dict["log_type"] != ReportType.Tip
-            and filtered_dict.get("tag", None) != "tip"
-        ):
-            # Tip数据不写入到日志里面, tag等于Tag也不写入到日志
-            message = json.dumps(
-                {"event_time": int(time.time()), "data": filtered_dict}, ensure_ascii=False, default=self.__json__
-            )
-            self.log_local_file.write(f"{message}\n")
+        item = (time.time(), ms, to_ws, to_file)
+        with self.pending_cond:
+            if not self.closing and self.writer.is_alive():
+                # 积压过多时才让调用方等待, 避免内存无限增长
+                self.pending_cond.wait_for(lambda: len(self.pending) < self.svc.conf.report_buffer_size or self.closing)
+                self.pending.append(item)
+                self.put_seq += 1
+                if len(self.pending) >= self.svc.conf.report_flush_size:
+                    self.pending_cond.notify_all()
+                return
+
+        # 后台线程已经结束, 直接写
+        self.__write_batch__([item])
+
+    def __write_loop__(self):
+        interval = self.svc.conf.report_flush_interval
+        flush_size = self.svc.conf.report_flush_size
+        while True:
+            with self.pending_cond:
+                self.pending_cond.wait_for(
+                    lambda: len(self.pending) >= flush_size or self.flush_request or self.closing, interval
+                )
+                batch = list(self.pending)
+                self.pending.clear()
+                self.flush_request = False
+                closing = self.closing
+                target = self.put_seq
+                self.pending_cond.notify_all()
+
+            if batch:
+                try:
+                    self.__write_batch__(batch)
+                except Exception as e:
+                    logger.exception("report write error: {}".format(e))
+
+            with self.pending_cond:
+                self.done_seq = target
+                self.pending_cond.notify_all()
+            if closing:
+                return
+
+    def __write_batch__(self, batch: list):
+        lines = []
+        pushed = False
+        for event_time, ms, to_ws, to_file in batch:
+            # 每条消息只序列化一次, 文件和ws共用
+            if to_ws:
+                # 带上提交时间, 用于统计端到端延迟
+                self.__put__((event_time, ms))
+                pushed = True
+            if to_file:
+                lines.append('{{"event_time": {}, "data": {}}}\n'.format(int(event_time), ms))
+
+        if pushed and self.queue_notify:
+            try:
+                self.queue_notify()
+            except RuntimeError:
+                # ws事件循环已经关闭
+                pass
+
+        if lines and self.log_local_file and not self.log_local_file.closed:
+            self.log_local_file.write("".join(lines))
             self.log_local_file.flush()
 
+    def set_queue_notify(self, notify):
+        """注册ws队列的新消息通知, notify需要线程安全"""
+        self.queue_notify = notify
+        if not self.queue.empty():
+            notify()
+
+    def __put__(self, ms: tuple):
+        if self.queue_policy == QueuePolicy.BLOCK:
+            self.queue.put(ms, block=True, timeout=None)
+            return
+        if self.drop_num > self.drop_reported:
+            # 队列有空位时先告诉前端丢了多少条
+            dropped = self.drop_num - self.drop_reported
+            marker = {
+                "log_type": ReportType.Script.value,
+                "msg_str": "日志过多, 已丢弃{}条".format(dropped),
+                "log_level": "warning",
+            }
+            try:
+                self.queue.put_nowait((ms[0], json.dumps(marker, ensure_ascii=False)))
+                self.drop_reported += dropped
+            except Full:
+                pass
+        try:
+            self.queue.put_nowait(ms)
+            return
+        except Full:
+            pass
+        self.drop_num += 1
+        if self.queue_policy == QueuePolicy.DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                pass
+            try:
+                self.queue.put_nowait(ms)
+            except Full:
+                pass
+
     def __pre__(self, message):
         if (
             isinstance(message, ReportFlow)
@@ -138,7 +299,7 @@ class Report(IReport):
     def info(self, message):
         message = self.__pre__(message)
 
-        filtered_dict = {k: v for k, v in asdict(message).items() if v is not None}
+        filtered_dict = self.__filtered_dict__(message)
 
         if isinstance(message, ReportCode):
             if message.status == ReportCodeStatus.START:
@@ -149,13 +310,13 @@ class Report(IReport):
     def warning(self, message):
         message = self.__pre__(message)
 
-        filtered_dict = {k: v for k, v in asdict(message).items() if v is not None}
+        filtered_dict = self.__filtered_dict__(message)
         filtered_dict["log_level"] = "warning"
         return self.__send__(filtered_dict)
 
     def error(self, message):
         message = self.__pre__(message)
 
-        filtered_dict = {k: v for k, v in asdict(message).items() if v is not None}
+        filtered_dict = self.__filtered_dict__(message)
         filtered_dict["log_level"] = "error"
         return self.__send__(filtered_dict)
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+from astronverse.executor.logger import logger
+
+
+class AtomStore:
+    """
+    本地原子能力定义缓存, 按 原子能力key+版本号 存储预计算好的合并结构
+
+    每个 key@version 单独一个文件, 写入时先写临时文件再替换, 机器上的多个执行器进程可以安全共享
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.memory = {}
+
+    def _file_path(self, key: str, version: str) -> str:
+        name = hashlib.sha1("{}@{}".format(key, version).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "{}.json".format(name))
+
+    def get(self, key: str, version: str) -> Optional[dict]:
+        if not version:
+            return None
+        with self.lock:
+            if (key, version) in self.memory:
+                return self.memory[(key, version)]
+
+        file_path = self._file_path(key, version)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning("atom store read error: {} {}".format(file_path, e))
+            return None
+        if data.get("key") != key or data.get("version") != version:
+            return None
+
+        with self.lock:
+            self.memory[(key, version)] = data.get("schema")
+        return data.get("schema")
+
+    def set(self, key: str, version: str, schema: dict):
+        if not version:
+            return
+        with self.lock:
+            self.memory[(key, version)] = schema
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            file_path = self._file_path(key, version)
+            tmp_path = "{}.{}.{}.tmp".format(file_path, os.getpid(), threading.get_ident())
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "version": version, "schema": schema}, f, ensure_ascii=False)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.warning("atom store write error: {} {}".format(key, e))
@@ -1,11 +1,35 @@
+import hashlib
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from importlib_metadata import PackageNotFoundError, version as package_version
 from astronverse.executor.error import BaseException, SYNTAX_ERROR_FORMAT, PROCESS_ACCESS_ERROR_FORMAT
 from astronverse.executor.flow.syntax.lexer import Lexer
 from astronverse.executor.flow.syntax.parser import Parser
 from astronverse.executor.flow.syntax.ast import CodeLine
+from astronverse.executor.flow.line_map import dump_line_map
 from astronverse.executor.utils.utils import _str_to_list_if_possible
 
+# 增量生成的缓存索引文件名
+GEN_CACHE_FILE = ".gen_cache.json"
+
+
+def _executor_version() -> str:
+    try:
+        return package_version("astronverse-executor")
+    except PackageNotFoundError:
+        return ""
+
+
+def _write_if_changed(file_path: str, content: str):
+    """内容不变时不重写文件, 保留文件mtime以复用.pyc"""
+    if os.path.exists(file_path):
+        with open(file_path, "r", encoding="utf-8") as file:
+            if file.read() == content:
+                return
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(content)
+
 
 class Flow:
     def __init__(self, svc):
@@ -15,6 +39,7 @@ class Flow:
         os.makedirs(path, exist_ok=True)
         component_list = self.svc.storage.component_list(project_id, mode, version)
         if component_list:
+            self._prefetch_components(component_list)
             for c in component_list:
                 component_id = c.get("componentId")
                 component_name = c.get("componentId")
@@ -57,6 +82,11 @@ class Flow:
         process_list = self.svc.storage.process_list(project_id=project_id, mode=mode, version=version)
         if len(process_list) == 0:
             raise BaseException(PROCESS_ACCESS_ERROR_FORMAT, "工程数据异常 {}".format(project_id))
+        self.svc.storage.prefetch(project_id=project_id, mode=mode, version=version, process_list=process_list)
+
+        # 增量生成缓存
+        gen_cache = self._load_gen_cache(path)
+        new_gen_cache = {}
 
         process_index = 1
         module_index = 1
@@ -84,19 +114,24 @@ class Flow:
                     file_name = "process{}.py".format(process_index)
                 process_index += 1
                 if is_main_process:
-                    res, map_res = self._flow_display(
-                        project_id, mode, version, resource_id, name, start_line=line, end_line=end_line
+                    new_gen_cache[file_name] = self._flow_gen(
+                        path,
+                        file_name,
+                        gen_cache.get(file_name),
+                        project_id,
+                        mode,
+                        version,
+                        resource_id,
+                        name,
+                        start_line=line,
+                        end_line=end_line,
                     )
                 else:
-                    res, map_res = self._flow_display(project_id, mode, version, resource_id, name)
+                    new_gen_cache[file_name] = self._flow_gen(
+                        path, file_name, gen_cache.get(file_name), project_id, mode, version, resource_id, name
+                    )
 
                 self.svc.add_process_info(project_id, resource_id, category, name, file_name)
-                with open(os.path.join(path, file_name), "w", encoding="utf-8") as file:
-                    file.write(res)
-                    pass
-                with open(os.path.join(path, file_name.replace(".py", ".map")), "w", encoding="utf-8") as file:
-                    file.write(map_res)
-                    pass
             elif category == "module":
                 file_name = ""
                 if process_id:
@@ -107,12 +142,11 @@ class Flow:
                 if not file_name:
                     file_name = "module{}.py".format(module_index)
                 module_index += 1
-                res = self._module_display(project_id, mode, version, resource_id, name)
+                new_gen_cache[file_name] = self._module_gen(
+                    path, file_name, gen_cache.get(file_name), project_id, mode, version, resource_id, name
+                )
 
                 self.svc.add_process_info(project_id, resource_id, category, name, file_name)
-                with open(os.path.join(path, file_name), "w", encoding="utf-8") as file:
-                    file.write(res)
-                    pass
             else:
                 raise NotImplementedError()
         if not main_process_name:
@@ -128,8 +162,7 @@ class Flow:
             global_code += f"gv[{k!r}] = {v}\n"
         tpl_content = tpl_content.replace("{{GLOBAL}}", global_code)
         package_py_content = tpl_content.replace("{{PACKAGE_PATH}}", repr(os.path.join(path, "package.json")))
-        with open(os.path.join(path, "package.py"), "w", encoding="utf-8") as file:
-            file.write(package_py_content)
+        _write_if_changed(os.path.join(path, "package.py"), package_py_content)
 
         # 4. 生成package.json
         res = json.dumps(
@@ -138,8 +171,7 @@ class Flow:
             ensure_ascii=False,
             indent=4,
         )
-        with open(os.path.join(path, "package.json"), "w", encoding="utf-8") as file:
-            file.write(res)
+        _write_if_changed(os.path.join(path, "package.json"), res)
 
         # 5. 生成__init__.py（使目录成为包，支持相对导入）
         init_py_path = os.path.join(path, "__init__.py")
@@ -147,6 +179,143 @@ class Flow:
             with open(init_py_path, "w", encoding="utf-8") as file:
                 file.write("")
 
+        # 6. 保存增量生成缓存
+        self._save_gen_cache(path, new_gen_cache)
+
+    @staticmethod
+    def _load_gen_cache(path: str) -> dict:
+        cache_path = os.path.join(path, GEN_CACHE_FILE)
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+        except Exception:
+            return {}
+        if not isinstance(cache, dict) or cache.get("executor_version") != _executor_version():
+            return {}
+        return cache.get("files", {})
+
+    @staticmethod
+    def _save_gen_cache(path: str, files: dict):
+        cache = {"executor_version": _executor_version(), "files": files}
+        _write_if_changed(os.path.join(path, GEN_CACHE_FILE), json.dumps(cache, ensure_ascii=False))
+
+    def _content_hash(self, content: dict) -> str:
+        """生成内容相关的hash, 包含影响生成结果的全局配置"""
+        content = {
+            **content,
+            "__debug_mode__": self.svc.conf.debug_mode,
+            "__indentation__": self.svc.conf.indentation,
+        }
+        data = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _flow_gen(
+        self,
+        path: str,
+        file_name: str,
+        cache_entry: dict,
+        project_id: str,
+        mode: str,
+        version: str,
+        process_id: str,
+        process_name: str,
+        start_line=0,
+        end_line=0,
+    ) -> dict:
+        """
+        生成流程文件, 流程json/配置参数/原子能力定义都没有变化时直接复用上次生成的文件
+        """
+
+        py_path = os.path.join(path, file_name)
+        map_path = os.path.join(path, file_name.replace(".py", ".map"))
+
+        flow_list = self._flow_prepare(project_id, mode, version, process_id, start_line, end_line)
+        param_list = self.svc.storage.param_list(
+            project_id=project_id, mode=mode, version=version, process_id=process_id
+        )
+        global_var = self.svc.ast_globals_dict[project_id].project_info.global_var or {}
+        content_hash = self._content_hash(
+            {
+                "process_id": process_id,
+                "process_name": process_name,
+                "flow": flow_list,
+                "param": param_list,
+                "global_var": sorted(global_var.keys()),
+            }
+        )
+
+        if (
+            cache_entry
+            and cache_entry.get("hash") == content_hash
+            and os.path.exists(py_path)
+            and os.path.exists(map_path)
+        ):
+            for atomic_key, params_name in cache_entry.get("atomic_info", {}).items():
+                self.svc.add_atomic_info(project_id, atomic_key, params_name)
+            return cache_entry
+
+        res, map_res = self._flow_render(project_id, mode, version, process_id, process_name, flow_list)
+        with open(py_path, "w", encoding="utf-8") as file:
+            file.write(res)
+        with open(map_path, "wb") as file:
+            file.write(dump_line_map(map_res))
+
+        atomic_info = self.svc.ast_globals_dict[project_id].atomic_info
+        return {
+            "hash": content_hash,
+            "atomic_info": {
+                v.get("key"): atomic_info[v.get("key")].params_name for v in flow_list if v.get("key") in atomic_info
+            },
+        }
+
+    def _module_gen(
+        self,
+        path: str,
+        file_name: str,
+        cache_entry: dict,
+        project_id: str,
+        mode: str,
+        version: str,
+        module_id: str,
+        module_name,
+    ) -> dict:
+        """
+        生成模块文件, 模块代码和配置参数都没有变化时直接复用上次生成的文件
+        """
+
+        py_path = os.path.join(path, file_name)
+        module_code = self.svc.storage.module_detail(
+            project_id=project_id, mode=mode, version=version, module_id=module_id
+        )
+        param_list = self.svc.storage.param_list(
+            project_id=project_id, mode=mode, version=version, process_id=module_id
+        )
+        content_hash = self._content_hash({"module_id": module_id, "code": module_code, "param": param_list})
+        if cache_entry and cache_entry.get("hash") == content_hash and os.path.exists(py_path):
+            return cache_entry
+
+        res = self._module_display(project_id, mode, version, module_id, module_name)
+        with open(py_path, "w", encoding="utf-8") as file:
+            file.write(res)
+        return {"hash": content_hash}
+
+    def _prefetch_components(self, component_list: list):
+        """
+        并发预取所有组件的工程数据
+        """
+
+        def prefetch(component_id, version):
+            process_list = self.svc.storage.process_list(project_id=component_id, mode="", version=version)
+            self.svc.storage.prefetch(project_id=component_id, mode="", version=version, process_list=process_list)
+
+        workers = max(1, min(self.svc.conf.storage_fetch_workers, len(component_list)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(prefetch, c.get("componentId"), c.get("version")) for c in component_list]
+            for future in futures:
+                future.result()
+
     def _requirement_display(self, project_id: str, mode: str, version: str):
         """
         当前包的依赖性
@@ -289,11 +458,11 @@ class Flow:
 
         return new_code
 
-    def _flow_display(
-        self, project_id: str, mode: str, version: str, process_id: str, process_name: str, start_line=0, end_line=0
-    ):
+    def _flow_prepare(
+        self, project_id: str, mode: str, version: str, process_id: str, start_line=0, end_line=0
+    ) -> list:
         """
-        流程生成 主流程 子流程
+        流程生成 主流程 子流程: 获取流程数据, 过滤行号范围并登记断点和流程元数据
         """
 
         # 1. 获取流程数据
@@ -323,7 +492,24 @@ class Flow:
             process_meta.append([line, v.get("id"), v.get("alias", v.get("title", "")), v.get("key")])
             new_flow_list.append(v)
 
+            # 登记引用的元素, 运行时启动阶段批量预加载
+            for i in v.get("inputList", []) + v.get("advanced", []):
+                value = i.get("value")
+                if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+                    if value[0].get("type") == "element":
+                        element_id = value[0].get("data", value[0].get("value"))
+                        if element_id and isinstance(element_id, str):
+                            self.svc.add_element(project_id, element_id)
+
         self.svc.add_process_meta(project_id, process_id, process_meta)
+        return new_flow_list
+
+    def _flow_render(
+        self, project_id: str, mode: str, version: str, process_id: str, process_name: str, new_flow_list: list
+    ):
+        """
+        解析流程数据并生成代码和行号映射
+        """
 
         # 2. 解析
         lexer = Lexer(flow_list=new_flow_list)
@@ -348,5 +534,5 @@ class Flow:
                 indent = str(self.svc.conf.indentation * code_line.tab_num)
                 code_lines.append(indent + code_line.code)
                 if code_line.line > 0:
-                    map_list.append("{}:{}".format(i + 1, code_line.line))
-        return "\n".join(code_lines), ",".join(map_list)
+                    map_list.append((i + 1, code_line.line))
+        return "\n".join(code_lines), map_list
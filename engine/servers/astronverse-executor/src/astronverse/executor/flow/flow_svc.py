@@ -41,6 +41,13 @@ class FlowSvc:
         self.ast_globals_dict[project_id].project_info.gateway_port = gateway_port
         self.ast_globals_dict[project_id].project_info.global_var = global_var
 
+    def add_element(self, project_id: str, element_id: str):
+        if project_id not in self.ast_globals_dict:
+            self.ast_globals_dict[project_id] = AstGlobals()
+        if self.ast_globals_dict[project_id].project_info.elements is None:
+            self.ast_globals_dict[project_id].project_info.elements = set()
+        self.ast_globals_dict[project_id].project_info.elements.add(element_id)
+
     def add_component_info(
         self,
         project_id: str,
@@ -0,0 +1,34 @@
+import sys
+from array import array
+from typing import Dict, List, Tuple
+
+# .map 文件格式: 文件头 + 小端 uint32 数组 [py_line, flow_line, py_line, flow_line, ...]
+LINE_MAP_MAGIC = b"RPAMAP1\n"
+
+
+def dump_line_map(pairs: List[Tuple[int, int]]) -> bytes:
+    """把 (python行号, 流程行号) 列表序列化成二进制"""
+    arr = array("I")
+    for py_line, flow_line in pairs:
+        arr.append(py_line)
+        arr.append(flow_line)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return LINE_MAP_MAGIC + arr.tobytes()
+
+
+def load_line_map(content: bytes) -> Dict[int, int]:
+    """反序列化 .map 文件内容, 兼容旧的 "py_line:flow_line,..." 文本格式"""
+    if content.startswith(LINE_MAP_MAGIC):
+        arr = array("I")
+        arr.frombytes(content[len(LINE_MAP_MAGIC) :])
+        if sys.byteorder == "big":
+            arr.byteswap()
+        return dict(zip(arr[0::2], arr[1::2]))
+
+    line_map = {}
+    for pair in content.decode("utf-8").strip().split(","):
+        if ":" in pair:
+            py_line, flow_line = pair.strip().split(":")
+            line_map[int(py_line)] = int(flow_line)
+    return line_map
@@ -1,4 +1,5 @@
 import json
+import math
 from enum import Enum
 from typing import Any, Dict, List
 from astronverse.executor.flow.syntax import IParam, InputParam, Token, OutputParam
@@ -20,6 +21,16 @@ class ParamType(Enum):
 
 param_type_dict = ParamType.to_dict()
 
+# 高级选项的默认值, 和 atomic_run 中的默认值保持一致, 等于默认值的参数生成代码时省略
+advance_default_dict = {
+    "__delay_before__": 0,
+    "__delay_after__": 0,
+    "__retry_time__": 0,
+    "__retry_interval__": 0,
+    "__res_print__": False,
+    "__skip_err__": "exit",
+}
+
 
 class Param(IParam):
     def __init__(self, svc):
@@ -95,7 +106,44 @@ class Param(IParam):
         if need_eval:
             return "+".join(f"str({p})" for p in pieces), need_eval
         else:
-            return "".join(pieces), need_eval, need_eval
+            return "".join(pieces), need_eval
+
+    @staticmethod
+    def _const_to_literal(types: str, value: Any) -> Any:
+        """
+        数值类型的原子能力常量参数在生成代码时就转换成目标类型, 运行时可以跳过字符串解析
+        只处理能够无歧义转换的值, 其余保持原样交给运行时验证(包括报错)
+        """
+
+        if not isinstance(value, str) or value == "" or value.strip() != value:
+            return value
+        try:
+            if types == "Int":
+                return int(value)
+            elif types == "Float":
+                res = float(value)
+                return res if math.isfinite(res) else value
+        except ValueError:
+            pass
+        return value
+
+    @staticmethod
+    def _is_advance_default(param: InputParam) -> bool:
+        """高级选项是否为默认值"""
+
+        if param.key not in advance_default_dict or param.need_eval or param.special:
+            return False
+        default = advance_default_dict[param.key]
+        if isinstance(default, bool):
+            if isinstance(param.value, str):
+                return param.value.lower() in ["", "false", "none", "undefined"]
+            return not param.value
+        elif isinstance(default, str):
+            return param.value == default
+        try:
+            return float(param.value) == default
+        except (ValueError, TypeError):
+            return False
 
     def parse_param(self, i: dict, token=None) -> InputParam:
         name = i.get("name", i.get("key"))
@@ -129,23 +177,6 @@ class Param(IParam):
         params_name = {}
         input_list = token.value.get("inputList", [])
         for i in input_list:
-            # 优化: 过滤高级选项中的默认值，减少参数传递[可以剔除这段优化代码]
-            if (
-                i.get("key")
-                in [
-                    "__delay_before__",
-                    "__delay_after__",
-                    "__retry_time__",
-                    "__retry_interval__",
-                ]
-                and i.get("value") == [{"type": "other", "value": 0}]
-                or i.get("key") == "__res_print__"
-                and i.get("value") is False
-                or i.get("key") == "__skip_err__"
-                and i.get("value") == "exit"
-            ):
-                continue
-
             # 1. 显隐关系
             if not i.get("show", True):
                 continue
@@ -153,15 +184,23 @@ class Param(IParam):
             if not i.get("key").startswith("__"):
                 params_name[i.get("name", i.get("key"))] = i.get("title", "")
 
-            # 2. 解析
-            res[i.get("name", i.get("key"))] = self.parse_param(i, token=token)
+            # 2. 解析, 原子能力的常量参数按声明的类型生成字面量
+            param = self.parse_param(i, token=token)
+            if not param.need_eval and not param.special:
+                param.value = self._const_to_literal(i.get("types"), param.value)
+
+            # 3. 过滤高级选项中的默认值，减少参数传递
+            if self._is_advance_default(param):
+                continue
+            res[i.get("name", i.get("key"))] = param
 
         # 高级选项
         info = [
             token.value.get("__line__", 0),
             token.value.get("__process_id__", ""),
         ]
-        res["info"] = InputParam(key="__info__", value=info, need_eval=True)
+        # 使用元组, 生成代码中是编译期常量, 不用每次调用都构建列表
+        res["info"] = InputParam(key="__info__", value=tuple(info), need_eval=True)
         project_id = self.svc.ast_curr_info.get("__project_id__")
         self.svc.add_atomic_info(project_id, token.value.get("key"), params_name)
         return res
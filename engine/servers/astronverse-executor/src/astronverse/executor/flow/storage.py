@@ -1,10 +1,14 @@
 import base64
 import json
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from json import JSONDecodeError
 from typing import Any, Optional
 import requests
+from requests.adapters import HTTPAdapter
 from astronverse.executor.error import *
+from astronverse.executor.flow.atom_store import AtomStore
 from astronverse.executor.logger import logger
 
 common_advanced = [
@@ -47,31 +51,37 @@ common_advanced = [
 ]
 
 
-def merge_dicts(flow, full_flow):
+def merge_schema(full_flow: dict) -> dict:
+    """
+    预计算原子能力定义中需要合并到流程节点上的字段, 合并时只需要按key查字典
+    """
+
     keep_level_1 = ["title", "src"]
     keep_level_2 = ["inputList", "outputList"]
     keep_level_3 = ["types", "title", "name", "need_parse", "show"]
 
+    schema = {"__self__": {k: full_flow[k] for k in keep_level_1 if k in full_flow}}
+    for v in keep_level_2:
+        schema[v] = {}
+        for v2 in full_flow.get(v, []):
+            schema[v][v2.get("key", "")] = {k: v2[k] for k in keep_level_3 if k in v2}
+    return schema
+
+
+def merge_dicts(flow, schema):
     flow["inputList"] = flow.get("inputList", []) + flow.get("advanced", []) + flow.get("exception", [])
     flow["advanced"] = flow["exception"] = []
     del flow["advanced"]
     del flow["exception"]
 
-    def merge_obj(keep_list: list, c1: dict, c2: dict):
-        for k in keep_list:
-            if k in c2:
-                c1[k] = c2[k]
-
-    merge_obj(keep_level_1, flow, full_flow)
+    flow.update(schema["__self__"])
 
-    for v in keep_level_2:
+    for v in ["inputList", "outputList"]:
         if v in flow:
-            full_flow_dict = {}
-            for v2 in full_flow.get(v, []):
-                full_flow_dict[v2.get("key", "")] = v2
+            schema_dict = schema.get(v, {})
             for v3 in flow.get(v):
-                if v3.get("key", "") and v3.get("key") in full_flow_dict:
-                    merge_obj(keep_level_3, v3, full_flow_dict[v3.get("key")])
+                if v3.get("key", "") and v3.get("key") in schema_dict:
+                    v3.update(schema_dict[v3.get("key")])
     return flow
 
 
@@ -111,22 +121,43 @@ class IStorage(ABC):
         """获取工程的用户pip依赖详情"""
         pass
 
+    @abstractmethod
+    def prefetch(self, project_id: str, mode: str, version: str, process_list: list):
+        """预取工程的流程数据"""
+        pass
+
 
 class HttpStorage(IStorage):
     def __init__(self, svc):
         self.svc = svc
         self.gateway_port = self.svc.conf.gateway_port
 
+        # 共享的长连接会话
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.svc.conf.storage_fetch_workers))
+
+        # 预取缓存 key: (project_id, mode, version[, process_id])
+        self.cache_lock = threading.Lock()
+        self.process_list_cache = {}
+        self.process_json_cache = {}
+        self.param_cache = {}
+        self.module_cache = {}
+        # 原子能力定义缓存 key: (atom_key, atom_version), 有版本号的会落盘给本机所有执行器共享
+        self.atom_full_cache = {}
+        # 本次从服务端获取的各key定义, 只在内存中使用, 不按节点引用的版本缓存
+        self.atom_latest_cache = {}
+        self.atom_store = AtomStore(self.svc.conf.atom_cache_dir)
+
     def __http__(self, shot_url: str, params: Optional[dict], data: Optional[dict], meta: str = "post") -> Any:
         """post 请求"""
         logger.debug("请求开始 {}:{}:{}".format(shot_url, params, data))
 
         if meta == "post":
-            response = requests.post(
+            response = self.session.post(
                 "http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), json=data, params=params
             )
         else:
-            response = requests.get("http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), params=params)
+            response = self.session.get("http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), params=params)
         if response.status_code != 200:
             raise BaseException(
                 SERVER_ERROR_FORMAT.format(response.status_code), "服务器错误{}".format(response.status_code)
@@ -157,71 +188,183 @@ class HttpStorage(IStorage):
         )
         return res
 
-    def process_list(self, project_id: str, mode: str, version: str) -> list:
-        """获取工程的流程列表"""
+    def __atom_full_dict__(self, atom_list: list) -> dict:
+        """
+        获取原子能力合并结构, atom_list为(key, version)列表
+
+        优先读取内存和本地缓存, 只有缓存里没有对应版本的key才请求服务端
+        """
+
+        missing = {}
+        for atom in dict.fromkeys(atom_list):
+            with self.cache_lock:
+                if atom in self.atom_full_cache or atom[0] in self.atom_latest_cache:
+                    continue
+            schema = self.atom_store.get(*atom)
+            if schema is not None:
+                with self.cache_lock:
+                    self.atom_full_cache[atom] = schema
+                continue
+            missing.setdefault(atom[0], []).append(atom[1])
+
+        if missing:
+            full = self.__process_json_full__(list(missing.keys()))
+            returned = set()
+            for f in full:
+                if f:
+                    f = json.loads(f.get("atomContent"))
+                f["inputList"] = f.get("inputList", []) + common_advanced
+                key = f.get("key")
+                schema = merge_schema(f)
+                returned.add(key)
+                # 只按服务端返回的实际版本缓存
+                version = str(f.get("version", ""))
+                self.atom_store.set(key, version, schema)
+                with self.cache_lock:
+                    self.atom_full_cache[(key, version)] = schema
+                    self.atom_latest_cache[key] = schema
+            with self.cache_lock:
+                # 服务端没有返回的key也记录下来, 避免重复请求
+                for key, versions in missing.items():
+                    if key in returned:
+                        continue
+                    for version in versions:
+                        self.atom_full_cache.setdefault((key, version), None)
+
+        with self.cache_lock:
+            # 缓存里没有节点引用的版本时, 沿用本次服务端返回的定义
+            full_dict = {
+                atom: self.atom_full_cache.get(atom) or self.atom_latest_cache.get(atom[0]) for atom in atom_list
+            }
+        return {atom: schema for atom, schema in full_dict.items() if schema}
+
+    @staticmethod
+    def __atom_version__(flow: dict) -> tuple:
+        version = flow.get("version")
+        return flow.get("key"), "" if version is None else str(version)
+
+    @staticmethod
+    def __process_json_loads__(res: str, process_id: str) -> list:
+        try:
+            flow_list = json.loads(res)
+        except Exception as e:
+            raise BaseException(PROCESS_ACCESS_ERROR_FORMAT.format(process_id), "工程数据异常 {}".format(e))
+
+        for flow in flow_list:
+            # 兼容代码
+            if flow.get("key") == "Code.Process":
+                flow.update({"key": "Script.process"})
+            if flow.get("key").startswith("Code.Component.") or flow.get("key").startswith("Script.component."):
+                code_id = flow.get("key").split(".")[-1]
+                flow.update(
+                    {
+                        "inputList": [{"key": "component", "value": code_id}] + flow.get("inputList", []),
+                        "key": "Script.component",
+                    }
+                )
+            # 兼容结束
+        return flow_list
+
+    def __process_json__(self, project_id: str, mode: str, version: str, process_id: str) -> str:
+        """获取流程原始json字符串"""
+
+        cache_key = (project_id, mode, version, process_id)
+        with self.cache_lock:
+            if cache_key in self.process_json_cache:
+                return self.process_json_cache[cache_key]
 
         data = {
             "robotId": project_id,
+            "processId": process_id,
         }
         if mode:
             data["mode"] = mode
         if version:
             data["robotVersion"] = int(version)
 
-        return self.__http__("/api/robot/module/processModuleList", None, data)
+        res = self.__http__("/api/robot/process/process-json", None, data)
+        with self.cache_lock:
+            self.process_json_cache[cache_key] = res
+        return res
+
+    def prefetch(self, project_id: str, mode: str, version: str, process_list: list):
+        """
+        并发预取工程的流程/参数/模块数据, 原子能力key在整个工程内去重后一次获取
+        """
+
+        tasks = []
+        for process in process_list:
+            category = process.get("resourceCategory")
+            resource_id = str(process.get("resourceId", ""))
+            if category == "process":
+                tasks.append((self.__process_json__, resource_id))
+            elif category == "module":
+                tasks.append((self.module_detail, resource_id))
+            else:
+                continue
+            tasks.append((self.param_list, resource_id))
+        if not tasks:
+            return
+
+        workers = max(1, min(self.svc.conf.storage_fetch_workers, len(tasks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(func, project_id, mode, version, resource_id) for func, resource_id in tasks]
+            for future in futures:
+                future.result()
+
+        atom_list = []
+        for process in process_list:
+            if process.get("resourceCategory") != "process":
+                continue
+            resource_id = str(process.get("resourceId", ""))
+            res = self.__process_json__(project_id, mode, version, resource_id)
+            atom_list.extend(self.__atom_version__(flow) for flow in self.__process_json_loads__(res, resource_id))
+        self.__atom_full_dict__(atom_list)
 
-    def process_detail(self, project_id: str, mode: str, version: str, process_id: str) -> list:
-        """获取流程json"""
+    def process_list(self, project_id: str, mode: str, version: str) -> list:
+        """获取工程的流程列表"""
+
+        cache_key = (project_id, mode, version)
+        with self.cache_lock:
+            if cache_key in self.process_list_cache:
+                return self.process_list_cache[cache_key]
 
-        # 基础数据
         data = {
             "robotId": project_id,
-            "processId": process_id,
         }
         if mode:
             data["mode"] = mode
         if version:
             data["robotVersion"] = int(version)
 
-        res = self.__http__("/api/robot/process/process-json", None, data)
-        try:
-            flow_list = json.loads(res)
-        except Exception as e:
-            raise BaseException(PROCESS_ACCESS_ERROR_FORMAT.format(process_id), "工程数据异常 {}".format(e))
+        res = self.__http__("/api/robot/module/processModuleList", None, data)
+        with self.cache_lock:
+            self.process_list_cache[cache_key] = res
+        return res
 
-        # 附加数据
-        atom_key_list = []
-        for flow in flow_list:
-            # 兼容代码
-            if flow.get("key") == "Code.Process":
-                flow.update({"key": "Script.process"})
-            if flow.get("key").startswith("Code.Component.") or flow.get("key").startswith("Script.component."):
-                code_id = flow.get("key").split(".")[-1]
-                flow.update(
-                    {
-                        "inputList": [{"key": "component", "value": code_id}] + flow.get("inputList", []),
-                        "key": "Script.component",
-                    }
-                )
-            # 兼容结束
-            atom_key_list.append(flow.get("key"))
+    def process_detail(self, project_id: str, mode: str, version: str, process_id: str) -> list:
+        """获取流程json"""
 
-        full = self.__process_json_full__(atom_key_list)
-        full_dict = {}
-        for f in full:
-            if f:
-                f = json.loads(f.get("atomContent"))
-            f["inputList"] = f.get("inputList", []) + common_advanced
-            full_dict[f.get("key")] = f
+        # 基础数据
+        res = self.__process_json__(project_id, mode, version, process_id)
+        flow_list = self.__process_json_loads__(res, process_id)
+
+        # 附加数据
+        full_dict = self.__atom_full_dict__([self.__atom_version__(flow) for flow in flow_list])
 
         # 合并
         for k, flow in enumerate(flow_list):
-            if flow.get("key") in full_dict:
-                full_item = full_dict[flow.get("key")]
-                flow_list[k] = merge_dicts(flow, full_item)
+            atom = self.__atom_version__(flow)
+            if atom in full_dict:
+                flow_list[k] = merge_dicts(flow, full_dict[atom])
         return flow_list
 
     def module_detail(self, project_id: str, mode: str, version: str, module_id: str) -> str:
+        cache_key = (project_id, mode, version, module_id)
+        with self.cache_lock:
+            if cache_key in self.module_cache:
+                return self.module_cache[cache_key]
+
         data = {
             "robotId": project_id,
             "moduleId": module_id,
@@ -232,14 +375,19 @@ class HttpStorage(IStorage):
             data["robotVersion"] = int(version)
 
         res = self.__http__("/api/robot/module/open", None, data)
-        if res:
-            return res.get("moduleContent", "")
-        else:
-            return ""
+        module_code = res.get("moduleContent", "") if res else ""
+        with self.cache_lock:
+            self.module_cache[cache_key] = module_code
+        return module_code
 
     def param_list(self, project_id: str, mode: str, version: str, process_id: str) -> list:
         """运行参数列表"""
 
+        cache_key = (project_id, mode, version, process_id)
+        with self.cache_lock:
+            if cache_key in self.param_cache:
+                return self.param_cache[cache_key]
+
         data = {
             "robotId": project_id,
             "processId": process_id,
@@ -252,6 +400,8 @@ class HttpStorage(IStorage):
         res = self.__http__("/api/robot/param/all", None, data)
         if res and isinstance(res, str):
             res = json.loads(res)
+        with self.cache_lock:
+            self.param_cache[cache_key] = res
         return res
 
     def global_list(self, project_id: str, mode: str, version: str = "") -> list:
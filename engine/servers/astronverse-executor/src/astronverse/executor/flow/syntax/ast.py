@@ -5,6 +5,19 @@ from astronverse.executor.flow.syntax.token import TokenType
 from astronverse.executor.utils.utils import _str_to_list_if_possible
 
 
+def atomic_arguments(arguments: Dict[str, InputParam], exit_on_err: bool = False) -> list:
+    """
+    生成原子能力调用参数
+    exit_on_err: 异常处理固定为 "exit" (debug模式或外层重试包装), 此时省略 __skip_err__ 和 retry 相关参数
+    """
+    res = []
+    for k, param in arguments.items():
+        if exit_on_err and k in ("__skip_err__", "__retry_time__", "__retry_interval__"):
+            continue
+        res.append(param.show())
+    return res
+
+
 @dataclass
 class CodeLine:
     """表示一行代码的数据结构"""
@@ -153,18 +166,8 @@ class Atomic(Node):
 
     def _display_normal(self, svc, tab_num) -> list:
         """原有的单行代码生成逻辑"""
-        # debug 模式下禁用重试，将 __skip_err__ 改为 "exit"
-        if svc.conf.debug_mode:
-            arguments = []
-            for k, param in self.__arguments__.items():
-                if k == "__skip_err__":
-                    arguments.append('__skip_err__="exit"')
-                elif k in ("__retry_time__", "__retry_interval__"):
-                    continue  # debug 模式下不传递重试相关参数
-                else:
-                    arguments.append(param.show())
-        else:
-            arguments = [i.show() for i in self.__arguments__.values()]
+        # debug 模式下禁用重试，__skip_err__ 使用默认的 "exit"
+        arguments = atomic_arguments(self.__arguments__, svc.conf.debug_mode)
 
         if len(self.__returned__) > 0:
             code = ",".join([r.show() for r in self.__returned__]) + " = {}({})".format(
@@ -183,15 +186,8 @@ class Atomic(Node):
         process_id = svc.ast_curr_info.get("__process_id__")
         uid = f"_{line}__"
 
-        # 构建函数调用参数：修改 __skip_err__ 为 "exit"，移除 retry 相关参数，添加标记
-        modified_arguments = []
-        for k, param in self.__arguments__.items():
-            if k == "__skip_err__":
-                modified_arguments.append('__skip_err__="exit"')
-            elif k in ("__retry_time__", "__retry_interval__"):
-                continue  # 这些由外层处理，不传给 atomic_run
-            else:
-                modified_arguments.append(param.show())
+        # 构建函数调用参数：__skip_err__ 使用默认的 "exit"，retry 相关参数由外层处理
+        modified_arguments = atomic_arguments(self.__arguments__, True)
         # 添加标记，告诉 atomic_run 跳过 START 上报
         modified_arguments.append("__in_external_retry__=True")
 
@@ -330,18 +326,8 @@ class AtomicExist(Node):
         """原有的代码生成逻辑"""
         code_lines = []
 
-        # debug 模式下禁用重试，将 __skip_err__ 改为 "exit"
-        if svc.conf.debug_mode:
-            arguments = []
-            for k, param in self.__arguments__.items():
-                if k == "__skip_err__":
-                    arguments.append('__skip_err__="exit"')
-                elif k in ("__retry_time__", "__retry_interval__"):
-                    continue
-                else:
-                    arguments.append(param.show())
-        else:
-            arguments = [i.show() for i in self.__arguments__.values()]
+        # debug 模式下禁用重试，__skip_err__ 使用默认的 "exit"
+        arguments = atomic_arguments(self.__arguments__, svc.conf.debug_mode)
 
         # if 原子能力块
         atomic_code = "if {}({}):".format(self.token.value.get("src"), ", ".join(arguments))
@@ -379,15 +365,8 @@ class AtomicExist(Node):
         process_id = svc.ast_curr_info.get("__process_id__")
         uid = f"_{line}__"
 
-        # 构建函数调用参数
-        modified_arguments = []
-        for k, param in self.__arguments__.items():
-            if k == "__skip_err__":
-                modified_arguments.append('__skip_err__="exit"')
-            elif k in ("__retry_time__", "__retry_interval__"):
-                continue
-            else:
-                modified_arguments.append(param.show())
+        # 构建函数调用参数：__skip_err__ 使用默认的 "exit"，retry 相关参数由外层处理
+        modified_arguments = atomic_arguments(self.__arguments__, True)
         modified_arguments.append("__in_external_retry__=True")
 
         # 生成函数调用代码
@@ -543,18 +522,8 @@ class AtomicFor(Node):
         """原有的代码生成逻辑"""
         code_lines = []
 
-        # debug 模式下禁用重试，将 __skip_err__ 改为 "exit"
-        if svc.conf.debug_mode:
-            arguments = []
-            for k, param in self.__arguments__.items():
-                if k == "__skip_err__":
-                    arguments.append('__skip_err__="exit"')
-                elif k in ("__retry_time__", "__retry_interval__"):
-                    continue
-                else:
-                    arguments.append(param.show())
-        else:
-            arguments = [i.show() for i in self.__arguments__.values()]
+        # debug 模式下禁用重试，__skip_err__ 使用默认的 "exit"
+        arguments = atomic_arguments(self.__arguments__, svc.conf.debug_mode)
 
         # for 原子能力块
         atomic_code = "for {} in {}({}):".format(
@@ -582,15 +551,8 @@ class AtomicFor(Node):
         process_id = svc.ast_curr_info.get("__process_id__")
         uid = f"_{line}__"
 
-        # 构建函数调用参数
-        modified_arguments = []
-        for k, param in self.__arguments__.items():
-            if k == "__skip_err__":
-                modified_arguments.append('__skip_err__="exit"')
-            elif k in ("__retry_time__", "__retry_interval__"):
-                continue
-            else:
-                modified_arguments.append(param.show())
+        # 构建函数调用参数：__skip_err__ 使用默认的 "exit"，retry 相关参数由外层处理
+        modified_arguments = atomic_arguments(self.__arguments__, True)
         modified_arguments.append("__in_external_retry__=True")
 
         # 生成函数调用代码
@@ -12,6 +12,12 @@ process_info = conf.get("process_info", {})
 component_info = conf.get("component_info", {})
 
 storage = HttpStorage(project_info.get("gateway_port"), project_info.get("mode"))
+storage.element_prefetch(
+    project_info.get("project_id"),
+    project_info.get("elements", []),
+    project_info.get("mode"),
+    project_info.get("version")
+)
 
 os.environ.setdefault("GATEWAY_PORT", project_info.get("gateway_port"))
 
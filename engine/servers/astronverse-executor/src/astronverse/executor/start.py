@@ -1,6 +1,7 @@
 import argparse
 import json
 import os
+import sys
 import threading
 import time
 from astronverse.actionlib import ReportFlow, ReportType, ReportFlowStatus
@@ -92,6 +93,7 @@ def debug_start(args, conf):
     data = debug.start(params=args.run_param)
 
     # 执行后验证
+    svc.report.flush()
     if Config.open_log_ws and Config.wait_web_ws:
         wait_time = 0
         size = svc.report.queue.qsize()
@@ -132,7 +134,16 @@ def start():
 
     parser.add_argument("--resource_dir", default="", help="资源目录", required=False)
     parser.add_argument("--recording_config", default="", help="录屏", required=False)
-    args = parser.parse_args()
+
+    argv = None
+    if "--warm=y" in sys.argv[1:]:
+        # 预热模式: 重量级模块已经在导入时加载完成, 等待调度器通过stdin下发本次运行的参数
+        line = sys.stdin.readline()
+        if not line.strip():
+            # 调度器关闭了管道, 直接退出
+            return
+        argv = ["--{}={}".format(k, v) for k, v in json.loads(line).items()]
+    args = parser.parse_args(argv)
 
     logger.debug("start {}".format(args))
 
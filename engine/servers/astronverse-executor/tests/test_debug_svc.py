@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import openpyxl
+
+# 子进程中运行: 用数据表原子写入后按执行器的方式结束流程(DebugSvc.end, 最后强制结束进程)
+FLOW_SCRIPT = textwrap.dedent(
+    """
+    import os
+    import sys
+    import threading
+    from types import SimpleNamespace
+
+    import psutil
+
+    from astronverse.datatable import datatable
+    from astronverse.datatable.datatable import DataTable
+    from astronverse.datatable.openpyxl import OpenpyxlWrapper
+    from astronverse.executor import ExecuteStatus
+    from astronverse.executor.debug.debug_svc import DebugSvc
+
+    xlsx_path, log_path = sys.argv[1], sys.argv[2]
+    datatable._xlsx_file_path = xlsx_path
+    datatable.PyxlWrapper = OpenpyxlWrapper(file_path=xlsx_path, sheet_name=None)
+
+
+    class FakeReport:
+        def info(self, msg):
+            pass
+
+        def close(self):
+            pass
+
+
+    svc = DebugSvc.__new__(DebugSvc)
+    svc.conf = SimpleNamespace(log_path=log_path, project_id="p1", exec_id="e1")
+    svc.report = FakeReport()
+    svc.recording_tool = SimpleNamespace(config={})
+    svc.sys_exit_lock = threading.Lock()
+    svc.sys_exit_lock_end = False
+
+    # 写入间隔内结束, 修改还在内存中
+    DataTable.write_data(row=1, col="A", data="first")
+    DataTable.write_data(row=2, col="B", data="last")
+    # kill_proc_tree 只结束运行目录下的 python, 和执行器一样切换到 python 所在目录
+    os.chdir(os.path.dirname(psutil.Process().exe()))
+    svc.end(ExecuteStatus.SUCCESS)
+    """
+)
+
+
+def test_end_flushes_data_table(tmp_path):
+    """流程结束时进程被强制结束, 数据表中最后的修改仍然写回文件"""
+    xlsx_path = str(tmp_path / "data_table.xlsx")
+    log_path = str(tmp_path / "logs")
+    proc = subprocess.run(
+        [sys.executable, "-c", FLOW_SCRIPT, xlsx_path, log_path],
+        capture_output=True,
+        text=True,
+        timeout=60,
+        cwd=str(tmp_path),
+    )
+    if os.name != "nt":
+        assert proc.returncode == -signal.SIGKILL, proc.stderr
+
+    sheet = openpyxl.load_workbook(xlsx_path).active
+    assert sheet["A1"].value == "first"
+    assert sheet["B2"].value == "last"
+
+    with open(os.path.join(log_path, "report", "p1", "e1.status.json"), encoding="utf-8") as f:
+        assert json.load(f)["result"] == "robotSuccess"
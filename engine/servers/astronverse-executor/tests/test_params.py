@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from astronverse.executor.flow.params import Param
+from astronverse.executor.flow.syntax import Token
+
+
+class FakeSvc:
+    """只提供 parse_input 用到的属性"""
+
+    def __init__(self):
+        self.ast_curr_info = {"__project_id__": "p1"}
+        self.atomic_info = {}
+
+    def add_atomic_info(self, project_id, key, params_name):
+        self.atomic_info[(project_id, key)] = params_name
+
+
+def test_global_str_keep_leading_zero():
+    """字符串类型的全局变量保持用户输入的原样"""
+    param = Param(FakeSvc()).parse_param({"value": "007", "types": "Str", "name": "code"})
+    assert param.value == "007"
+    assert param.show_value() == "'007'"
+
+
+def test_global_int_not_folded():
+    """全局变量和子模块参数不做常量折叠, 交给运行时按类型转换"""
+    param = Param(FakeSvc()).parse_param({"value": "007", "types": "Int", "name": "code"})
+    assert param.value == "007"
+
+
+def test_atom_input_fold_numeric_only():
+    """原子能力参数只有数值类型的常量生成字面量"""
+    token = Token(
+        type="Atomic",
+        value={
+            "key": "Test.atom",
+            "__line__": 1,
+            "inputList": [
+                {"key": "count", "types": "Int", "value": [{"type": "other", "value": "5"}]},
+                {"key": "ratio", "types": "Float", "value": "0.5"},
+                {"key": "code", "types": "Str", "value": "007"},
+                {"key": "flag", "types": "Bool", "value": "true"},
+                {"key": "bad", "types": "Int", "value": "abc"},
+                {"key": "__res_print__", "types": "Bool", "value": "false"},
+            ],
+        },
+    )
+    res = Param(FakeSvc()).parse_input(token)
+    assert res["count"].value == 5
+    assert res["ratio"].value == 0.5
+    assert res["code"].value == "007"
+    assert res["flag"].value == "true"
+    assert res["bad"].value == "abc"
+    # 等于默认值的高级选项仍然省略
+    assert "__res_print__" not in res
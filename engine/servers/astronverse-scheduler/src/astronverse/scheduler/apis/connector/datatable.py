@@ -112,30 +112,36 @@ def remove_active_watcher(file_path: str):
         del _active_watchers[normalized_path]
 
 
+@router.on_event("shutdown")
+def datatable_shutdown():
+    """调度器退出前写回所有未保存的编辑"""
+    ExcelService.flush_all()
+
+
 # ==================== SSE 接口 ====================
 
 
 @router.get("/stream")
-async def datatable_stream(project_id: str, filename: str, svc: Svc = Depends(get_svc)):
+async def datatable_stream(project_id: str, filename: str, chunk_size: int = 500, svc: Svc = Depends(get_svc)):
     """
-    SSE 流式接口：打开/创建 Excel 文件，流式返回数据，并持续监听文件变更
+    SSE 流式接口：打开 Excel 文件，分块流式返回数据，并持续推送文件变更
 
-    - 如果工程目录不存在，会自动创建
-    - 如果文件不存在，会自动创建空白 Excel 文件
-    - 首先流式返回 Excel 数据（逐行发送）
-    - 然后持续监听文件变更，有变更时推送通知
+    - 首先按块流式返回 Excel 数据（每个 rows 事件最多 chunk_size 行，行数据去掉末尾空单元格）
+    - 然后持续监听文件变更，有变更时和上次发送的行哈希对比，只推送变化的行区间
 
     Query Args:
         project_id: 工程ID
         filename: Excel 文件名（不含扩展名）
+        chunk_size: 每个 rows 事件包含的行数
 
     SSE Events:
-        - created: 文件被创建（之前不存在）
         - sheet_start: 工作表开始，包含 sheet 名称和行列数
-        - row: 行数据
+        - rows: 行数据块，包含起始行号 row 和行数组 data
         - sheet_end: 工作表结束
-        - complete: 数据加载完成
-        - file_changed: 文件被外部修改
+        - sheet_size: 工作表行列数变化
+        - sheet_removed: 工作表被删除
+        - complete: 数据加载完成（diff 为 True 表示一次增量推送结束）
+        - file_changed: 文件被外部修改，随后推送增量
         - file_deleted: 文件被删除
         - heartbeat: 心跳保持连接
         - error: 错误信息
@@ -143,6 +149,8 @@ async def datatable_stream(project_id: str, filename: str, svc: Svc = Depends(ge
 
     async def event_generator():
         watcher = None
+        # 已发送给客户端的 {sheet: (行哈希列表, 最大列数)}
+        served = {}
 
         try:
             # 1. 确保工程目录存在
@@ -155,18 +163,20 @@ async def datatable_stream(project_id: str, filename: str, svc: Svc = Depends(ge
             if not excel_service.file_exists(filename):
                 raise FileNotFoundError(f"File not found: {filename}")
 
-            # # 3. 流式读取 Excel 数据
-            # for row_data in excel_service.read_file_stream(filename):
-            #     event_type = row_data.get("type", "data")
-            #     yield format_sse_event(event_type, row_data)
+            # 3. 分块流式读取 Excel 数据
+            for event in excel_service.read_file_stream(filename, chunk_size=chunk_size, served=served):
+                yield format_sse_event(event["type"], event)
 
             # 4. 启动文件监听
             watcher = AsyncFileWatcher(file_path)
             set_active_watcher(file_path, watcher)
 
-            # 5. 持续监听文件变更
+            # 5. 持续监听文件变更, 只推送变化的部分
             async for event in watcher.start():
                 yield format_sse_event(event["type"], event)
+                if event["type"] == "file_changed" and excel_service.file_exists(filename):
+                    for diff in excel_service.read_file_diff(filename, served, chunk_size=chunk_size):
+                        yield format_sse_event(diff["type"], diff)
 
         except FileNotFoundError as e:
             logger.error(f"File not found: {e}")
@@ -202,7 +212,7 @@ def format_sse_event(event_type: str, data: dict) -> str:
     Returns:
         SSE 格式的字符串
     """
-    json_data = json.dumps(data, ensure_ascii=False)
+    json_data = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
     return f"event: {event_type}\ndata: {json_data}\n\n"
 
 
@@ -272,14 +282,7 @@ def datatable_update_cells(req: UpdateCellsRequest, svc: Svc = Depends(get_svc))
         if not excel_service.file_exists(req.filename):
             return res_msg(code=ResCode.ERR, msg=f"File not found: {req.filename}")
 
-        file_path = excel_service.get_file_path(req.filename)
-
-        # 暂停文件监听，避免自触发
-        watcher = get_active_watcher(file_path)
-        if watcher:
-            watcher.pause_watching(duration=2.0)
-
-        # 更新单元格
+        # 更新单元格, 写回由服务在空闲时完成, 监听器会忽略服务自己的写入
         excel_service.update_cells(req.filename, req.updates)
 
         return res_msg(
@@ -316,6 +319,9 @@ def datatable_close(req: CloseDataTableRequest, svc: Svc = Depends(get_svc)):
             watcher.stop()
             remove_active_watcher(file_path)
 
+        # 写回未保存的编辑并释放内存
+        excel_service.close_file(req.filename)
+
         return res_msg(code=ResCode.SUCCESS, msg="ok", data={"project_id": req.project_id, "filename": req.filename})
 
     except Exception as e:
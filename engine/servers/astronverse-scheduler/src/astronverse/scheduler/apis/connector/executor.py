@@ -32,18 +32,24 @@ class ExecutorProject(BaseModel):
     run_param: str = ""  # 执行器参数
     open_virtual_desk: bool = False  # 虚拟桌面
     version: Union[int, str] = ""  # 机器人版本
+    needs_desktop: bool = True  # 是否需要操作桌面
 
 
 class StopTask(BaseModel):
     task_id: Optional[str] = None
 
 
+class ExecutorStatus(BaseModel):
+    needs_desktop: bool = True  # 是否需要操作桌面
+
+
 class RobotInfo(BaseModel):
     robotId: str
     robotName: str
     paramJson: str = ""
     version: str = ""
     sort: int = 1
+    needs_desktop: bool = True  # 是否需要操作桌面
 
 
 class TaskInfo(BaseModel):
@@ -100,9 +106,11 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
     """
     运行和启动一组工程(计划任务), 同步
     """
-    if svc.executor_mg.status():
+    needs_desktop = any(r.needs_desktop for r in task_info.callback_project_ids) or task_info.open_virtual_desk
+    if not svc.executor_mg.has_free_slot(needs_desktop):
         return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
-    svc.terminal_task_stop = False
+    svc.executor_mg.stopped_tasks.discard(task_info.trigger_id)
+    svc.executor_mg.active_tasks.add(task_info.trigger_id)
     settings = get_settings()
     task_executor_id = ""
     try:
@@ -136,13 +144,13 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
                     open_virtual_desk=settings.get("open_virtual_desk", False) or task_info.open_virtual_desk,
                     version=r.version,
                     is_send_log_event=False,
+                    needs_desktop=r.needs_desktop,
                 )
                 if svc.terminal_mod:
                     svc.executor_mg.task_trigger_status()
 
                 # 检查是否运行结束
-                while svc.executor_mg.status():
-                    time.sleep(1)
+                while not svc.executor_mg.wait_end(executor, 1):
                     if 0 < end_time < time.time():
                         svc.executor_mg.close(executor)
                         raise Exception("启动失败: 运行超时")
@@ -154,8 +162,8 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
                     is_break = True
                     break
 
-                if svc.terminal_task_stop:
-                    svc.terminal_task_stop = False
+                if task_info.trigger_id in svc.executor_mg.stopped_tasks:
+                    svc.executor_mg.stopped_tasks.discard(task_info.trigger_id)
                     is_cancel = True
                     is_break = True
                     break
@@ -224,6 +232,8 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
         if svc.terminal_mod:
             svc.executor_mg.task_trigger_status()
         return res_msg(code=ResCode.SUCCESS, msg=str(e), data={})
+    finally:
+        svc.executor_mg.active_tasks.discard(task_info.trigger_id)
 
 
 @router.post("/run_sync")
@@ -232,7 +242,7 @@ def executor_run_sync(param: ExecutorProject, svc: Svc = Depends(get_svc)):
     运行和启动一个工程(远程调度), 同步，并获取返回值
     """
 
-    if svc.executor_mg.status():
+    if not svc.executor_mg.has_free_slot(param.needs_desktop or param.open_virtual_desk, param.project_id):
         return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
 
     recording_config = {}
@@ -257,10 +267,10 @@ def executor_run_sync(param: ExecutorProject, svc: Svc = Depends(get_svc)):
         open_virtual_desk=param.open_virtual_desk,
         is_send_log_event=False,
         version=param.version,
+        needs_desktop=param.needs_desktop,
     )
     # 检查是否运行结束
-    while svc.executor_mg.status():
-        time.sleep(1)
+    svc.executor_mg.wait_end(executor)
     # 检测状态
     if executor is not None:
         execute_status = executor.execute_status
@@ -284,7 +294,7 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
     # 初始化
     if not param.project_id:
         return res_msg(code=ResCode.ERR, msg="工程id为空", data=None)
-    if svc.executor_mg.status():
+    if not svc.executor_mg.has_free_slot(param.needs_desktop or param.open_virtual_desk, param.project_id):
         return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
 
     recording_config = {}
@@ -309,6 +319,7 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
         open_virtual_desk=param.open_virtual_desk,
         is_send_log_event=True,
         version=param.version,
+        needs_desktop=param.needs_desktop,
     )
     if executor is not None:
         return res_msg(msg="启动成功", data={"addr": "ws://127.0.0.1:{}/".format(executor.exec_port)})
@@ -317,12 +328,23 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
 
 
 @router.post("/status")
-def executor_status(svc: Svc = Depends(get_svc)):
+def executor_status(param: Optional[ExecutorStatus] = None, svc: Svc = Depends(get_svc)):
     """
     获取执行器状态
+    running: 是否有机器人在运行; full: 是否已经没有可以启动(needs_desktop)机器人的空闲槽位; free: 空闲槽位数
     """
+    needs_desktop = param.needs_desktop if param else True
     status = svc.executor_mg.status()
-    return res_msg(msg="ok", data={"running": status})
+    free = svc.executor_mg.free_slots(needs_desktop)
+    return res_msg(msg="ok", data={"running": status, "full": free <= 0, "free": free})
+
+
+@router.post("/startup_stats")
+def executor_startup_stats(svc: Svc = Depends(get_svc)):
+    """
+    执行器启动耗时直方图, 区分预热进程(warm)和冷启动(cold)
+    """
+    return res_msg(msg="ok", data=svc.executor_mg.warm_pool.histogram.snapshot())
 
 
 @router.post("/stop")
@@ -340,7 +362,5 @@ def executor_stop(exe_pro: ExecutorProject, svc: Svc = Depends(get_svc)):
 @router.post("/stop_list")
 def executor_stop_list(stop_info: StopTask, svc: Svc = Depends(get_svc)):
     if svc.executor_mg:
-        if (stop_info.task_id and svc.executor_mg.curr_task_id == stop_info.task_id) or (not stop_info.task_id):
-            svc.terminal_task_stop = True
-            svc.executor_mg.close_all()  # 关闭正在进行的任务
+        svc.executor_mg.stop_task(stop_info.task_id)  # 关闭正在进行的任务
     return res_msg(msg="停止成功", data=None)
@@ -88,6 +88,7 @@ class PipPackages(BaseModel):
     package: str = ""
     version: str = ""
     mirror: str = ""
+    packages: list = []  # 一次安装多个包 [{"package": "", "version": ""}], 和 package 一起安装
 
 
 class NotifyText(BaseModel):
@@ -286,13 +287,10 @@ def stream_sse(pck: PipPackages, svc: Svc = Depends(get_svc)):
         sub_processes = list()
         try:
             project_id = pck.project_id
-            package = pck.package
-            version = pck.version
             mirror = pck.mirror
+            requirements = [(pck.package, pck.version)] if pck.package else []
+            requirements += [(i.get("package"), i.get("version", "")) for i in pck.packages if i.get("package")]
             exec_python = create_project_venv(svc, project_id)
-            pck_v = package
-            if version:
-                pck_v += "=={}".format(version)
 
             def log(sub_proc):
                 while True:
@@ -302,23 +300,42 @@ def stream_sse(pck: PipPackages, svc: Svc = Depends(get_svc)):
                     if not output.strip():
                         continue
                     yield "data: {}\n\n".format(json.dumps({"stdout": output}))
-                    if "Successfully installed {}".format(package) in output:
+                    if output.startswith("Successfully installed"):
                         return
                 err_info = sub_proc.proc.stderr.read().strip()
                 if err_info:
                     raise Exception(err_info)
 
-            # 下载并缓存
-            download_proc = SubPopen(cmd=PipManager.download_pip_cmd(package, version, mirror)).run(log=True)
-            sub_processes.append(download_proc)
-            for log_data in log(download_proc):
-                yield log_data
+            # 已经安装了要求的版本, 不需要下载和安装
+            missing = PipManager.missing_packages(requirements, exec_python=exec_python)
+            for package, version in requirements:
+                if (package, version) not in missing:
+                    pck_v = "{}=={}".format(package, version) if version else package
+                    yield "data: {}\n\n".format(
+                        json.dumps({"stdout": "Requirement already satisfied: {}".format(pck_v)})
+                    )
+            if not missing:
+                return
+
+            # 下载并缓存, 缺失的包在一次 pip 调用中统一解析; 失败时逐个下载, 定位出错的包
+            try:
+                download_proc = SubPopen(cmd=PipManager.download_pips_cmd(missing, mirror)).run(log=True)
+                sub_processes.append(download_proc)
+                for log_data in log(download_proc):
+                    yield log_data
+            except Exception as e:
+                if len(missing) == 1:
+                    raise
+                logger.warning("batch download failed, retry one by one: {}".format(e))
+                for package, version in missing:
+                    download_proc = SubPopen(cmd=PipManager.download_pip_cmd(package, version, mirror)).run(log=True)
+                    sub_processes.append(download_proc)
+                    for log_data in log(download_proc):
+                        yield log_data
 
             # 执行安装
-            install_proc = SubPopen(cmd=PipManager.install_pip_cmd(package, version, exec_python=exec_python)).run(
-                log=True
-            )
-            sub_processes.append(download_proc)
+            install_proc = SubPopen(cmd=PipManager.install_pips_cmd(missing, exec_python=exec_python)).run(log=True)
+            sub_processes.append(install_proc)
             for log_data in log(install_proc):
                 yield log_data
         except Exception as e:
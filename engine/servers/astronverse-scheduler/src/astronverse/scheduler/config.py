@@ -22,3 +22,13 @@ class Config:
     python_base = sys.executable
     # 虚拟环境dir
     venv_base_dir = "venvs"
+    # 预先创建的空虚拟环境数量(低水位)
+    venv_pool_size = 2
+    # 并发创建虚拟环境的线程数
+    venv_pool_workers = 2
+    # 执行器并发槽位数, 0 按CPU核数自动计算; 需要桌面的机器人始终串行
+    executor_slots = 0
+    # 每个工程虚拟环境保留的预热执行器进程数, 0 关闭预热
+    executor_warm_size = 1
+    # 预热进程最长空闲时间(s), 超过后回收重建
+    executor_warm_ttl = 1800
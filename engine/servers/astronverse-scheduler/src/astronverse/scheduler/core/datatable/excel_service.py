@@ -1,15 +1,248 @@
 import os
+import threading
+import uuid
 from typing import Any, Generator, Optional
 
 from openpyxl import Workbook, load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.cell.cell import MergedCell
 
+from astronverse.scheduler.core.datatable.file_watcher import file_signature, mark_own_write
 from astronverse.scheduler.logger import logger
 
 
+class TableSnapshot:
+    """
+    工作簿的内存列式快照和待写回的编辑日志
+
+    读取直接走快照; 单元格更新先合并到日志并应用到快照, 空闲一段时间后或者关闭时只把日志中的单元格写回
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+        # sheet名称 -> 列列表 columns[col][row], 都从0开始
+        self.sheets: dict[str, list[list]] = {}
+        self.sheet_order: list[str] = []
+        self.active_sheet: Optional[str] = None
+        # 公式单元格的缓存结果 (sheet, row, col) -> value, 用于读取时展示
+        self.cached: dict[tuple, Any] = {}
+        # 编辑日志 (sheet, row, col) -> value, 同一个单元格只保留最后一次
+        self.journal: dict[tuple, Any] = {}
+        # 快照对应的文件签名
+        self.signature: Optional[tuple] = None
+        self.timer: Optional[threading.Timer] = None
+
+    def load(self):
+        """流式读取文件到快照, 公式保留原文, 另外记录公式的缓存结果"""
+        wb = load_workbook(self.file_path, read_only=True)
+        formula_sheets = []
+        try:
+            self.active_sheet = wb.active.title if wb.active else None
+            self.sheet_order = list(wb.sheetnames)
+            self.sheets = {}
+            for sheet_name in wb.sheetnames:
+                columns = []
+                has_formula = False
+                for r, row in enumerate(wb[sheet_name].iter_rows(values_only=True)):
+                    if len(row) > len(columns):
+                        columns.extend([None] * r for _ in range(len(row) - len(columns)))
+                    for c, value in enumerate(row):
+                        columns[c].append(value)
+                        if isinstance(value, str) and value.startswith("="):
+                            has_formula = True
+                    for c in range(len(row), len(columns)):
+                        columns[c].append(None)
+                self.sheets[sheet_name] = columns
+                if has_formula:
+                    formula_sheets.append(sheet_name)
+        finally:
+            wb.close()
+
+        self.cached = {}
+        if formula_sheets:
+            wb = load_workbook(self.file_path, read_only=True, data_only=True)
+            try:
+                for sheet_name in formula_sheets:
+                    columns = self.sheets[sheet_name]
+                    for r, row in enumerate(wb[sheet_name].iter_rows(values_only=True)):
+                        for c, value in enumerate(row):
+                            raw = columns[c][r] if c < len(columns) and r < len(columns[c]) else None
+                            if isinstance(raw, str) and raw.startswith("="):
+                                self.cached[(sheet_name, r, c)] = value
+            finally:
+                wb.close()
+        self.signature = file_signature(self.file_path)
+
+    def size(self, sheet_name: str) -> tuple[int, int]:
+        """(max_row, max_column)"""
+        columns = self.sheets.get(sheet_name, [])
+        return (len(columns[0]) if columns else 0), len(columns)
+
+    def rows(self, sheet_name: str) -> Generator[list, None, None]:
+        """按行返回展示值"""
+        columns = self.sheets.get(sheet_name, [])
+        max_row, _ = self.size(sheet_name)
+        for r in range(max_row):
+            row = [col[r] for col in columns]
+            if self.cached:
+                for c in range(len(row)):
+                    if (sheet_name, r, c) in self.cached:
+                        row[c] = self.cached[(sheet_name, r, c)]
+            yield row
+
+    def reload(self):
+        """重新加载被外部修改的文件, 未写回的编辑重新应用到新的快照上"""
+        self.load()
+        for (sheet_name, r, c), value in self.journal.items():
+            self._set_cell(sheet_name, r, c, value)
+
+    def apply(self, updates: list[dict]):
+        """把更新写入日志和快照, row/col 从1开始"""
+        for update in updates:
+            key = (update.get("sheet"), update.get("row") - 1, update.get("col") - 1)
+            self._set_cell(*key, update.get("value"))
+            self.journal[key] = update.get("value")
+
+    def _set_cell(self, sheet_name: str, r: int, c: int, value: Any):
+        """写入快照, r/c 从0开始"""
+        if sheet_name not in self.sheets:
+            self.sheets[sheet_name] = []
+            self.sheet_order.append(sheet_name)
+        columns = self.sheets[sheet_name]
+        max_row, _ = self.size(sheet_name)
+        while len(columns) <= c:
+            columns.append([None] * max_row)
+        if r >= max_row:
+            for col in columns:
+                col.extend([None] * (r + 1 - max_row))
+        columns[c][r] = value
+        self.cached.pop((sheet_name, r, c), None)
+
+    def flush(self):
+        """
+        把日志中的单元格写回文件, 日志为空时直接返回
+
+        只修改这些单元格, 样式、列宽、合并单元格和其他单元格(包括外部修改的内容)都保持文件中的样子;
+        文件已经被删除时按快照整体保存。
+        """
+        with self.flush_lock:
+            with self.lock:
+                if not self.journal:
+                    return
+                journal = self.journal
+                self.journal = {}
+                changed = self.signature != file_signature(self.file_path)
+                sheets = None
+                if not os.path.exists(self.file_path):
+                    sheets = [(name, [list(col) for col in self.sheets[name]]) for name in self.sheet_order]
+                active_sheet = self.active_sheet
+            skipped = []
+            try:
+                if sheets is None:
+                    skipped = save_cells(self.file_path, journal)
+                else:
+                    save_sheets(self.file_path, sheets, active_sheet)
+            except Exception:
+                # 保存文件失败(单元格的错误在 save_cells 中已经跳过), 编辑放回日志等待下次写回, 期间新的编辑优先
+                with self.lock:
+                    self.journal = {**journal, **self.journal}
+                raise
+            with self.lock:
+                if changed or skipped:
+                    # 文件在写回前被外部修改过或者有单元格没有写入, 快照换成写回之后的文件内容
+                    self.reload()
+                else:
+                    self.signature = file_signature(self.file_path)
+            logger.info(f"Flushed {len(journal)} cells to: {self.file_path}")
+
+
+def save_cells(file_path: str, cells: dict[tuple, Any]) -> list[tuple]:
+    """
+    把单元格写入已有的工作簿并保存, 工作簿中的样式、列宽、合并单元格等保持不变
+
+    Args:
+        file_path: 文件路径
+        cells: {(sheet名称, 行, 列): 值}, 行列都从0开始
+
+    Returns:
+        没有写入的单元格 (合并区域中非左上角的单元格, 以及 sheet 名称、位置或值无法写入的单元格)
+    """
+    skipped = []
+    wb = load_workbook(file_path)
+    try:
+        for (sheet_name, r, c), value in cells.items():
+            try:
+                ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(sheet_name)
+                cell = ws.cell(row=r + 1, column=c + 1)
+                if isinstance(cell, MergedCell):
+                    # 合并区域中只有左上角的单元格可以写入
+                    logger.warning(f"Skip merged cell {sheet_name}!{cell.coordinate} in: {file_path}")
+                    skipped.append((sheet_name, r, c))
+                    continue
+                cell.value = value
+            except Exception as e:
+                # 单个单元格写入失败时跳过, 不影响其他单元格
+                logger.error(f"Skip cell {(sheet_name, r, c)} in: {file_path}, {e}")
+                skipped.append((sheet_name, r, c))
+        replace_file(file_path, wb)
+    finally:
+        wb.close()
+    return skipped
+
+
+def save_sheets(file_path: str, sheets: list[tuple[str, list[list]]], active_sheet: Optional[str] = None):
+    """
+    write-only模式整体保存(不保留原有的样式)
+
+    Args:
+        file_path: 文件路径
+        sheets: [(sheet名称, 列列表)]
+        active_sheet: 活动 sheet
+    """
+    wb = Workbook(write_only=True)
+    names = [name for name, _ in sheets] or ["Sheet1"]
+    for name, columns in sheets or [("Sheet1", [])]:
+        ws = wb.create_sheet(name)
+        max_row = len(columns[0]) if columns else 0
+        for r in range(max_row):
+            ws.append([col[r] for col in columns])
+    if active_sheet in names:
+        wb.active = names.index(active_sheet)
+    replace_file(file_path, wb)
+
+
+def replace_file(file_path: str, wb: Workbook):
+    """
+    先把工作簿保存到同目录的临时文件再替换, 并标记为自己的写入
+
+    Args:
+        file_path: 文件路径
+        wb: 工作簿
+    """
+    dir_path, base = os.path.split(file_path)
+    temp_path = os.path.join(dir_path, f".~{uuid.uuid4().hex}.{base}")
+    try:
+        wb.save(temp_path)
+        # 替换前登记签名, 替换触发的文件事件到达时已能识别为自己的写入
+        mark_own_write(file_path, file_signature(temp_path))
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+# 已打开的快照, key 为规范化的文件路径
+_tables: dict[str, TableSnapshot] = {}
+_tables_lock = threading.Lock()
+
+
 class ExcelService:
     """Excel 文件读写服务"""
 
+    # 最后一次编辑之后多久写回文件（秒）
+    flush_delay: float = 2.0
+
     def __init__(self, resource_dir: str):
         """
         初始化 Excel 服务
@@ -19,6 +252,52 @@ class ExcelService:
         """
         self.resource_dir = resource_dir
 
+    def _get_table(self, filename: str) -> TableSnapshot:
+        """
+        获取文件的内存快照，文件被外部修改时重新加载, 未写回的编辑合并到新的快照上
+
+        Args:
+            filename: 文件名
+
+        Returns:
+            TableSnapshot 实例
+        """
+        file_path = self.get_file_path(filename)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Excel file not found: {file_path}")
+
+        key = os.path.normpath(file_path)
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _tables[key] = TableSnapshot(file_path)
+        with table.lock:
+            if table.signature is None:
+                table.load()
+            elif table.signature != file_signature(file_path):
+                logger.info(f"Reload changed Excel file: {file_path}")
+                table.reload()
+        return table
+
+    def _drop_table(self, filename: str, discard: bool = False) -> Optional[TableSnapshot]:
+        """
+        移除内存快照并取消待执行的写回
+
+        Args:
+            filename: 文件名
+            discard: 是否丢弃未写回的编辑（等待正在进行的写回结束）
+        """
+        key = os.path.normpath(self.get_file_path(filename))
+        with _tables_lock:
+            table = _tables.pop(key, None)
+        if table:
+            if table.timer:
+                table.timer.cancel()
+            if discard:
+                with table.flush_lock, table.lock:
+                    table.journal = {}
+        return table
+
     def get_file_path(self, filename: str) -> str:
         """
         获取 Excel 文件的完整路径
@@ -71,61 +350,143 @@ class ExcelService:
         logger.info(f"Created Excel file: {file_path}")
         return file_path
 
-    def read_file_stream(self, filename: str) -> Generator[dict, None, None]:
+    def _sheet_rows(self, table: TableSnapshot, sheet_name: str) -> tuple[list[list], list[int], int]:
+        """
+        取出 sheet 的紧凑行数据和行哈希
+
+        Args:
+            table: 内存快照
+            sheet_name: sheet 名称
+
+        Returns:
+            (行数据列表, 行哈希列表, 最大列数)，行数据去掉了末尾的空单元格
+        """
+        serialize = self._serialize_cell_value
+        rows = []
+        with table.lock:
+            _, max_column = table.size(sheet_name)
+            for row in table.rows(sheet_name):
+                row_data = [serialize(cell) for cell in row]
+                while row_data and row_data[-1] is None:
+                    row_data.pop()
+                rows.append(row_data)
+        # repr 区分 1 和 True, 比 json 序列化快
+        hashes = [hash(repr(row)) for row in rows]
+        return rows, hashes, max_column
+
+    @staticmethod
+    def _row_chunks(sheet_name: str, rows: list[list], start: int, end: int, chunk_size: int):
+        """把 rows[start:end] 按块生成 rows 事件，row 从1开始"""
+        for i in range(start, end, chunk_size):
+            yield {
+                "type": "rows",
+                "sheet": sheet_name,
+                "row": i + 1,
+                "data": rows[i : min(i + chunk_size, end)],
+            }
+
+    def read_file_stream(
+        self, filename: str, chunk_size: int = 500, served: Optional[dict] = None
+    ) -> Generator[dict, None, None]:
         """
-        流式读取 Excel 文件，逐行返回数据
+        流式读取 Excel 文件，按块返回行数据
+
+        行数据是紧凑数组，每行末尾的空单元格被去掉，客户端按 max_column 补齐
 
         Args:
             filename: 文件名
+            chunk_size: 每个 rows 事件包含的行数
+            served: 不为 None 时记录已发送的 {sheet: (行哈希列表, 最大列数)}，供 read_file_diff 使用
 
         Yields:
-            每行数据的字典，格式为 {"sheet": str, "row": int, "data": list}
+            事件字典，行数据格式为 {"type": "rows", "sheet": str, "row": 起始行号, "data": list[list]}
         """
-        file_path = self.get_file_path(filename)
+        table = self._get_table(filename)
+        chunk_size = max(1, chunk_size)
+
+        for sheet_name in list(table.sheet_order):
+            rows, hashes, max_column = self._sheet_rows(table, sheet_name)
+            if served is not None:
+                served[sheet_name] = (hashes, max_column)
+
+            # 发送 sheet 开始事件
+            yield {
+                "type": "sheet_start",
+                "sheet": sheet_name,
+                "max_row": len(rows),
+                "max_column": max_column,
+            }
 
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Excel file not found: {file_path}")
+            yield from self._row_chunks(sheet_name, rows, 0, len(rows), chunk_size)
 
-        wb = load_workbook(file_path, read_only=True, data_only=True)
+            # 发送 sheet 结束事件
+            yield {
+                "type": "sheet_end",
+                "sheet": sheet_name,
+            }
 
-        try:
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-
-                # 发送 sheet 开始事件
-                yield {
-                    "type": "sheet_start",
-                    "sheet": sheet_name,
-                    "max_row": ws.max_row or 0,
-                    "max_column": ws.max_column or 0,
-                }
+        # 发送完成事件
+        yield {
+            "type": "complete",
+            "filename": filename,
+        }
 
-                # 逐行读取数据
-                row_num = 0
-                for row in ws.iter_rows(values_only=True):
-                    row_num += 1
-                    # 将单元格值转换为可序列化的格式
-                    row_data = [self._serialize_cell_value(cell) for cell in row]
-                    yield {
-                        "type": "row",
-                        "sheet": sheet_name,
-                        "row": row_num,
-                        "data": row_data,
-                    }
-
-                # 发送 sheet 结束事件
-                yield {
-                    "type": "sheet_end",
-                    "sheet": sheet_name,
-                }
+    def read_file_diff(self, filename: str, served: dict, chunk_size: int = 500) -> Generator[dict, None, None]:
+        """
+        对比上次发送的行哈希，只返回发生变化的行区间，并更新 served
 
-        finally:
-            wb.close()
+        Args:
+            filename: 文件名
+            served: read_file_stream 记录的 {sheet: (行哈希列表, 最大列数)}
+            chunk_size: 每个 rows 事件包含的行数
+
+        Yields:
+            事件字典:
+            - sheet_start/rows/sheet_end: 新增的 sheet，全量发送
+            - sheet_size: 行数或列数发生变化，客户端据此截断或扩展
+            - rows: 变化的连续行区间
+            - sheet_removed: sheet 被删除
+            - complete: 对比结束，diff 为 True
+        """
+        table = self._get_table(filename)
+        chunk_size = max(1, chunk_size)
+        sheet_order = list(table.sheet_order)
+
+        for sheet_name in sheet_order:
+            rows, hashes, max_column = self._sheet_rows(table, sheet_name)
+            old = served.get(sheet_name)
+            served[sheet_name] = (hashes, max_column)
+
+            if old is None:
+                yield {"type": "sheet_start", "sheet": sheet_name, "max_row": len(rows), "max_column": max_column}
+                yield from self._row_chunks(sheet_name, rows, 0, len(rows), chunk_size)
+                yield {"type": "sheet_end", "sheet": sheet_name}
+                continue
+
+            old_hashes, old_max_column = old
+            if len(old_hashes) != len(hashes) or old_max_column != max_column:
+                yield {"type": "sheet_size", "sheet": sheet_name, "max_row": len(rows), "max_column": max_column}
+
+            # 合并连续变化的行
+            i, n = 0, len(hashes)
+            while i < n:
+                if i < len(old_hashes) and old_hashes[i] == hashes[i]:
+                    i += 1
+                    continue
+                j = i + 1
+                while j < n and (j >= len(old_hashes) or old_hashes[j] != hashes[j]):
+                    j += 1
+                yield from self._row_chunks(sheet_name, rows, i, j, chunk_size)
+                i = j
+
+        for sheet_name in [name for name in served if name not in sheet_order]:
+            del served[sheet_name]
+            yield {"type": "sheet_removed", "sheet": sheet_name}
 
-        # 发送完成事件
         yield {
             "type": "complete",
             "filename": filename,
+            "diff": True,
         }
 
     def read_file(self, filename: str) -> dict:
@@ -138,30 +499,25 @@ class ExcelService:
         Returns:
             包含所有数据的字典
         """
-        file_path = self.get_file_path(filename)
+        table = self._get_table(filename)
 
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Excel file not found: {file_path}")
-
-        wb = load_workbook(file_path, read_only=True, data_only=True)
-
-        try:
+        with table.lock:
             result = {
                 "filename": filename,
                 "sheets": [],
-                "active_sheet": wb.active.title if wb.active else None,
+                "active_sheet": table.active_sheet,
             }
 
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
+            for sheet_name in table.sheet_order:
+                max_row, max_column = table.size(sheet_name)
                 sheet_data = {
                     "name": sheet_name,
-                    "max_row": ws.max_row or 0,
-                    "max_column": ws.max_column or 0,
+                    "max_row": max_row,
+                    "max_column": max_column,
                     "data": [],
                 }
 
-                for row in ws.iter_rows(values_only=True):
+                for row in table.rows(sheet_name):
                     row_data = [self._serialize_cell_value(cell) for cell in row]
                     sheet_data["data"].append(row_data)
 
@@ -169,12 +525,9 @@ class ExcelService:
 
             return result
 
-        finally:
-            wb.close()
-
     def write_file(self, filename: str, data: dict) -> None:
         """
-        写入数据到 Excel 文件
+        写入数据到 Excel 文件（write-only 模式整体保存）
 
         Args:
             filename: 文件名
@@ -187,72 +540,94 @@ class ExcelService:
         if dir_path and not os.path.exists(dir_path):
             os.makedirs(dir_path, exist_ok=True)
 
-        wb = Workbook()
+        sheets = []
+        for sheet_info in data.get("sheets", []):
+            sheet_data = sheet_info.get("data", [])
+            max_column = max((len(row) for row in sheet_data), default=0)
+            columns = [[row[c] if c < len(row) else None for row in sheet_data] for c in range(max_column)]
+            sheets.append((sheet_info.get("name", "Sheet1"), columns))
 
-        # 删除默认创建的 sheet
-        if wb.active:
-            wb.remove(wb.active)
-
-        sheets = data.get("sheets", [])
-        if not sheets:
-            # 如果没有数据，至少创建一个空 sheet
-            wb.create_sheet("Sheet1")
-        else:
-            for sheet_info in sheets:
-                sheet_name = sheet_info.get("name", "Sheet1")
-                ws = wb.create_sheet(sheet_name)
-
-                sheet_data = sheet_info.get("data", [])
-                for row_idx, row_data in enumerate(sheet_data, start=1):
-                    for col_idx, cell_value in enumerate(row_data, start=1):
-                        ws.cell(row=row_idx, column=col_idx, value=cell_value)
-
-        # 设置活动 sheet
-        active_sheet = data.get("active_sheet")
-        if active_sheet and active_sheet in wb.sheetnames:
-            wb.active = wb[active_sheet]
-        elif wb.sheetnames:
-            wb.active = wb[wb.sheetnames[0]]
-
-        wb.save(file_path)
-        wb.close()
+        # 整体覆盖, 之前未写回的编辑作废
+        self._drop_table(filename, discard=True)
+        save_sheets(file_path, sheets, data.get("active_sheet"))
 
         logger.info(f"Saved Excel file: {file_path}")
 
     def update_cells(self, filename: str, updates: list[dict]) -> None:
         """
-        更新指定单元格的值
+        更新指定单元格的值，先写入内存快照，空闲 flush_delay 秒后再统一写回文件
 
         Args:
             filename: 文件名
             updates: 更新列表，每项格式为 {"sheet": str, "row": int, "col": int, "value": any}
         """
-        file_path = self.get_file_path(filename)
+        self._validate_updates(updates)
+        table = self._get_table(filename)
 
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Excel file not found: {file_path}")
+        with table.lock:
+            table.apply(updates)
+            if table.timer:
+                table.timer.cancel()
+            table.timer = threading.Timer(self.flush_delay, self._flush_table, args=(table,))
+            table.timer.daemon = True
+            table.timer.start()
 
-        wb = load_workbook(file_path)
+        logger.info(f"Updated {len(updates)} cells in: {table.file_path}")
 
+    @staticmethod
+    def _validate_updates(updates: list[dict]):
+        """检查单元格更新, 有一项不合法时整批拒绝, 不写入日志"""
+        for update in updates:
+            sheet_name, row, col = update.get("sheet"), update.get("row"), update.get("col")
+            if not isinstance(sheet_name, str) or not sheet_name:
+                raise ValueError(f"Invalid sheet name: {sheet_name!r}")
+            for name, value in (("row", row), ("col", col)):
+                if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                    raise ValueError(f"Invalid {name}: {value!r}, must be an integer >= 1")
+
+    @staticmethod
+    def _flush_table(table: TableSnapshot):
         try:
-            for update in updates:
-                sheet_name = update.get("sheet")
-                row = update.get("row")
-                col = update.get("col")
-                value = update.get("value")
-
-                if sheet_name not in wb.sheetnames:
-                    ws = wb.create_sheet(sheet_name)
-                else:
-                    ws = wb[sheet_name]
+            table.flush()
+        except Exception as e:
+            logger.exception(f"Error flushing Excel file: {e}")
 
-                ws.cell(row=row, column=col, value=value)
+    def flush(self, filename: str) -> None:
+        """
+        立即写回未保存的编辑
 
-            wb.save(file_path)
-            logger.info(f"Updated {len(updates)} cells in: {file_path}")
+        Args:
+            filename: 文件名
+        """
+        key = os.path.normpath(self.get_file_path(filename))
+        table = _tables.get(key)
+        if table:
+            if table.timer:
+                table.timer.cancel()
+            table.flush()
 
-        finally:
-            wb.close()
+    @staticmethod
+    def flush_all() -> None:
+        """
+        立即写回所有已打开文件的未保存编辑, 执行器启动前和调度器退出时调用
+        """
+        with _tables_lock:
+            tables = list(_tables.values())
+        for table in tables:
+            if table.timer:
+                table.timer.cancel()
+            ExcelService._flush_table(table)
+
+    def close_file(self, filename: str) -> None:
+        """
+        写回未保存的编辑并释放内存快照
+
+        Args:
+            filename: 文件名
+        """
+        table = self._drop_table(filename)
+        if table:
+            table.flush()
 
     def delete_file(self, filename: str) -> bool:
         """
@@ -265,6 +640,7 @@ class ExcelService:
             是否删除成功
         """
         file_path = self.get_file_path(filename)
+        self._drop_table(filename, discard=True)
 
         if os.path.exists(file_path):
             os.remove(file_path)
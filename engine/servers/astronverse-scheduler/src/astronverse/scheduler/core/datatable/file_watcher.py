@@ -8,6 +8,29 @@ from watchdog.observers import Observer
 
 from astronverse.scheduler.logger import logger
 
+# 服务自己写入后的文件签名, key 为小写规范化路径
+_own_writes: dict[str, tuple] = {}
+
+
+def file_signature(file_path: str) -> Optional[tuple]:
+    """文件签名 (mtime_ns, size)，文件不存在返回 None"""
+    try:
+        st = os.stat(file_path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def mark_own_write(file_path: str, signature: Optional[tuple] = None):
+    """记录服务自己写入后的文件签名，监听器据此忽略自己触发的变更"""
+    _own_writes[os.path.normpath(file_path).lower()] = signature or file_signature(file_path)
+
+
+def is_own_write(file_path: str) -> bool:
+    """文件当前内容是否就是服务自己最后一次写入的结果"""
+    signature = _own_writes.get(os.path.normpath(file_path).lower())
+    return signature is not None and signature == file_signature(file_path)
+
 
 class ExcelFileHandler(FileSystemEventHandler):
     """Excel 文件变更处理器"""
@@ -62,6 +85,11 @@ class ExcelFileHandler(FileSystemEventHandler):
             logger.debug(f"Ignoring event during pause period: {event_path}")
             return False
 
+        # 服务自己写入的变更
+        if is_own_write(event_path):
+            logger.debug(f"Ignoring own write: {event_path}")
+            return False
+
         return True
 
     def _debounce_check(self) -> bool:
@@ -122,6 +150,9 @@ class ExcelFileHandler(FileSystemEventHandler):
         # 检查目标路径是否是我们监听的文件
         dest_path = getattr(event, "dest_path", None)
         if dest_path and os.path.normpath(dest_path).lower() == self.target_file:
+            if time.time() < self._ignore_until or is_own_write(dest_path):
+                return
+
             if not self._debounce_check():
                 return
 
@@ -1,4 +1,5 @@
 import datetime
+import heapq
 import json
 import os
 import sys
@@ -12,6 +13,8 @@ from typing import Union
 
 import requests
 import websocket
+from astronverse.scheduler.core.datatable.excel_service import ExcelService
+from astronverse.scheduler.core.executor.warm_pool import WarmPool
 from astronverse.scheduler.core.executor.virtual_desk import (
     WindowVirtualDeskSubprocessAdapter,
     virtual_desk,
@@ -25,7 +28,6 @@ from astronverse.scheduler.utils.utils import (
     EmitType,
     check_port,
     emit_to_front,
-    read_last_n_lines,
 )
 
 
@@ -74,38 +76,23 @@ class ProjectExecPosition(Enum):
     DISPATCH = "DISPATCH"
 
 
-def read_status(file) -> (ExecuteStatus, str):
+def read_status(file) -> (ExecuteStatus, str, dict):
     """
-    从日志文件中读取执行结果
+    读取执行器退出前推送的最终状态
     """
     try:
         if os.path.exists(file):
-            log_lines = read_last_n_lines(file, 5)
-            for line in reversed(log_lines):
-                line = line.strip()
-                if line == "":
-                    continue
-                try:
-                    result_json = json.loads(line)
-                except Exception as e:
-                    continue
-
-                # 处理数据
-                result_json_data = result_json.get("data", {})
-                if result_json_data.get("result", None) is None:
-                    continue
-                execute_status = ExecuteStatus(result_json_data.get("result"))
-
-                execute_reason = result_json.get("data", {}).get("msg_str", "")
-                execute_data = result_json.get("data", {}).get("data", "")
-                if execute_status == execute_status.SUCCESS:
-                    execute_reason = ""
-
-                # 直接结束
-                return execute_status, execute_reason, execute_data
+            with open(file, encoding="utf-8") as f:
+                result_json = json.load(f)
+            execute_status = ExecuteStatus(result_json.get("result"))
+            execute_reason = result_json.get("msg_str", "")
+            execute_data = result_json.get("data", {})
+            if execute_status == ExecuteStatus.SUCCESS:
+                execute_reason = ""
+            return execute_status, execute_reason, execute_data
     except Exception as e:
         logger.exception("read_exec_status error: {}".format(e))
-    return ExecuteStatus.FAIL, "运行日志为空", {}
+    return ExecuteStatus.FAIL, "执行器异常退出", {}
 
 
 class Executor:
@@ -125,6 +112,7 @@ class Executor:
         open_virtual_desk: bool = False,
         version: str = "",  # 版本号
         run_param: str = "",  # 执行参数
+        needs_desktop: bool = True,  # 是否需要操作桌面
     ):
         # 配置数据
         self.project_id = project_id
@@ -139,6 +127,7 @@ class Executor:
         self.open_virtual_desk = open_virtual_desk
         self.version = version
         self.run_param = run_param
+        self.needs_desktop = needs_desktop
         # 是否需要发送日志事件
         self.is_send_log_event = True
 
@@ -147,6 +136,7 @@ class Executor:
         self.kill_time = 0  # 强杀时间 0 不强杀 >0 强杀 <0 已经强杀
         self.report_log_time = 0  # 上报 0 没上报 > 0 上报中 <0 上报结束
         self.run_param_file = None  # run_param临时文件路径
+        self.done = threading.Event()  # 回收完成
 
         # -运行结果
         self.execute_status = ExecuteStatus.EXECUTE  # 执行状态
@@ -184,6 +174,11 @@ class Executor:
         else:
             raise NotImplementedError()
 
+    def wait(self):
+        """阻塞等待进程退出"""
+        if self.__ins__:
+            self.__ins__.wait()
+
     def kill(self):
         """强行关闭进程"""
         if self.__ins__:
@@ -224,6 +219,16 @@ class ExecutorManager:
         self.report_log_lock = threading.Lock()
         # 正在执行队列
         self.executor_list = {}
+        # 已占用但还没有启动完成的槽位 exec_id -> executor
+        self.reserved = {}
+        # 正在运行/被要求停止的计划任务
+        self.active_tasks = set()
+        self.stopped_tasks = set()
+        # 预热执行器进程池
+        self.warm_pool = WarmPool(svc)
+        # 强杀定时器 [(kill_time, exec_id, executor)]
+        self.kill_cond = threading.Condition()
+        self.kill_heap = []
 
         # 一些统计数据
         self.curr_task_name = ""
@@ -252,6 +257,7 @@ class ExecutorManager:
         open_virtual_desk: bool = False,  # 虚拟桌面
         version: str = "",  # 版本号
         is_send_log_event: bool = True,  # 是否需要发送日志事件
+        needs_desktop: bool = True,  # 是否需要操作桌面, 不需要的可以和其他机器人并发
     ):
         """启动一个实例"""
         executor = Executor()
@@ -264,6 +270,7 @@ class ExecutorManager:
         executor.version = version
         executor.run_param = run_param
         executor.is_send_log_event = is_send_log_event
+        executor.needs_desktop = needs_desktop or open_virtual_desk
 
         # 1. 日志上报
         if exec_position in [
@@ -284,26 +291,72 @@ class ExecutorManager:
         if not executor.exec_id:
             executor.exec_id = str(uuid.uuid1())
 
-        # 2. 检查是否占用
-        if self.status():
+        # 2. 检查并占用槽位
+        if not self.reserve(executor):
             raise Exception("已有实例运行，启动失败...")
+        try:
+            return self.__start__(
+                executor,
+                process_id=process_id,
+                line=line,
+                end_line=end_line,
+                debug=debug,
+                exec_position=exec_position,
+                recording_config=recording_config,
+                hide_log_window=hide_log_window,
+                task_name=task_name,
+            )
+        finally:
+            with self.thread_lock:
+                self.reserved.pop(executor.exec_id, None)
+
+    def __start__(
+        self,
+        executor: Executor,
+        process_id: str,
+        line: int,
+        end_line: int,
+        debug: str,
+        exec_position: ProjectExecPosition,
+        recording_config: dict,
+        hide_log_window: bool,
+        task_name: str,
+    ):
+        """在已占用的槽位上启动执行器进程"""
+        project_id = executor.project_id
+        project_name = executor.project_name
+        run_param = executor.run_param
+        version = executor.version
+        open_virtual_desk = executor.open_virtual_desk
 
         # 2.1 统计数据
         self.curr_task_name = task_name
-        self.curr_task_id = task_id
+        self.curr_task_id = executor.task_id
         self.curr_project_name = project_name
         self.curr_log_name = os.path.join(r"logs", "report", executor.project_id, "{}.txt".format(executor.exec_id))
 
+        start_time = time.time()
+
+        # 2.2 数据表格未写回的编辑先写回文件, 执行器直接读取文件
+        ExcelService.flush_all()
+
         # 3. 获取端口
         executor.exec_port = self.svc.get_validate_port(None)
 
         # 4. 创建虚拟环境
         exec_python = create_project_venv(self.svc, project_id)
 
+        warm = False
         if open_virtual_desk and sys.platform == "win32":
             ins = WindowVirtualDeskSubprocessAdapter(self.svc, exec_python=exec_python)
-        else:
+        elif open_virtual_desk:
+            # 虚拟桌面需要特殊的环境变量, 不使用预热进程
             ins = SubPopen(name="executor", cmd=[exec_python, "-m", "astronverse.executor"])
+        else:
+            ins = self.warm_pool.acquire(exec_python)
+            warm = ins is not None
+            if not warm:
+                ins = SubPopen(name="executor", cmd=[exec_python, "-m", "astronverse.executor"])
 
         ins.set_param("port", executor.exec_port)
         ins.set_param("gateway_port", self.svc.rpa_route_port)
@@ -390,9 +443,11 @@ class ExecutorManager:
             return None
         with self.thread_lock:
             self.executor_list[executor.exec_id] = executor
+        threading.Thread(target=self.__reap__, args=(executor,), daemon=True).start()
 
         # 7. 检查是否真启动完成
         if executor.wait_start(time_out=5):
+            self.warm_pool.histogram.record("warm" if warm else "cold", time.time() - start_time)
             return executor
         else:
             executor.execute_status = ExecuteStatus.FAIL
@@ -402,68 +457,56 @@ class ExecutorManager:
             return None
 
     def async_call(self):
-        """异步任务：回收，强杀，上报等异步任务"""
+        """强杀定时器: 等待最近的kill_time到期, 强杀还没有退出的执行器"""
         while True:
-            time.sleep(0.1)
             try:
-                if len(self.executor_list) == 0:
-                    time.sleep(3)  # 执行器至少执行3s，延迟越长给其他任务更多时间
-                    continue
-
-                # 每.1秒检查一次是否进程死亡，需要回收
-                for key in list(self.executor_list.keys()):
-                    executor = self.executor_list[key]
-
-                    # 任务1：检测他的进程是否关闭(可能是主动也可能是异常关闭或用户手动关闭)，并标记需要回收，不重复标记
-                    try:
-                        if not executor.open_async and not executor.ins.is_alive():
-                            # 启动回收逻辑
-                            logger.info("step1: {}".format(executor.exec_id))
-                            executor.open_async = True
-                            continue
-                    except Exception as e:
-                        logger.errr("step1 error: {}".format(e))
-                        continue
-
-                    # 任务2: 强杀逻辑, 如果标记回收，且标记了强杀时间[大于0]，到了强杀时间就回收[强杀结束后kill_time会设置成-1]
-                    try:
-                        if executor.open_async and 0 < executor.kill_time <= time.time():
-                            logger.info("step2: {} {}".format(executor.exec_id, executor.kill_time))
-                            executor.kill()
-                    except Exception as e:
-                        logger.errr("step2 error: {}".format(e))
-                        continue
-
-                    # 任务3: 日志上报，如果标记回收，没有标记强杀时间，或已经被强杀了，所有尘埃落地后，去上报状态，并标记上报状态 上报 0 没上报 > 0 上报中 <0 上报结束
-                    try:
-                        if executor.open_async and executor.kill_time <= 0 and executor.report_log_time == 0:
-                            logger.info("step3: {}".format(executor.exec_id))
-                            self.report_app_log(executor)
-                    except Exception as e:
-                        logger.errr("step3 error: {} ".format(e))
-                        continue
-
-                    # 任务4: 全部完成，上报也结束后，删除执行器
-                    try:
-                        if executor.open_async and executor.kill_time <= 0 and executor.report_log_time < 0:
-                            logger.info("step4: {}".format(executor.exec_id))
-                            try:
-                                if executor.open_virtual_desk:
-                                    virtual_desk.stop()
-                            except Exception as e:
-                                pass
-                            if executor.run_param_file and os.path.exists(executor.run_param_file):
-                                try:
-                                    os.remove(executor.run_param_file)
-                                except Exception:
-                                    pass
-                            del self.executor_list[executor.exec_id]
-                    except Exception as e:
-                        logger.info("step4 error: {}".format(e))
-                        continue
+                with self.kill_cond:
+                    if not self.kill_heap:
+                        self.kill_cond.wait(60)
+                    elif self.kill_heap[0][0] > time.time():
+                        self.kill_cond.wait(self.kill_heap[0][0] - time.time())
+                    due = []
+                    while self.kill_heap and self.kill_heap[0][0] <= time.time():
+                        due.append(heapq.heappop(self.kill_heap)[2])
+
+                if not due:
+                    self.warm_pool.clean()
+                for executor in due:
+                    # kill_time 可能已经被重新设置或进程已经回收
+                    if 0 < executor.kill_time <= time.time():
+                        logger.info("kill: {} {}".format(executor.exec_id, executor.kill_time))
+                        executor.kill()
             except Exception as e:
                 logger.error("async_call error: {} {}".format(e, traceback.format_exc()))
+
+    def __reap__(self, executor: Executor):
+        """等待执行器进程退出后回收: 日志上报, 清理资源"""
+        try:
+            executor.wait()
+        except Exception as e:
+            logger.error("wait error: {} {}".format(executor.exec_id, e))
+        logger.info("reap: {}".format(executor.exec_id))
+        executor.open_async = True
+        executor.kill_time = -1  # 进程已经退出, 不再需要强杀
+
+        try:
+            self.report_app_log(executor)
+        except Exception as e:
+            logger.error("report error: {}".format(e))
+
+        try:
+            if executor.open_virtual_desk:
+                virtual_desk.stop()
+        except Exception as e:
+            pass
+        if executor.run_param_file and os.path.exists(executor.run_param_file):
+            try:
+                os.remove(executor.run_param_file)
+            except Exception:
                 pass
+        with self.thread_lock:
+            self.executor_list.pop(executor.exec_id, None)
+        executor.done.set()
 
     def close(self, executor: Executor):
         """用户主动结束, 不包括进程自己关闭"""
@@ -474,11 +517,16 @@ class ExecutorManager:
             executor.open_async = True  # 再设置他关闭状态
         except Exception as e:
             logger.exception("close error: {}".format(e))
+        finally:
+            if executor.kill_time > 0:
+                with self.kill_cond:
+                    heapq.heappush(self.kill_heap, (executor.kill_time, executor.exec_id, executor))
+                    self.kill_cond.notify()
 
     def close_by_project(self, project_id: int):
         """用户主动结束, 不包括进程自己关闭"""
         if len(self.executor_list) > 0:
-            for _, v in self.executor_list.items():
+            for _, v in list(self.executor_list.items()):
                 if v.project_id == project_id:
                     self.close(v)
                     return True
@@ -486,7 +534,7 @@ class ExecutorManager:
 
     def close_all(self):
         """用户主动结束, 不包括进程自己关闭"""
-        for _, v in self.executor_list.items():
+        for _, v in list(self.executor_list.items()):
             self.close(v)
         return True
 
@@ -498,6 +546,74 @@ class ExecutorManager:
                 return False
         return True
 
+    def max_slots(self) -> int:
+        """并发槽位数"""
+        slots = getattr(self.svc.config, "executor_slots", 0) if self.svc.config else 0
+        if slots <= 0:
+            slots = max(1, (os.cpu_count() or 2) // 2)
+        return slots
+
+    def __has_free_slot__(self, needs_desktop: bool, project_id: str = None) -> bool:
+        running = list(self.executor_list.values()) + list(self.reserved.values())
+        if len(running) >= self.max_slots():
+            return False
+        if needs_desktop and any(v.needs_desktop for v in running):
+            # 需要桌面的机器人互斥
+            return False
+        if self.svc.is_venv and running:
+            # 所有工程共用一个python环境, 生成代码的目录也是共用的, 只能串行
+            return False
+        if project_id is not None and any(v.project_id == project_id for v in running):
+            # 同一个工程共用虚拟环境和生成代码的目录, 不能同时运行
+            return False
+        return True
+
+    def has_free_slot(self, needs_desktop: bool = True, project_id: str = None) -> bool:
+        """判断是否还有空闲槽位可以启动机器人, 传入project_id时同时检查该工程是否已经在运行"""
+
+        with self.thread_lock:
+            return self.__has_free_slot__(needs_desktop, project_id)
+
+    def free_slots(self, needs_desktop: bool = True) -> int:
+        """还可以启动的(needs_desktop)机器人数量, 需要桌面或者共用python环境的机器人互斥, 最多为1"""
+
+        with self.thread_lock:
+            if not self.__has_free_slot__(needs_desktop):
+                return 0
+            if needs_desktop or self.svc.is_venv:
+                return 1
+            return self.max_slots() - len(self.executor_list) - len(self.reserved)
+
+    def reserve(self, executor: Executor) -> bool:
+        """占用一个槽位"""
+
+        with self.thread_lock:
+            if not self.__has_free_slot__(executor.needs_desktop, executor.project_id):
+                return False
+            self.reserved[executor.exec_id] = executor
+            return True
+
+    @staticmethod
+    def wait_end(executor: Executor, timeout: float = None) -> bool:
+        """等待某个执行器运行结束并回收完成, 返回是否已经结束"""
+
+        if executor is None:
+            return True
+        return executor.done.wait(timeout)
+
+    def stop_task(self, task_id: str = None):
+        """停止计划任务, task_id为空时停止所有"""
+
+        with self.thread_lock:
+            executors = list(self.executor_list.values())
+            if task_id:
+                self.stopped_tasks.add(task_id)
+            else:
+                self.stopped_tasks.update(self.active_tasks)
+        for v in executors:
+            if not task_id or v.task_id == task_id:
+                self.close(v)
+
     def task_trigger_status(self):
         """通知触发"""
 
@@ -591,8 +707,19 @@ class ExecutorManager:
                 else:
                     logger.warning(f"{log_file} size is {log_path_size / (10 * 1024 * 1024)}, will ignore report.")
 
-                # 2.4 状态收集
-                execute_status, execute_reason, execute_data = read_status(log_file)
+            # 2.4 状态收集, 执行器退出前推送; 没有推送的(启动失败, 被强杀)保持已有失败状态
+            status_file = os.path.join(
+                r"logs",
+                "report",
+                executor.project_id,
+                "{}.status.json".format(executor.exec_id),
+            )
+            if os.path.exists(status_file) or execute_status == ExecuteStatus.EXECUTE:
+                execute_status, execute_reason, execute_data = read_status(status_file)
+                try:
+                    os.remove(status_file)
+                except Exception:
+                    pass
 
             # 3. 视频路径收集
             video_path = os.path.join(
@@ -158,6 +158,11 @@ class WindowVirtualDeskSubprocessAdapter:
             self.live_cache = False
         return self.live_cache
 
+    def wait(self):
+        """虚拟桌面中的进程拿不到句柄, 只能按is_alive的缓存周期轮询"""
+        while self.is_alive():
+            time.sleep(2)
+
     def kill(self):
         try:
             logger.info("检查虚拟桌面任务关闭")
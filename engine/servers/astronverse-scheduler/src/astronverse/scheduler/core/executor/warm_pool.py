@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from collections import deque
+
+from astronverse.scheduler.logger import logger
+from astronverse.scheduler.utils.subprocess import SubPopen
+
+
+class WarmSubPopen(SubPopen):
+    """
+    预热的执行器进程
+
+    进程提前以 --warm=y 启动并完成重量级模块的导入, run 时才通过 stdin 下发本次运行的参数
+    """
+
+    def __init__(self, exec_python: str):
+        super().__init__(name="executor", cmd=[exec_python, "-m", "astronverse.executor", "--warm=y"])
+        self.exec_python = exec_python
+        self.spawn_time = 0
+
+    def spawn(self) -> "WarmSubPopen":
+        """启动空闲进程"""
+        super().run(stdin_pipe=True)
+        self.spawn_time = time.time()
+        return self
+
+    def run(self, *args, **kwargs) -> "WarmSubPopen":
+        """下发运行参数, 进程开始执行"""
+        params = {k: str(v) for k, v in self.params.items()}
+        self.start_time = time.time()
+        self.proc.stdin.write(json.dumps(params, ensure_ascii=False) + "\n")
+        self.proc.stdin.flush()
+        self.proc.stdin.close()
+        return self
+
+    def kill(self):
+        # 空闲进程读到EOF会自行退出
+        if self.proc and self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=3)
+            except Exception:
+                pass
+        super().kill()
+
+
+class LatencyHistogram:
+    """启动耗时直方图, 按启动方式(warm/cold)分别统计"""
+
+    # 桶上限, 单位ms
+    bounds = (100, 250, 500, 1000, 2000, 3000, 5000)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def record(self, kind: str, seconds: float):
+        ms = seconds * 1000
+        with self.lock:
+            item = self.data.setdefault(kind, {"count": 0, "sum_ms": 0.0, "buckets": [0] * (len(self.bounds) + 1)})
+            item["count"] += 1
+            item["sum_ms"] += ms
+            for i, bound in enumerate(self.bounds):
+                if ms <= bound:
+                    item["buckets"][i] += 1
+                    break
+            else:
+                item["buckets"][-1] += 1
+
+    def snapshot(self) -> dict:
+        labels = ["<={}ms".format(b) for b in self.bounds] + [">{}ms".format(self.bounds[-1])]
+        with self.lock:
+            return {
+                kind: {
+                    "count": item["count"],
+                    "avg_ms": round(item["sum_ms"] / item["count"], 1) if item["count"] else 0,
+                    "buckets": dict(zip(labels, item["buckets"])),
+                }
+                for kind, item in self.data.items()
+            }
+
+
+class WarmPool:
+    """
+    预热执行器进程池
+
+    每个工程虚拟环境(exec_python)保留 size 个已经完成导入的空闲执行器进程, 取走一个后在后台补齐
+    """
+
+    def __init__(self, svc):
+        self.svc = svc
+        self.lock = threading.Lock()
+        self.idle = {}  # exec_python -> deque[WarmSubPopen]
+        self.filling = set()
+        self.histogram = LatencyHistogram()
+
+    @property
+    def size(self) -> int:
+        return getattr(self.svc.config, "executor_warm_size", 0) if self.svc.config else 0
+
+    @property
+    def ttl(self) -> int:
+        return getattr(self.svc.config, "executor_warm_ttl", 1800) if self.svc.config else 1800
+
+    def __usable__(self, ins: WarmSubPopen) -> bool:
+        return ins.is_alive() and time.time() - ins.spawn_time < self.ttl
+
+    def acquire(self, exec_python: str):
+        """取一个预热进程, 没有时返回None, 并触发补齐"""
+        if self.size <= 0:
+            return None
+
+        ins = None
+        expired = []
+        with self.lock:
+            queue = self.idle.setdefault(exec_python, deque())
+            while queue:
+                item = queue.popleft()
+                if self.__usable__(item):
+                    ins = item
+                    break
+                expired.append(item)
+        for item in expired:
+            item.kill()
+        self.refill(exec_python)
+        return ins
+
+    def refill(self, exec_python: str):
+        """后台补齐空闲进程"""
+        with self.lock:
+            if exec_python in self.filling:
+                return
+            self.filling.add(exec_python)
+        threading.Thread(target=self.__fill__, args=(exec_python,), daemon=True).start()
+
+    def __fill__(self, exec_python: str):
+        try:
+            while True:
+                with self.lock:
+                    if len(self.idle.setdefault(exec_python, deque())) >= self.size:
+                        return
+                ins = WarmSubPopen(exec_python).spawn()
+                with self.lock:
+                    self.idle[exec_python].append(ins)
+        except Exception as e:
+            logger.error("warm pool fill error: {}".format(e))
+        finally:
+            with self.lock:
+                self.filling.discard(exec_python)
+
+    def clean(self):
+        """回收过期或者已经退出的空闲进程"""
+        expired = []
+        with self.lock:
+            for queue in self.idle.values():
+                for item in list(queue):
+                    if not self.__usable__(item):
+                        queue.remove(item)
+                        expired.append(item)
+        for item in expired:
+            item.kill()
@@ -1,13 +1,38 @@
+import hashlib
 import os
 import re
-import sys
+import shutil
+import stat
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.platform_utils import platform_python_venv_path
 from astronverse.scheduler.utils.subprocess import SubPopen
 
+# venv_base_dir 下不参与临时环境清理的目录
+STORE_DIR = ".store"  # 按基础解释器内容寻址的模板环境, 新环境从这里硬链接site-packages
+TRASH_DIR = ".trash"  # 待删除目录, 先重命名到这里再后台删除
+
+
+def rmtree_onerror(func, path, exc):
+    # windows下只读文件无法直接删除
+    try:
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+    except Exception:
+        pass
+
 
 class VenvManager:
+    # 正在创建中的目录名, 清理时跳过
+    building = set()
+    lock = threading.Lock()
+    store_lock = threading.Lock()
+    workers = None
+    trash_cleaned = False
+
     @staticmethod
     def list_temp_venvs(svc):
         """
@@ -19,7 +44,7 @@ class VenvManager:
         for temp_venv in os.listdir(svc.config.venv_base_dir):
             if re.search(r"^temp_venv\d+$", temp_venv):
                 res.append(temp_venv)
-        res.sort()
+        res.sort(key=lambda x: int(x[len("temp_venv") :]))
         return res
 
     @staticmethod
@@ -35,75 +60,185 @@ class VenvManager:
                 project_venv_list.append(os.path.join(self.svc.config.venv_base_dir, venv))
         return project_venv_list
 
+    @staticmethod
+    def remove_async(svc, path: str):
+        """
+        删除目录: 先重命名到回收目录, 再在后台线程中删除, 不阻塞调用方
+        """
+        if not os.path.exists(path):
+            return
+        trash_dir = os.path.join(svc.config.venv_base_dir, TRASH_DIR)
+        os.makedirs(trash_dir, exist_ok=True)
+        trash_path = os.path.join(trash_dir, uuid.uuid4().hex)
+        try:
+            os.rename(path, trash_path)
+        except Exception as e:
+            logger.warning("remove venv rename failed: {} {}".format(path, e))
+            trash_path = path
+        threading.Thread(
+            target=shutil.rmtree, args=(trash_path,), kwargs={"onexc": rmtree_onerror}, daemon=True
+        ).start()
+
     @staticmethod
     def remove_temp_venv(svc):
-        if os.path.exists(svc.config.venv_base_dir):
-            files = os.listdir(svc.config.venv_base_dir)
-            for file_name in files:
-                if file_name.startswith("."):
-                    try:
-                        # os.remove 无法删除.文件
-                        if sys.platform == "win32":
-                            os.system("rd /s/q {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                        else:
-                            os.system("rm -rf {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                    except Exception as e:
-                        pass
-                if not os.path.exists(os.path.join(svc.config.venv_base_dir, file_name, "venv")):
-                    try:
-                        # os.remove 无法删除.文件
-                        if sys.platform == "win32":
-                            os.system("rd /s/q {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                        else:
-                            os.system("rm -rf {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                    except Exception as e:
-                        pass
+        if not os.path.exists(svc.config.venv_base_dir):
+            return
+        with VenvManager.lock:
+            building = set(VenvManager.building)
+        for file_name in os.listdir(svc.config.venv_base_dir):
+            if file_name in (STORE_DIR, TRASH_DIR) or file_name in building:
+                continue
+            path = os.path.join(svc.config.venv_base_dir, file_name)
+            if file_name.startswith(".") or not os.path.exists(os.path.join(path, "venv")):
+                VenvManager.remove_async(svc, path)
+
+        # 上次退出时没有删完的
+        trash_dir = os.path.join(svc.config.venv_base_dir, TRASH_DIR)
+        if not VenvManager.trash_cleaned and os.path.exists(trash_dir):
+            VenvManager.trash_cleaned = True
+            for file_name in os.listdir(trash_dir):
+                VenvManager.remove_async(svc, os.path.join(trash_dir, file_name))
 
     @staticmethod
-    def create_new(svc, temp_venv_maxsize=1):
+    def store_key(svc) -> str:
+        """模板环境的内容地址: 基础解释器路径 + 文件大小 + 修改时间"""
+        python_base = os.path.abspath(svc.config.python_base)
+        st = os.stat(python_base)
+        raw = "{}|{}|{}".format(python_base, st.st_size, int(st.st_mtime))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def find_site_packages(venv_dir: str):
+        """venv下的site-packages目录, 没有时返回None"""
+        for root, dirs, _ in os.walk(venv_dir):
+            if os.path.basename(root) == "site-packages":
+                return root
+        return None
+
+    @staticmethod
+    def store_site_packages(svc) -> (str, str):
         """
-        穿件一个新的工程运行的venv
+        获取(必要时创建)模板环境, 返回模板的venv目录和site-packages目录
+        模板环境是带pip的完整venv, 同一个基础解释器只创建一次, 创建失败时删除不完整的模板
         """
+        store_dir = os.path.join(svc.config.venv_base_dir, STORE_DIR)
+        template = os.path.join(store_dir, VenvManager.store_key(svc))
+        with VenvManager.store_lock:
+            if os.path.exists(template) and not VenvManager.find_site_packages(os.path.join(template, "venv")):
+                # 旧版本可能留下了不完整的模板
+                VenvManager.remove_async(svc, template)
+            if not os.path.exists(template):
+                logger.info("create venv store...")
+                template_temp = os.path.join(store_dir, ".{}".format(uuid.uuid4().hex))
+                cmd = [
+                    svc.config.python_base,
+                    "-m",
+                    "venv",
+                    os.path.join(template_temp, "venv"),
+                    "--system-site-packages",
+                ]
+                proc = SubPopen(name="create_venv", cmd=cmd).run(log=True)
+                _, err = proc.logger_handler()
+                if proc.proc.returncode != 0 or not VenvManager.find_site_packages(os.path.join(template_temp, "venv")):
+                    logger.error("create venv store failed: {}".format(err))
+                    VenvManager.remove_async(svc, template_temp)
+                    raise Exception("create venv store failed: {}".format(err))
+                os.rename(template_temp, template)
 
-        # 1. 清空temp_venv保证是最新的
-        VenvManager.remove_temp_venv(svc)
-        temp_venv_list = VenvManager.list_temp_venvs(svc)
-        if len(temp_venv_list) >= temp_venv_maxsize:
-            return
+                # 基础解释器更新后, 旧的模板不再使用
+                for name in os.listdir(store_dir):
+                    if name != os.path.basename(template):
+                        VenvManager.remove_async(svc, os.path.join(store_dir, name))
 
-        # 2. 虚拟环创建
-        logger.info("create new venv...")
-
-        # 2.1 名称获取
-        temp_venv_num_start = 1
-        if temp_venv_list:
-            temp_venv_num_start = int(temp_venv_list[-1].split("temp_venv")[-1]) + 1
-        env_dir_parent = os.path.join(
-            svc.config.venv_base_dir,
-            ".temp_venv{}".format(temp_venv_num_start),
-        )
-        env_dir_temp = os.path.join(env_dir_parent, "venv")
+        template_venv = os.path.join(template, "venv")
+        site_packages = VenvManager.find_site_packages(template_venv)
+        if site_packages:
+            return template_venv, site_packages
+        raise Exception("venv store site-packages not found")
+
+    @staticmethod
+    def link_tree(src: str, dst: str):
+        """把src下的文件硬链接到dst, 跨盘等不支持硬链接时退化为复制"""
+        for root, dirs, files in os.walk(src):
+            target = os.path.join(dst, os.path.relpath(root, src))
+            os.makedirs(target, exist_ok=True)
+            for f in files:
+                dst_file = os.path.join(target, f)
+                if os.path.exists(dst_file):
+                    continue
+                try:
+                    os.link(os.path.join(root, f), dst_file)
+                except OSError:
+                    shutil.copy2(os.path.join(root, f), dst_file)
 
-        # 2.2 创建虚拟环境
+    @staticmethod
+    def build(svc, env_dir_parent: str):
+        """
+        在 env_dir_parent/venv 创建一个工程运行的venv
+        不再每次执行ensurepip, site-packages从模板环境硬链接过来
+        """
+        template_venv, site_packages = VenvManager.store_site_packages(svc)
+        env_dir_temp = os.path.join(env_dir_parent, "venv")
         cmd = [
             svc.config.python_base,
             "-m",
             "venv",
             env_dir_temp,
             "--system-site-packages",
+            "--without-pip",
         ]
-        _, err = SubPopen(name="create_venv", cmd=cmd).run(log=True).logger_handler()
-        if err:
+        proc = SubPopen(name="create_venv", cmd=cmd).run(log=True)
+        _, err = proc.logger_handler()
+        if proc.proc.returncode != 0:
             logger.error("create venv failed: {}".format(err))
+            raise Exception("create venv failed: {}".format(err))
 
-        # 2.3 .temp_venv重命名成temp_venv
-        os.rename(
-            env_dir_parent,
-            os.path.join(
-                svc.config.venv_base_dir,
-                "temp_venv{}".format(temp_venv_num_start),
-            ),
-        )
+        VenvManager.link_tree(site_packages, os.path.join(env_dir_temp, os.path.relpath(site_packages, template_venv)))
+
+    @staticmethod
+    def __build_temp__(svc, num: int):
+        name = ".temp_venv{}".format(num)
+        env_dir_parent = os.path.join(svc.config.venv_base_dir, name)
+        try:
+            VenvManager.build(svc, env_dir_parent)
+            # .temp_venv重命名成temp_venv
+            os.rename(env_dir_parent, os.path.join(svc.config.venv_base_dir, "temp_venv{}".format(num)))
+        except Exception as e:
+            logger.exception("create venv error: {}".format(e))
+            VenvManager.remove_async(svc, env_dir_parent)
+        finally:
+            with VenvManager.lock:
+                VenvManager.building.discard(name)
+
+    @staticmethod
+    def create_new(svc, temp_venv_maxsize=None):
+        """
+        补齐临时venv池到低水位, 并发在后台创建
+        """
+        if temp_venv_maxsize is None:
+            temp_venv_maxsize = svc.config.venv_pool_size
+
+        # 1. 清理未完成的临时环境
+        VenvManager.remove_temp_venv(svc)
+        temp_venv_list = VenvManager.list_temp_venvs(svc)
+
+        with VenvManager.lock:
+            temp_building = [i for i in VenvManager.building if i.startswith(".temp_venv")]
+            need = temp_venv_maxsize - len(temp_venv_list) - len(temp_building)
+            if need <= 0:
+                return
+
+            # 2. 虚拟环创建
+            logger.info("create new venv... {}".format(need))
+            if VenvManager.workers is None:
+                VenvManager.workers = ThreadPoolExecutor(max_workers=max(1, svc.config.venv_pool_workers))
+            nums = [int(i[len("temp_venv") :]) for i in temp_venv_list]
+            nums += [int(i[len(".temp_venv") :]) for i in VenvManager.building if re.search(r"^\.temp_venv\d+$", i)]
+            num = max(nums) if nums else 0
+            for _ in range(need):
+                num += 1
+                VenvManager.building.add(".temp_venv{}".format(num))
+                VenvManager.workers.submit(VenvManager.__build_temp__, svc, num)
 
 
 def create_project_venv(svc, project_id: str):
@@ -114,12 +249,34 @@ def create_project_venv(svc, project_id: str):
         return svc.config.python_base
 
     v_path = os.path.join(svc.config.venv_base_dir, project_id)
-    if not os.path.exists(v_path):
+    with VenvManager.lock:
+        if os.path.exists(v_path):
+            return platform_python_venv_path(v_path)
         temp_envs = VenvManager.list_temp_venvs(svc)
-        if not temp_envs:
-            raise Exception("empty venv runtime...")
-        temp_v = temp_envs[0]
-        os.rename(os.path.join(svc.config.venv_base_dir, temp_v), v_path)
+        if temp_envs:
+            os.rename(os.path.join(svc.config.venv_base_dir, temp_envs[0]), v_path)
+            return platform_python_venv_path(v_path)
+
+    # 池中没有可用的环境, 直接创建
+    logger.info("venv pool empty, create venv for {}".format(project_id))
+    name = ".{}_{}".format(project_id, uuid.uuid4().hex)
+    env_dir_parent = os.path.join(svc.config.venv_base_dir, name)
+    with VenvManager.lock:
+        VenvManager.building.add(name)
+    try:
+        VenvManager.build(svc, env_dir_parent)
+        with VenvManager.lock:
+            if os.path.exists(v_path):
+                VenvManager.remove_async(svc, env_dir_parent)
+            else:
+                os.rename(env_dir_parent, v_path)
+    except Exception:
+        # 创建失败的环境不能作为工程环境使用
+        VenvManager.remove_async(svc, env_dir_parent)
+        raise
+    finally:
+        with VenvManager.lock:
+            VenvManager.building.discard(name)
     return platform_python_venv_path(v_path)
 
 
@@ -5,6 +5,7 @@ import sys
 import time
 
 import psutil
+from astronverse.scheduler.core.datatable.excel_service import ExcelService
 from astronverse.scheduler.logger import logger
 
 system_encoding = locale.getpreferredencoding()
@@ -141,6 +142,8 @@ class Process:
             try:
                 if not psutil.pid_exists(root_id) or psutil.Process(root_id).name() != root_name:
                     logger.info("pid_exist_check kill process...")
+                    # 写回数据表格未保存的编辑
+                    ExcelService.flush_all()
                     # 首先递归杀一遍子进程
                     Process.kill_proc_tree(psutil.Process(os.getpid()), exclude_pids=[os.getpid()])
                     # 再找到当前的启动路径的所有python进程杀一遍
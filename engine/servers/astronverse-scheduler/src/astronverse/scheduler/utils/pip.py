@@ -1,72 +1,161 @@
+import json
 import os
+import re
 import sys
+import threading
 import time
 from urllib.parse import urlparse
 
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.subprocess import SubPopen
-from importlib_metadata import version
 
 
-class PipManager:
-    """pip管理类"""
+def normalize_name(name: str) -> str:
+    """PEP 503 包名规范化"""
+    return re.sub(r"[-_.]+", "-", name).lower()
 
-    DOWNLOADED_PACKAGES = {}
 
-    @staticmethod
-    def get_installed_packages(exec_python=None):
-        if not exec_python:
-            exec_python = sys.executable
+class DistIndex:
+    """
+    已安装包索引: 直接读取各个site-packages下的 *.dist-info / *.egg-info 目录
+    按目录mtime失效(安装/卸载都会增删目录), 查询不再需要启动子进程
+    """
+
+    lock = threading.Lock()
+    # exec_python -> [site-packages目录], 按导入优先级排序
+    site_dirs_cache = {}
+    # site-packages目录 -> (mtime, {规范化包名: (包名, 版本)})
+    dir_cache = {}
 
-        packages = dict()
+    @classmethod
+    def site_dirs(cls, exec_python: str) -> list:
+        """获取解释器的site-packages目录(包括用户目录), 按sys.path中的顺序排列, 每个解释器只查询一次"""
+        with cls.lock:
+            if exec_python in cls.site_dirs_cache:
+                return cls.site_dirs_cache[exec_python]
 
-        def default_output_callback(msg):
+        dirs = []
+        script = (
+            "import json, site, sys; "
+            "d = site.getsitepackages() + ([site.getusersitepackages()] if site.ENABLE_USER_SITE else []); "
+            "print(json.dumps(sorted(d, key=lambda p: sys.path.index(p) if p in sys.path else len(sys.path))))"
+        )
+        cmd = [exec_python, "-c", script]
+        stdout, stderr = SubPopen(cmd=cmd).run(log=True).proc.communicate()
+        if stdout:
             try:
-                if "==" not in msg:
-                    return
-                pck, var = msg.split("==")
-                packages[pck] = var
+                dirs = json.loads(stdout.strip().splitlines()[-1])
             except Exception as e:
-                pass
+                logger.error("site_dirs error: {} {}".format(stdout, e))
+        if not dirs:
+            logger.error("site_dirs error: {}".format(stderr))
+            return []
+        with cls.lock:
+            cls.site_dirs_cache[exec_python] = dirs
+        return dirs
 
-        current_dir = os.path.dirname(os.path.dirname(__file__))
-        cmd = [exec_python, os.path.join(current_dir, "pip_all_version_script.py")]
-        _, err = SubPopen(cmd=cmd).run(log=True).logger_handler(output_callback=default_output_callback)
-        if err:
-            logger.error("get_installed_packages error:{}".format(err))
+    @classmethod
+    def scan(cls, site_dir: str) -> dict:
+        """读取单个site-packages目录, mtime未变化时直接返回缓存"""
+        try:
+            mtime = os.stat(site_dir).st_mtime_ns
+        except OSError:
+            return {}
+        cache = cls.dir_cache.get(site_dir)
+        if cache and cache[0] == mtime:
+            return cache[1]
+
+        packages = {}
+        for entry in os.listdir(site_dir):
+            if entry.endswith(".dist-info"):
+                # {name}-{version}.dist-info
+                name, _, ver = entry[: -len(".dist-info")].partition("-")
+            elif entry.endswith(".egg-info"):
+                # {name}-{version}[-pyX.Y].egg-info
+                parts = entry[: -len(".egg-info")].split("-")
+                if len(parts) < 2:
+                    continue
+                name, ver = parts[0], parts[1]
+            else:
+                continue
+            if name and ver:
+                packages.setdefault(normalize_name(name), (name, ver))
+        cls.dir_cache[site_dir] = (mtime, packages)
         return packages
 
+    @classmethod
+    def packages(cls, exec_python: str = None) -> dict:
+        """{规范化包名: (包名, 版本)}, 前面的site-packages优先"""
+        if not exec_python:
+            exec_python = sys.executable
+        res = {}
+        for site_dir in cls.site_dirs(exec_python):
+            for k, v in cls.scan(site_dir).items():
+                res.setdefault(k, v)
+        return res
+
+    @classmethod
+    def version(cls, package_name: str, exec_python: str = None) -> str:
+        """包版本, 没有安装返回空"""
+        if not exec_python:
+            exec_python = sys.executable
+        key = normalize_name(package_name)
+        for site_dir in cls.site_dirs(exec_python):
+            item = cls.scan(site_dir).get(key)
+            if item:
+                return item[1]
+        return ""
+
+
+class PipManager:
+    """pip管理类"""
+
+    DOWNLOADED_PACKAGES = {}
+
+    @staticmethod
+    def get_installed_packages(exec_python=None):
+        return {name: ver for name, ver in DistIndex.packages(exec_python).values()}
+
     @staticmethod
     def package_version(package_name: str, exec_python=None) -> str:
         """
         校验本地包版本，如果没有这个包，版本为空
         """
-        if not exec_python:
-            exec_python = sys.executable
-        cmd = [
-            exec_python,
-            "-c",
-            "from importlib_metadata import version; print(version('{}'))".format(package_name),
-        ]
-        stdout, stderr = SubPopen(cmd=cmd).run(log=True).proc.communicate()
-        if stderr:
-            return ""
-        if stdout:
-            return stdout.strip()
+        return DistIndex.version(package_name, exec_python)
 
     @staticmethod
-    def local_packages_version(package_name):
+    def local_packages_version(package_name, exec_python=None):
         """获取本地版本"""
-        try:
-            return version(package_name)
-        except Exception:
-            return None
+        return DistIndex.version(package_name, exec_python) or None
+
+    @staticmethod
+    def missing_packages(requirements: list, exec_python=None) -> list:
+        """
+        检查依赖是否满足, 返回没有安装或者版本不一致的 [(package, ver)]
+        """
+        installed = DistIndex.packages(exec_python)
+        missing = []
+        for package, ver in requirements:
+            item = installed.get(normalize_name(package))
+            if not item or (ver and item[1] != ver):
+                missing.append((package, ver))
+        return missing
+
+    @staticmethod
+    def requirement_specs(requirements: list) -> list:
+        """[(package, ver)] 转换成 pip 的参数 package==ver"""
+        return ["{}=={}".format(package, ver) if ver else package for package, ver in requirements]
 
     @staticmethod
     def download_pip_cmd(package, ver, mirror, exec_python=None, pip_cache_dir="pip_cache"):
-        pck = package
-        if ver:
-            pck = "{}=={}".format(package, ver)
+        return PipManager.download_pips_cmd([(package, ver)], mirror, exec_python, pip_cache_dir)
+
+    @staticmethod
+    def download_pips_cmd(requirements: list, mirror, exec_python=None, pip_cache_dir="pip_cache"):
+        """
+        批量下载的命令, 所有包在一次 pip 调用中由 pip 统一解析依赖, 已经缓存的 wheel 直接复用
+        requirements: [(package, ver)]
+        """
         if not exec_python:
             exec_python = sys.executable
 
@@ -75,9 +164,10 @@ class PipManager:
             "-m",
             "pip",
             "wheel",
-            pck,
+            *PipManager.requirement_specs(requirements),
             "-w",
             pip_cache_dir,
+            "--find-links={}".format(pip_cache_dir),
             "--index-url={}".format(mirror),
             "--trusted-host",
             urlparse(mirror).hostname,
@@ -129,9 +219,11 @@ class PipManager:
 
     @staticmethod
     def install_pip_cmd(package, ver, exec_python=None, pip_cache_dir="pip_cache"):
-        pck = package
-        if ver:
-            pck += "=={}".format(ver)
+        return PipManager.install_pips_cmd([(package, ver)], exec_python, pip_cache_dir)
+
+    @staticmethod
+    def install_pips_cmd(requirements: list, exec_python=None, pip_cache_dir="pip_cache"):
+        """从本地缓存批量安装的命令, requirements: [(package, ver)]"""
         if not exec_python:
             exec_python = sys.executable
 
@@ -140,7 +232,7 @@ class PipManager:
             "-m",
             "pip",
             "install",
-            pck,
+            *PipManager.requirement_specs(requirements),
             "--no-index",
             "--find-links={}".format(pip_cache_dir),
             "--no-warn-script-location",
@@ -194,7 +286,7 @@ class PipManager:
                     logger.error("install_pip error:{}".format(error_data))
                     raise Exception("install_pip error:{}".format(error_data))
             except Exception as e:
-                new_version = PipManager.local_packages_version(package)
+                new_version = PipManager.local_packages_version(package, exec_python)
                 if not ver and new_version:
                     return
                 if ver and ver == new_version:
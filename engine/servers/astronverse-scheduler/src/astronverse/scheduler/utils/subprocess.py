@@ -111,7 +111,9 @@ class SubPopen:
         stdout_thread.start()
         return
 
-    def run(self, shell: bool = None, log: bool = False, encoding="utf-8", env=None) -> "SubPopen":
+    def run(
+        self, shell: bool = None, log: bool = False, encoding="utf-8", env=None, stdin_pipe: bool = False
+    ) -> "SubPopen":
         disable_cmd_quick_edit()
 
         # shell 默认值
@@ -144,7 +146,7 @@ class SubPopen:
         self.proc = subprocess.Popen(
             cmd,
             shell=shell,
-            stdin=subprocess.DEVNULL,
+            stdin=subprocess.PIPE if stdin_pipe else subprocess.DEVNULL,
             stdout=subprocess.PIPE if log else subprocess.DEVNULL,
             stderr=subprocess.PIPE if log else subprocess.DEVNULL,
             text=True,
@@ -172,6 +174,13 @@ class SubPopen:
         """
         return self.proc is not None and self.proc.poll() is None
 
+    def wait(self):
+        """
+        阻塞等待子进程退出
+        """
+        if self.proc is not None:
+            self.proc.wait()
+
     def kill(self):
         if self.proc:
             try:
@@ -115,34 +115,6 @@ def kill_proc_tree(
             pass
 
 
-def read_last_n_lines(file_path, n):
-    """
-    返回文件最后n行信心
-    """
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, "rb") as f:
-        # 移动到文件末尾
-        f.seek(0, 2)
-        pointer_location = f.tell()
-        buffer = bytearray()
-        lines_found = 0
-
-        for i in range(pointer_location - 1, -1, -1):
-            f.seek(i)
-            byte = f.read(1)
-            buffer.append(byte[0])
-
-            if byte == b"\n":
-                lines_found += 1
-                if lines_found == n:
-                    break
-
-        # 反转并解码字节数组为字符串
-        line_strs = buffer[::-1].decode("utf-8").strip()
-        return line_strs.splitlines(True)
-
-
 def get_settings(file_path=".setting.json", times: int = 5):
     setting = {}
     for i in range(times):
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from astronverse.scheduler.core.datatable.excel_service import ExcelService
+from openpyxl import Workbook, load_workbook
+
+
+@pytest.fixture
+def service(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    for row in [[1, 10], [2, 20], [3, 30]]:
+        ws.append(row)
+    wb.save(tmp_path / "t.xlsx")
+    service = ExcelService(str(tmp_path))
+    yield service
+    service.close_file("t")
+
+
+def file_rows(service) -> list:
+    wb = load_workbook(service.get_file_path("t"))
+    return [list(row) for row in wb["Sheet1"].iter_rows(values_only=True)]
+
+
+@pytest.mark.parametrize("row, col", [(0, 1), (1, 0), (-1, 1), ("1", 1), (1.0, 1), (True, 1), (None, 1)])
+def test_invalid_position_rejected(service, row, col):
+    """行列不是 >= 1 的整数时整批拒绝, 不进入日志, 之后合法的编辑正常写回"""
+    with pytest.raises(ValueError):
+        service.update_cells(
+            "t",
+            [
+                {"sheet": "Sheet1", "row": 1, "col": 1, "value": 100},
+                {"sheet": "Sheet1", "row": row, "col": col, "value": 0},
+            ],
+        )
+    service.update_cells("t", [{"sheet": "Sheet1", "row": 2, "col": 2, "value": 200}])
+    service.flush("t")
+    assert file_rows(service) == [[1, 10], [2, 200], [3, 30]]
+
+
+def test_failed_cell_dropped(service):
+    """无法写入的单元格被跳过, 其他单元格照常写回, 之后的写回不再失败"""
+    service.update_cells(
+        "t",
+        [
+            {"sheet": "Sheet1", "row": 1, "col": 1, "value": [1, 2]},
+            {"sheet": "Sheet1", "row": 3, "col": 2, "value": 300},
+        ],
+    )
+    service.flush("t")
+    assert file_rows(service) == [[1, 10], [2, 20], [3, 300]]
+
+    service.update_cells("t", [{"sheet": "Sheet1", "row": 1, "col": 2, "value": 100}])
+    service.flush("t")
+    assert file_rows(service) == [[1, 100], [2, 20], [3, 300]]
+    # 快照和文件一致, 跳过的单元格不再显示写入的值
+    assert service.read_file("t")["sheets"][0]["data"][0] == [1, 100]
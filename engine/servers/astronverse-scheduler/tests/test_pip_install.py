@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+from astronverse.scheduler.apis.connector import tools
+from astronverse.scheduler.core.svc import get_svc
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+class FakePopen:
+    """记录 pip 命令, 不启动子进程; fail_batch 时批量下载失败"""
+
+    cmds = []
+    fail_batch = False
+
+    def __init__(self, name: str = None, cmd: list = None, params: dict = None):
+        self.cmd = cmd
+        self.proc = None
+
+    def run(self, log: bool = False, **kwargs) -> "FakePopen":
+        FakePopen.cmds.append(self.cmd)
+        stdout, stderr = "ok\n", ""
+        if self.cmd[3] == "install":
+            stdout = "Successfully installed\n"
+        elif FakePopen.fail_batch and len(self.specs()) > 1:
+            stderr = "ERROR: batch failed"
+        self.proc = type("Proc", (), {"stdout": io.StringIO(stdout), "stderr": io.StringIO(stderr)})()
+        return self
+
+    def specs(self) -> list:
+        """命令中的包, 在 wheel/install 和第一个选项之间"""
+        specs = []
+        for arg in self.cmd[4:]:
+            if arg.startswith("-"):
+                break
+            specs.append(arg)
+        return specs
+
+    def is_alive(self) -> bool:
+        return False
+
+    def kill(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    FakePopen.cmds = []
+    FakePopen.fail_batch = False
+    installed = {("requests", "2.0.0")}
+    monkeypatch.setattr(tools, "SubPopen", FakePopen)
+    monkeypatch.setattr(tools, "create_project_venv", lambda svc, project_id: "/venv/bin/python")
+    monkeypatch.setattr(
+        tools.PipManager,
+        "missing_packages",
+        staticmethod(lambda requirements, exec_python=None: [r for r in requirements if r not in installed]),
+    )
+    app = FastAPI()
+    app.include_router(tools.router)
+    app.dependency_overrides[get_svc] = lambda: None
+    return TestClient(app)
+
+
+def install(client, packages: list) -> str:
+    body = {"project_id": "1", "mirror": "https://pypi.example.com/simple", "packages": packages}
+    return client.post("/pip/install", json=body).text
+
+
+def commands(kind: str) -> list:
+    return [cmd for cmd in FakePopen.cmds if cmd[3] == kind]
+
+
+def test_missing_packages_download_in_one_call(client):
+    """N 个缺失的包只调用一次 pip 解析下载, 再一次安装, 已经安装的包不下载"""
+    packages = [{"package": "requests", "version": "2.0.0"}] + [
+        {"package": "pkg{}".format(i), "version": "1.{}".format(i)} for i in range(5)
+    ]
+    text = install(client, packages)
+
+    downloads = commands("wheel")
+    assert len(downloads) == 1
+    assert FakePopen(cmd=downloads[0]).specs() == ["pkg{}==1.{}".format(i, i) for i in range(5)]
+    installs = commands("install")
+    assert len(installs) == 1
+    assert FakePopen(cmd=installs[0]).specs() == ["pkg{}==1.{}".format(i, i) for i in range(5)]
+    assert "Requirement already satisfied: requests==2.0.0" in text
+    assert "stderr" not in text
+
+
+def test_batch_failure_falls_back_to_single_downloads(client):
+    """批量下载失败时逐个下载"""
+    FakePopen.fail_batch = True
+    install(client, [{"package": "a"}, {"package": "b"}])
+
+    downloads = [FakePopen(cmd=cmd).specs() for cmd in commands("wheel")]
+    assert downloads == [["a", "b"], ["a"], ["b"]]
+    assert len(commands("install")) == 1
@@ -0,0 +1,100 @@
+"""
+文件触发器吞吐测试
+
+在临时目录下建立几个互相覆盖的文件任务, 向子目录一次写入大量文件, 统计:
+- 共享监听的数量和每个任务收到的投递次数(防抖后应当只有一次)
+- 真实写入后到最后一次投递的耗时
+- 同样数量的变化直接分发一批的耗时
+
+    python benchmark.py [文件数]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import astronverse.trigger.server  # noqa: F401 先加载 server, 和运行时的导入顺序一致
+from astronverse.trigger.tasks.file_task import (
+    FileSubscription,
+    FileWatchService,
+    create_flag,
+    delete_flag,
+    modified_flag,
+)
+from watchfiles import Change
+
+
+def make_subscriptions(root: str, sub_dir: str) -> dict:
+    """三个互相覆盖的任务: 递归根目录(按扩展名), 递归子目录(全部文件), 非递归子目录(按文件名)"""
+    return {
+        "root .txt": FileSubscription(root, True, [" .txt"], [create_flag], asyncio.Queue()),
+        "sub *": FileSubscription(sub_dir, True, [], [create_flag, delete_flag], asyncio.Queue()),
+        "sub name": FileSubscription(sub_dir, False, ["file_1.txt"], [create_flag, modified_flag], asyncio.Queue()),
+    }
+
+
+async def drain(subs: dict, idle: float) -> dict:
+    """收集投递次数, idle 秒内没有新的投递时结束"""
+    counts = {name: 0 for name in subs}
+    last = time.perf_counter()
+    while time.perf_counter() - last < idle:
+        for name, sub in subs.items():
+            while not sub.q.empty():
+                sub.q.get_nowait()
+                counts[name] += 1
+                last = time.perf_counter()
+        await asyncio.sleep(0.05)
+    return counts
+
+
+async def real_files(root: str, files: int):
+    sub_dir = os.path.join(root, "sub")
+    os.makedirs(sub_dir)
+    service = FileWatchService()
+    subs = make_subscriptions(root, sub_dir)
+    for sub in subs.values():
+        service.subscribe(sub)
+    print("watch tasks: {}, roots: {}".format(len(service.tasks), service.roots))
+    # 等待监听启动
+    await asyncio.sleep(1)
+
+    start = time.perf_counter()
+    for i in range(files):
+        with open(os.path.join(sub_dir, "file_{}.txt".format(i)), "w") as f:
+            f.write("x")
+    written = time.perf_counter() - start
+    counts = await drain(subs, idle=FileSubscription.max_delay + 1)
+    print("write {:,} files{:>10.2f}s".format(files, written))
+    print("deliveries: {}".format(counts))
+
+    for sub in list(service.subscriptions):
+        service.unsubscribe(sub)
+    service.stop_event.set()
+
+
+async def synthetic(root: str, files: int):
+    sub_dir = os.path.join(root, "sub")
+    service = FileWatchService()
+    subs = make_subscriptions(root, sub_dir)
+    for sub in subs.values():
+        index = service.prefix if sub.recursive else service.exact
+        index.setdefault(sub.root, []).append(sub)
+    changes = [(Change.added, os.path.join(sub_dir, "file_{}.txt".format(i))) for i in range(files)]
+
+    start = time.perf_counter()
+    service.dispatch(changes)
+    print("dispatch {:,} changes{:>8.2f}s".format(files, time.perf_counter() - start))
+    for sub in subs.values():
+        sub.cancel()
+
+
+async def main(files: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        await real_files(tmp, files)
+        await synthetic(tmp, files)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000))
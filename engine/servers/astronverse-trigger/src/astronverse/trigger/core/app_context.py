@@ -1,10 +1,9 @@
 import threading
-from collections import deque
 from typing import Optional
 
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
-from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.queue_manager import TaskQueue, TaskQueueManager
 from astronverse.trigger.terminal import Terminal
 from astronverse.trigger.trigger import Trigger
 
@@ -26,7 +25,7 @@ class AppContext:
         }
 
         # 用于监控的队列，存储当前正在排队的任务信息
-        self.task_queue_monitor = deque(maxlen=1000)  # 设置最大长度为1000，防止内存溢出
+        self.task_queue_monitor = TaskQueue(maxlen=1000)  # 设置最大长度为1000，防止内存溢出
 
         # 线程管理
         self._threads = []
@@ -1,19 +1,202 @@
 import copy
+import heapq
+import itertools
+import threading
 import time
 import uuid
-from collections import deque
 
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
-from astronverse.trigger.server.gateway_client import execute_multiple_projects
+from astronverse.trigger.server.gateway_client import execute_multiple_projects, get_executor_free_slots
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class TaskQueue:
+    """
+    排队任务的优先级队列
+
+    按 (优先级从高到低, 入队先后) 出队; unique_id 和 trigger_id 建了索引, 查重和删除都是 O(1)
+    下发失败的任务放进退避堆, 到期后按原来的位置回到队列, 不阻塞后面的任务
+    兼容原来 deque 的 len/遍历/remove/pop 用法, 遍历返回快照, 遍历时可以删除
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.maxlen = maxlen
+        self.lock = threading.RLock()
+        self.cond = threading.Condition(self.lock)
+        self.seq = itertools.count()
+        self.heap = []  # [(key, unique_id)], 删除是惰性的, 出队时跳过失效项
+        self.delayed = []  # [(retry_at, unique_id)], 退避中的任务
+        self.tasks = {}  # unique_id -> task
+        self.keys = {}  # unique_id -> (-priority, seq)
+        self.enqueued = {}  # unique_id -> (monotonic, time.time())
+        self.deadlines = {}  # unique_id -> monotonic 过期时间
+        self.trigger_counts = {}  # trigger_id -> 排队数量
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        with self.lock:
+            uids = sorted(self.tasks, key=self.keys.__getitem__)
+            return iter([self.tasks[uid] for uid in uids])
+
+    def append(self, task: dict, max_wait_minutes: float):
+        """入队, task 需要带 unique_id, 可选 priority(越大越先执行)"""
+        with self.cond:
+            if len(self.tasks) >= self.maxlen:
+                self.pop()
+            uid = task["unique_id"]
+            now, wall = time.monotonic(), time.time()
+            self.keys[uid] = (-int(task.get("priority") or 0), next(self.seq))
+            self.enqueued[uid] = (now, wall)
+            self.deadlines[uid] = now + max_wait_minutes * 60
+            task["enqueue_time"] = time.strftime(TIME_FORMAT, time.localtime(wall))
+            task["expire_time"] = time.strftime(TIME_FORMAT, time.localtime(wall + max_wait_minutes * 60))
+            self.__insert__(task)
+            heapq.heappush(self.heap, (self.keys[uid], uid))
+            self.cond.notify_all()
+
+    def __insert__(self, task: dict):
+        self.tasks[task["unique_id"]] = task
+        trigger_id = task.get("trigger_id")
+        self.trigger_counts[trigger_id] = self.trigger_counts.get(trigger_id, 0) + 1
+
+    def __discard__(self, uid: str, forget: bool = True):
+        task = self.tasks.pop(uid, None)
+        if task is None:
+            return None
+        trigger_id = task.get("trigger_id")
+        count = self.trigger_counts.get(trigger_id, 0) - 1
+        if count > 0:
+            self.trigger_counts[trigger_id] = count
+        else:
+            self.trigger_counts.pop(trigger_id, None)
+        if forget:
+            self.keys.pop(uid, None)
+            self.enqueued.pop(uid, None)
+            self.deadlines.pop(uid, None)
+        return task
+
+    def remove(self, task: dict):
+        """删除任务, 不存在时和 deque 一样抛出 ValueError"""
+        with self.lock:
+            if self.__discard__(task.get("unique_id")) is None:
+                raise ValueError("task not in queue")
+
+    def pop(self) -> dict:
+        """删除并返回最后出队的任务"""
+        with self.lock:
+            if not self.tasks:
+                raise IndexError("pop from an empty queue")
+            uid = max(self.tasks, key=self.keys.__getitem__)
+            return self.__discard__(uid)
+
+    def has_trigger(self, trigger_id: str) -> bool:
+        """是否已有相同 trigger_id 的任务在排队"""
+        return trigger_id in self.trigger_counts
+
+    def is_expired(self, task: dict) -> bool:
+        deadline = self.deadlines.get(task.get("unique_id"))
+        return deadline is not None and time.monotonic() > deadline
+
+    def set_max_wait(self, max_wait_minutes: float):
+        """最大等待时间变化后, 重新计算所有任务的过期时间"""
+        with self.lock:
+            for uid, (enqueue_mono, enqueue_wall) in self.enqueued.items():
+                self.deadlines[uid] = enqueue_mono + max_wait_minutes * 60
+                if uid in self.tasks:
+                    self.tasks[uid]["expire_time"] = time.strftime(
+                        TIME_FORMAT, time.localtime(enqueue_wall + max_wait_minutes * 60)
+                    )
+
+    def retry(self, task: dict, delay: float):
+        """下发失败, delay 秒后按原来的优先级和位置重新排队"""
+        with self.cond:
+            uid = task["unique_id"]
+            if uid not in self.keys or uid in self.tasks:
+                return
+            self.__insert__(task)
+            heapq.heappush(self.delayed, (time.monotonic() + delay, uid))
+            self.cond.notify_all()
+
+    def __promote__(self):
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, uid = heapq.heappop(self.delayed)
+            if uid in self.tasks:
+                heapq.heappush(self.heap, (self.keys[uid], uid))
+
+    def wait_ready(self, timeout: float):
+        """等待有可以出队的任务"""
+        with self.cond:
+            self.__promote__()
+            if self.heap:
+                return
+            if self.delayed:
+                timeout = min(timeout, max(0.0, self.delayed[0][0] - time.monotonic()))
+            self.cond.wait(timeout)
+
+    def wait(self, timeout: float):
+        """等待新任务入队或者槽位释放"""
+        with self.cond:
+            self.cond.wait(timeout)
+
+    def notify(self):
+        with self.cond:
+            self.cond.notify_all()
+
+    def drain(self, visit):
+        """
+        按出队顺序访问可以出队的任务, visit(task) 返回:
+        take: 出队并返回; skip: 留在队列; drop: 直接删除; stop: 结束本轮
+        """
+        taken, skipped = [], []
+        with self.lock:
+            self.__promote__()
+            while self.heap:
+                key, uid = heapq.heappop(self.heap)
+                task = self.tasks.get(uid)
+                if task is None or self.keys.get(uid) != key:
+                    continue
+                action = visit(task)
+                if action == "take":
+                    # 保留 key 等信息, 下发失败时按原位置重新排队
+                    self.__discard__(uid, forget=False)
+                    taken.append(task)
+                elif action == "drop":
+                    self.__discard__(uid)
+                else:
+                    skipped.append((key, uid))
+                    if action == "stop":
+                        break
+            for item in skipped:
+                heapq.heappush(self.heap, item)
+        return taken
+
+    def forget(self, task: dict):
+        """任务下发成功, 清理索引"""
+        with self.lock:
+            uid = task.get("unique_id")
+            if uid not in self.tasks:
+                self.keys.pop(uid, None)
+                self.enqueued.pop(uid, None)
+                self.deadlines.pop(uid, None)
 
 
 class TaskQueueManager:
-    def __init__(self, task_queue_monitor: deque, trigger_queue, app_context):
+    # 下发失败的退避: 6*i 秒, 最多60秒
+    retry_step = 6
+    retry_max = 60
+
+    def __init__(self, task_queue_monitor: TaskQueue, trigger_queue, app_context):
         self.task_queue_monitor = task_queue_monitor
         self.trigger_queue = trigger_queue
         self.app_context = app_context  # 直接引用 app_context
         self.trigger = None
+        # 已下发还未结束的需要桌面的任务
+        self.inflight_desktop = set()
 
     def set_trigger(self, trigger):
         """设置trigger实例"""
@@ -24,19 +207,9 @@ class TaskQueueManager:
         """动态获取队列配置"""
         return self.app_context.queue_config
 
-    @staticmethod
-    def is_task_timeout(task):
+    def is_task_timeout(self, task):
         """检查任务是否超时"""
-        try:
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            expire_time = task.get("expire_time", "")
-            # 判断是否超时
-            return time.mktime(time.strptime(current_time, "%Y-%m-%d %H:%M:%S")) > time.mktime(
-                time.strptime(expire_time, "%Y-%m-%d %H:%M:%S")
-            )
-        except Exception as e:
-            logger.error(f"检查任务是否超时失败: {e}")
-            return False
+        return self.task_queue_monitor.is_expired(task)
 
     def fetch_tasks(self):
         """获取任务并添加到监控队列"""
@@ -54,70 +227,108 @@ class TaskQueueManager:
                 logger.warning(f"任务队列已满，任务已丢弃: {task_info.get('trigger_id')}")
                 continue
 
+            # 检查是否需要去重
+            if (
+                not config.TERMINAL_MODE
+                and self.queue_config["deduplicate"]
+                and self.task_queue_monitor.has_trigger(task_info.get("trigger_id"))
+            ):
+                logger.info(f"任务已存在，跳过: {task_info.get('trigger_id')}")
+                continue
+
             # 使用深拷贝避免修改原始任务对象
             task_copy = copy.deepcopy(task_info)
-
-            if not config.TERMINAL_MODE:
-                # 检查是否需要去重
-                if self.queue_config["deduplicate"]:
-                    # 检查是否已存在相同trigger_id的任务
-                    for task in self.task_queue_monitor:
-                        if task.get("trigger_id") == task_copy.get("trigger_id"):
-                            logger.info(f"任务已存在，跳过: {task_copy.get('trigger_id')}")
-                            continue
-
-            # 将任务信息添加到监控队列，并记录入队时间和过期时间
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            task_copy["enqueue_time"] = current_time
-            # 计算过期时间
-            expire_time = time.strftime(
-                "%Y-%m-%d %H:%M:%S",
-                time.localtime(
-                    time.mktime(time.strptime(current_time, "%Y-%m-%d %H:%M:%S"))
-                    + self.queue_config["max_wait_minutes"] * 60
-                ),
-            )
-            task_copy["expire_time"] = expire_time
-            # 添加唯一ID
+            # 添加唯一ID, 入队时记录入队时间和过期时间
             task_copy["unique_id"] = str(uuid.uuid4())
-            self.task_queue_monitor.append(task_copy)
+            self.task_queue_monitor.append(task_copy, self.queue_config["max_wait_minutes"])
 
     def process_tasks(self):
-        """处理监控队列中的任务"""
+        """处理监控队列中的任务: 按优先级下发到调度器的空闲槽位, 没有槽位的任务不阻塞其他任务"""
         while True:
+            self.task_queue_monitor.wait_ready(timeout=1)
             if not self.task_queue_monitor:
-                time.sleep(1)
                 continue
+            try:
+                taken = self.dispatch_ready()
+            except Exception as e:
+                logger.error(f"下发任务失败: {e}")
+                taken = []
+            if taken:
+                # 留时间给调度器占用槽位, 再查询下一轮
+                time.sleep(1)
+            else:
+                self.task_queue_monitor.wait(timeout=1)
 
-            task_info = self.task_queue_monitor[0]  # 只查看不移除
+    def dispatch_ready(self) -> list:
+        """一轮调度, 返回本轮下发的任务"""
+        # 查询调度器放在队列锁外面
+        free = {False: get_executor_free_slots(False)}
+        if free[False] > 0 and not self.inflight_desktop:
+            free[True] = get_executor_free_slots(True)
+        else:
+            free[True] = 0
 
+        def visit(task_info):
             # 检查任务是否是当前mode的
             if task_info.get("mode") == "DISPATCH" and not config.TERMINAL_MODE:
-                self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
                 logger.info(f"任务模式为本地计划任务，已移除远程调度任务: {task_info.get('trigger_id')}")
-                continue
+                return "drop"
             if task_info.get("mode") != "DISPATCH" and config.TERMINAL_MODE:
-                self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
                 logger.info(f"任务模式为远程调度任务，已移除本地计划任务: {task_info.get('trigger_id')}")
-                continue
+                return "drop"
 
             # 检查任务是否超时
             if self.is_task_timeout(task_info):
-                self.task_queue_monitor.popleft()  # 移除超时任务
                 logger.info(
                     f"任务等待时间超过{self.queue_config['max_wait_minutes']}分钟，已移除: {task_info.get('trigger_id')}"
                 )
-                continue
+                return "drop"
 
-            self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
-            i = 0
-            while True:
-                success_flag = execute_multiple_projects(task_info)  # 调度调度器
-                if not success_flag:
-                    if i < 10:
-                        i += 1
-                    time.sleep(6 * i)  # 等待6*i秒后，重新下发【这里表示下发失败】
-                    logger.info(f"重新下发, task_info: {task_info}")
-                    continue
-                # 任务执行完成后，从监控队列中移除
-                break
+            # 没有空闲槽位的任务留在队列里, 继续看后面的任务
+            if free[False] <= 0:
+                return "stop"
+            needs_desktop = self.task_needs_desktop(task_info)
+            if needs_desktop and (self.inflight_desktop or free[True] <= 0):
+                return "skip"
+
+            free[False] -= 1
+            if needs_desktop:
+                # 需要桌面的机器人互斥, 本轮不能再下发需要桌面的任务; 不需要桌面的任务只占用总槽位
+                free[True] = 0
+                self.inflight_desktop.add(task_info["unique_id"])
+            return "take"
+
+        taken = self.task_queue_monitor.drain(visit)
+        for task_info in taken:
+            needs_desktop = task_info["unique_id"] in self.inflight_desktop
+            threading.Thread(target=self.dispatch_task, args=(task_info, needs_desktop), daemon=True).start()
+        return taken
+
+    @staticmethod
+    def task_needs_desktop(task_info) -> bool:
+        """任务中是否有需要操作桌面的机器人, 需要桌面的机器人在调度器中串行执行"""
+        if task_info.get("open_virtual_desk"):
+            return True
+        return any(r.get("needs_desktop", True) for r in task_info.get("callback_project_ids", []))
+
+    def dispatch_task(self, task_info, needs_desktop: bool):
+        """下发任务到调度器, 同步等待任务执行完成; 失败时退避后重新排队"""
+        success_flag = False
+        try:
+            success_flag = execute_multiple_projects(task_info)  # 调度调度器
+        except Exception as e:
+            logger.error(f"下发任务异常: {e}")
+        finally:
+            if needs_desktop:
+                self.inflight_desktop.discard(task_info["unique_id"])
+
+        if success_flag:
+            self.task_queue_monitor.forget(task_info)
+        else:
+            # 等待6*i秒后，重新下发【这里表示下发失败】
+            task_info["retry"] = task_info.get("retry", 0) + 1
+            delay = min(self.retry_step * task_info["retry"], self.retry_max)
+            logger.info(f"重新下发, {delay}秒后重试, task_info: {task_info}")
+            self.task_queue_monitor.retry(task_info, delay)
+        # 槽位已经释放
+        self.task_queue_monitor.notify()
@@ -31,16 +31,31 @@ def execute_single_project(project_info: dict):
         return {"code": "5001", "msg": "请求失败", "data": None}
 
 
-def get_executor_status():
+def get_executor_status(needs_desktop: bool = True):
+    """调度器是否已经没有空闲槽位启动(needs_desktop)机器人, 兼容只返回running的旧版本"""
     url = "http://127.0.0.1:{}/scheduler/executor/status".format(config.GATEWAY_PORT)
-    response = requests.post(url)
+    response = requests.post(url, json={"needs_desktop": needs_desktop})
     logger.info(f"当前调度器返回的结果的Json是：{response.json()}")
-    if int(response.status_code) == 200 and response.json().get("data", {}).get("running", False):
-        return True
+    if int(response.status_code) == 200:
+        data = response.json().get("data", {})
+        return data.get("full", data.get("running", False))
     else:
         return False
 
 
+def get_executor_free_slots(needs_desktop: bool = True) -> int:
+    """调度器还可以启动的(needs_desktop)机器人数量, 旧版本没有free字段时按full换算成0/1"""
+    url = "http://127.0.0.1:{}/scheduler/executor/status".format(config.GATEWAY_PORT)
+    response = requests.post(url, json={"needs_desktop": needs_desktop})
+    if int(response.status_code) == 200:
+        data = response.json().get("data", {})
+        if "free" in data:
+            return int(data["free"])
+        return 0 if data.get("full", data.get("running", False)) else 1
+    else:
+        return 0
+
+
 def send_msg(data: dict):
     url = "http://127.0.0.1:{}/scheduler/send/tip".format(config.GATEWAY_PORT)
     headers = {"Content-Type": "application/json"}
@@ -48,7 +48,7 @@ class WebSocketManager:
         logger.info(msg)
         data = msg.data
         for i in range(3):
-            if not get_executor_status():
+            if not get_executor_status(data.get("needs_desktop", True)):
                 return execute_single_project(data)
             else:
                 time.sleep(2)
@@ -331,13 +331,12 @@ async def remove_queue_task(task_info: RemoveQueueTaskInput):
         removed_count = 0
         # 遍历要删除的unique_id列表
         for unique_id in task_info.unique_id:
-            # 在队列中查找对应的任务
-            for task in list(app_context.task_queue_monitor):
-                if task.get("unique_id") == unique_id:
-                    app_context.task_queue_monitor.remove(task)
-                    removed_count += 1
-                    logger.info(f"从队列中删除任务: {unique_id}")
-                    break
+            try:
+                app_context.task_queue_monitor.remove({"unique_id": unique_id})
+            except ValueError:
+                continue
+            removed_count += 1
+            logger.info(f"从队列中删除任务: {unique_id}")
 
         if removed_count > 0:
             return {
@@ -367,23 +366,13 @@ async def update_queue_config(config: QueueConfigInput):
     try:
         # 如果最大等待时间发生变化，更新所有任务的过期时间
         if config.max_wait_minutes != app_context.queue_config["max_wait_minutes"]:
-            for task in app_context.task_queue_monitor:
-                enqueue_time = task.get("enqueue_time", "")
-                if enqueue_time:
-                    # 重新计算过期时间
-                    expire_time = time.strftime(
-                        "%Y-%m-%d %H:%M:%S",
-                        time.localtime(
-                            time.mktime(time.strptime(enqueue_time, "%Y-%m-%d %H:%M:%S")) + config.max_wait_minutes * 60
-                        ),
-                    )
-                    task["expire_time"] = expire_time
+            app_context.task_queue_monitor.set_max_wait(config.max_wait_minutes)
 
         # 如果队列最大长度变小了，删除超出限制的任务
         if config.max_length < app_context.queue_config["max_length"]:
             current_size = len(app_context.task_queue_monitor)
             if current_size > config.max_length:
-                # 删除超出限制的任务（从队列末尾删除，保留最早的任务）
+                # 删除超出限制的任务（从队列末尾删除，保留最先出队的任务）
                 tasks_to_remove = current_size - config.max_length
                 for _ in range(tasks_to_remove):
                     if app_context.task_queue_monitor:
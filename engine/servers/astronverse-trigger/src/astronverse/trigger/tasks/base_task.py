@@ -149,15 +149,26 @@ class AsyncSchedulerTask(Task):
             trigger=self.trigger,
             id=self.trigger_id,
         )
+        if hasattr(self.minor_task, "on_push"):
+            # 支持推送的任务(邮件IDLE)有新事件时不用等到下一个间隔
+            self.minor_task.on_push = self.run_now
 
         if not self.enable:
             self.pause()
 
+    def run_now(self):
+        """立即触发一次，暂停中的任务不触发；modify_job 是线程安全的，可以在推送线程中调用"""
+        job = self.scheduler.get_job(self.trigger_id)
+        if job and job.next_run_time:
+            job.modify(next_run_time=datetime.now(tz=get_localzone()))
+
     def delete(self):
         """删除任务"""
         task = self.scheduler.get_job(self.trigger_id)
         if task:
             self.scheduler.remove_job(self.trigger_id)
+        if hasattr(self.minor_task, "close"):
+            self.minor_task.close()
 
     def pause(self):
         """停止任务"""
@@ -1,9 +1,8 @@
 import asyncio
 import fnmatch
 import os
-import time
-from pathlib import Path
-from typing import Union
+import re
+from typing import Optional, Union
 
 from astronverse.trigger.core.logger import logger
 from watchfiles import Change, awatch
@@ -14,6 +13,257 @@ modified_flag = "update"
 rename_flag = "rename"
 
 
+def normalize_patterns(patterns: Union[list[str], None]) -> list[str]:
+    """
+    整理配置的文件名/文件类型: 去掉首尾空白和空项, ".txt" 这样的扩展名当作通配符 "*.txt"
+    """
+    res = []
+    for pattern in patterns or []:
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if pattern.startswith(".") and not any(c in pattern for c in "*?["):
+            pattern = "*" + pattern
+        res.append(pattern)
+    return res
+
+
+class FileSubscription:
+    """一个文件任务的订阅：目录、是否包含子路径、文件名匹配、监听的事件，以及独立的防抖投递"""
+
+    # 持续有事件时最长延迟投递(秒)
+    max_delay = 5.0
+
+    def __init__(
+        self,
+        directory: str,
+        recursive: bool,
+        patterns: list[str],
+        events: list[str],
+        q: asyncio.Queue,
+        run_event: Optional[asyncio.Event] = None,
+        debounce: float = 0.5,
+    ):
+        self.root = os.path.normcase(os.path.abspath(directory))
+        self.recursive = recursive
+        self.events = set(events or [])
+        self.q = q
+        self.run_event = run_event
+        self.debounce = debounce
+
+        # 精确文件名走集合, 通配符编译成一个正则; 没有配置时匹配所有文件
+        patterns = normalize_patterns(patterns)
+        self.match_all = not patterns
+        self.names = set()
+        globs = []
+        for pattern in patterns:
+            if any(c in pattern for c in "*?["):
+                globs.append(fnmatch.translate(os.path.normcase(pattern)))
+            else:
+                self.names.add(os.path.normcase(pattern))
+        self.glob = re.compile("|".join(globs)) if globs else None
+
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.first_time = 0.0
+
+    def match(self, name: str) -> bool:
+        """文件名是否匹配"""
+        if self.match_all:
+            return True
+        name = os.path.normcase(name)
+        return name in self.names or (self.glob is not None and self.glob.match(name) is not None)
+
+    def wants(self, flag: str) -> bool:
+        return flag in self.events and not (self.run_event and self.run_event.is_set())
+
+    def notify(self, loop: asyncio.AbstractEventLoop):
+        """有符合条件的事件, 防抖后投递一次"""
+        now = loop.time()
+        if self.handle is None:
+            self.first_time = now
+        else:
+            self.handle.cancel()
+        delay = max(0.0, min(self.debounce, self.first_time + self.max_delay - now))
+        self.handle = loop.call_later(delay, self.__deliver__)
+
+    def __deliver__(self):
+        self.handle = None
+        self.q.put_nowait(True)
+
+    def cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+
+class FileWatchService:
+    """
+    trigger 进程内共享的文件监听服务
+
+    - 所有文件任务共用监听: 被递归根目录覆盖的目录不再单独监听, 最多一个递归监听和一个非递归监听
+    - 事件按目录索引分发: 非递归订阅按所在目录, 递归订阅按根目录, 每个事件只需向上查找父目录
+    - 重命名按父目录分桶配对, 目录判断每批次每个路径最多一次, 且只对有订阅关心的事件做
+    """
+
+    # 监听批次的合并时间(毫秒), 订阅各自还有防抖
+    batch_ms = 200
+    # 不存在的监听目录的重试间隔(秒)
+    retry_interval = 5.0
+
+    def __init__(self):
+        self.subscriptions: set[FileSubscription] = set()
+        self.exact: dict[str, list[FileSubscription]] = {}  # 目录 -> 非递归订阅
+        self.prefix: dict[str, list[FileSubscription]] = {}  # 根目录 -> 递归订阅
+        self.roots: tuple = ((), ())
+        self.stop_event: Optional[asyncio.Event] = None
+        self.tasks: list[asyncio.Task] = []
+        self.missing: list[str] = []
+        self.retry_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscription: FileSubscription):
+        self.subscriptions.add(subscription)
+        self.rebuild()
+
+    def unsubscribe(self, subscription: FileSubscription):
+        subscription.cancel()
+        self.subscriptions.discard(subscription)
+        self.rebuild()
+
+    @staticmethod
+    def covered(path: str, roots) -> bool:
+        return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+
+    def rebuild(self):
+        """重建分发索引, 监听的根目录变化时重启监听"""
+        self.exact, self.prefix = {}, {}
+        for sub in self.subscriptions:
+            index = self.prefix if sub.recursive else self.exact
+            index.setdefault(sub.root, []).append(sub)
+
+        recursive_roots = []
+        for root in sorted(self.prefix, key=len):
+            if not self.covered(root, recursive_roots):
+                recursive_roots.append(root)
+        plain_roots = [root for root in sorted(self.exact) if not self.covered(root, recursive_roots)]
+
+        missing = [root for root in recursive_roots + plain_roots if not os.path.isdir(root)]
+        if missing:
+            logger.warning(f"【FileWatchService】监听目录不存在：{missing}")
+        self.missing = missing
+        if missing and (self.retry_task is None or self.retry_task.done()):
+            self.retry_task = asyncio.create_task(self.retry_missing())
+        roots = (
+            tuple(root for root in recursive_roots if root not in missing),
+            tuple(root for root in plain_roots if root not in missing),
+        )
+        if roots == self.roots and all(not task.done() for task in self.tasks):
+            return
+        self.roots = roots
+        self.restart()
+
+    async def retry_missing(self):
+        """定时检查不存在的监听目录, 目录创建后重新建立监听, 没有缺失的目录时结束"""
+        while self.missing:
+            await asyncio.sleep(self.retry_interval)
+            if any(os.path.isdir(root) for root in self.missing):
+                self.rebuild()
+
+    def restart(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        self.tasks = []
+        self.stop_event = asyncio.Event()
+        recursive_roots, plain_roots = self.roots
+        if recursive_roots:
+            self.tasks.append(asyncio.create_task(self.watch(recursive_roots, True, self.stop_event)))
+        if plain_roots:
+            self.tasks.append(asyncio.create_task(self.watch(plain_roots, False, self.stop_event)))
+        logger.info(f"【FileWatchService】监听目录：递归{list(recursive_roots)} 非递归{list(plain_roots)}")
+
+    async def watch(self, roots: tuple, recursive: bool, stop_event: asyncio.Event):
+        while not stop_event.is_set():
+            try:
+                async for changes in awatch(*roots, recursive=recursive, debounce=self.batch_ms, stop_event=stop_event):
+                    self.dispatch(changes)
+            except Exception as e:
+                logger.error(f"【FileWatchService】文件监听异常：{e}")
+                await asyncio.sleep(1)
+
+    def subscribers(self, directory: str, cache: dict) -> list[FileSubscription]:
+        """目录下的文件事件需要通知的订阅, 同一批次按目录缓存"""
+        subs = cache.get(directory)
+        if subs is None:
+            subs = list(self.exact.get(directory, ()))
+            current = directory
+            while True:
+                subs.extend(self.prefix.get(current, ()))
+                parent = os.path.dirname(current)
+                if parent == current:
+                    break
+                current = parent
+            cache[directory] = subs
+        return subs
+
+    def dispatch(self, changes):
+        """把一个批次的变化分类后分发给订阅"""
+        loop = asyncio.get_running_loop()
+        changes = [(change, os.path.normcase(path)) for change, path in changes]
+        # 父目录也在本批次里出现, 说明该目录的 modified 是子项变化引起的
+        parents = {os.path.dirname(path) for _, path in changes}
+
+        added, deleted_by_parent, modified = [], {}, []
+        for change, path in changes:
+            if change == Change.added:
+                added.append(path)
+            elif change == Change.deleted:
+                deleted_by_parent.setdefault(os.path.dirname(path), []).append(path)
+            elif change == Change.modified and path not in parents:
+                modified.append(path)
+
+        # 同一批次同一目录下的 DELETED+ADDED 配对成重命名
+        events = []
+        for path in added:
+            bucket = deleted_by_parent.get(os.path.dirname(path))
+            if bucket:
+                name = os.path.basename(path)
+                for i, old in enumerate(bucket):
+                    if os.path.basename(old) != name:
+                        events.append((rename_flag, bucket.pop(i), path))
+                        break
+                else:
+                    events.append((create_flag, None, path))
+            else:
+                events.append((create_flag, None, path))
+        events.extend((delete_flag, None, path) for bucket in deleted_by_parent.values() for path in bucket)
+        events.extend((modified_flag, None, path) for path in modified)
+
+        cache, is_dir, notified = {}, {}, set()
+        for flag, old, path in events:
+            directory, name = os.path.split(path)
+            targets = [
+                sub
+                for sub in self.subscribers(directory, cache)
+                if sub not in notified
+                and sub.wants(flag)
+                and (sub.match(name) or (old and sub.match(os.path.basename(old))))
+            ]
+            if not targets:
+                continue
+            if flag != delete_flag:
+                # 忽略目录自身的事件, 以及已经不存在的路径的残留 modified
+                if path not in is_dir:
+                    is_dir[path] = os.path.isdir(path) or (flag == modified_flag and not os.path.exists(path))
+                if is_dir[path]:
+                    continue
+            for sub in targets:
+                notified.add(sub)
+                sub.notify(loop)
+
+
+# 全局共享的文件监听服务
+file_watch_service = FileWatchService()
+
+
 class FileTask:
     def __init__(
         self,
@@ -39,67 +289,15 @@ class FileTask:
         self.events = events
         self.files_or_type = files_or_type or []
 
-    def _match_file(self, filepath: str) -> bool:
-        filename = os.path.basename(filepath)
-        for pattern in self.files_or_type:
-            if filename == pattern or fnmatch.fnmatch(filename, pattern):
-                return True
-        return False
-
     async def callback(self, q: asyncio.Queue, run_event: asyncio.Event):
         """
-        检查回调
+        检查回调：订阅共享的文件监听服务，任务取消时退订
         """
-        async for changes in awatch(
-            self.directory, recursive=self.relative_sub_path, debounce=500
-        ):  # debounce判断500ms里是否能一次性监听响应
-            if run_event.is_set():
-                continue
-
-            deleted_paths = set()
-            added_paths = set()
-            modified_paths = set()
-            final_modified = set()
-            renamed_pairs = []
-            current_time = time.time()
-
-            for change_type, path in changes:
-                logger.info(f"【AsyncFileTask callback】监听文件变化：{change_type} {path}")
-                path_obj = Path(path)
-                if path_obj.is_dir():  # 忽略目录自身的事件（如父目录MODIFIED）
-                    continue
-
-                if change_type == Change.deleted:  # 属于delete事件，则在对应的集合添加
-                    deleted_paths.add(path)
-                elif change_type == Change.added:  # 属于added事件，则在对应的集合添加
-                    added_paths.add(path)
-                elif change_type == Change.modified:  # 属于modified事件，则在对应的集合添加
-                    if path_obj.exists():  # 验证路径有效性（避免已删除文件残留事件）
-                        modified_paths.add((path, current_time))
-
-            # 匹配重命名事件（同一批次DELETED+ADDED配对）
-            for deleted_path in list(deleted_paths):
-                for added_path in list(added_paths):
-                    if (
-                        Path(deleted_path).parent == Path(added_path).parent
-                        and Path(deleted_path).name != Path(added_path).name
-                    ):
-                        renamed_pairs.append((deleted_path, added_path))
-                        deleted_paths.remove(deleted_path)
-                        added_paths.remove(added_path)
-                        break
-
-            # 处理剩余事件（过滤高频MODIFIED）
-            for path, timestamp in modified_paths:
-                if current_time - timestamp < 0.5:
-                    final_modified.add(path)
-
-            # 真实的勾选监控事件判断
-            if (
-                (create_flag in self.events and added_paths)
-                or (delete_flag in self.events and deleted_paths)
-                or (rename_flag in self.events and renamed_pairs)
-                or (modified_flag in self.events and final_modified)
-            ):
-                await q.put(True)
-                continue
+        subscription = FileSubscription(
+            self.directory, self.relative_sub_path, self.files_or_type, self.events, q, run_event
+        )
+        file_watch_service.subscribe(subscription)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            file_watch_service.unsubscribe(subscription)
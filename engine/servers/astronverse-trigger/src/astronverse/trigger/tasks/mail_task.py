@@ -1,7 +1,14 @@
+import asyncio
 import email
 import imaplib
 import poplib
+import re
+import select
+import threading
+import time
+import weakref
 from datetime import datetime
+from typing import Callable, Optional
 
 from apscheduler.triggers.interval import IntervalTrigger
 from astronverse.trigger.core.logger import logger
@@ -36,6 +43,267 @@ def decode_data(bytes, added_encode=None):
     return None
 
 
+# FETCH 响应里的 literal 类型
+RE_FETCH_START = re.compile(rb"^\d+ \(")
+RE_FETCH_UID = re.compile(rb"UID (\d+)")
+RE_HEADER_LITERAL = re.compile(rb"BODY\[HEADER\] \{\d+\}$")
+RE_FULL_LITERAL = re.compile(rb"BODY\[\] \{\d+\}$")
+# BODYSTRUCTURE 里出现文件名参数即认为有附件, 和 part.get_filename() 的判断一致
+RE_ATTACHMENT = re.compile(rb'"(file)?name\*?"', re.IGNORECASE)
+RE_IDLE_CHANGED = re.compile(rb"^\* \d+ (EXISTS|RECENT)")
+
+
+def parse_fetch(data) -> list:
+    """
+    解析 UID FETCH 的返回, 每封邮件返回 {"uid": int, "meta": bytes, "header": bytes, "full": bytes}
+
+    meta 是去掉 literal 之后的响应文本(包含 BODYSTRUCTURE), 各数据项的顺序由服务端决定
+    """
+    messages = []
+    current = None
+    for item in data or []:
+        if isinstance(item, tuple):
+            head, literal = item[0], item[1]
+            if current is None or RE_FETCH_START.match(head):
+                current = {"uid": None, "meta": b"", "header": None, "full": None}
+                messages.append(current)
+            current["meta"] += head
+            if RE_HEADER_LITERAL.search(head):
+                current["header"] = literal
+            elif RE_FULL_LITERAL.search(head):
+                current["full"] = literal
+            else:
+                current["meta"] += literal
+        elif isinstance(item, (bytes, bytearray)):
+            if current is None or RE_FETCH_START.match(item):
+                current = {"uid": None, "meta": b"", "header": None, "full": None}
+                messages.append(current)
+            current["meta"] += bytes(item)
+    for message in messages:
+        uid = RE_FETCH_UID.search(message["meta"])
+        message["uid"] = int(uid.group(1)) if uid else None
+    return [m for m in messages if m["uid"] is not None]
+
+
+class ImapSession:
+    """
+    同一个邮箱账号的常驻 IMAP 连接, 被该账号的所有邮件任务共享
+
+    - 只读方式(EXAMINE)选择收件箱, 记录 UIDVALIDITY 和已经处理到的 UID, 只查询新增的 UID
+    - 服务端支持 IDLE 时保持 IDLE, 新邮件到达立即检查并通知任务
+    - 判断条件只拉取 BODY.PEEK[HEADER] 和 BODYSTRUCTURE, 需要判断正文时才拉取整封邮件
+    """
+
+    # IDLE 最长保持时间(秒), RFC 2177 要求 29 分钟内重新发起
+    idle_timeout = 25 * 60
+    # 不支持 IDLE 时的保活检查间隔(秒)
+    keepalive = 5 * 60
+    # 连接异常后的重连间隔(秒)
+    reconnect_delay = 10
+    # 每次 FETCH 的邮件数量
+    fetch_batch = 50
+
+    sessions = {}
+    sessions_lock = threading.Lock()
+
+    def __init__(self, key: tuple, opener: Callable):
+        self.key = key
+        self.opener = opener
+        self.client = None
+        self.idle_supported = False
+        self.uidvalidity = None
+        self.last_uid = 0
+        self.subscribers = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.checked = threading.Condition()
+        self.generation = 0
+        self.thread = None
+
+    @classmethod
+    def subscribe(cls, task: "MailTask") -> "ImapSession":
+        """任务订阅所在账号的会话, 会话线程不存在时启动"""
+        with cls.sessions_lock:
+            session = cls.sessions.get(task.account_key)
+            if session is None:
+                session = cls.sessions[task.account_key] = ImapSession(task.account_key, task.open_client)
+            session.subscribers.add(task)
+            if session.thread is None or not session.thread.is_alive():
+                session.thread = threading.Thread(target=session.run, daemon=True)
+                session.thread.start()
+        return session
+
+    def unsubscribe(self, task: "MailTask"):
+        with ImapSession.sessions_lock:
+            self.subscribers.discard(task)
+        self.wake.set()
+
+    def request_check(self, timeout: float = 30) -> bool:
+        """唤醒会话线程立即检查一次, 等待检查完成"""
+        with self.checked:
+            generation = self.generation
+            self.wake.set()
+            return self.checked.wait_for(lambda: self.generation > generation, timeout)
+
+    def run(self):
+        logger.info(f"【ImapSession】会话启动：{self.key}")
+        while True:
+            with ImapSession.sessions_lock:
+                if not len(self.subscribers):
+                    ImapSession.sessions.pop(self.key, None)
+                    break
+            try:
+                if self.client is None:
+                    self.connect()
+                self.wake.clear()
+                self.check()
+                with self.checked:
+                    self.generation += 1
+                    self.checked.notify_all()
+                if self.idle_supported:
+                    self.idle(self.idle_timeout)
+                else:
+                    self.wake.wait(self.keepalive)
+            except Exception as e:
+                logger.error(f"【ImapSession】邮箱会话异常：{e}")
+                self.close()
+                with self.checked:
+                    self.generation += 1
+                    self.checked.notify_all()
+                self.wake.wait(self.reconnect_delay)
+        self.close()
+        logger.info(f"【ImapSession】会话结束：{self.key}")
+
+    def connect(self):
+        client = self.opener()
+        if client is None:
+            raise ConnectionError("邮箱连接失败")
+        self.client = client
+        self.idle_supported = "IDLE" in getattr(client, "capabilities", ())
+
+    def close(self):
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                client.logout()
+            except Exception:
+                pass
+
+    def check(self):
+        """检查新邮件, UIDVALIDITY 变化(首次连接或者邮箱重建)时只建立基准"""
+        client = self.client
+        status, data = client.select("INBOX", readonly=True)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"选择INBOX失败：{data}")
+        validity = client.response("UIDVALIDITY")[1][0]
+        uidnext = client.response("UIDNEXT")[1][0]
+        validity = int(validity) if validity else None
+        uidnext = int(uidnext) if uidnext else None
+
+        if self.uidvalidity is None or validity != self.uidvalidity:
+            self.uidvalidity = validity
+            if uidnext:
+                self.last_uid = uidnext - 1
+            else:
+                status, data = client.uid("SEARCH", None, "UID *")
+                uids = data[0].split() if status == "OK" and data and data[0] else []
+                self.last_uid = max((int(uid) for uid in uids), default=0)
+            logger.info(f"【ImapSession】建立邮件基准 UIDVALIDITY={validity} UID={self.last_uid}")
+            return
+
+        if uidnext and uidnext <= self.last_uid + 1:
+            return
+
+        # UID n:* 至少会返回最大的 UID, 需要再过滤一次
+        status, data = client.uid("SEARCH", None, f"UID {self.last_uid + 1}:*")
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"搜索邮件失败：{data}")
+        uids = sorted(int(uid) for uid in (data[0] or b"").split() if int(uid) > self.last_uid)
+        if not uids:
+            return
+        logger.info(f"【ImapSession】发现{len(uids)}封新邮件，开始检查")
+
+        for i in range(0, len(uids), self.fetch_batch):
+            batch = uids[i : i + self.fetch_batch]
+            status, data = client.uid(
+                "FETCH", ",".join(str(uid) for uid in batch), "(UID BODYSTRUCTURE BODY.PEEK[HEADER])"
+            )
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"读取邮件失败：{data}")
+            for message in parse_fetch(data):
+                self.dispatch(message)
+            self.last_uid = max(self.last_uid, batch[-1])
+
+    def dispatch(self, message: dict):
+        """用邮件头判断每个订阅任务的条件, 正文按需拉取且只拉取一次"""
+        mail_info = MailTask._extract_header_info(message["header"] or b"")
+        mail_info["has_attachment"] = bool(RE_ATTACHMENT.search(message["meta"]))
+        body = {}
+
+        def load_body():
+            if "body" not in body:
+                status, data = self.client.uid("FETCH", str(message["uid"]), "(UID BODY.PEEK[])")
+                full = parse_fetch(data)[0]["full"] if status == "OK" and parse_fetch(data) else None
+                body["body"] = MailTask._extract_info([(b"", full)])["body"] if full else None
+            return body["body"]
+
+        for task in list(self.subscribers):
+            try:
+                if task._check_mail_conditions(mail_info, load_body):
+                    logger.info(f"【ImapSession】邮件{message['uid']}符合任务{task.task_id}的条件{task.condition}")
+                    task.notify()
+            except Exception as e:
+                logger.error(f"【ImapSession】判断邮件条件失败：{e}")
+
+    @staticmethod
+    def new_tag(client) -> bytes:
+        """
+        生成下一个命令 tag
+
+        imaplib 没有公开生成 tag 的接口, 优先使用内部的 _new_tag (会登记到 tagged_commands);
+        不存在时按 imaplib 的格式 tagpre + tagnum 生成, 保证和其他命令的 tag 不重复
+        """
+        new_tag = getattr(client, "_new_tag", None)
+        if callable(new_tag):
+            return new_tag()
+        tagnum = getattr(client, "tagnum", 0)
+        client.tagnum = tagnum + 1
+        return getattr(client, "tagpre", b"IDLE") + str(tagnum).encode()
+
+    def idle(self, timeout: float):
+        """
+        保持 IDLE 直到有新邮件、被唤醒或者超时
+
+        imaplib 没有 IDLE 的实现, 这里直接收发原始行; 用 select 等待数据, 避免 socket 超时后文件对象不可用
+        """
+        client = self.client
+        tag = self.new_tag(client)
+        client.send(tag + b" IDLE\r\n")
+        line = client.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE失败：{line}")
+
+        sock = client.sock
+        deadline = time.monotonic() + timeout
+        while not self.wake.is_set() and time.monotonic() < deadline:
+            pending = sock.pending() if hasattr(sock, "pending") else 0
+            if not pending and not select.select([sock], [], [], 1)[0]:
+                continue
+            line = client.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("连接已关闭")
+            if RE_IDLE_CHANGED.match(line):
+                break
+
+        client.send(b"DONE\r\n")
+        while True:
+            line = client.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("连接已关闭")
+            if line.startswith(tag):
+                break
+
+
 class MailTask:
     def __init__(
         self,
@@ -89,6 +357,14 @@ class MailTask:
         self.user_mail: str = kwargs.get("user_mail")
         self.user_authorization: str = kwargs.get("user_authorization")
 
+        # IMAP 会话检查到符合条件的新邮件后置位, callback 取走
+        self._pending = False
+        self._checking = False
+        self._pending_lock = threading.Lock()
+        # 新邮件到达时的推送回调, 由任务调度层设置
+        self.on_push: Optional[Callable[[], None]] = None
+        self._session: Optional[ImapSession] = None
+
         self.mail_server_dict = {
             # IMAP SSL
             "qq": ["imap.qq.com", 993, "IMAP", True],
@@ -141,9 +417,9 @@ class MailTask:
         except Exception as e:
             return False
 
-    async def aconnect(self):
+    def open_client(self):
         """
-        异步方法，连接邮箱客户端并返回
+        连接并登录邮箱客户端，失败返回 None
         :return:
         """
         try:
@@ -194,47 +470,74 @@ class MailTask:
             logger.info(f"【AsyncMailTask callback】详细错误信息：{traceback.format_exc()}")
             return None
 
-    async def search_all(self, client, condition: str = "ALL"):
-        """搜索邮件"""
-        # 根据协议类型处理
-        if self.custom_mail_protocol == "IMAP":
-            # IMAP协议 - 需要先选择邮箱，再搜索
-            try:
-                # 先选择INBOX
-                status, data = client.select("INBOX")
-                if status != "OK":
-                    logger.error(f"【AsyncMailTask callback】选择INBOX失败：{status} - {data}")
-                    return False
-
-                # 然后搜索邮件
-                status, data = client.search(None, condition)
-                if status != "OK":
-                    logger.error(f"【AsyncMailTask callback】搜索邮件失败：{status} - {data}")
-                    return False
-                return data
-            except Exception as e:
-                logger.error(f"【AsyncMailTask callback】IMAP搜索邮件异常：{str(e)}")
-                return False
-        elif self.custom_mail_protocol == "POP3":
-            # POP3协议 - 获取所有邮件数量
-            try:
-                num_messages = len(client.list()[1])
-                # 返回邮件ID列表（POP3使用数字ID）
-                return [str(i + 1).encode() for i in range(num_messages)]
-            except Exception as e:
-                logger.info(f"【AsyncMailTask callback】POP3获取邮件列表失败：{str(e)}")
-                return False
-        else:
-            logger.error(f"【AsyncMailTask callback】不支持的协议：{self.custom_mail_protocol}")
+    async def aconnect(self):
+        """
+        异步方法，连接邮箱客户端并返回
+        :return:
+        """
+        return await asyncio.to_thread(self.open_client)
+
+    @property
+    def protocol(self) -> str:
+        return self.mail_server_dict[self.mail_flag][2]
+
+    @property
+    def account_key(self) -> tuple:
+        used_mail_server, used_mail_port, _, _ = self.mail_server_dict[self.mail_flag]
+        return used_mail_server, int(used_mail_port), self.user_mail
+
+    def notify(self):
+        """IMAP 会话发现符合条件的邮件, 不是 callback 主动检查时推送给调度层"""
+        with self._pending_lock:
+            self._pending = True
+            push = not self._checking
+        if push and self.on_push:
+            self.on_push()
+
+    def close(self):
+        """任务删除时退出 IMAP 会话"""
+        if self._session:
+            self._session.unsubscribe(self)
+            self._session = None
+
+    async def search_all(self, client):
+        """POP3 获取邮件列表, 返回邮件序号; IMAP 由 ImapSession 按 UID 增量检查"""
+        try:
+            num_messages = len(client.list()[1])
+            # 返回邮件ID列表（POP3使用数字ID）
+            return [str(i + 1).encode() for i in range(num_messages)]
+        except Exception as e:
+            logger.info(f"【AsyncMailTask callback】POP3获取邮件列表失败：{str(e)}")
             return False
 
     async def callback(self) -> bool:
         """
         检查回调
 
+        IMAP 通过常驻会话增量检查，POP3 每次重新连接
+
         :return
             `bool`, 标识是否调度成功
         """
+        if self.protocol == "IMAP":
+            return await self.imap_callback()
+        return await self.pop3_callback()
+
+    async def imap_callback(self) -> bool:
+        """订阅账号的 IMAP 会话并让其立即检查一次，返回期间是否有符合条件的新邮件"""
+        self._session = ImapSession.subscribe(self)
+        with self._pending_lock:
+            self._checking = True
+        try:
+            await asyncio.to_thread(self._session.request_check)
+        finally:
+            with self._pending_lock:
+                self._checking = False
+                flag, self._pending = self._pending, False
+        return flag
+
+    async def pop3_callback(self) -> bool:
+        """POP3 没有 UID 和 IDLE，每次连接后对比邮件数量"""
 
         # 邮箱连接
         logger.info("【AsyncMailTask callback】准备开始连接邮箱...")
@@ -247,27 +550,16 @@ class MailTask:
             logger.error(f"【AsyncMailTask callback】连接邮箱异常：{str(e)}")
             return False
 
-        # 查询当前邮筒的所有邮件（search_all会自动选择INBOX）
+        # 查询当前邮筒的所有邮件
         try:
-            data = await self.search_all(client)
-            if not data:
+            email_ids = await self.search_all(client)
+            if not email_ids:
                 logger.info("【AsyncMailTask callback】获取邮件列表失败")
                 return False
         except Exception as e:
             logger.error(f"【AsyncMailTask callback】搜索邮件异常：{str(e)}")
             return False
 
-        # 处理邮件ID列表
-        if self.custom_mail_protocol == "IMAP":
-            # if len(data) > 1 and data[1] == b'SEARCH completed':
-            #     # IMAP返回格式：(b'1 2 3 4 5...', b'SEARCH completed')
-            #     email_ids = data[0].split()
-            # else:
-            email_ids = data[0].split()
-        elif self.custom_mail_protocol == "POP3":
-            # POP3返回的是列表
-            email_ids = data
-
         cache_ids = global_mail_ids.get(self.task_id, [])
         logger.info(f"【AsyncMailTask callback】获取邮筒当前邮件成功：{len(email_ids)} 封邮件")
 
@@ -298,21 +590,11 @@ class MailTask:
         processed_count = 0
         for email_id in updated_ids:
             try:
-                # 根据协议类型获取邮件内容
-                if self.custom_mail_protocol == "IMAP":
-                    # IMAP协议
-                    status, data = client.fetch(email_id.decode(), "RFC822")
-                elif self.custom_mail_protocol == "POP3":
-                    # POP3协议
-                    email_id_str = email_id.decode() if isinstance(email_id, bytes) else str(email_id)
-                    data = client.retr(int(email_id_str))
-                    # POP3返回的是元组 (response, lines, octets)
-                    data = [data[1]]  # 转换为与IMAP相同的格式
-                else:
-                    logger.error(f"【AsyncMailTask callback】不支持的协议：{self.custom_mail_protocol}")
-                    continue
+                # POP3返回的是元组 (response, lines, octets)
+                email_id_str = email_id.decode() if isinstance(email_id, bytes) else str(email_id)
+                data = [client.retr(int(email_id_str))[1]]
 
-                mail_info = self._extract_info(data, self.custom_mail_protocol)
+                mail_info = self._extract_info(data, "POP3")
                 processed_count += 1
                 logger.info(f"【AsyncMailTask callback】已读取邮件信息完毕，准备开始判断：{mail_info}...")
 
@@ -329,12 +611,13 @@ class MailTask:
         global_mail_ids[self.task_id] = email_ids
         return False
 
-    def _check_mail_conditions(self, mail_info):
+    def _check_mail_conditions(self, mail_info, load_body: Optional[Callable[[], Optional[str]]] = None):
         """
         检查邮件是否符合过滤条件
 
         Args:
             mail_info: 邮件信息字典
+            load_body: mail_info 没有正文时用于拉取正文，只在正文条件会影响结果时调用
 
         Returns:
             bool: 是否符合条件
@@ -355,7 +638,14 @@ class MailTask:
             conditions.append(("subject", subject_match))
 
         if self.content_text:
-            content_match = self._check_content(mail_info)
+            if load_body is not None and "body" not in mail_info:
+                # 其他条件已经决定结果时不拉取正文
+                decided = (self.condition == CONDITION_OR and any(match for _, match in conditions)) or (
+                    self.condition == CONDITION_AND and not all(match for _, match in conditions)
+                )
+                if not decided and self.condition != CONDITION_ALL:
+                    mail_info["body"] = load_body()
+            content_match = self._check_content(mail_info) if "body" in mail_info else False
             conditions.append(("content", content_match))
 
         if self.attachment is not None:  # 附件条件特殊处理，None表示不限制
@@ -421,6 +711,51 @@ class MailTask:
 
         """
 
+        body = None
+        html = None
+        has_attachment = False
+
+        # 处理不同协议的数据格式
+        if mail_type == "IMAP":
+            # IMAP格式：data[0] = (b'1 (BODY[] {1234}', b'...邮件内容...')
+            msg = email.message_from_string(decode_data(data[0][1]))
+        if mail_type == "POP3":
+            # POP3格式：data[0] = [b'...邮件内容行1...', b'...邮件内容行2...', ...]
+            # 需要将多行合并成一个字符串
+            email_content = b"\n".join(data[0])
+            msg = email.message_from_string(decode_data(email_content))
+
+        logger.info(f"【AsyncMailTask callback】邮件信息：{msg}")
+        info = MailTask._header_info(msg)
+
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                if body is None:
+                    body = b""
+                body += part.get_payload(decode=True)
+            elif part.get_content_type() == "text/html":
+                if html is None:
+                    html = b""
+                html += part.get_payload(decode=True)
+
+            if not has_attachment:
+                name = part.get_filename()
+                if name:
+                    has_attachment = True
+
+        info.update(
+            {
+                "body": decode_data(body),  # 文字内容
+                "html": decode_data(html),  # （正文）html信息
+                "has_attachment": has_attachment,  # 是否包含附件
+            }
+        )
+        return info
+
+    @staticmethod
+    def _header_info(msg):
+        """邮件头信息：发送人、接收人、主题、发送时间"""
+
         def get_sender_info(msg):
             name = email.utils.parseaddr(msg["from"])[0]
             deName = email.header.decode_header(name)[0]
@@ -458,52 +793,19 @@ class MailTask:
                 formatted_time = None
             return formatted_time
 
-        body = None
-        html = None
-        has_attachment = False
-
-        # 处理不同协议的数据格式
-        if mail_type == "IMAP":
-            if isinstance(data, list) and len(data) > 0:
-                if isinstance(data[0], tuple):
-                    # IMAP格式：data[0] = (b'1 (RFC822 {1234}', b'...邮件内容...')
-                    msg = email.message_from_string(decode_data(data[0][1]))
-                elif isinstance(data[1], (bytes, bytearray)) and len(data) > 1:
-                    # IMAP异步fetch格式：data[1] = bytearray(b'...邮件内容...')
-                    msg = email.message_from_string(decode_data(data[1]))
-        if mail_type == "POP3":
-            # POP3格式：data[0] = [b'...邮件内容行1...', b'...邮件内容行2...', ...]
-            # 需要将多行合并成一个字符串
-            email_content = b"\n".join(data[0])
-            msg = email.message_from_string(decode_data(email_content))
-
-        logger.info(f"【AsyncMailTask callback】邮件信息：{msg}")
-
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                if body is None:
-                    body = b""
-                body += part.get_payload(decode=True)
-            elif part.get_content_type() == "text/html":
-                if html is None:
-                    html = b""
-                html += part.get_payload(decode=True)
-
-            if not has_attachment:
-                name = part.get_filename()
-                if name:
-                    has_attachment = True
-
         return {
             "from": get_sender_info(msg),  # 发送人
             "to": get_receiver_info(msg),  # 接收人
             "subject": get_subject_content(msg),  # 主题
-            "body": decode_data(body),  # 文字内容
-            "html": decode_data(html),  # （正文）html信息
             "time": get_mail_time(msg),  # 发送时间
-            "has_attachment": has_attachment,  # 是否包含附件
         }
 
+    @staticmethod
+    def _extract_header_info(header: bytes):
+        """只根据 BODY[HEADER] 解析邮件头信息，不包含正文和附件"""
+        msg = email.message_from_string(decode_data(header) or "")
+        return MailTask._header_info(msg)
+
     def to_trigger(self):
         """获取该类任务的触发器模型"""
         return IntervalTrigger(end_date=self._end_time, **{"minutes": self.interval_time})
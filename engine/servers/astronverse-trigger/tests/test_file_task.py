@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+import astronverse.trigger.server  # noqa: F401 先加载 server, 和运行时的导入顺序一致
+from astronverse.trigger.tasks import file_task
+from astronverse.trigger.tasks.file_task import FileSubscription, FileTask, FileWatchService, create_flag
+from watchfiles import Change
+
+
+def test_subscription_patterns():
+    """文件名去掉首尾空白, ".txt" 这样的扩展名按 "*.txt" 匹配"""
+    sub = FileSubscription("/data", False, [".txt", " .csv ", "report.docx ", "*.log", ""], [create_flag], None)
+    assert sub.match("a.txt")
+    assert sub.match("b.csv")
+    assert sub.match("report.docx")
+    assert sub.match("x.log")
+    assert not sub.match("a.txt.bak")
+    assert not sub.match("other.docx")
+
+    # 只有空项等同于没有配置, 匹配所有文件
+    assert FileSubscription("/data", False, [" ", ""], [create_flag], None).match("any.bin")
+
+
+def test_task_subscribes_with_patterns(tmp_path, monkeypatch):
+    """FileTask 按配置的文件名/文件类型订阅, 匹配由订阅完成"""
+
+    async def run():
+        service = FileWatchService()
+        monkeypatch.setattr(file_task, "file_watch_service", service)
+        task = FileTask(directory=str(tmp_path), events=[create_flag], files_or_type=[" .txt", "report.docx "])
+        callback = asyncio.create_task(task.callback(asyncio.Queue(), asyncio.Event()))
+        await asyncio.sleep(0.05)
+        (sub,) = service.subscriptions
+        assert sub.match("a.txt")
+        assert sub.match("report.docx")
+        assert not sub.match("a.csv")
+
+        callback.cancel()
+        await asyncio.sleep(0.05)
+        assert not service.subscriptions
+        service.stop_event.set()
+
+    asyncio.run(run())
+
+
+def test_missing_root_watched_after_created(tmp_path, monkeypatch):
+    """启动时不存在的目录, 创建之后重新加入监听"""
+    monkeypatch.setattr(FileWatchService, "retry_interval", 0.1)
+    root = tmp_path / "later"
+
+    async def run():
+        q = asyncio.Queue()
+        service = FileWatchService()
+        service.subscribe(FileSubscription(str(root), False, [], [create_flag], q, debounce=0))
+        assert service.roots == ((), ())
+
+        root.mkdir()
+        await asyncio.sleep(0.5)
+        assert service.roots == ((), (os.path.normcase(str(root)),))
+        assert service.retry_task.done()
+
+        # 等待监听启动
+        await asyncio.sleep(0.5)
+        (root / "a.txt").write_text("x")
+        assert await asyncio.wait_for(q.get(), 5)
+        service.stop_event.set()
+
+    asyncio.run(run())
+
+
+def test_dispatch_by_extension(tmp_path):
+    """按扩展名订阅时只有匹配的文件事件会投递"""
+
+    async def run():
+        q = asyncio.Queue()
+        sub = FileSubscription(str(tmp_path), False, [" .txt"], [create_flag], q, debounce=0)
+        service = FileWatchService()
+        service.exact = {sub.root: [sub]}
+
+        service.dispatch([(Change.added, str(tmp_path / "b.csv"))])
+        await asyncio.sleep(0.05)
+        assert q.empty()
+
+        service.dispatch([(Change.added, str(tmp_path / "a.txt"))])
+        assert await asyncio.wait_for(q.get(), 1)
+
+    asyncio.run(run())
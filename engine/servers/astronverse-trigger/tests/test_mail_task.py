@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import socket
+import threading
+import time
+
+import astronverse.trigger.server  # noqa: F401 先加载 server, 和运行时的导入顺序一致
+from astronverse.trigger.tasks.mail_task import ImapSession, MailTask
+
+
+class FakeMailbox:
+    """服务端的收件箱, 多个连接共享"""
+
+    def __init__(self, uidvalidity: int, subjects: dict):
+        self.uidvalidity = uidvalidity
+        self.subjects = dict(subjects)
+
+    def add(self, uid: int, subject: str):
+        self.subjects[uid] = subject
+
+    def header(self, uid: int) -> bytes:
+        return "Subject: {}\r\nFrom: a@example.com\r\nTo: b@example.com\r\n\r\n".format(self.subjects[uid]).encode()
+
+
+class FakeClient:
+    """
+    模拟 imaplib.IMAP4 中 ImapSession 用到的部分
+
+    传入 sock 时支持 IDLE, 原始行通过 socket 收发; 没有 _new_tag, 使用 ImapSession.new_tag 的兜底实现
+    """
+
+    tagpre = b"TEST"
+
+    def __init__(self, mailbox: FakeMailbox, sock: socket.socket = None):
+        self.mailbox = mailbox
+        self.sock = sock
+        self.file = sock.makefile("rb") if sock else None
+        self.capabilities = ("IMAP4REV1", "IDLE") if sock else ("IMAP4REV1",)
+        self.untagged = {}
+        self.fetched = []
+        self.logged_out = False
+
+    def select(self, mailbox, readonly=False):
+        assert readonly
+        self.untagged = {
+            "UIDVALIDITY": [str(self.mailbox.uidvalidity).encode()],
+            "UIDNEXT": [str(max(self.mailbox.subjects, default=0) + 1).encode()],
+        }
+        return "OK", [str(len(self.mailbox.subjects)).encode()]
+
+    def response(self, code):
+        return code, self.untagged.pop(code, [None])
+
+    def uid(self, command, *args):
+        uids = sorted(self.mailbox.subjects)
+        if command == "SEARCH":
+            # UID n:* 没有更大的 UID 时返回最大的 UID
+            first = int(args[1].split()[1].split(":")[0])
+            found = [uid for uid in uids if uid >= first] or uids[-1:]
+            return "OK", [" ".join(str(uid) for uid in found).encode()]
+        if command == "FETCH":
+            data = []
+            for uid in (int(uid) for uid in args[0].split(",")):
+                self.fetched.append(uid)
+                header = self.mailbox.header(uid)
+                head = '{} (UID {} BODYSTRUCTURE ("text" "plain" NIL NIL NIL "7bit" 0 0) BODY[HEADER] {{{}}}'
+                data.append((head.format(uid, uid, len(header)).encode(), header))
+                data.append(b")")
+            return "OK", data
+        raise AssertionError(command)
+
+    def send(self, data: bytes):
+        if self.sock is None:
+            raise AssertionError("不支持 IDLE 时不应该发送原始命令")
+        self.sock.sendall(data)
+
+    def readline(self) -> bytes:
+        return self.file.readline()
+
+    def logout(self):
+        self.logged_out = True
+
+
+class FakeIdleServer:
+    """socket 的服务端, 只处理 IDLE 和 DONE"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+        self.idling = threading.Event()
+        self.commands = []
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        tag = None
+        for line in iter(self.file.readline, b""):
+            self.commands.append(line.strip())
+            if line.rstrip().endswith(b" IDLE"):
+                tag = line.split()[0]
+                self.sock.sendall(b"+ idling\r\n")
+                self.idling.set()
+            elif line.strip() == b"DONE":
+                self.idling.clear()
+                self.sock.sendall(tag + b" OK IDLE terminated\r\n")
+
+    def push(self, line: bytes):
+        self.sock.sendall(line)
+
+
+def make_task(pushed: threading.Event = None) -> MailTask:
+    """主题包含 hello 的邮件任务, 记录推送次数"""
+    task = MailTask(task_id="t1", theme_text="hello", attachment=None)
+    task.pushes = 0
+
+    def on_push():
+        task.pushes += 1
+        if pushed:
+            pushed.set()
+
+    task.on_push = on_push
+    return task
+
+
+def start_session(client: FakeClient, task: MailTask) -> ImapSession:
+    session = ImapSession(("imap.example.com", 993, "a@example.com"), lambda: client)
+    session.subscribers.add(task)
+    session.thread = threading.Thread(target=session.run, daemon=True)
+    session.thread.start()
+    return session
+
+
+def stop_session(session: ImapSession, task: MailTask):
+    session.unsubscribe(task)
+    session.thread.join(5)
+    assert not session.thread.is_alive()
+
+
+def test_uid_tracking_across_reconnect():
+    """重连后从记录的 UID 继续检查, 不重复也不遗漏; UIDVALIDITY 变化时只重新建立基准"""
+    mailbox = FakeMailbox(uidvalidity=7, subjects={1: "hello old"})
+    clients = []
+
+    def opener():
+        clients.append(FakeClient(mailbox))
+        return clients[-1]
+
+    task = make_task()
+    session = ImapSession(("imap.example.com", 993, "a@example.com"), opener)
+    session.subscribers.add(task)
+
+    session.connect()
+    session.check()
+    assert session.last_uid == 1
+    assert task.pushes == 0
+
+    # 断线期间到达的邮件, 重连后检查
+    mailbox.add(2, "hello new")
+    session.close()
+    assert clients[0].logged_out
+    mailbox.add(3, "other")
+    session.connect()
+    session.check()
+    assert clients[1].fetched == [2, 3]
+    assert session.last_uid == 3
+    assert task.pushes == 1
+
+    # 没有新邮件时不再拉取
+    session.check()
+    assert clients[1].fetched == [2, 3]
+    assert task.pushes == 1
+
+    # 邮箱重建, 已有的邮件不触发
+    mailbox.uidvalidity = 8
+    mailbox.add(4, "hello again")
+    session.close()
+    session.connect()
+    session.check()
+    assert clients[2].fetched == []
+    assert session.last_uid == 4
+    assert task.pushes == 1
+
+
+def test_idle_wakes_on_new_mail():
+    """IDLE 中收到 EXISTS 后立即检查新邮件并推送"""
+    client_sock, server_sock = socket.socketpair()
+    mailbox = FakeMailbox(uidvalidity=7, subjects={1: "old"})
+    server = FakeIdleServer(server_sock)
+    pushed = threading.Event()
+    task = make_task(pushed)
+    session = start_session(FakeClient(mailbox, client_sock), task)
+    try:
+        assert server.idling.wait(5)
+        # 等客户端读完 "+ idling" 进入等待, 新邮件通知单独到达
+        time.sleep(0.2)
+        start = time.monotonic()
+        mailbox.add(2, "hello")
+        server.push(b"* 2 EXISTS\r\n")
+        assert pushed.wait(5)
+        # 不需要等到 IDLE 超时或者被唤醒
+        assert time.monotonic() - start < 2
+        assert task.pushes == 1
+        assert session.last_uid == 2
+    finally:
+        stop_session(session, task)
+        client_sock.close()
+        server_sock.close()
+    # 每次 IDLE 都用新的 tag 并以 DONE 结束
+    idles = [c for c in server.commands if c.endswith(b" IDLE")]
+    assert len(idles) >= 2
+    assert len(set(idles)) == len(idles)
+    assert server.commands.count(b"DONE") == len(idles)
+
+
+def test_idle_wakes_on_request_check():
+    """IDLE 中被 request_check 唤醒, 结束 IDLE 后检查一次"""
+    client_sock, server_sock = socket.socketpair()
+    mailbox = FakeMailbox(uidvalidity=7, subjects={1: "old"})
+    server = FakeIdleServer(server_sock)
+    task = make_task()
+    session = start_session(FakeClient(mailbox, client_sock), task)
+    try:
+        assert server.idling.wait(5)
+        # 服务端没有推送 EXISTS
+        mailbox.add(2, "hello")
+        assert session.request_check(timeout=5)
+        assert task.pushes == 1
+    finally:
+        stop_session(session, task)
+        client_sock.close()
+        server_sock.close()
+
+
+def test_fallback_without_idle():
+    """服务端不支持 IDLE 时不发送 IDLE, 由 request_check 或者保活间隔触发检查"""
+    mailbox = FakeMailbox(uidvalidity=7, subjects={1: "old"})
+    client = FakeClient(mailbox)
+    task = make_task()
+    session = start_session(client, task)
+    try:
+        assert session.request_check(timeout=5)
+        assert not session.idle_supported
+        mailbox.add(2, "hello")
+        assert session.request_check(timeout=5)
+        assert task.pushes == 1
+        assert client.fetched == [2]
+    finally:
+        stop_session(session, task)
+    assert client.logged_out
+
+
+def test_new_tag():
+    """优先使用 imaplib 的 _new_tag, 没有时按 tagpre + tagnum 生成不重复的 tag"""
+
+    class Client:
+        def _new_tag(self):
+            return b"ABCD1"
+
+    assert ImapSession.new_tag(Client()) == b"ABCD1"
+
+    client = FakeClient(FakeMailbox(uidvalidity=1, subjects={}))
+    assert ImapSession.new_tag(client) == b"TEST0"
+    assert ImapSession.new_tag(client) == b"TEST1"
+
+
+def test_pop3_callback():
+    """POP3 首次只建立基准, 之后只读取新增的邮件"""
+
+    class FakePop3:
+        def __init__(self, mailbox: FakeMailbox):
+            self.mailbox = mailbox
+            self.retrieved = []
+
+        def list(self):
+            return b"+OK", [str(uid).encode() for uid in sorted(self.mailbox.subjects)], 0
+
+        def retr(self, which: int):
+            self.retrieved.append(which)
+            uid = sorted(self.mailbox.subjects)[which - 1]
+            return b"+OK", self.mailbox.header(uid).split(b"\r\n"), 0
+
+    mailbox = FakeMailbox(uidvalidity=1, subjects={1: "hello old"})
+    clients = []
+
+    def open_client():
+        clients.append(FakePop3(mailbox))
+        return clients[-1]
+
+    task = MailTask(task_id="pop3", theme_text="hello", attachment=None)
+    task.open_client = open_client
+    assert not asyncio.run(task.pop3_callback())
+
+    mailbox.add(2, "other")
+    mailbox.add(3, "hello new")
+    assert asyncio.run(task.pop3_callback())
+    assert clients[1].retrieved == [2, 3]
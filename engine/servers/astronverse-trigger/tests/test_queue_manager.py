@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import astronverse.trigger.server  # noqa: F401 先加载 server, 和运行时的导入顺序一致
+from astronverse.trigger.core import queue_manager
+from astronverse.trigger.core.queue_manager import TaskQueue, TaskQueueManager
+
+
+def make_manager(monkeypatch, free_slots: dict):
+    """槽位数由 free_slots 决定, 下发只记录不调用调度器"""
+    monkeypatch.setattr(queue_manager, "get_executor_free_slots", lambda needs_desktop=True: free_slots[needs_desktop])
+    manager = TaskQueueManager(TaskQueue(), None, None)
+    manager.dispatched = []
+    monkeypatch.setattr(manager, "dispatch_task", lambda task, needs_desktop: manager.dispatched.append(task))
+    monkeypatch.setattr(manager, "is_task_timeout", lambda task: False)
+    return manager
+
+
+def add_task(manager, name: str, needs_desktop: bool, priority: int = 0):
+    task = {
+        "unique_id": name,
+        "trigger_id": name,
+        "priority": priority,
+        "callback_project_ids": [{"project_id": name, "needs_desktop": needs_desktop}],
+    }
+    manager.task_queue_monitor.append(task, 10)
+
+
+def test_headless_does_not_block_desktop(monkeypatch):
+    """先下发不需要桌面的任务, 同一轮仍然可以下发需要桌面的任务"""
+    manager = make_manager(monkeypatch, {False: 3, True: 1})
+    add_task(manager, "headless", False, priority=2)
+    add_task(manager, "desktop", True, priority=1)
+
+    taken = manager.dispatch_ready()
+    assert [t["unique_id"] for t in taken] == ["headless", "desktop"]
+    assert manager.inflight_desktop == {"desktop"}
+
+
+def test_desktop_tasks_are_serialized(monkeypatch):
+    """需要桌面的任务一轮只下发一个, 不影响不需要桌面的任务"""
+    manager = make_manager(monkeypatch, {False: 3, True: 1})
+    add_task(manager, "desktop1", True, priority=3)
+    add_task(manager, "desktop2", True, priority=2)
+    add_task(manager, "headless", False, priority=1)
+
+    taken = manager.dispatch_ready()
+    assert [t["unique_id"] for t in taken] == ["desktop1", "headless"]
+    assert [t["unique_id"] for t in manager.task_queue_monitor] == ["desktop2"]
+
+
+def test_total_slots_limit(monkeypatch):
+    """总槽位用完后本轮结束"""
+    manager = make_manager(monkeypatch, {False: 1, True: 1})
+    add_task(manager, "headless", False, priority=2)
+    add_task(manager, "desktop", True, priority=1)
+
+    taken = manager.dispatch_ready()
+    assert [t["unique_id"] for t in taken] == ["headless"]
+    assert len(manager.task_queue_monitor) == 1
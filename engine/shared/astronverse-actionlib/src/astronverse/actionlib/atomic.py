@@ -4,6 +4,7 @@ import os
 import re
 import time
 import traceback
+from collections import OrderedDict
 from enum import Enum
 from functools import wraps
 from typing import Any
@@ -21,6 +22,7 @@ from astronverse.actionlib import (
 )
 from astronverse.actionlib.config import config
 from astronverse.actionlib.error import *
+from astronverse.actionlib.logger import logger
 from astronverse.actionlib.report import report
 from astronverse.actionlib.types import Bool, Date, Pick
 from astronverse.actionlib.utils import InspectType
@@ -31,8 +33,25 @@ class AtomicManager:
 
     def __init__(self):
         self.atomic_dict = {}
-        self.model_cache = {}
+        # 原子能力调用计划缓存(LRU) key -> (model, has_result, has_kwargs)
+        self.model_cache = OrderedDict()
         self.model_cache_max_size = 1000
+        # 流程结束时的写回回调, 执行器结束流程时会强制结束进程, atexit 注册的回调不会执行
+        self.exit_flush_funcs = []
+
+    def register_exit_flush(self, func):
+        """注册流程结束时的写回回调, 也可以作为装饰器使用"""
+        if func not in self.exit_flush_funcs:
+            self.exit_flush_funcs.append(func)
+        return func
+
+    def run_exit_flush(self):
+        """执行写回回调, 单个回调出错不影响其他回调"""
+        for func in list(self.exit_flush_funcs):
+            try:
+                func()
+            except Exception as e:
+                logger.exception("exit flush error: {}".format(e))
 
     @staticmethod
     def cfg() -> dict:
@@ -108,11 +127,41 @@ class AtomicManager:
         """
         return AtomicParamMeta(**kwargs, key=key)
 
+    def _call_plan(self, key: str, func: Any) -> tuple:
+        """
+        获取原子能力的调用计划, 首次调用时编译, 之后直接复用
+        """
+        plan = self.model_cache.get(key)
+        if plan is not None:
+            self.model_cache.move_to_end(key)
+            return plan
+
+        if not self.atomic_dict[key].__end__:
+            self._update_atomic_param(key, func)
+        meta = self.atomic_dict[key]
+        model = utils.ParamModel(meta.inputList, key)
+        model.plan = model.compile()
+        has_result = not (meta.outputList is None or len(meta.outputList) == 0)
+        plan = (model, has_result, bool(meta.__has_kwargs__))
+
+        self.model_cache[key] = plan
+        if len(self.model_cache) > self.model_cache_max_size:
+            # 淘汰最久未使用的
+            self.model_cache.popitem(last=False)
+        return plan
+
     def atomic_run(self, func: Any, key: str, *args, **kwargs):
-        base_kwargs = {k: v for k, v in kwargs.items() if v is not None and not k.startswith("__")}
-        advance_kwargs = {k: v for k, v in kwargs.items() if v is not None and k.startswith("__")}
+        base_kwargs = {}
+        advance_kwargs = {}
+        for k, v in kwargs.items():
+            if v is None:
+                continue
+            if k.startswith("__"):
+                advance_kwargs[k] = v
+            else:
+                base_kwargs[k] = v
 
-        info = kwargs.get("__info__", [])
+        info = advance_kwargs.get("__info__")
         if not info:
             # 不是用原子能力调用，而是直接调用，不做处理
             return func(*args, **base_kwargs, **advance_kwargs)
@@ -122,15 +171,24 @@ class AtomicManager:
         process_id = info[1]
 
         # 高级参数
-        res_print = kwargs.get("__res_print__", False)
-        delay_before = float(kwargs.get("__delay_before__", 0))
-        delay_after = float(kwargs.get("__delay_after__", 0))
-        skip_err = kwargs.get("__skip_err__", "exit")
-        retry_time = int(kwargs.get("__retry_time__", 0))
-        retry_interval = float(kwargs.get("__retry_interval__", 0))
+        if len(advance_kwargs) == 1:
+            # 只有__info__, 全部是默认值
+            res_print = False
+            delay_before = delay_after = 0
+            skip_err = "exit"
+            retry_time = 0
+            retry_interval = 0
+            in_external_retry = False
+        else:
+            res_print = advance_kwargs.get("__res_print__", False)
+            delay_before = float(advance_kwargs.get("__delay_before__", 0))
+            delay_after = float(advance_kwargs.get("__delay_after__", 0))
+            skip_err = advance_kwargs.get("__skip_err__", "exit")
+            retry_time = int(advance_kwargs.get("__retry_time__", 0))
+            retry_interval = float(advance_kwargs.get("__retry_interval__", 0))
 
-        # 检测是否在外部重试块中（主要是处理设置了重试）
-        in_external_retry = kwargs.get("__in_external_retry__", False)
+            # 检测是否在外部重试块中（主要是处理设置了重试）
+            in_external_retry = advance_kwargs.get("__in_external_retry__", False)
 
         # START 上报（外部重试时跳过，因为已在外层上报）
         if not in_external_retry:
@@ -146,23 +204,9 @@ class AtomicManager:
             )
 
         # 基础参数验证+转换
-        if not self.atomic_dict[key].__end__:
-            self._update_atomic_param(key, func)
-
-        if key not in self.model_cache:
-            if len(self.model_cache) > self.model_cache_max_size:
-                # gc回收
-                self.model_cache = {}
-            model = utils.ParamModel(self.atomic_dict[key].inputList, key)
-            self.model_cache[key] = model
-        else:
-            model = self.model_cache[key]
+        model, has_result, has_kwargs = self._call_plan(key, func)
 
         # 2. 高级参数处理
-        has_result = True
-        if self.atomic_dict[key].outputList is None or len(self.atomic_dict[key].outputList) == 0:
-            has_result = False
-
         if delay_before > 0:
             time.sleep(delay_before)
 
@@ -170,11 +214,11 @@ class AtomicManager:
             try:
                 # 验证只验证 __convert__ 为true的参数，不适用于对象验证
                 model_res = model(**base_kwargs)
-                for name, value in model_res.items():
-                    base_kwargs[name] = value
+                if model_res:
+                    base_kwargs.update(model_res)
 
                 # 只有**kwargs的原子能力才接受高级参数
-                if not self.atomic_dict[key].__has_kwargs__:
+                if not has_kwargs:
                     advance_kwargs = {}
                 res = func(*args, **base_kwargs, **advance_kwargs)
                 if res_print and has_result:
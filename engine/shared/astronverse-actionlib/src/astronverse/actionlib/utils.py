@@ -89,6 +89,7 @@ class ParamModel:
     def __init__(self, inputList: list, key: str = ""):
         self.inputList = inputList
         self.key = key
+        self.plan = None
 
     @staticmethod
     def parse_conditional(conditional, kwargs) -> bool:
@@ -128,67 +129,96 @@ class ParamModel:
             )
 
     def __call__(self, **kwargs) -> dict:
+        """只返回需要转换的参数, 类型已经匹配的参数直接跳过"""
+        if self.plan is None:
+            self.plan = self.compile()
+
         res_list = {}
-        for i in self.inputList:
-            if i.name in kwargs:
-                value = kwargs[i.name]
-            else:
+        for name, kind, annotation, types, extra in self.plan:
+            if name not in kwargs:
                 continue
+            value = kwargs[name]
+            if kind == InspectType.PYTHONBASE:
+                # list/dict 保留原有的拷贝语义, 不可变类型完全匹配时不需要转换
+                if extra and type(value) is annotation:
+                    continue
+                res_list[name] = self.convert_base(annotation, name, types, value)
+            elif kind == InspectType.ENUM:
+                if isinstance(value, annotation):
+                    continue
+                res_list[name] = self.convert_enum(annotation, extra, value)
+            else:
+                # __validate__ 对已经是该类型的值原样返回
+                if isinstance(value, annotation):
+                    continue
+                res_list[name] = self.convert_rpa(annotation, name, types, value)
+        return res_list
 
-            # 类型处理
-            if i.__annotation__ == inspect.Parameter.empty:
-                # 忽略
-                pass
-            elif i.__annotation__ in [str, list, tuple, int, float, dict, bool]:
-                try:
-                    if i.__annotation__ == bool and isinstance(value, str):
-                        if value.lower() in ["false", "none", "undefined", ""]:
-                            value = False
-                        else:
-                            value = i.__annotation__(value)
-                    elif i.__annotation__ in [int, float] and isinstance(value, str):
-                        if value.lower() == "":
-                            value = 0
-                        else:
-                            value = i.__annotation__(value)
-                    elif (
-                        i.__annotation__ == list
-                        and isinstance(value, str)
-                        and value.startswith("[")
-                        and value.endswith("]")
-                    ) or (
-                        i.__annotation__ == dict
-                        and isinstance(value, str)
-                        and value.startswith("{")
-                        and value.endswith("}")
-                    ):
-                        value = ast.literal_eval(value)
-                    else:
-                        value = i.__annotation__(value)
-                except Exception as e:
-                    raise ParamException(
-                        PARAM_CONVERT_ERROR_FORMAT.format(i.name, i.types, value),
-                        "{}的值转换成{}失败{}, error:{}".format(i.name, i.types, value, e),
-                    ) from e
-            elif isinstance(i.__annotation__, str) or str(i.__annotation__).startswith("typing."):
-                # 忽略
-                pass
-            elif issubclass(i.__annotation__, Enum):
-                # 转换
-                for a in i.__annotation__:
-                    if a.value == value:
-                        value = a
-            elif hasattr(i.__annotation__, "__validate__"):
-                # 转换
+    def compile(self) -> list:
+        """
+        预编译参数转换计划, 只保留需要转换的参数
+        [(name, kind, annotation, types, extra)]
+        """
+        plan = []
+        for i in self.inputList:
+            annotation = i.__annotation__
+            if annotation == inspect.Parameter.empty:
+                continue
+            elif annotation in [str, list, tuple, int, float, dict, bool]:
+                immutable = annotation in [str, tuple, int, float, bool]
+                plan.append((i.name, InspectType.PYTHONBASE, annotation, i.types, immutable))
+            elif isinstance(annotation, str) or str(annotation).startswith("typing."):
+                continue
+            elif issubclass(annotation, Enum):
                 try:
-                    value = i.__annotation__.__validate__(i.name, value)  # noqa
-                except Exception as e:
-                    raise ParamException(
-                        PARAM_CONVERT_ERROR_FORMAT.format(i.name, i.types, value),
-                        "{}的值装换成{}失败{}, error:{}".format(i.name, i.types, value, e),
-                    ) from e
-            else:
-                # 忽略
+                    members = {a.value: a for a in annotation}
+                except TypeError:
+                    members = None
+                plan.append((i.name, InspectType.ENUM, annotation, i.types, members))
+            elif hasattr(annotation, "__validate__"):
+                plan.append((i.name, InspectType.RPABASE, annotation, i.types, None))
+        return plan
+
+    @staticmethod
+    def convert_base(annotation, name, types, value):
+        try:
+            if annotation == bool and isinstance(value, str):
+                if value.lower() in ["false", "none", "undefined", ""]:
+                    return False
+                return annotation(value)
+            elif annotation in [int, float] and isinstance(value, str):
+                if value.lower() == "":
+                    return 0
+                return annotation(value)
+            elif (annotation == list and isinstance(value, str) and value.startswith("[") and value.endswith("]")) or (
+                annotation == dict and isinstance(value, str) and value.startswith("{") and value.endswith("}")
+            ):
+                return ast.literal_eval(value)
+            return annotation(value)
+        except Exception as e:
+            raise ParamException(
+                PARAM_CONVERT_ERROR_FORMAT.format(name, types, value),
+                "{}的值转换成{}失败{}, error:{}".format(name, types, value, e),
+            ) from e
+
+    @staticmethod
+    def convert_enum(annotation, members, value):
+        if members is not None:
+            try:
+                return members.get(value, value)
+            except TypeError:
                 pass
-            res_list[i.name] = value
-        return res_list
+        for a in annotation:
+            if a.value == value:
+                value = a
+        return value
+
+    @staticmethod
+    def convert_rpa(annotation, name, types, value):
+        try:
+            return annotation.__validate__(name, value)  # noqa
+        except Exception as e:
+            raise ParamException(
+                PARAM_CONVERT_ERROR_FORMAT.format(name, types, value),
+                "{}的值装换成{}失败{}, error:{}".format(name, types, value, e),
+            ) from e
@@ -0,0 +1,134 @@
+import time
+import unittest
+from enum import Enum
+
+from astronverse.actionlib.atomic import AtomicManager
+from astronverse.actionlib.report import IReport, report
+from astronverse.actionlib.types import Int, Str
+
+
+class NullReport(IReport):
+    def info(self, message):
+        pass
+
+    def warning(self, message):
+        pass
+
+    def error(self, message):
+        pass
+
+
+class Mode(Enum):
+    FAST = "fast"
+    SLOW = "slow"
+
+
+def make_atomic(mg: AtomicManager):
+    @mg.atomic("Demo", outputList=[mg.param("res", types="Any")])
+    def demo(a: int = 0, b: str = "", c: list = None, mode: Mode = Mode.FAST, d: Int = 0, e: Str = "", **kwargs):
+        return a, b, c, mode, d, e
+
+    return demo
+
+
+class TestAtomicRun(unittest.TestCase):
+    """原子能力调用测试类"""
+
+    def setUp(self):
+        report.set_code(NullReport())
+        self.mg = AtomicManager()
+        self.demo = make_atomic(self.mg)
+
+    def tearDown(self):
+        report.set_code(None)
+
+    def test_convert(self):
+        """测试参数转换"""
+        res = self.demo(a="12", b=3, c="[1, 2]", mode="slow", d="5", e=6, __info__=[1, "p"])
+        self.assertEqual(res, (12, "3", [1, 2], Mode.SLOW, 5, "6"))
+        self.assertIsInstance(res[4], Int)
+        self.assertIsInstance(res[5], Str)
+
+    def test_typed_value_skip(self):
+        """测试已经是目标类型的值不做转换"""
+        d = Int(5)
+        res = self.demo(a=1, b="x", mode=Mode.FAST, d=d, __info__=[1, "p"])
+        self.assertIs(res[4], d)
+        self.assertEqual(res[:2], (1, "x"))
+
+    def test_list_copy(self):
+        """测试list参数保持拷贝语义"""
+        c = [1, 2]
+        res = self.demo(c=c, __info__=[1, "p"])
+        self.assertEqual(res[2], c)
+        self.assertIsNot(res[2], c)
+
+    def test_direct_call(self):
+        """测试直接调用不做转换"""
+        res = self.demo(a="12")
+        self.assertEqual(res[0], "12")
+
+    def test_plan_lru(self):
+        """测试调用计划缓存按LRU淘汰"""
+        self.mg.model_cache_max_size = 1
+        self.demo(a=1, __info__=[1, "p"])
+
+        @self.mg.atomic("Demo")
+        def other(a: int = 0):
+            return a
+
+        other(a="1", __info__=[2, "p"])
+        self.assertEqual(list(self.mg.model_cache.keys()), ["Demo.other"])
+
+    def test_benchmark(self):
+        """测试单次调用开销"""
+        n = 100000
+        start = time.perf_counter()
+        for i in range(n):
+            self.demo(a=i, b="x", mode=Mode.FAST, __info__=[1, "p"])
+        cost = time.perf_counter() - start
+        print("atomic_run: {:.2f}us/call".format(cost / n * 1e6))
+
+    def test_benchmark_generated_call(self):
+        """测试执行器生成代码的调用开销: 全量参数 vs 常量内联+省略默认高级参数"""
+        old_code = (
+            "for i in range(10000):\n"
+            "    res = demo(a='12', b='x', mode='fast', d='5', __delay_before__='0', __delay_after__='0', "
+            "__res_print__=False, __skip_err__='exit', __info__=[1, 'p'])\n"
+        )
+        new_code = "for i in range(10000):\n    res = demo(a=12, b='x', mode='fast', d=5, __info__=(1, 'p'))\n"
+
+        costs = []
+        for code in [old_code, new_code]:
+            scope = {"demo": self.demo}
+            start = time.perf_counter()
+            exec(compile(code, "main.py", "exec"), scope)
+            costs.append(time.perf_counter() - start)
+            self.assertEqual(scope["res"], (12, "x", None, Mode.FAST, 5, ""))
+        print("generated call 10k: old {:.1f}ms, new {:.1f}ms".format(costs[0] * 1e3, costs[1] * 1e3))
+
+
+class TestExitFlush(unittest.TestCase):
+    """流程结束时的写回回调"""
+
+    def test_run_exit_flush(self):
+        mg = AtomicManager()
+        calls = []
+
+        @mg.register_exit_flush
+        def broken():
+            calls.append("broken")
+            raise ValueError("broken")
+
+        def flush():
+            calls.append("flush")
+
+        mg.register_exit_flush(flush)
+        mg.register_exit_flush(flush)
+        mg.run_exit_flush()
+        # 按注册顺序执行, 重复注册只执行一次, 出错的回调不影响后面的回调
+        self.assertEqual(calls, ["broken", "flush"])
+
+
+if __name__ == "__main__":
+    unittest.main()
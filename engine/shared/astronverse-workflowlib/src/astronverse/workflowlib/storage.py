@@ -1,6 +1,9 @@
 import base64
 import json
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
 from abc import ABC, abstractmethod
 from json import JSONDecodeError
@@ -22,37 +25,71 @@ class Storage(ABC):
 
 
 class StorageCache:
-    def __init__(self, base_dir: str = "resource", resource_cache: bool = True):
+    """
+    资源缓存: 内存LRU(按字节数限制) + 本地文件
+    图片在内存中保存原始字节, 读取时才转成base64
+    """
+
+    def __init__(self, base_dir: str = "resource", resource_cache: bool = True, max_bytes: int = 64 * 1024 * 1024):
         self.base_dir = base_dir
         self.resource_cache = resource_cache
-        self.memory = {}
+        self.max_bytes = max_bytes
+        self.memory_bytes = 0
+        # (resource_type, resource_id) -> (data, size)
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
         self.resource_type_conf = {
             "element": {"file_ext": "json", "binary": False},
             "image": {"file_ext": "png", "binary": True},
         }
 
+    def __memory_get__(self, key: tuple) -> Optional[Any]:
+        with self.lock:
+            item = self.memory.get(key)
+            if item is None:
+                return None
+            self.memory.move_to_end(key)
+            return item[0]
+
+    def __memory_set__(self, key: tuple, data: Any, size: int):
+        with self.lock:
+            old = self.memory.pop(key, None)
+            if old is not None:
+                self.memory_bytes -= old[1]
+            if size > self.max_bytes:
+                # 单个资源超过上限, 不进内存, 只走本地文件
+                return
+            self.memory[key] = (data, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.max_bytes:
+                _, (_, evict_size) = self.memory.popitem(last=False)
+                self.memory_bytes -= evict_size
+
+    @staticmethod
+    def __to_output__(conf: dict, data: Any) -> Any:
+        if conf.get("binary") and isinstance(data, bytes):
+            return base64.b64encode(data).decode("utf-8")
+        return data
+
     def get(self, resource_type: str, resource_id: str) -> Optional[Any]:
         if resource_type not in self.resource_type_conf:
             raise Exception("Resource type does not exist: {}".format(resource_type))
         conf = self.resource_type_conf[resource_type]
-        if resource_type not in self.memory:
-            self.memory[resource_type] = {}
 
-        data = self.memory.get(resource_type, {}).get(resource_id, None)
+        data = self.__memory_get__((resource_type, resource_id))
         if data is not None:
-            return data
+            return self.__to_output__(conf, data)
 
         local_data_path = os.path.join(self.base_dir, resource_type, "{}.{}".format(resource_id, conf.get("file_ext")))
         if self.resource_cache and os.path.exists(local_data_path):
+            with open(local_data_path, "rb") as f:
+                raw_bytes = f.read()
             if conf.get("binary"):
-                with open(local_data_path, "rb") as f:
-                    raw_bytes = f.read()
-                data = base64.b64encode(raw_bytes).decode("utf-8")
+                data = raw_bytes
             else:
-                with open(local_data_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            self.memory[resource_type][resource_id] = data
-            return data
+                data = json.loads(raw_bytes.decode("utf-8"))
+            self.__memory_set__((resource_type, resource_id), data, len(raw_bytes))
+            return self.__to_output__(conf, data)
 
         return None
 
@@ -60,22 +97,21 @@ class StorageCache:
         if resource_type not in self.resource_type_conf:
             raise Exception("Resource type does not exist: {}".format(resource_type))
         conf = self.resource_type_conf[resource_type]
-        if resource_type not in self.memory:
-            self.memory[resource_type] = {}
-        dir_path = os.path.join(self.base_dir, resource_type)
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, exist_ok=True)
 
-        self.memory[resource_type][resource_id] = data
-        local_data_path = os.path.join(self.base_dir, resource_type, "{}.{}".format(resource_id, conf.get("file_ext")))
+        if conf.get("binary"):
+            raw_bytes = base64.b64decode(data) if isinstance(data, str) else data
+            data = raw_bytes
+        else:
+            raw_bytes = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.__memory_set__((resource_type, resource_id), data, len(raw_bytes))
+
         if self.resource_cache:
-            if resource_type == "element":
-                with open(local_data_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False)
-            elif resource_type == "image":
-                binary_bytes = base64.b64decode(data) if isinstance(data, str) else data
-                with open(local_data_path, "wb") as f:
-                    f.write(binary_bytes)
+            dir_path = os.path.join(self.base_dir, resource_type)
+            if not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            local_data_path = os.path.join(dir_path, "{}.{}".format(resource_id, conf.get("file_ext")))
+            with open(local_data_path, "wb") as f:
+                f.write(raw_bytes)
 
 
 class HttpStorage(Storage):
@@ -159,3 +195,18 @@ class HttpStorage(Storage):
 
         self.cache_manager.set("image", img_id, res)
         return res
+
+    def element_prefetch(self, project_id: str, element_ids: list, mode: str, version: str = "", workers: int = 8):
+        """批量预加载工程引用的元素, 单个元素失败不影响其他元素, 使用时会再次获取"""
+        element_ids = [i for i in dict.fromkeys(element_ids or []) if i]
+        if not element_ids:
+            return
+
+        def __load(element_id):
+            try:
+                self.element_detail(project_id, element_id, mode, version)
+            except Exception as e:
+                logger.warning("Element prefetch failed {}: {}".format(element_id, e))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(element_ids)))) as pool:
+            list(pool.map(__load, element_ids))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import base64
+import tempfile
+
+from astronverse.workflowlib.storage import StorageCache
+
+
+def test_storage_cache_lru():
+    """测试内存缓存按字节数淘汰"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = StorageCache(base_dir=tmp, resource_cache=False, max_bytes=10)
+        cache.set("image", "a", b"12345")
+        cache.set("image", "b", b"12345")
+        cache.get("image", "a")
+        cache.set("image", "c", b"12345")
+
+        assert cache.memory_bytes <= 10
+        assert cache.get("image", "b") is None
+        assert cache.get("image", "a") == base64.b64encode(b"12345").decode("utf-8")
+
+
+def test_storage_cache_disk():
+    """测试本地文件缓存, 图片以原始字节保存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        img = base64.b64encode(b"png-bytes").decode("utf-8")
+        cache = StorageCache(base_dir=tmp, resource_cache=True)
+        cache.set("image", "i", img)
+        cache.set("element", "e", {"name": "元素"})
+        assert cache.memory[("image", "i")][0] == b"png-bytes"
+
+        cache = StorageCache(base_dir=tmp, resource_cache=True)
+        assert cache.get("image", "i") == img
+        assert cache.get("element", "e") == {"name": "元素"}
+
+
+if __name__ == "__main__":
+    test_storage_cache_lru()
+    test_storage_cache_disk()